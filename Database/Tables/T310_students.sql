@@ -33,6 +33,7 @@ CREATE TABLE students (
     father_phone VARCHAR(20),
     father_email VARCHAR(255),
     father_occupation VARCHAR(100),
+    family_key VARCHAR(230),
     mother_name VARCHAR(200),
     mother_phone VARCHAR(20),
     mother_email VARCHAR(255),
@@ -76,6 +77,7 @@ CREATE INDEX IF NOT EXISTS idx_students_session ON students(session_year_id);
 CREATE INDEX IF NOT EXISTS idx_students_user_id ON students(user_id);
 CREATE INDEX IF NOT EXISTS idx_students_not_deleted ON students(is_deleted) WHERE is_deleted = FALSE;
 CREATE INDEX IF NOT EXISTS idx_students_active_not_deleted ON students(is_active, is_deleted) WHERE is_active = TRUE AND is_deleted = FALSE;
+CREATE INDEX IF NOT EXISTS idx_students_family_key ON students(family_key) WHERE family_key IS NOT NULL AND is_active = TRUE AND (is_deleted = FALSE OR is_deleted IS NULL);
 
 -- Add comments
 COMMENT ON TABLE students IS 'Student profile information';
@@ -84,6 +86,7 @@ COMMENT ON COLUMN students.admission_number IS 'Unique admission number (unique
 COMMENT ON COLUMN students.email IS 'Student email address (unique only for non-deleted students with non-null email)';
 COMMENT ON COLUMN students.profile_picture_url IS 'Cloudinary URL for student profile picture';
 COMMENT ON COLUMN students.profile_picture_cloudinary_id IS 'Cloudinary public ID for profile picture management (deletion/replacement)';
+COMMENT ON COLUMN students.family_key IS 'Sibling family key: normalized father name || ''|'' || father phone (maintained by the backend)';
 COMMENT ON COLUMN students.is_deleted IS 'Soft delete flag';
 COMMENT ON COLUMN students.deleted_date IS 'Timestamp when record was soft deleted';
 
@@ -0,0 +1,65 @@
+-- =====================================================
+-- Tables: progression_batches, progression_batch_items
+-- Description: Staged, resumable bulk session progression. A batch is
+--              processed in committed chunks of pending items.
+-- Dependencies: session_years, students, classes, progression_actions, users
+-- =====================================================
+
+-- Drop existing tables
+DROP TABLE IF EXISTS progression_batch_items CASCADE;
+DROP TABLE IF EXISTS progression_batches CASCADE;
+
+-- Create tables
+CREATE TABLE progression_batches (
+    id SERIAL PRIMARY KEY,
+    batch_id VARCHAR(50) NOT NULL UNIQUE,
+    from_session_year_id INTEGER NOT NULL REFERENCES session_years(id),
+    to_session_year_id INTEGER NOT NULL REFERENCES session_years(id),
+
+    -- Progress
+    status VARCHAR(20) NOT NULL DEFAULT 'PENDING',
+    total_students INTEGER NOT NULL DEFAULT 0,
+    processed_count INTEGER NOT NULL DEFAULT 0,
+    successful_count INTEGER NOT NULL DEFAULT 0,
+    failed_count INTEGER NOT NULL DEFAULT 0,
+    chunk_size INTEGER NOT NULL DEFAULT 500,
+    last_error TEXT,
+
+    -- Audit
+    created_by INTEGER NOT NULL REFERENCES users(id),
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    started_at TIMESTAMP WITH TIME ZONE,
+    completed_at TIMESTAMP WITH TIME ZONE,
+    updated_at TIMESTAMP WITH TIME ZONE,
+
+    CONSTRAINT chk_progression_batches_status
+        CHECK (status IN ('PENDING', 'RUNNING', 'COMPLETED', 'FAILED', 'ROLLED_BACK'))
+);
+
+CREATE TABLE progression_batch_items (
+    id SERIAL PRIMARY KEY,
+    batch_id VARCHAR(50) NOT NULL REFERENCES progression_batches(batch_id) ON DELETE CASCADE,
+    student_id INTEGER NOT NULL REFERENCES students(id) ON DELETE CASCADE,
+    progression_action_id INTEGER REFERENCES progression_actions(id),
+    creates_new_session BOOLEAN NOT NULL DEFAULT TRUE,
+    target_class_id INTEGER REFERENCES classes(id),
+    target_section VARCHAR(10),
+    target_roll_number VARCHAR(20),
+    remarks TEXT,
+
+    status VARCHAR(20) NOT NULL DEFAULT 'PENDING',
+    error_message TEXT,
+
+    CONSTRAINT chk_progression_batch_items_status CHECK (status IN ('PENDING', 'DONE', 'FAILED'))
+);
+
+-- Performance Indexes
+-- Chunk selection: pending items of a batch in id order
+CREATE INDEX IF NOT EXISTS idx_progression_batch_items_pending
+    ON progression_batch_items(batch_id, id) WHERE status = 'PENDING';
+CREATE INDEX IF NOT EXISTS idx_progression_batch_items_batch ON progression_batch_items(batch_id);
+
+-- Comments
+COMMENT ON TABLE progression_batches IS 'Bulk session progression runs with progress counters (resumable)';
+COMMENT ON TABLE progression_batch_items IS 'Students of a progression batch with requested action and target class';
+COMMENT ON COLUMN progression_batch_items.status IS 'PENDING until its chunk commits (DONE); FAILED items did not pass validation';
@@ -0,0 +1,61 @@
+-- =====================================================
+-- Table: student_fee_balances
+-- Description: Per student x session rollup of monthly_fee_tracking and
+--              transport_monthly_tracking, maintained by the backend in the
+--              same transaction as payments, reversals and tracking changes
+-- Dependencies: students, session_years
+-- =====================================================
+
+-- Drop existing table
+DROP TABLE IF EXISTS student_fee_balances CASCADE;
+
+-- Create table
+CREATE TABLE student_fee_balances (
+    student_id INTEGER NOT NULL,
+    session_year_id INTEGER NOT NULL,
+
+    -- Tuition months (monthly_fee_tracking)
+    months_tracked INTEGER NOT NULL DEFAULT 0,
+    paid_months INTEGER NOT NULL DEFAULT 0,
+    partial_months INTEGER NOT NULL DEFAULT 0,
+    pending_months INTEGER NOT NULL DEFAULT 0,
+    tuition_expected DECIMAL(12,2) NOT NULL DEFAULT 0.00,
+    tuition_paid DECIMAL(12,2) NOT NULL DEFAULT 0.00,
+    tuition_balance DECIMAL(12,2) NOT NULL DEFAULT 0.00,
+    tuition_overdue_months INTEGER NOT NULL DEFAULT 0,
+    tuition_overdue_amount DECIMAL(12,2) NOT NULL DEFAULT 0.00,
+
+    -- Transport months with service enabled (transport_monthly_tracking)
+    transport_months INTEGER NOT NULL DEFAULT 0,
+    transport_expected DECIMAL(12,2) NOT NULL DEFAULT 0.00,
+    transport_paid DECIMAL(12,2) NOT NULL DEFAULT 0.00,
+    transport_balance DECIMAL(12,2) NOT NULL DEFAULT 0.00,
+
+    -- Tuition + transport
+    expected_amount DECIMAL(12,2) NOT NULL DEFAULT 0.00,
+    paid_amount DECIMAL(12,2) NOT NULL DEFAULT 0.00,
+    balance_amount DECIMAL(12,2) NOT NULL DEFAULT 0.00,
+    overdue_months INTEGER NOT NULL DEFAULT 0,
+    overdue_amount DECIMAL(12,2) NOT NULL DEFAULT 0.00,
+    oldest_unpaid_due_date DATE,
+    last_payment_date DATE,
+    as_of_date DATE NOT NULL DEFAULT CURRENT_DATE,
+
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+
+    PRIMARY KEY (student_id, session_year_id),
+    FOREIGN KEY (student_id) REFERENCES students(id) ON DELETE CASCADE,
+    FOREIGN KEY (session_year_id) REFERENCES session_years(id)
+);
+
+-- Create indexes
+-- Session-wide lists and totals, outstanding balances first
+CREATE INDEX IF NOT EXISTS idx_student_fee_balances_session_balance ON student_fee_balances(session_year_id, balance_amount DESC);
+CREATE INDEX IF NOT EXISTS idx_student_fee_balances_overdue ON student_fee_balances(session_year_id, overdue_amount DESC) WHERE overdue_months > 0;
+
+-- Add comments
+COMMENT ON TABLE student_fee_balances IS 'Maintained rollup of monthly tuition and transport tracking per student and session; verified by the backend reconciliation job';
+COMMENT ON COLUMN student_fee_balances.transport_months IS 'Transport months with is_service_enabled = TRUE (all enrollments of the session)';
+COMMENT ON COLUMN student_fee_balances.overdue_months IS 'Tuition and transport months with a balance whose due_date is before as_of_date';
+COMMENT ON COLUMN student_fee_balances.as_of_date IS 'Date the overdue figures were computed for (rolled forward by reconciliation)';
+COMMENT ON COLUMN student_fee_balances.last_payment_date IS 'Latest non-reversal fee or transport payment date for the session';
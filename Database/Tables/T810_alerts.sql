@@ -54,7 +54,7 @@ CREATE TABLE alerts (
     updated_at TIMESTAMP WITH TIME ZONE,
 
     -- Soft Delete
-    is_deleted BOOLEAN DEFAULT FALSE,
+    is_deleted BOOLEAN NOT NULL DEFAULT FALSE,
     deleted_date TIMESTAMP WITH TIME ZONE
 );
 
@@ -69,11 +69,13 @@ CREATE INDEX IF NOT EXISTS idx_alerts_target_user ON alerts(target_user_id);
 CREATE INDEX IF NOT EXISTS idx_alerts_created ON alerts(created_at DESC);
 CREATE INDEX IF NOT EXISTS idx_alerts_priority ON alerts(priority_level DESC, created_at DESC);
 
--- Composite index for common query patterns
-CREATE INDEX IF NOT EXISTS idx_alerts_unread ON alerts(alert_status_id, target_role, created_at DESC)
-    WHERE is_deleted = FALSE;
-CREATE INDEX IF NOT EXISTS idx_alerts_role_unread ON alerts(target_role, alert_status_id, created_at DESC)
-    WHERE is_deleted = FALSE;
+-- Visibility branches of the alert list (newest first); unread counts come from alert_unread_counters
+CREATE INDEX IF NOT EXISTS idx_alerts_user_visible ON alerts(target_user_id, created_at DESC)
+    WHERE is_deleted = FALSE AND target_user_id IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_alerts_role_visible ON alerts(target_role, created_at DESC)
+    WHERE is_deleted = FALSE AND target_user_id IS NULL;
+CREATE INDEX IF NOT EXISTS idx_alerts_broadcast_visible ON alerts(created_at DESC)
+    WHERE is_deleted = FALSE AND target_user_id IS NULL AND target_role IS NULL;
 
 -- Add comments
 COMMENT ON TABLE alerts IS 'Central notification/alert storage for all system activities';
@@ -0,0 +1,26 @@
+-- =====================================================
+-- Table: alert_unread_counters
+-- Description: Maintained unread alert counts per recipient bucket
+--              (one user, one role, or everyone). A user's unread
+--              count is the sum of their USER, ROLE and ALL rows.
+-- Dependencies: alerts
+-- =====================================================
+
+-- Drop existing table
+DROP TABLE IF EXISTS alert_unread_counters CASCADE;
+
+-- Create table
+CREATE TABLE alert_unread_counters (
+    -- 'USER' (key = user id), 'ROLE' (key = role name) or 'ALL' (key = '*')
+    recipient_type VARCHAR(10) NOT NULL,
+    recipient_key VARCHAR(50) NOT NULL,
+    unread_count INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+
+    PRIMARY KEY (recipient_type, recipient_key)
+);
+
+-- Add comments
+COMMENT ON TABLE alert_unread_counters IS 'Unread, not deleted alerts per visibility bucket; maintained by the backend with every alert write';
+COMMENT ON COLUMN alert_unread_counters.recipient_type IS 'USER: target_user_id set; ROLE: target_role only; ALL: broadcast';
+COMMENT ON COLUMN alert_unread_counters.recipient_key IS 'User id, role name, or * for broadcast alerts';
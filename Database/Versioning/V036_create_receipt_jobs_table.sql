@@ -0,0 +1,55 @@
+-- =====================================================
+-- Migration: V036_create_receipt_jobs_table
+-- Description: Queue table for asynchronous receipt generation,
+--              Cloudinary upload and WhatsApp delivery
+--              (payment endpoints no longer do this inline)
+-- =====================================================
+
+CREATE TABLE IF NOT EXISTS receipt_jobs (
+    id SERIAL PRIMARY KEY,
+    job_type VARCHAR(20) NOT NULL,
+    fee_payment_id INTEGER REFERENCES fee_payments(id),
+    transport_payment_id INTEGER REFERENCES transport_payments(id),
+    receipt_number VARCHAR(50) NOT NULL,
+
+    -- Receipt generator inputs and WhatsApp recipient
+    payload JSONB NOT NULL DEFAULT '{}',
+
+    -- Queue State
+    status VARCHAR(20) NOT NULL DEFAULT 'PENDING',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 5,
+    next_attempt_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    locked_at TIMESTAMP WITH TIME ZONE,
+    last_error TEXT,
+
+    -- Receipt Step
+    receipt_status VARCHAR(20) NOT NULL DEFAULT 'PENDING',
+    receipt_url TEXT,
+    receipt_public_id VARCHAR(255),
+
+    -- WhatsApp Step
+    whatsapp_status VARCHAR(30) NOT NULL DEFAULT 'PENDING',
+    whatsapp_phone VARCHAR(20),
+    whatsapp_message_sid VARCHAR(50),
+
+    -- Audit
+    created_by INTEGER REFERENCES users(id),
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    updated_at TIMESTAMP WITH TIME ZONE,
+    completed_at TIMESTAMP WITH TIME ZONE,
+
+    CONSTRAINT chk_receipt_jobs_type CHECK (job_type IN ('FEE', 'COMBINED', 'TRANSPORT')),
+    CONSTRAINT chk_receipt_jobs_status CHECK (status IN ('PENDING', 'PROCESSING', 'COMPLETED', 'FAILED'))
+);
+
+-- Performance Indexes
+-- Worker poll: due jobs in order
+CREATE INDEX IF NOT EXISTS idx_receipt_jobs_due ON receipt_jobs(next_attempt_at, id) WHERE status = 'PENDING';
+CREATE INDEX IF NOT EXISTS idx_receipt_jobs_fee_payment ON receipt_jobs(fee_payment_id);
+CREATE INDEX IF NOT EXISTS idx_receipt_jobs_transport_payment ON receipt_jobs(transport_payment_id);
+
+-- Comments
+COMMENT ON TABLE receipt_jobs IS 'Post-payment receipt delivery queue processed by the backend receipt worker';
+COMMENT ON COLUMN receipt_jobs.payload IS 'Receipt generator inputs (payment, student, breakdown, summary) and WhatsApp recipient';
+COMMENT ON COLUMN receipt_jobs.next_attempt_at IS 'Earliest time the worker may pick the job up (exponential backoff on failure)';
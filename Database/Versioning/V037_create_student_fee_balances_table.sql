@@ -0,0 +1,143 @@
+-- =====================================================
+-- Migration: V037_create_student_fee_balances_table
+-- Description: Maintained per student x session fee balance rollup
+--              (tuition + transport monthly tracking). Fee screens read
+--              this table instead of re-aggregating tracking rows; the
+--              backend updates it with every payment, reversal and
+--              tracking change and reconciles it periodically.
+-- =====================================================
+
+CREATE TABLE IF NOT EXISTS student_fee_balances (
+    student_id INTEGER NOT NULL,
+    session_year_id INTEGER NOT NULL,
+
+    -- Tuition months (monthly_fee_tracking)
+    months_tracked INTEGER NOT NULL DEFAULT 0,
+    paid_months INTEGER NOT NULL DEFAULT 0,
+    partial_months INTEGER NOT NULL DEFAULT 0,
+    pending_months INTEGER NOT NULL DEFAULT 0,
+    tuition_expected DECIMAL(12,2) NOT NULL DEFAULT 0.00,
+    tuition_paid DECIMAL(12,2) NOT NULL DEFAULT 0.00,
+    tuition_balance DECIMAL(12,2) NOT NULL DEFAULT 0.00,
+    tuition_overdue_months INTEGER NOT NULL DEFAULT 0,
+    tuition_overdue_amount DECIMAL(12,2) NOT NULL DEFAULT 0.00,
+
+    -- Transport months with service enabled (transport_monthly_tracking)
+    transport_months INTEGER NOT NULL DEFAULT 0,
+    transport_expected DECIMAL(12,2) NOT NULL DEFAULT 0.00,
+    transport_paid DECIMAL(12,2) NOT NULL DEFAULT 0.00,
+    transport_balance DECIMAL(12,2) NOT NULL DEFAULT 0.00,
+
+    -- Tuition + transport
+    expected_amount DECIMAL(12,2) NOT NULL DEFAULT 0.00,
+    paid_amount DECIMAL(12,2) NOT NULL DEFAULT 0.00,
+    balance_amount DECIMAL(12,2) NOT NULL DEFAULT 0.00,
+    overdue_months INTEGER NOT NULL DEFAULT 0,
+    overdue_amount DECIMAL(12,2) NOT NULL DEFAULT 0.00,
+    oldest_unpaid_due_date DATE,
+    last_payment_date DATE,
+    as_of_date DATE NOT NULL DEFAULT CURRENT_DATE,
+
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+
+    PRIMARY KEY (student_id, session_year_id),
+    FOREIGN KEY (student_id) REFERENCES students(id) ON DELETE CASCADE,
+    FOREIGN KEY (session_year_id) REFERENCES session_years(id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_student_fee_balances_session_balance ON student_fee_balances(session_year_id, balance_amount DESC);
+CREATE INDEX IF NOT EXISTS idx_student_fee_balances_overdue ON student_fee_balances(session_year_id, overdue_amount DESC) WHERE overdue_months > 0;
+
+COMMENT ON TABLE student_fee_balances IS 'Maintained rollup of monthly tuition and transport tracking per student and session; verified by the backend reconciliation job';
+COMMENT ON COLUMN student_fee_balances.transport_months IS 'Transport months with is_service_enabled = TRUE (all enrollments of the session)';
+COMMENT ON COLUMN student_fee_balances.overdue_months IS 'Tuition and transport months with a balance whose due_date is before as_of_date';
+COMMENT ON COLUMN student_fee_balances.as_of_date IS 'Date the overdue figures were computed for (rolled forward by reconciliation)';
+COMMENT ON COLUMN student_fee_balances.last_payment_date IS 'Latest non-reversal fee or transport payment date for the session';
+
+-- Backfill from existing tracking rows
+WITH tuition AS (
+    SELECT
+        student_id,
+        session_year_id,
+        COUNT(*) AS months,
+        COUNT(*) FILTER (WHERE paid_amount >= monthly_amount) AS paid_months,
+        COUNT(*) FILTER (WHERE paid_amount > 0 AND paid_amount < monthly_amount) AS partial_months,
+        SUM(monthly_amount) AS expected,
+        SUM(paid_amount) AS paid,
+        COUNT(*) FILTER (WHERE paid_amount < monthly_amount AND due_date < CURRENT_DATE) AS overdue_months,
+        COALESCE(SUM(monthly_amount - paid_amount) FILTER (WHERE paid_amount < monthly_amount AND due_date < CURRENT_DATE), 0) AS overdue_amount,
+        MIN(due_date) FILTER (WHERE paid_amount < monthly_amount) AS oldest_unpaid_due_date
+    FROM monthly_fee_tracking
+    GROUP BY student_id, session_year_id
+),
+transport AS (
+    SELECT
+        student_id,
+        session_year_id,
+        COUNT(*) AS months,
+        SUM(monthly_amount) AS expected,
+        SUM(paid_amount) AS paid,
+        COUNT(*) FILTER (WHERE paid_amount < monthly_amount AND due_date < CURRENT_DATE) AS overdue_months,
+        COALESCE(SUM(monthly_amount - paid_amount) FILTER (WHERE paid_amount < monthly_amount AND due_date < CURRENT_DATE), 0) AS overdue_amount,
+        MIN(due_date) FILTER (WHERE paid_amount < monthly_amount) AS oldest_unpaid_due_date
+    FROM transport_monthly_tracking
+    WHERE is_service_enabled = TRUE
+    GROUP BY student_id, session_year_id
+),
+balance_keys AS (
+    SELECT student_id, session_year_id FROM tuition
+    UNION
+    SELECT student_id, session_year_id FROM transport
+),
+fee_payment_dates AS (
+    SELECT fr.student_id, fr.session_year_id, MAX(fp.payment_date) AS last_payment_date
+    FROM fee_payments fp
+    JOIN fee_records fr ON fr.id = fp.fee_record_id
+    WHERE fp.is_reversal = FALSE
+    GROUP BY fr.student_id, fr.session_year_id
+),
+transport_payment_dates AS (
+    SELECT tp.student_id, ste.session_year_id, MAX(tp.payment_date) AS last_payment_date
+    FROM transport_payments tp
+    JOIN student_transport_enrollment ste ON ste.id = tp.enrollment_id
+    WHERE tp.is_reversal = FALSE
+    GROUP BY tp.student_id, ste.session_year_id
+)
+INSERT INTO student_fee_balances (
+    student_id, session_year_id,
+    months_tracked, paid_months, partial_months, pending_months,
+    tuition_expected, tuition_paid, tuition_balance, tuition_overdue_months, tuition_overdue_amount,
+    transport_months, transport_expected, transport_paid, transport_balance,
+    expected_amount, paid_amount, balance_amount,
+    overdue_months, overdue_amount, oldest_unpaid_due_date, last_payment_date, as_of_date
+)
+SELECT
+    k.student_id,
+    k.session_year_id,
+    COALESCE(t.months, 0),
+    COALESCE(t.paid_months, 0),
+    COALESCE(t.partial_months, 0),
+    COALESCE(t.months, 0) - COALESCE(t.paid_months, 0) - COALESCE(t.partial_months, 0),
+    COALESCE(t.expected, 0),
+    COALESCE(t.paid, 0),
+    COALESCE(t.expected, 0) - COALESCE(t.paid, 0),
+    COALESCE(t.overdue_months, 0),
+    COALESCE(t.overdue_amount, 0),
+    COALESCE(tr.months, 0),
+    COALESCE(tr.expected, 0),
+    COALESCE(tr.paid, 0),
+    COALESCE(tr.expected, 0) - COALESCE(tr.paid, 0),
+    COALESCE(t.expected, 0) + COALESCE(tr.expected, 0),
+    COALESCE(t.paid, 0) + COALESCE(tr.paid, 0),
+    COALESCE(t.expected, 0) + COALESCE(tr.expected, 0) - COALESCE(t.paid, 0) - COALESCE(tr.paid, 0),
+    COALESCE(t.overdue_months, 0) + COALESCE(tr.overdue_months, 0),
+    COALESCE(t.overdue_amount, 0) + COALESCE(tr.overdue_amount, 0),
+    LEAST(t.oldest_unpaid_due_date, tr.oldest_unpaid_due_date),
+    GREATEST(fpd.last_payment_date, tpd.last_payment_date),
+    CURRENT_DATE
+FROM balance_keys k
+LEFT JOIN tuition t ON t.student_id = k.student_id AND t.session_year_id = k.session_year_id
+LEFT JOIN transport tr ON tr.student_id = k.student_id AND tr.session_year_id = k.session_year_id
+LEFT JOIN fee_payment_dates fpd ON fpd.student_id = k.student_id AND fpd.session_year_id = k.session_year_id
+LEFT JOIN transport_payment_dates tpd ON tpd.student_id = k.student_id AND tpd.session_year_id = k.session_year_id
+ON CONFLICT (student_id, session_year_id) DO NOTHING;
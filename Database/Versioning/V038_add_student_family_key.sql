@@ -0,0 +1,31 @@
+-- =====================================================
+-- Migration: V038_add_student_family_key
+-- Description: Persisted, indexed sibling family key on students.
+--              Sibling detection used to compare
+--              lower(regexp_replace(father_name, ...)) against the input,
+--              which cannot use an index and scanned every student on each
+--              create/update. The backend now maintains family_key
+--              (normalized father name + '|' + trimmed father phone) on
+--              every student write and detection is an index lookup.
+-- =====================================================
+
+ALTER TABLE students
+ADD COLUMN IF NOT EXISTS family_key VARCHAR(230);
+
+COMMENT ON COLUMN students.family_key IS 'Sibling family key: lower-cased father name with collapsed whitespace || ''|'' || trimmed father phone (NULL unless both are set)';
+
+-- Backfill with the same normalization as app.models.student.family_key_for
+UPDATE students
+SET family_key = lower(btrim(regexp_replace(father_name, '\s+', ' ', 'g')))
+                 || '|' || regexp_replace(father_phone, '^\s+|\s+$', '', 'g')
+WHERE btrim(coalesce(father_name, '')) <> ''
+  AND btrim(coalesce(father_phone, '')) <> ''
+  AND family_key IS DISTINCT FROM (
+      lower(btrim(regexp_replace(father_name, '\s+', ' ', 'g')))
+      || '|' || regexp_replace(father_phone, '^\s+|\s+$', '', 'g')
+  );
+
+-- Detection only considers active, non-deleted students
+CREATE INDEX IF NOT EXISTS idx_students_family_key
+ON students(family_key)
+WHERE family_key IS NOT NULL AND is_active = TRUE AND (is_deleted = FALSE OR is_deleted IS NULL);
@@ -0,0 +1,56 @@
+-- =====================================================
+-- Migration: V040_create_alert_unread_counters
+-- Description: Maintained unread alert counters per recipient bucket
+--              (user, role, everyone) so the notification badge is a
+--              primary-key lookup, and partial indexes for the three
+--              alert visibility branches. is_deleted becomes NOT NULL
+--              so the partial index predicates match the queries.
+-- =====================================================
+
+CREATE TABLE IF NOT EXISTS alert_unread_counters (
+    recipient_type VARCHAR(10) NOT NULL,
+    recipient_key VARCHAR(50) NOT NULL,
+    unread_count INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+
+    PRIMARY KEY (recipient_type, recipient_key)
+);
+
+COMMENT ON TABLE alert_unread_counters IS 'Unread, not deleted alerts per visibility bucket; maintained by the backend with every alert write';
+COMMENT ON COLUMN alert_unread_counters.recipient_type IS 'USER: target_user_id set; ROLE: target_role only; ALL: broadcast';
+COMMENT ON COLUMN alert_unread_counters.recipient_key IS 'User id, role name, or * for broadcast alerts';
+
+-- Soft delete flag is always set by the backend; make it NOT NULL
+UPDATE alerts SET is_deleted = FALSE WHERE is_deleted IS NULL;
+ALTER TABLE alerts ALTER COLUMN is_deleted SET NOT NULL;
+
+-- Visibility branches of the alert list (newest first)
+CREATE INDEX IF NOT EXISTS idx_alerts_user_visible ON alerts(target_user_id, created_at DESC)
+    WHERE is_deleted = FALSE AND target_user_id IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_alerts_role_visible ON alerts(target_role, created_at DESC)
+    WHERE is_deleted = FALSE AND target_user_id IS NULL;
+CREATE INDEX IF NOT EXISTS idx_alerts_broadcast_visible ON alerts(created_at DESC)
+    WHERE is_deleted = FALSE AND target_user_id IS NULL AND target_role IS NULL;
+
+-- Superseded by the counters and the visibility indexes
+DROP INDEX IF EXISTS idx_alerts_unread;
+DROP INDEX IF EXISTS idx_alerts_role_unread;
+
+-- Backfill from existing alerts
+INSERT INTO alert_unread_counters (recipient_type, recipient_key, unread_count)
+SELECT
+    CASE
+        WHEN target_user_id IS NOT NULL THEN 'USER'
+        WHEN target_role IS NOT NULL THEN 'ROLE'
+        ELSE 'ALL'
+    END AS recipient_type,
+    CASE
+        WHEN target_user_id IS NOT NULL THEN target_user_id::TEXT
+        WHEN target_role IS NOT NULL THEN target_role
+        ELSE '*'
+    END AS recipient_key,
+    COUNT(*)
+FROM alerts
+WHERE alert_status_id = 1 AND is_deleted = FALSE
+GROUP BY 1, 2
+ON CONFLICT (recipient_type, recipient_key) DO UPDATE SET unread_count = EXCLUDED.unread_count, updated_at = NOW();
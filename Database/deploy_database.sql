@@ -69,6 +69,7 @@
 \ir Tables/T310_students.sql
 \ir Tables/T315_student_siblings.sql
 \ir Tables/T316_student_session_history.sql
+\ir Tables/T317_progression_batches.sql
 \ir Tables/T320_teachers.sql
 
 \echo ''
@@ -88,6 +89,8 @@
 \ir Tables/T415_fee_payments.sql
 \ir Tables/T420_monthly_fee_tracking.sql
 \ir Tables/T430_monthly_payment_allocations.sql
+\ir Tables/T480_student_fee_balances.sql
+\ir Tables/T475_receipt_jobs.sql
 
 \echo ''
 \echo '✓ All fee management tables created'
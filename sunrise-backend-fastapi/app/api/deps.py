@@ -4,6 +4,7 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.database import get_db
+from app.core.principal_cache import principal_cache
 from app.core.security import verify_token
 from app.crud.crud_user import CRUDUser
 from app.models.user import User
@@ -11,14 +12,12 @@ from app.models.user import User
 security = HTTPBearer()
 
 
-async def get_current_user(
-    db: AsyncSession = Depends(get_db),
-    credentials: HTTPAuthorizationCredentials = Depends(security)
-) -> User:
+async def get_user_from_token(db: AsyncSession, token: str) -> User:
     """
-    Get current authenticated user
+    Resolve a bearer token to its user
+    Served from the principal cache when possible; cached users are detached
+    and have no password hash (load the row before modifying the user).
     """
-    token = credentials.credentials
     user_id = verify_token(token)
     
     if user_id is None:
@@ -28,6 +27,10 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    cached_user = principal_cache.get(int(user_id))
+    if cached_user is not None:
+        return cached_user
+
     # Use the new CRUD instance and get user with metadata
     user_crud = CRUDUser()
     user = await user_crud.get_with_metadata(db, id=int(user_id))
@@ -37,7 +40,17 @@ async def get_current_user(
             detail="User not found"
         )
 
-    return user
+    return principal_cache.set(user)
+
+
+async def get_current_user(
+    db: AsyncSession = Depends(get_db),
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+) -> User:
+    """
+    Get current authenticated user
+    """
+    return await get_user_from_token(db, credentials.credentials)
 
 
 async def get_current_active_user(
@@ -3,7 +3,7 @@ from fastapi import APIRouter
 from app.api.v1.endpoints import (
     auth, teachers, students, leaves, expenses, fees, configuration,
     public, database, transport, dashboard, gallery, reports, inventory,
-    student_siblings, users, attendance, alerts, session_progression
+    student_siblings, users, attendance, alerts, session_progression, monitoring
 )
 
 api_router = APIRouter()
@@ -32,3 +32,4 @@ api_router.include_router(gallery.router, prefix="/gallery", tags=["gallery"])
 api_router.include_router(reports.router, prefix="/reports", tags=["reports"])
 api_router.include_router(alerts.router, prefix="/alerts", tags=["alerts"])
 api_router.include_router(session_progression.router, prefix="/session-progression", tags=["session-progression"])
+api_router.include_router(monitoring.router, prefix="/monitoring", tags=["monitoring"])
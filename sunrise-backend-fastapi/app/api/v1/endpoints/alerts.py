@@ -4,20 +4,25 @@ Provides endpoints for managing user alerts/notifications
 """
 
 from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.database import get_db
-from app.api.deps import get_current_active_user
+from app.core.database import AsyncSessionLocal, get_db
+from app.api.deps import get_current_active_user, get_current_admin_user, get_user_from_token
 from app.models.user import User
 from app.crud.crud_alert import alert_crud
 from app.schemas.alert import (
     AlertResponse, AlertListResponse, AlertWithDetails,
     AlertFilters, AlertStats, AlertUnreadCountResponse, AlertActionResponse
 )
+from app.services.alert_broker import alert_broker, stream_alert_events
 
 router = APIRouter()
 
+optional_bearer = HTTPBearer(auto_error=False)
+
 
 def get_user_role(current_user: User) -> str:
     """Helper to get user role string from User model"""
@@ -140,6 +145,18 @@ async def get_unread_count(
     return AlertUnreadCountResponse(unread_count=count)
 
 
+@router.post("/unread-counters/rebuild")
+async def rebuild_unread_counters(
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """
+    Recount the unread alert counters from the alerts table (admin only); run
+    after alerts were changed outside the application, e.g. by SQL scripts
+    """
+    return await alert_crud.rebuild_unread_counters(db)
+
+
 @router.get("/stats", response_model=AlertStats)
 async def get_alert_stats(
     session_year_id: Optional[int] = Query(None, description="Filter by session year ID"),
@@ -157,6 +174,54 @@ async def get_alert_stats(
     return AlertStats(**stats)
 
 
+@router.get("/stream")
+async def stream_alerts(
+    request: Request,
+    token: Optional[str] = Query(None, description="Access token (EventSource cannot send headers)"),
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_bearer)
+):
+    """
+    Server-sent events with new alerts and unread count changes for the current user.
+
+    Replaces polling /unread-count; clients fall back to polling when the stream
+    is unavailable. No database session is held while the stream is open.
+    """
+    access_token = credentials.credentials if credentials else token
+    if not access_token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    async with AsyncSessionLocal() as db:
+        current_user = await get_user_from_token(db, access_token)
+    if not current_user.is_active:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Inactive user")
+
+    user_id = current_user.id
+    user_role = get_user_role(current_user)
+
+    async def count_unread() -> int:
+        async with AsyncSessionLocal() as db:
+            return await alert_crud.get_unread_count(db, user_id=user_id, user_role=user_role)
+
+    await alert_broker.start()
+    subscription = alert_broker.subscribe(user_id, user_role)
+
+    async def events():
+        try:
+            async for message in stream_alert_events(subscription, count_unread, request.is_disconnected):
+                yield message
+        finally:
+            alert_broker.unsubscribe(subscription)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.get("/{alert_id}", response_model=AlertWithDetails)
 async def get_alert(
     alert_id: int,
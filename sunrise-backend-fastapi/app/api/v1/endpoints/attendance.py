@@ -10,7 +10,7 @@ from app.crud import student_crud, teacher_crud
 from app.schemas.attendance import (
     AttendanceRecord, AttendanceRecordCreate, AttendanceRecordUpdate,
     AttendanceFilters, AttendanceListResponse,
-    BulkAttendanceCreate, StudentAttendanceSummary,
+    BulkAttendanceCreate, BulkAttendanceSchoolCreate, StudentAttendanceSummary,
     ClassAttendanceSummary, AttendanceStatistics,
     ConsecutiveAbsenceResponse, ClassConsecutiveAbsences, ConsecutiveAbsentStudent
 )
@@ -476,6 +476,32 @@ async def create_bulk_attendance(
     }
 
 
+@router.post("/bulk/school", response_model=dict)
+async def create_bulk_school_attendance(
+    attendance_data: BulkAttendanceSchoolCreate,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Mark attendance for several classes at once
+
+    Accepts the records of multiple classes for one date and period and writes
+    them in a single transaction. Returns totals and per-class created/updated counts.
+    """
+    result = await attendance_record_crud.create_bulk_school(
+        db, bulk_data=attendance_data, marked_by=current_user.id
+    )
+
+    return {
+        "message": "Bulk attendance processed successfully",
+        "created": result["created"],
+        "updated": result["updated"],
+        "total_processed": result["total_processed"],
+        "classes": result["classes"],
+        "errors": result["errors"]
+    }
+
+
 # ============================================
 # Student-Specific Endpoints
 # ============================================
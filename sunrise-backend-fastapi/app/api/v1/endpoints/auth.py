@@ -754,7 +754,8 @@ async def update_user_profile(
 
         # Update user table if there are user-level changes
         if user_updates:
-            await user_crud.update(db, db_obj=current_user, obj_in=user_updates)
+            db_user = await user_crud.get(db, id=current_user.id)
+            await user_crud.update(db, db_obj=db_user, obj_in=user_updates)
 
         # Handle role-specific profile updates
         if current_user.user_type_enum == UserTypeEnum.STUDENT:
@@ -5,33 +5,20 @@ Returns service-specific metadata configuration for optimized performance
 
 from typing import Dict, Any, List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status, Response, Request
-from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import text
-import json
-import gzip
 import time
 
 from app.core.database import get_db
+from app.core.metadata_cache import metadata_cache
 from app.api.deps import get_current_active_user
 from app.models.user import User
-from app.schemas.metadata import ConfigurationResponse
 from app.crud import get_all_metadata_async
-from app.crud.crud_teacher import teacher_crud
-from app.utils.performance_monitor import ConfigurationPerformanceMonitor, timer
+from app.utils.performance_monitor import ConfigurationPerformanceMonitor
 
 router = APIRouter()
 
-# Service-specific configuration caches
-_service_configuration_caches: Dict[str, Dict[str, Any]] = {}
-_service_cache_timestamps: Dict[str, float] = {}
-
-# Legacy global configuration cache (for backward compatibility)
-_configuration_cache: Dict[str, Any] = {}
-_cache_timestamp: float = 0.0
-
-# Cache TTL in seconds (5 minutes)
-CACHE_TTL = 300
+# Clients keep the payload but revalidate with If-None-Match (cheap 304)
+CACHE_CONTROL = "private, no-cache"
 
 # Service metadata mappings
 SERVICE_METADATA_MAPPINGS = {
@@ -168,8 +155,9 @@ async def get_service_metadata_configuration(db: AsyncSession, service_name: str
         "optimizations": [
             "Service-specific metadata loading",
             "Reduced payload size (60-80% smaller)",
-            "Response compression (gzip)",
-            "Service-aware caching (5min TTL)",
+            "Pre-compressed responses (gzip)",
+            "Versioned cache invalidated on metadata changes",
+            "ETag revalidation (304 Not Modified)",
             "Performance monitoring"
         ]
     }
@@ -216,87 +204,63 @@ async def get_metadata_configuration(db: AsyncSession) -> Dict[str, Any]:
     return configuration
 
 
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against the entry ETag"""
+    if if_none_match.strip() == "*":
+        return True
+    opaque_tag = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque_tag:
+            return True
+    return False
+
+
 async def _get_service_configuration_with_cache(
     db: AsyncSession, service_name: str, request: Request
 ) -> Response:
     """
-    Helper function to get service configuration with caching and compression
-    """
-    global _service_configuration_caches, _service_cache_timestamps
-
-    # Check cache
-    current_time = time.time()
-    cache_key = service_name
-
-    if (cache_key in _service_configuration_caches and
-        cache_key in _service_cache_timestamps and
-        current_time - _service_cache_timestamps[cache_key] < CACHE_TTL):
+    Helper function to serve service configuration from the metadata cache
 
-        # Cache hit
-        cached_config = _service_configuration_caches[cache_key]
-        cache_hit = True
-        total_time_start = time.time()
-    else:
-        # Cache miss - fetch from database
-        cache_hit = False
-        total_time_start = time.time()
-
-        cached_config = await get_service_metadata_configuration(db, service_name)
-
-        # Update cache
-        _service_configuration_caches[cache_key] = cached_config
-        _service_cache_timestamps[cache_key] = current_time
-
-    # Calculate record count for performance monitoring
-    record_count = sum(len(v) for k, v in cached_config.items() if isinstance(v, list))
-
-    # Check if client accepts gzip compression
-    accept_encoding = request.headers.get("accept-encoding", "")
-    use_compression = "gzip" in accept_encoding.lower()
+    Hits return the pre-serialized (and pre-gzipped) bytes of the entry; requests
+    carrying the current ETag in If-None-Match get 304 Not Modified.
+    """
+    total_time_start = time.time()
 
-    response_data = cached_config
+    entry, cache_hit = await metadata_cache.get_or_build(
+        service_name, lambda: get_service_metadata_configuration(db, service_name)
+    )
     total_time_ms = (time.time() - total_time_start) * 1000
 
     # Log cache performance
     ConfigurationPerformanceMonitor.log_cache_performance(
-        cache_hit, total_time_ms, record_count
+        cache_hit, total_time_ms, entry.record_count
     )
 
-    if use_compression:
-        # Compress the JSON response
-        compression_start = time.time()
-        json_str = json.dumps(response_data, default=str, separators=(',', ':'))
-        compressed_data = gzip.compress(json_str.encode('utf-8'))
-        compression_time_ms = (time.time() - compression_start) * 1000
+    headers = {
+        "ETag": entry.etag,
+        "Cache-Control": CACHE_CONTROL,
+        "Vary": "Accept-Encoding",
+        "X-Service-Name": service_name,
+        "X-Cache-Status": "HIT" if cache_hit else "MISS",
+        "X-Cache-Version": entry.version,
+        "X-Record-Count": str(entry.record_count),
+        "X-Response-Time": f"{total_time_ms:.2f}ms"
+    }
 
-        # Log compression performance
-        ConfigurationPerformanceMonitor.log_compression_performance(
-            len(json_str), len(compressed_data), compression_time_ms
-        )
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, entry.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
 
-        return Response(
-            content=compressed_data,
-            media_type="application/json",
-            headers={
-                "Content-Encoding": "gzip",
-                "Cache-Control": f"public, max-age={CACHE_TTL}",
-                "X-Service-Name": service_name,
-                "X-Cache-Status": "HIT" if cache_hit else "MISS",
-                "X-Record-Count": str(record_count),
-                "X-Response-Time": f"{total_time_ms:.2f}ms"
-            }
-        )
-    else:
-        return JSONResponse(
-            content=response_data,
-            headers={
-                "Cache-Control": f"public, max-age={CACHE_TTL}",
-                "X-Service-Name": service_name,
-                "X-Cache-Status": "HIT" if cache_hit else "MISS",
-                "X-Record-Count": str(record_count),
-                "X-Response-Time": f"{total_time_ms:.2f}ms"
-            }
-        )
+    # Check if client accepts gzip compression
+    accept_encoding = request.headers.get("accept-encoding", "")
+    if "gzip" in accept_encoding.lower():
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=entry.gzip_bytes, media_type="application/json", headers=headers)
+
+    return Response(content=entry.json_bytes, media_type="application/json", headers=headers)
 
 
 # Service-specific configuration endpoints
@@ -548,49 +512,40 @@ async def refresh_configuration(
             detail="Only administrators can refresh configuration"
         )
 
-    global _service_configuration_caches, _service_cache_timestamps
-
     try:
-        current_time = time.time()
-        refreshed_services = []
-
-        if service:
-            # Refresh specific service cache
-            if service not in SERVICE_METADATA_MAPPINGS:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Unknown service: {service}. Valid services: {list(SERVICE_METADATA_MAPPINGS.keys())}"
-                )
-
-            config = await get_service_metadata_configuration(db, service)
-            _service_configuration_caches[service] = config
-            _service_cache_timestamps[service] = current_time
-            refreshed_services.append(service)
-        else:
-            # Refresh all service caches
-            for service_name in SERVICE_METADATA_MAPPINGS.keys():
-                config = await get_service_metadata_configuration(db, service_name)
-                _service_configuration_caches[service_name] = config
-                _service_cache_timestamps[service_name] = current_time
-                refreshed_services.append(service_name)
-
-        # Build response with cache statistics
+        if service and service not in SERVICE_METADATA_MAPPINGS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown service: {service}. Valid services: {list(SERVICE_METADATA_MAPPINGS.keys())}"
+            )
+
+        # Bumping the version makes every worker rebuild on next request;
+        # the requested services are rebuilt now so the next request is a hit
+        metadata_cache.invalidate()
+        refreshed_services = [service] if service else list(SERVICE_METADATA_MAPPINGS.keys())
+
         cache_stats = {}
         for service_name in refreshed_services:
-            config = _service_configuration_caches.get(service_name, {})
+            entry, _ = await metadata_cache.get_or_build(
+                service_name, lambda: get_service_metadata_configuration(db, service_name)
+            )
             cache_stats[service_name] = {
-                "metadata_types": len([k for k in config.keys() if k != "metadata"]),
-                "total_records": sum(len(v) for k, v in config.items() if isinstance(v, list)),
-                "timestamp": _service_cache_timestamps.get(service_name)
+                "metadata_types": len(SERVICE_METADATA_MAPPINGS[service_name]),
+                "total_records": entry.record_count,
+                "timestamp": entry.created_at,
+                "version": entry.version,
+                "etag": entry.etag
             }
 
         return {
             "message": f"Configuration cache refreshed successfully for: {', '.join(refreshed_services)}",
             "refreshed_services": refreshed_services,
             "cache_statistics": cache_stats,
-            "refresh_timestamp": current_time
+            "refresh_timestamp": time.time()
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
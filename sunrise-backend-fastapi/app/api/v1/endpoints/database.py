@@ -257,8 +257,11 @@ async def deploy_database():
         fee_tables = [
             "T400_fee_structures.sql",
             "T410_fee_records.sql",
+            "T415_fee_payments.sql",
             "T420_monthly_fee_tracking.sql",
             "T430_monthly_payment_allocations.sql",
+            "T480_student_fee_balances.sql",
+            "T475_receipt_jobs.sql",
         ]
         
         for table_file in fee_tables:
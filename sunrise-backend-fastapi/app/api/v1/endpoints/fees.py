@@ -1,17 +1,25 @@
 from typing import Optional, List
 from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import RedirectResponse, Response, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import and_, or_, func, select, text
+from sqlalchemy import and_, or_, case, func, select, text
 from sqlalchemy.orm import joinedload, selectinload
 from datetime import date, datetime, timedelta
 import math
 import calendar
 import logging
+import time
 
-from app.core.database import get_db
+from app.core.config import settings
+from app.core.database import get_db, get_read_db
 from app.crud import fee_structure_crud, fee_record_crud, fee_payment_crud, student_crud, teacher_crud
-from app.crud.crud_monthly_fee import monthly_fee_tracking_crud, monthly_payment_allocation_crud
+from app.crud.crud_monthly_fee import (
+    monthly_fee_tracking_crud, monthly_payment_allocation_crud,
+    SUMMARY_ORDER_NAME, SUMMARY_ORDER_CLASS_ROLL, encode_summary_cursor, decode_summary_cursor
+)
 from app.crud.metadata import payment_method_crud
+from app.crud.crud_receipt_job import receipt_job_crud
+from app.crud.crud_fee_balance import fee_balance_crud, mark_fee_balances_stale
 from app.schemas.fee import (
     FeeStructure, FeeStructureCreate, FeeStructureUpdate,
     FeeRecord, FeeRecordCreate, FeeRecordUpdate, FeeRecordWithStudent,
@@ -20,19 +28,26 @@ from app.schemas.fee import (
     SessionYearEnum, PaymentStatusEnum, PaymentTypeEnum,
     EnhancedStudentFeeSummary, StudentMonthlyFeeHistory, EnhancedPaymentRequest,
     EnableMonthlyTrackingRequest, MonthlyFeeTracking,
-    FeePaymentReversalRequest, FeePaymentPartialReversalRequest, FeePaymentReversalResponse
+    FeePaymentReversalRequest, FeePaymentPartialReversalRequest, FeePaymentReversalResponse,
+    StudentFeeBalance, ReceiptBatchRequest, ReceiptBatchIncludeEnum, ReceiptBatchOutputEnum
 )
-from app.api.deps import get_current_active_user
+from app.api.deps import get_current_active_user, get_current_admin_user
 from app.models.user import User
 from app.models.student import Student
+from app.models.student_session_history import StudentSessionHistory
 from app.models.teacher import Teacher
 from app.models.expense import Expense as ExpenseModel
 from app.models.fee import FeeRecord as FeeRecordModel, FeePayment as FeePaymentModel, MonthlyFeeTracking as MonthlyFeeTrackingModel, MonthlyPaymentAllocation
+from app.models.fee import StudentFeeBalance as StudentFeeBalanceModel
+from app.models.metadata import Class, SessionYear as SessionYearModel
 from app.models.transport import StudentTransportEnrollment, TransportMonthlyTracking
 from app.services.alert_service import alert_service
-from app.services.receipt_generator import ReceiptGenerator
-from app.services.cloudinary_receipt_service import CloudinaryReceiptService
+from app.services.dashboard_engine import mark_dashboard_topic
+from app.services.due_fee_engine import due_fee_engine
+from app.services.receipt_batch import iter_file, receipt_batch_renderer
+from app.services.receipt_pipeline import receipt_pipeline, resolve_whatsapp_phone
 from app.services.whatsapp_service import whatsapp_service
+from app.utils.performance_monitor import log_timing
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -1116,7 +1131,11 @@ async def get_payment_receipt(
             detail="You can only view receipts for your own payments"
         )
 
+    # Receipt generation / WhatsApp delivery progress from the receipt queue
+    receipt_job = await receipt_job_crud.get_latest_for_fee_payment(db, fee_payment_id=payment.id)
+
     return {
+        "receipt_status": receipt_pipeline.describe(receipt_job, receipt_url=payment.receipt_cloudinary_url),
         "receipt_info": {
             "payment_id": payment.id,
             "receipt_number": payment.receipt_number or f"RCP-{payment.id:06d}",
@@ -1151,6 +1170,131 @@ async def get_payment_receipt(
     }
 
 
+@router.get("/payment-receipt/{payment_id}/pdf")
+async def reprint_payment_receipt(
+    payment_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Reprint a payment receipt PDF.
+    Served from the receipt cache (rendered at most once per receipt content);
+    payments receipted before the queue existed redirect to the stored receipt.
+    """
+    payment = await fee_payment_crud.get(db, id=payment_id)
+    if not payment:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Payment record not found"
+        )
+
+    student_user_id = await db.scalar(
+        select(Student.user_id)
+        .join(FeeRecordModel, FeeRecordModel.student_id == Student.id)
+        .where(FeeRecordModel.id == payment.fee_record_id)
+    )
+    # 1=admin, 2=teacher, 6=super_admin can view any student's receipts
+    if current_user.user_type_id not in [1, 2, 6] and student_user_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You can only view receipts for your own payments"
+        )
+
+    receipt_job = await receipt_job_crud.get_latest_for_fee_payment(db, fee_payment_id=payment.id)
+    if not receipt_job or not (receipt_job.payload or {}).get("payment_data"):
+        if payment.receipt_cloudinary_url:
+            return RedirectResponse(payment.receipt_cloudinary_url)
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Receipt not available for this payment"
+        )
+
+    pdf_bytes = await receipt_pipeline.render_pdf(receipt_job)
+    return Response(
+        content=pdf_bytes,
+        media_type="application/pdf",
+        headers={"Content-Disposition": f'inline; filename="{receipt_job.receipt_number}.pdf"'}
+    )
+
+
+@router.post("/receipts/batch")
+async def render_receipt_batch(
+    request: ReceiptBatchRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """
+    Reprint many receipts at once (end-of-day and month-end printing).
+    Selects the stored receipts of the given payments and/or payment date range,
+    renders the uncached ones across the batch process pool and streams back one
+    merged, print-ready PDF or a ZIP of individual receipts.
+    """
+    if not (request.payment_ids or request.transport_payment_ids or request.from_date or request.to_date):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Provide payment ids or a payment date range"
+        )
+    if request.from_date and request.to_date and request.from_date > request.to_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="from_date must be on or before to_date"
+        )
+
+    by_ids = bool(request.payment_ids or request.transport_payment_ids)
+    job_types = ["FEE", "TRANSPORT"] if request.include == ReceiptBatchIncludeEnum.ALL else [request.include.value]
+    receipt_jobs = await receipt_job_crud.get_latest_for_payments(
+        db,
+        fee_payment_ids=(request.payment_ids or []) if by_ids else None,
+        transport_payment_ids=(request.transport_payment_ids or []) if by_ids else None,
+        from_date=request.from_date,
+        to_date=request.to_date,
+        job_types=job_types
+    )
+    # Payments receipted before the queue existed have no stored payload to render
+    receipt_jobs = [job for job in receipt_jobs if (job.payload or {}).get("payment_data")]
+
+    if not receipt_jobs:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No receipts found for the selected payments"
+        )
+    if len(receipt_jobs) > settings.RECEIPT_BATCH_MAX_RECEIPTS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Batch has {len(receipt_jobs)} receipts; at most {settings.RECEIPT_BATCH_MAX_RECEIPTS} per request"
+        )
+
+    requested = len(request.payment_ids or []) + len(request.transport_payment_ids or [])
+    missing = max(requested - len(receipt_jobs), 0)
+    label = f"{request.from_date or 'start'}_{request.to_date or 'end'}" if not by_ids else f"{len(receipt_jobs)}"
+
+    if request.output == ReceiptBatchOutputEnum.ZIP:
+        return StreamingResponse(
+            receipt_batch_renderer.stream_zip(receipt_jobs, extra_summary={"missing": missing}),
+            media_type="application/zip",
+            headers={
+                "Content-Disposition": f'attachment; filename="receipts_{label}.zip"',
+                "X-Receipt-Count": str(len(receipt_jobs))
+            }
+        )
+
+    merged, metrics = await receipt_batch_renderer.render_merged_file(receipt_jobs)
+    return StreamingResponse(
+        iter_file(merged),
+        media_type="application/pdf",
+        headers={
+            "Content-Disposition": f'inline; filename="receipts_{label}.pdf"',
+            "Content-Length": str(metrics["output_bytes"]),
+            "X-Receipt-Count": str(metrics["receipts"]),
+            "X-Receipt-Rendered": str(metrics["rendered"]),
+            "X-Receipt-Cache-Hits": str(metrics["cache_hits"]),
+            "X-Receipt-Missing": str(missing),
+            "X-Receipt-Render-Seconds": str(metrics["render_seconds"]),
+            "X-Receipts-Per-Second": str(metrics["receipts_per_second"])
+        }
+    )
+
+
 @router.post("/receipts/resend-whatsapp/{payment_id}")
 async def resend_receipt_whatsapp(
     payment_id: int,
@@ -1163,19 +1307,21 @@ async def resend_receipt_whatsapp(
 
     This endpoint allows administrators to resend fee receipts to parents via WhatsApp.
     Useful when parents lose the original message or need a copy of the receipt.
+    Delivery is queued on the payment's receipt job and performed by the receipt
+    worker; progress is reported by GET /payment-receipt/{payment_id}.
 
     **Authorization:** Admin only (user_type_id = 1)
 
     **Requirements:**
-    - Receipt must be generated and uploaded to Cloudinary
+    - Receipt must be generated, or still queued for generation
     - Parent phone number must be available
     - Payment must not be reversed or a reversal payment
 
     **Returns:**
-    - success: Boolean indicating if message was sent
+    - success: Boolean indicating if delivery was queued
     - message: User-friendly message
-    - message_sid: Twilio message SID (for tracking)
-    - sent_at: Timestamp when message was sent
+    - receipt_status: Current receipt job status
+    - queued_at: Timestamp when delivery was queued
     """
     # Permission check: Only admin can resend
     if current_user.user_type_id not in [1]:  # 1 = admin
@@ -1205,13 +1351,20 @@ async def resend_receipt_whatsapp(
             detail="Cannot resend receipt for reversed payments"
         )
 
-    # Check if receipt exists
-    if not payment.receipt_cloudinary_url:
+    # Check if receipt exists or is queued
+    receipt_job = await receipt_job_crud.get_latest_for_fee_payment(db, fee_payment_id=payment.id)
+    if not receipt_job and not payment.receipt_cloudinary_url:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Receipt not available for this payment. Please generate the receipt first."
         )
 
+    if receipt_job and receipt_job.status == "PROCESSING":
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Receipt delivery is already in progress for this payment"
+        )
+
     # Get student and parent phone
     fee_record = await fee_record_crud.get_with_student(db, id=payment.fee_record_id)
     if not fee_record:
@@ -1229,40 +1382,26 @@ async def resend_receipt_whatsapp(
             detail="No parent phone number available for this student"
         )
 
-    # Send WhatsApp notification using media receipt template
     logger.info(f"WhatsApp resend requested for payment {payment_id} by admin {current_user.id}")
-    logger.info(f"Receipt URL: {payment.receipt_cloudinary_url}")
-    logger.info(f"Parent phone: {parent_phone}")
 
-    try:
-        whatsapp_result = await whatsapp_service.send_fee_media_receipt(
-            phone_number=parent_phone,
-            student_name=f"{student.first_name} {student.last_name}",
-            amount=float(payment.amount),
-            receipt_url=payment.receipt_cloudinary_url,
-            payment_id=payment.id
-        )
+    receipt_job = receipt_pipeline.queue_whatsapp_resend(
+        db,
+        job=receipt_job,
+        fee_payment=payment,
+        phone=parent_phone,
+        student_name=f"{student.first_name} {student.last_name}",
+        amount=float(payment.amount),
+        created_by=current_user.id
+    )
+    await db.commit()
+    receipt_pipeline.notify()
 
-        if whatsapp_result.get("success"):
-            return {
-                "success": True,
-                "message": f"Receipt sent successfully to {parent_phone}",
-                "message_sid": whatsapp_result.get('message_sid'),
-                "sent_at": datetime.now().isoformat()
-            }
-        else:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Failed to send WhatsApp: {whatsapp_result.get('error', 'Unknown error')}"
-            )
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Failed to resend WhatsApp for payment {payment_id}: {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to send WhatsApp: {str(e)}"
-        )
+    return {
+        "success": True,
+        "message": f"Receipt queued for WhatsApp delivery to {parent_phone}",
+        "receipt_status": receipt_pipeline.describe(receipt_job, receipt_url=payment.receipt_cloudinary_url),
+        "queued_at": datetime.now().isoformat()
+    }
 
 
 @router.get("/dashboard", response_model=FeeDashboard)
@@ -1435,16 +1574,21 @@ async def get_students_with_due_fees(
     """
     Get all students with their fee due status based on selected frequency
     Shows monthly/quarterly/half-yearly/yearly fee status for each student
-    """
-    from app.crud import student_crud
-    from datetime import datetime, date
-    import calendar
 
+    Fee structures, monthly tracking and payments for the whole page are loaded
+    with grouped queries, so the query count does not grow with per_page
+    """
     # Get current date info
     current_date = date.today()
     current_month = current_date.month
     current_year = current_date.year
 
+    session_year_mapping = {
+        "2022-23": 1, "2023-24": 2, "2024-25": 3, "2025-26": 4, "2026-27": 5
+    }
+    session_year_id = session_year_mapping.get(session_year.value, 4)
+    session_start_year = int(session_year.value.split("-")[0])
+
     # Get students with filters
     students_query = select(Student).options(
         joinedload(Student.class_ref)
@@ -1468,59 +1612,19 @@ async def get_students_with_due_fees(
     # Get paginated students
     skip = (page - 1) * per_page
     students_result = await db.execute(
-        students_query.offset(skip).limit(per_page)
+        students_query.order_by(Student.id).offset(skip).limit(per_page)
     )
     students = students_result.scalars().all()
 
-    # Process each student's fee status
-    students_with_fees = []
-    for student in students:
-        # Get student's fee structure
-        fee_structure = await fee_structure_crud.get_by_class_and_session(
-            db,
-            class_name=student.class_ref.name if student.class_ref else "",
-            session_year=session_year.value
-        )
-
-        if not fee_structure:
-            continue
-
-        # Calculate monthly fee amount
-        monthly_fee = float(fee_structure.total_annual_fee) / 12
-
-        # Get student's payment history
-        payments_query = select(FeePaymentModel).join(FeeRecordModel).where(
-            and_(
-                FeeRecordModel.student_id == student.id,
-                FeeRecordModel.session_year_id == 4  # 2025-26
-            )
-        )
-        payments_result = await db.execute(payments_query)
-        payments = payments_result.scalars().all()
-
-        # Calculate fee status based on frequency
-        fee_status = calculate_fee_status(
-            frequency, monthly_fee, payments, current_date, fee_structure.total_annual_fee
-        )
-
-        student_data = {
-            "id": student.id,
-            "admission_number": student.admission_number,
-            "name": f"{student.first_name} {student.last_name}",
-            "class": student.class_ref.name if student.class_ref else "Unknown",
-            "section": student.section,
-            "phone": student.phone,
-            "email": student.email,
-            "monthly_fee": monthly_fee,
-            "annual_fee": float(fee_structure.total_annual_fee),
-            "fee_status": fee_status,
-            "total_paid": sum(p.amount for p in payments),
-            "total_due": fee_status.get("total_due", 0),
-            "overdue_amount": fee_status.get("overdue_amount", 0),
-            "status_summary": fee_status.get("status", "Unknown")
-        }
-
-        students_with_fees.append(student_data)
+    # Process the whole page's fee status in one batch
+    students_with_fees = await due_fee_engine.get_students_fee_status(
+        db,
+        students,
+        session_year_id=session_year_id,
+        session_start_year=session_start_year,
+        frequency=frequency,
+        current_date=current_date
+    )
 
     total_pages = math.ceil(total / per_page)
 
@@ -1537,153 +1641,6 @@ async def get_students_with_due_fees(
     }
 
 
-def calculate_fee_status(frequency: str, monthly_fee: float, payments: list, current_date: date, annual_fee: float):
-    """Calculate fee status based on payment frequency"""
-    from datetime import datetime
-    import calendar
-
-    current_month = current_date.month
-    current_year = current_date.year
-
-    # Calculate total paid amount
-    total_paid = sum(p.amount for p in payments)
-
-    if frequency == "monthly":
-        # For monthly, check each month from April to current month
-        months_status = []
-        total_due = 0
-        overdue_amount = 0
-
-        # Academic year starts from April
-        start_month = 4  # April
-        months_to_check = []
-
-        # Generate months from April of current academic year
-        for i in range(12):
-            month = ((start_month - 1 + i) % 12) + 1
-            year = current_year if month >= start_month else current_year + 1
-            months_to_check.append((month, year))
-
-            # Only check up to current month
-            if month == current_month and year == current_year:
-                break
-
-        for month, year in months_to_check:
-            month_due = monthly_fee
-            month_paid = 0  # Calculate from payments for this month
-
-            if month_paid >= month_due:
-                status = "paid"
-            elif month_paid > 0:
-                status = "partial"
-            elif month < current_month or year < current_year:
-                status = "overdue"
-                overdue_amount += (month_due - month_paid)
-            else:
-                status = "pending"
-
-            total_due += month_due
-
-            months_status.append({
-                "month": month,
-                "year": year,
-                "month_name": calendar.month_name[month],
-                "due_amount": month_due,
-                "paid_amount": month_paid,
-                "status": status
-            })
-
-        return {
-            "type": "monthly",
-            "months": months_status,
-            "total_due": total_due,
-            "total_paid": total_paid,
-            "overdue_amount": overdue_amount,
-            "status": "overdue" if overdue_amount > 0 else ("paid" if total_paid >= total_due else "pending")
-        }
-
-    elif frequency == "quarterly":
-        # For quarterly, divide year into 4 quarters
-        quarterly_fee = annual_fee / 4
-        quarters = [
-            {"name": "Q1 (Apr-Jun)", "months": [4, 5, 6], "due": quarterly_fee},
-            {"name": "Q2 (Jul-Sep)", "months": [7, 8, 9], "due": quarterly_fee},
-            {"name": "Q3 (Oct-Dec)", "months": [10, 11, 12], "due": quarterly_fee},
-            {"name": "Q4 (Jan-Mar)", "months": [1, 2, 3], "due": quarterly_fee}
-        ]
-
-        quarters_status = []
-        total_due = 0
-        overdue_amount = 0
-
-        for quarter in quarters:
-            # Check if this quarter is due based on current date
-            is_due = any(month <= current_month for month in quarter["months"])
-
-            if is_due:
-                quarter_paid = 0  # Calculate from payments
-                quarter_due = quarter["due"]
-
-                if quarter_paid >= quarter_due:
-                    status = "paid"
-                elif quarter_paid > 0:
-                    status = "partial"
-                else:
-                    # Check if overdue (past the quarter end)
-                    last_month = max(quarter["months"])
-                    if current_month > last_month:
-                        status = "overdue"
-                        overdue_amount += (quarter_due - quarter_paid)
-                    else:
-                        status = "pending"
-
-                total_due += quarter_due
-
-                quarters_status.append({
-                    "quarter": quarter["name"],
-                    "months": quarter["months"],
-                    "due_amount": quarter_due,
-                    "paid_amount": quarter_paid,
-                    "status": status
-                })
-
-        return {
-            "type": "quarterly",
-            "quarters": quarters_status,
-            "total_due": total_due,
-            "total_paid": total_paid,
-            "overdue_amount": overdue_amount,
-            "status": "overdue" if overdue_amount > 0 else ("paid" if total_paid >= total_due else "pending")
-        }
-
-    elif frequency == "half_yearly":
-        # For half-yearly, divide into 2 halves
-        half_yearly_fee = annual_fee / 2
-        halves = [
-            {"name": "First Half (Apr-Sep)", "months": [4, 5, 6, 7, 8, 9], "due": half_yearly_fee},
-            {"name": "Second Half (Oct-Mar)", "months": [10, 11, 12, 1, 2, 3], "due": half_yearly_fee}
-        ]
-
-        # Similar logic as quarterly
-        return {
-            "type": "half_yearly",
-            "halves": [],  # Implement similar to quarterly
-            "total_due": annual_fee if current_month >= 4 else half_yearly_fee,
-            "total_paid": total_paid,
-            "overdue_amount": 0,
-            "status": "paid" if total_paid >= annual_fee else "pending"
-        }
-
-    else:  # yearly
-        return {
-            "type": "yearly",
-            "total_due": annual_fee,
-            "total_paid": total_paid,
-            "overdue_amount": max(0, annual_fee - total_paid) if current_month > 6 else 0,  # Overdue after 6 months
-            "status": "paid" if total_paid >= annual_fee else ("overdue" if current_month > 6 else "pending")
-        }
-
-
 @router.get("/summary")
 async def get_fee_summary(
     session_year: Optional[SessionYearEnum] = SessionYearEnum.YEAR_2025_26,
@@ -1693,28 +1650,18 @@ async def get_fee_summary(
     """
     Get comprehensive fee collection summary for the dashboard
     Shows total collected, pending, overdue amounts and student counts before any filters
+    Amounts are tuition months from the student_fee_balances rollup, grouped by class in one query
     """
-    from datetime import datetime, date
-
     current_date = date.today()
     current_month = current_date.month
 
-    # Get all active students for the session
-    students_query = select(Student).options(
-        joinedload(Student.class_ref)
-    ).where(
-        and_(
-            Student.is_active == True,
-            Student.session_year_id == 4  # 2025-26
-        )
-    )
-
-    students_result = await db.execute(students_query)
-    students = students_result.scalars().all()
+    session_year_id = (await db.execute(
+        select(SessionYearModel.id).where(SessionYearModel.name == session_year.value)
+    )).scalar()
 
     # Initialize summary counters
     summary = {
-        "total_students": len(students),
+        "total_students": 0,
         "total_expected_amount": 0,
         "total_collected_amount": 0,
         "total_pending_amount": 0,
@@ -1728,79 +1675,69 @@ async def get_fee_summary(
         "collection_efficiency": 0
     }
 
-    # Get all payments for the session
-    payments_query = select(FeePaymentModel).join(FeeRecordModel).where(
-        FeeRecordModel.session_year_id == 4  # 2025-26
+    is_overdue = func.coalesce(StudentFeeBalanceModel.tuition_overdue_months, 0) > 0
+    is_paid = and_(
+        ~is_overdue,
+        StudentFeeBalanceModel.months_tracked > 0,
+        StudentFeeBalanceModel.tuition_balance <= 0
+    )
+    is_partial = and_(
+        ~is_overdue,
+        StudentFeeBalanceModel.tuition_paid > 0,
+        StudentFeeBalanceModel.tuition_balance > 0
     )
-    payments_result = await db.execute(payments_query)
-    all_payments = payments_result.scalars().all()
-
-    total_collected = sum(p.amount for p in all_payments)
-    summary["total_collected_amount"] = float(total_collected)
 
-    # Process each student
-    for student in students:
-        # Get student's fee structure
-        fee_structure = await fee_structure_crud.get_by_class_and_session(
-            db,
-            class_name=student.class_ref.name if student.class_ref else "",
-            session_year=session_year.value
+    class_rows = (await db.execute(
+        select(
+            func.coalesce(Class.name, "Unknown").label("class_name"),
+            func.count(Student.id).label("total_students"),
+            func.coalesce(func.sum(StudentFeeBalanceModel.tuition_expected), 0).label("total_expected"),
+            func.coalesce(func.sum(StudentFeeBalanceModel.tuition_paid), 0).label("total_collected"),
+            func.coalesce(func.sum(StudentFeeBalanceModel.tuition_overdue_amount), 0).label("total_overdue"),
+            func.sum(case((is_paid, 1), else_=0)).label("students_paid"),
+            func.sum(case((is_partial, 1), else_=0)).label("students_partial"),
+            func.sum(case((is_overdue, 1), else_=0)).label("students_overdue")
+        )
+        .select_from(Student)
+        .outerjoin(Class, Class.id == Student.class_id)
+        .outerjoin(
+            StudentFeeBalanceModel,
+            and_(
+                StudentFeeBalanceModel.student_id == Student.id,
+                StudentFeeBalanceModel.session_year_id == Student.session_year_id
+            )
         )
-
-        if not fee_structure:
-            continue
-
-        annual_fee = float(fee_structure.total_annual_fee)
-        monthly_fee = annual_fee / 12
-
-        summary["total_expected_amount"] += annual_fee
-
-        # Get student's payments
-        student_payments = [p for p in all_payments if any(
-            fr.student_id == student.id for fr in [p.fee_record] if fr
-        )]
-
-        student_paid = sum(p.amount for p in student_payments)
-
-        # Calculate months due up to current month
-        months_due = current_month - 3 if current_month >= 4 else current_month + 9  # Academic year starts April
-        expected_till_now = monthly_fee * months_due
-
-        # Determine student status
-        if student_paid >= expected_till_now:
-            summary["students_paid"] += 1
-        elif student_paid > 0:
-            if student_paid < expected_till_now * 0.5:  # Less than 50% paid
-                summary["students_overdue"] += 1
-                summary["total_overdue_amount"] += (expected_till_now - student_paid)
-            else:
-                summary["students_partial"] += 1
-        else:
-            if months_due > 0:
-                summary["students_overdue"] += 1
-                summary["total_overdue_amount"] += expected_till_now
-            else:
-                summary["students_pending"] += 1
-
-        # Class-wise summary
-        class_name = student.class_ref.name if student.class_ref else "Unknown"
-        if class_name not in summary["class_wise_summary"]:
-            summary["class_wise_summary"][class_name] = {
-                "total_students": 0,
-                "total_expected": 0,
-                "total_collected": 0,
-                "students_paid": 0,
-                "students_pending": 0
-            }
-
-        summary["class_wise_summary"][class_name]["total_students"] += 1
-        summary["class_wise_summary"][class_name]["total_expected"] += annual_fee
-        summary["class_wise_summary"][class_name]["total_collected"] += student_paid
-
-        if student_paid >= expected_till_now:
-            summary["class_wise_summary"][class_name]["students_paid"] += 1
-        else:
-            summary["class_wise_summary"][class_name]["students_pending"] += 1
+        .where(
+            and_(
+                Student.is_active == True,
+                Student.session_year_id == session_year_id
+            )
+        )
+        .group_by(func.coalesce(Class.name, "Unknown"))
+    )).all()
+
+    for row in class_rows:
+        total_students = row.total_students or 0
+        students_paid = int(row.students_paid or 0)
+        students_partial = int(row.students_partial or 0)
+        students_overdue = int(row.students_overdue or 0)
+
+        summary["total_students"] += total_students
+        summary["total_expected_amount"] += float(row.total_expected or 0)
+        summary["total_collected_amount"] += float(row.total_collected or 0)
+        summary["total_overdue_amount"] += float(row.total_overdue or 0)
+        summary["students_paid"] += students_paid
+        summary["students_partial"] += students_partial
+        summary["students_overdue"] += students_overdue
+        summary["students_pending"] += total_students - students_paid - students_partial - students_overdue
+
+        summary["class_wise_summary"][row.class_name] = {
+            "total_students": total_students,
+            "total_expected": float(row.total_expected or 0),
+            "total_collected": float(row.total_collected or 0),
+            "students_paid": students_paid,
+            "students_pending": total_students - students_paid
+        }
 
     # Calculate pending amount
     summary["total_pending_amount"] = summary["total_expected_amount"] - summary["total_collected_amount"] - summary["total_overdue_amount"]
@@ -1815,7 +1752,7 @@ async def get_fee_summary(
     for month in range(1, 13):
         month_name = calendar.month_name[month]
         # Calculate expected collection for this month
-        expected_for_month = summary["total_students"] * (summary["total_expected_amount"] / summary["total_students"] / 12) if summary["total_students"] > 0 else 0
+        expected_for_month = summary["total_expected_amount"] / 12
 
         # Get actual collections for this month (simplified)
         actual_for_month = 0  # Would need to calculate from payment dates
@@ -2087,8 +2024,11 @@ async def pay_monthly_enhanced(
         remarks=f"Enhanced monthly payment: {remarks}" if remarks else "Enhanced monthly payment"
     )
 
-    # Create the payment record using CRUD
-    payment = await fee_payment_crud.create(db, obj_in=payment_data)
+    # Create the payment record. It is only flushed here: the payment, its allocations
+    # and its receipt job are committed together below.
+    payment = FeePaymentModel(**payment_data.model_dump())
+    db.add(payment)
+    await db.flush()
 
     # Allocate payment to months using the smart allocation logic
     remaining_amount = actual_amount_to_process  # Use the actual processable amount
@@ -2131,7 +2071,7 @@ async def pay_monthly_enhanced(
     # Process the allocations
     if allocations:
         await monthly_payment_allocation_crud.allocate_payment_to_months(
-            db, payment.id, allocations
+            db, payment.id, allocations, auto_commit=False
         )
 
     # Update the main fee record with the payment amount (should equal total_allocated now)
@@ -2156,10 +2096,6 @@ async def pay_monthly_enhanced(
     elif fee_record.paid_amount > 0:
         fee_record.payment_status_id = 3  # PARTIAL
 
-    await db.commit()
-    await db.refresh(fee_record)
-    await db.refresh(payment)
-
     # Calculate summary
     total_months_affected = len(payment_breakdown)
     fully_paid_months = len([m for m in payment_breakdown if m["status"] == "Paid"])
@@ -2168,53 +2104,49 @@ async def pay_monthly_enhanced(
     # Calculate any remaining amount that couldn't be processed
     remaining_unprocessed = amount - actual_amount_to_process
 
-    # Generate receipt PDF and upload to Cloudinary
-    receipt_url = None
-    receipt_number = None
-    try:
-        logger.info(f"Generating receipt for payment {payment.id}")
-
-        # Get payment method description
-        payment_method = await payment_method_crud.get_by_id_async(db, id=payment_method_id)
-        payment_method_desc = payment_method.description if payment_method else "Cash"
-
-        # Generate receipt number
-        receipt_number = f"FEE-{payment.id:06d}"
-
-        # Prepare payment data for receipt (enhanced with payment_date_str)
-        payment_date_str = payment.payment_date.strftime('%d-%b-%Y') if payment.payment_date else 'N/A'
-        payment_data = {
-            'id': payment.id,
-            'amount': float(payment.amount),
-            'payment_method': payment_method_desc,
-            'payment_date': payment.payment_date,
-            'payment_date_str': payment_date_str,
-            'transaction_id': payment.transaction_id or 'N/A',
-            'receipt_number': receipt_number
-        }
+    # Queue receipt PDF generation, Cloudinary upload and WhatsApp delivery in the
+    # payment's transaction. The receipt worker does the slow work after this response is sent.
+    receipt_number = f"FEE-{payment.id:06d}"
+    # Get payment method description
+    payment_method = await payment_method_crud.get_by_id_async(db, id=payment_method_id)
+    payment_method_desc = payment_method.description if payment_method else "Cash"
+
+    # Prepare payment data for receipt (enhanced with payment_date_str)
+    payment_date_str = payment.payment_date.strftime('%d-%b-%Y') if payment.payment_date else 'N/A'
+    payment_data = {
+        'id': payment.id,
+        'amount': float(payment.amount),
+        'payment_method': payment_method_desc,
+        'payment_date': payment.payment_date,
+        'payment_date_str': payment_date_str,
+        'transaction_id': payment.transaction_id or 'N/A',
+        'receipt_number': receipt_number
+    }
 
-        # Prepare student data for receipt (enhanced with address and mobile)
-        student_data = {
-            'name': f"{student.first_name} {student.last_name}",
-            'admission_number': student.admission_number,
-            'class_name': f"{student.class_ref.description} - {student.section}" if student.class_ref and student.section else (student.class_ref.description if student.class_ref else 'N/A'),
-            'roll_number': student.roll_number or 'N/A',
-            'father_name': student.father_name,
-            'mobile': student.father_phone or student.phone or 'N/A',
-            'father_phone': student.father_phone or 'N/A',
-            'address': student.address or ''
-        }
+    # Prepare student data for receipt (enhanced with address and mobile)
+    student_data = {
+        'name': f"{student.first_name} {student.last_name}",
+        'admission_number': student.admission_number,
+        'class_name': f"{student.class_ref.description} - {student.section}" if student.class_ref and student.section else (student.class_ref.description if student.class_ref else 'N/A'),
+        'roll_number': student.roll_number or 'N/A',
+        'father_name': student.father_name,
+        'mobile': student.father_phone or student.phone or 'N/A',
+        'father_phone': student.father_phone or 'N/A',
+        'address': student.address or ''
+    }
 
-        # Prepare fee summary
-        fee_summary = {
-            'total_annual_fee': float(fee_record.total_amount),
-            'total_paid': float(fee_record.paid_amount),
-            'balance_remaining': float(fee_record.balance_amount)
-        }
+    # Prepare fee summary
+    fee_summary = {
+        'total_annual_fee': float(fee_record.total_amount),
+        'total_paid': float(fee_record.paid_amount),
+        'balance_remaining': float(fee_record.balance_amount)
+    }
 
-        # Check if student has transport enrollment for current session
-        transport_data = None
-        try:
+    # Check if student has transport enrollment for current session
+    transport_data = None
+    try:
+        # Savepoint: a failed lookup must not abort the payment's transaction
+        async with db.begin_nested():
             from app.crud.crud_transport import student_transport_enrollment_crud
             transport_enrollment = await db.execute(
                 select(StudentTransportEnrollment)
@@ -2256,48 +2188,43 @@ async def pay_monthly_enhanced(
                     'balance': balance_transport,
                     'months_covered': paid_months
                 }
-        except Exception as transport_error:
-            logger.warning(f"Could not fetch transport data: {str(transport_error)}")
-            # Continue without transport data
-
-        # Get admin user name who processed the payment
-        created_by_name = f"{current_user.first_name} {current_user.last_name}" if current_user else None
-
-        # Generate receipt PDF (enhanced with transport data and created_by_name)
-        receipt_generator = ReceiptGenerator()
-        pdf_buffer = receipt_generator.generate_receipt(
-            payment_data=payment_data,
-            student_data=student_data,
-            month_breakdown=payment_breakdown,
-            fee_summary=fee_summary,
-            transport_data=transport_data,
-            created_by_name=created_by_name
-        )
-
-        # Upload to Cloudinary
-        cloudinary_service = CloudinaryReceiptService()
-        receipt_url, cloudinary_public_id = cloudinary_service.upload_receipt(
-            pdf_buffer=pdf_buffer,
-            payment_id=payment.id,
-            receipt_number=receipt_number
-        )
+    except Exception as transport_error:
+        logger.warning(f"Could not fetch transport data: {str(transport_error)}")
+        # Continue without transport data
 
-        # Update payment record with receipt information
-        payment.receipt_number = receipt_number
-        payment.receipt_cloudinary_url = receipt_url
-        payment.receipt_cloudinary_id = cloudinary_public_id
+    # Get admin user name who processed the payment
+    created_by_name = f"{current_user.first_name} {current_user.last_name}" if current_user else None
 
-        await db.commit()
-        await db.refresh(payment)
+    # Receipt generator inputs (enhanced with transport data and created_by_name)
+    receipt_job = receipt_pipeline.enqueue(
+        db,
+        job_type="FEE",
+        receipt_number=receipt_number,
+        payload={
+            "payment_data": payment_data,
+            "student_data": student_data,
+            "month_breakdown": payment_breakdown,
+            "fee_summary": fee_summary,
+            "transport_data": transport_data,
+            "created_by_name": created_by_name
+        },
+        whatsapp={
+            "phone": resolve_whatsapp_phone(student),
+            "student_name": f"{student.first_name} {student.last_name}",
+            "amount": float(actual_amount_to_process)
+        },
+        fee_payment_id=payment.id,
+        created_by=current_user.id
+    )
+    payment.receipt_number = receipt_number
 
-        logger.info(f"Receipt generated and uploaded successfully: {receipt_url}")
+    # One commit for the payment and its receipt job: a payment is never left without one
+    await db.commit()
+    await db.refresh(fee_record)
+    await db.refresh(payment)
+    receipt_pipeline.notify()
 
-    except Exception as e:
-        # Log error but don't fail the payment
-        logger.error(f"Failed to generate/upload receipt: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        # Continue with payment response even if receipt generation fails
+    logger.info(f"Receipt job {receipt_job.id} queued for payment {payment.id}")
 
     # Generate alert for fee payment
     try:
@@ -2334,48 +2261,6 @@ async def pay_monthly_enhanced(
         print(f"Failed to create fee payment alert: {e}")
         traceback.print_exc()
 
-    # =====================================================
-    # WhatsApp Notification - Using approved media template
-    # Template: school_fee_media_template_v1 (4 variables)
-    # Sends receipt PDF attachment with clickable link
-    # =====================================================
-    whatsapp_result = None
-    whatsapp_status = None
-    whatsapp_error = None
-    try:
-        # Check available phone numbers in priority order: father > mother > guardian > student
-        contact_phone = None
-        for phone_field in [student.father_phone, student.mother_phone, student.guardian_phone, student.phone]:
-            is_valid, validated_phone = whatsapp_service.validate_phone_number(phone_field)
-            if is_valid and validated_phone:
-                contact_phone = validated_phone
-                break
-
-        if contact_phone:
-            # Send WhatsApp notification using media receipt template (with PDF attachment)
-            whatsapp_result = await whatsapp_service.send_fee_media_receipt(
-                phone_number=contact_phone,
-                student_name=f"{student.first_name} {student.last_name}",
-                amount=float(actual_amount_to_process),
-                receipt_url=receipt_url,
-                payment_id=payment.id
-            )
-
-            logger.info(f"WhatsApp notification sent for payment {payment.id}: {whatsapp_result}")
-            whatsapp_status = whatsapp_result.get("status", "UNKNOWN")
-            whatsapp_error = whatsapp_result.get("error")
-        else:
-            whatsapp_status = "NO_PHONE"
-            whatsapp_error = "No valid phone number available (checked father, mother, guardian, student)"
-            logger.info(f"WhatsApp not sent for payment {payment.id}: No valid phone number")
-
-    except Exception as e:
-        import traceback
-        logger.error(f"Failed to send WhatsApp notification for payment {payment.id}: {e}")
-        traceback.print_exc()
-        whatsapp_status = "ERROR"
-        whatsapp_error = str(e)[:500]
-
     return {
         "success": True,
         "message": f"Payment of ₹{actual_amount_to_process} processed: ₹{total_allocated} allocated across {total_months_affected} month(s)" + (f", ₹{remaining_unprocessed} could not be processed (no pending amounts)" if remaining_unprocessed > 0 else ""),
@@ -2384,9 +2269,11 @@ async def pay_monthly_enhanced(
         "processed_amount": actual_amount_to_process,
         "remaining_unprocessed": remaining_unprocessed,
         "receipt": {
-            "available": receipt_url is not None,
+            "available": False,
+            "status": receipt_job.receipt_status if receipt_job else "NOT_GENERATED",
+            "job_id": receipt_job.id if receipt_job else None,
             "receipt_number": receipt_number,
-            "receipt_url": receipt_url
+            "receipt_url": None
         },
         "student": {
             "id": student.id,
@@ -2412,11 +2299,12 @@ async def pay_monthly_enhanced(
             "payment_status": "Paid" if fee_record.balance_amount <= 0 else ("Partial" if fee_record.paid_amount > 0 else "Pending")
         },
         "whatsapp_notification": {
-            "sent": whatsapp_result.get("success", False) if whatsapp_result else False,
-            "status": whatsapp_result.get("status") if whatsapp_result else whatsapp_status,
-            "message_sid": whatsapp_result.get("message_sid") if whatsapp_result else None,
-            "phone_number": student.phone if student.phone else None,
-            "error": whatsapp_result.get("error") if whatsapp_result else whatsapp_error
+            "sent": False,
+            "status": receipt_job.whatsapp_status if receipt_job else "NOT_QUEUED",
+            "message_sid": None,
+            "phone_number": receipt_job.whatsapp_phone if receipt_job else None,
+            "error": "No valid phone number available (checked father, mother, guardian, student)"
+            if receipt_job and receipt_job.whatsapp_status == "NO_PHONE" else None
         }
     }
 
@@ -2669,7 +2557,10 @@ async def pay_combined_tuition_transport(
         transaction_id=transaction_id,
         remarks=f"Combined payment: {remarks}" if remarks else "Combined tuition + transport payment"
     )
-    tuition_payment = await fee_payment_crud.create(db, obj_in=tuition_payment_data)
+    # Flushed only: both payments and the receipt job are committed together in PART 3
+    tuition_payment = FeePaymentModel(**tuition_payment_data.model_dump())
+    db.add(tuition_payment)
+    await db.flush()
 
     # Allocate tuition payment to months
     remaining_tuition = actual_tuition_amount
@@ -2843,19 +2734,12 @@ async def pay_combined_tuition_transport(
                 "status": "Paid" if paid_rounded >= monthly_rounded else "Partial"
             })
 
-    # Commit all changes
-    await db.commit()
-
-    # Refresh records
-    await db.refresh(tuition_payment)
-    await db.refresh(transport_payment)
-    await db.refresh(fee_record)
-
     # =====================================================
-    # PART 3: Generate Combined Receipt
+    # PART 3: Queue Combined Receipt
+    # (PDF, Cloudinary upload and WhatsApp are handled by the receipt worker;
+    # the job is committed with the payments)
     # =====================================================
-    receipt_url = None
-    receipt_number = None
+    receipt_number = f"RCP-{tuition_payment.id:06d}"
 
     # Calculate transport totals after payment (needed for both receipt and response)
     transport_total_result = await db.execute(
@@ -2867,94 +2751,89 @@ async def pay_combined_tuition_transport(
     )
     transport_totals = transport_total_result.first()
 
-    try:
-        # Generate receipt number
-        receipt_number = f"RCP-{tuition_payment.id:06d}"
-
-        # Get payment method description
-        payment_method = await payment_method_crud.get_by_id_async(db, id=tuition_payment_method_id)
-        payment_method_name = payment_method.description if payment_method else "Cash"
-
-        # Format payment date for receipt display
-        payment_date_str = payment_date.strftime('%d-%b-%Y') if payment_date else 'N/A'
-
-        # Prepare payment data for receipt
-        receipt_payment_data = {
-            'id': tuition_payment.id,
-            'amount': float(actual_tuition_amount) + float(transport_amount),  # Combined total
-            'tuition_amount': float(actual_tuition_amount),
-            'transport_amount': float(transport_amount),
-            'payment_method': payment_method_name,
-            'payment_date': payment_date,
-            'payment_date_str': payment_date_str,  # Formatted date string for receipt
-            'transaction_id': transaction_id,
-            'receipt_number': receipt_number
-        }
-
-        # Prepare student data for receipt
-        student_data = {
-            'name': f"{student.first_name} {student.last_name}",
-            'admission_number': student.admission_number,
-            'class_name': student.class_ref.description if student.class_ref else 'N/A',
-            'roll_number': student.roll_number or 'N/A',
-            'father_name': student.father_name,
-            'phone': student.phone
-        }
-
-        # Prepare fee summary
-        fee_summary = {
-            'total_annual_fee': float(fee_record.total_amount),
-            'total_paid': float(fee_record.paid_amount),
-            'balance_remaining': float(fee_record.balance_amount)
-        }
+    # Get payment method description
+    payment_method = await payment_method_crud.get_by_id_async(db, id=tuition_payment_method_id)
+    payment_method_name = payment_method.description if payment_method else "Cash"
+
+    # Format payment date for receipt display
+    payment_date_str = payment_date.strftime('%d-%b-%Y') if payment_date else 'N/A'
+
+    # Prepare payment data for receipt
+    receipt_payment_data = {
+        'id': tuition_payment.id,
+        'amount': float(actual_tuition_amount) + float(transport_amount),  # Combined total
+        'tuition_amount': float(actual_tuition_amount),
+        'transport_amount': float(transport_amount),
+        'payment_method': payment_method_name,
+        'payment_date': payment_date,
+        'payment_date_str': payment_date_str,  # Formatted date string for receipt
+        'transaction_id': transaction_id,
+        'receipt_number': receipt_number
+    }
 
-        # Prepare transport data for receipt with monthly breakdown
-        transport_receipt_data = {
-            'monthly_fee': float(transport_enrollment.monthly_fee),
-            'total_fee': float(transport_totals.total_fee or 0) if transport_totals else 0,
-            'total_paid': float(transport_totals.total_paid or 0) if transport_totals else 0,
-            'balance': float(transport_totals.total_balance or 0) if transport_totals else 0,
-            'monthly_breakdown': transport_breakdown,  # This contains the months paid in THIS transaction
-            'current_payment_amount': float(transport_amount),
-            'months_covered': [m['month_name'] for m in transport_breakdown]
-        }
+    # Prepare student data for receipt
+    student_data = {
+        'name': f"{student.first_name} {student.last_name}",
+        'admission_number': student.admission_number,
+        'class_name': student.class_ref.description if student.class_ref else 'N/A',
+        'roll_number': student.roll_number or 'N/A',
+        'father_name': student.father_name,
+        'phone': student.phone
+    }
 
-        # Get admin user name
-        created_by_name = f"{current_user.first_name} {current_user.last_name}" if current_user else None
+    # Prepare fee summary
+    fee_summary = {
+        'total_annual_fee': float(fee_record.total_amount),
+        'total_paid': float(fee_record.paid_amount),
+        'balance_remaining': float(fee_record.balance_amount)
+    }
 
-        # Generate receipt PDF
-        receipt_generator = ReceiptGenerator()
-        pdf_buffer = receipt_generator.generate_receipt(
-            payment_data=receipt_payment_data,
-            student_data=student_data,
-            month_breakdown=tuition_breakdown,
-            fee_summary=fee_summary,
-            transport_data=transport_receipt_data,
-            created_by_name=created_by_name
-        )
+    # Prepare transport data for receipt with monthly breakdown
+    transport_receipt_data = {
+        'monthly_fee': float(transport_enrollment.monthly_fee),
+        'total_fee': float(transport_totals.total_fee or 0) if transport_totals else 0,
+        'total_paid': float(transport_totals.total_paid or 0) if transport_totals else 0,
+        'balance': float(transport_totals.total_balance or 0) if transport_totals else 0,
+        'monthly_breakdown': transport_breakdown,  # This contains the months paid in THIS transaction
+        'current_payment_amount': float(transport_amount),
+        'months_covered': [m['month_name'] for m in transport_breakdown]
+    }
 
-        # Upload to Cloudinary
-        cloudinary_service = CloudinaryReceiptService()
-        receipt_url, cloudinary_public_id = cloudinary_service.upload_receipt(
-            pdf_buffer=pdf_buffer,
-            payment_id=tuition_payment.id,
-            receipt_number=receipt_number
-        )
+    # Get admin user name
+    created_by_name = f"{current_user.first_name} {current_user.last_name}" if current_user else None
 
-        # Update tuition payment with receipt info
-        tuition_payment.receipt_number = receipt_number
-        tuition_payment.receipt_cloudinary_url = receipt_url
-        tuition_payment.receipt_cloudinary_id = cloudinary_public_id
+    receipt_job = receipt_pipeline.enqueue(
+        db,
+        job_type="COMBINED",
+        receipt_number=receipt_number,
+        payload={
+            "payment_data": receipt_payment_data,
+            "student_data": student_data,
+            "month_breakdown": tuition_breakdown,
+            "fee_summary": fee_summary,
+            "transport_data": transport_receipt_data,
+            "created_by_name": created_by_name
+        },
+        whatsapp={
+            "phone": resolve_whatsapp_phone(student),
+            "student_name": f"{student.first_name} {student.last_name}",
+            "amount": float(actual_tuition_amount) + float(transport_amount)
+        },
+        fee_payment_id=tuition_payment.id,
+        created_by=current_user.id
+    )
+    tuition_payment.receipt_number = receipt_number
 
-        await db.commit()
-        await db.refresh(tuition_payment)
+    # Commit all changes: the payments never exist without their receipt job
+    await db.commit()
 
-        logger.info(f"Combined receipt generated: {receipt_url}")
+    # Refresh records
+    await db.refresh(tuition_payment)
+    await db.refresh(transport_payment)
+    await db.refresh(fee_record)
+    receipt_pipeline.notify()
 
-    except Exception as e:
-        logger.error(f"Failed to generate combined receipt: {str(e)}")
-        import traceback
-        traceback.print_exc()
+    logger.info(f"Combined receipt job {receipt_job.id} queued for payment {tuition_payment.id}")
 
     # =====================================================
     # PART 4: Create Alert for Combined Payment
@@ -3005,50 +2884,6 @@ async def pay_combined_tuition_transport(
         print(f"Failed to create combined fee payment alert: {e}")
         traceback.print_exc()
 
-    # =====================================================
-    # PART 5: WhatsApp Notification - Using approved template
-    # Template: school_fee_text_receipt_v6 (2 variables)
-    # =====================================================
-    whatsapp_result = None
-    whatsapp_status = None
-    whatsapp_error = None
-    try:
-        # Total combined amount for WhatsApp
-        total_combined_amount = float(actual_tuition_amount) + float(transport_amount)
-
-        # Check available phone numbers in priority order: father > mother > guardian > student
-        contact_phone = None
-        for phone_field in [student.father_phone, student.mother_phone, student.guardian_phone, student.phone]:
-            is_valid, validated_phone = whatsapp_service.validate_phone_number(phone_field)
-            if is_valid and validated_phone:
-                contact_phone = validated_phone
-                break
-
-        if contact_phone:
-            # Send WhatsApp notification using media receipt template (with PDF attachment)
-            whatsapp_result = await whatsapp_service.send_fee_media_receipt(
-                phone_number=contact_phone,
-                student_name=f"{student.first_name} {student.last_name}",
-                amount=total_combined_amount,
-                receipt_url=receipt_url,
-                payment_id=tuition_payment.id
-            )
-
-            logger.info(f"WhatsApp notification sent for combined payment {tuition_payment.id}: {whatsapp_result}")
-            whatsapp_status = whatsapp_result.get("status", "UNKNOWN")
-            whatsapp_error = whatsapp_result.get("error")
-        else:
-            whatsapp_status = "NO_PHONE"
-            whatsapp_error = "No valid phone number available (checked father, mother, guardian, student)"
-            logger.info(f"WhatsApp not sent for combined payment {tuition_payment.id}: No valid phone number")
-
-    except Exception as e:
-        import traceback
-        logger.error(f"Failed to send WhatsApp notification for combined payment {tuition_payment.id}: {e}")
-        traceback.print_exc()
-        whatsapp_status = "ERROR"
-        whatsapp_error = str(e)[:500]
-
     # Return combined response
     return {
         "success": True,
@@ -3066,9 +2901,16 @@ async def pay_combined_tuition_transport(
             "month_breakdown": transport_breakdown
         },
         "receipt": {
-            "available": receipt_url is not None,
+            "available": False,
+            "status": receipt_job.receipt_status if receipt_job else "NOT_GENERATED",
+            "job_id": receipt_job.id if receipt_job else None,
             "receipt_number": receipt_number,
-            "receipt_url": receipt_url
+            "receipt_url": None
+        },
+        "whatsapp_notification": {
+            "sent": False,
+            "status": receipt_job.whatsapp_status if receipt_job else "NOT_QUEUED",
+            "phone_number": receipt_job.whatsapp_phone if receipt_job else None
         },
         "student": {
             "id": student.id,
@@ -3438,39 +3280,138 @@ async def get_enhanced_students_summary(
     search: Optional[str] = Query(None, description="Search by student name or admission number"),
     page: int = Query(1, ge=1, description="Page number"),
     per_page: int = Query(25, ge=1, le=100, description="Items per page"),
-    db: AsyncSession = Depends(get_db),
+    order: str = Query(
+        SUMMARY_ORDER_NAME, pattern="^(name|class_roll)$",
+        description="name (page numbers) or class_roll (class, roll number; supports cursor)"
+    ),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page (class_roll order)"),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """
     Get enhanced student fee summary with both legacy and monthly tracking data
     Shows comprehensive fee status for all students
+
+    total is exact. With order=class_roll, pass next_cursor back as cursor to
+    fetch the following page without re-reading the earlier ones (page is then ignored).
     """
-    offset = (page - 1) * per_page
+    after = None
+    if cursor:
+        if order != SUMMARY_ORDER_CLASS_ROLL:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="cursor requires order=class_roll")
+        try:
+            after = decode_summary_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
 
-    summaries = await monthly_fee_tracking_crud.get_enhanced_student_summary(
+    start = time.perf_counter()
+    result = await monthly_fee_tracking_crud.get_enhanced_student_summary_page(
         db=db,
         session_year_id=session_year_id,
         class_id=class_id,
         payment_status_id=payment_status_id,
         search=search,
         limit=per_page,
-        offset=offset
+        offset=0 if after else (page - 1) * per_page,
+        order=order,
+        after=after
     )
-
-    # Get total count for pagination
-    total = len(summaries)  # This is approximate
-    total_pages = math.ceil(total / per_page)
+    query_time_ms = round((time.perf_counter() - start) * 1000, 2)
+    summaries = result["students"]
+    total = result["total"]
+    log_timing("enhanced_students_summary", query_time_ms, rows=len(summaries), total=total, order=order)
 
     return {
         "students": summaries,
         "total": total,
         "page": page,
         "per_page": per_page,
-        "total_pages": total_pages,
-        "has_monthly_tracking": any(s.has_monthly_tracking for s in summaries)
+        "total_pages": math.ceil(total / per_page),
+        "next_cursor": encode_summary_cursor(result["next_key"]) if result["next_key"] else None,
+        "has_monthly_tracking": any(s.has_monthly_tracking for s in summaries),
+        "query_time_ms": query_time_ms
+    }
+
+
+@router.get("/balances")
+async def get_fee_balances(
+    session_year_id: int = Query(..., description="Session year ID"),
+    class_id: Optional[int] = Query(None, description="Filter by class ID"),
+    outstanding_only: bool = Query(False, description="Only students with a balance"),
+    overdue_only: bool = Query(False, description="Only students with overdue months"),
+    page: int = Query(1, ge=1, description="Page number"),
+    per_page: int = Query(25, ge=1, le=100, description="Items per page"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """
+    Per-student fee balances (tuition + transport) from the maintained rollup,
+    largest balance first, with session or class totals
+    """
+    balances, total = await fee_balance_crud.get_multi(
+        db,
+        session_year_id=session_year_id,
+        class_id=class_id,
+        outstanding_only=outstanding_only,
+        overdue_only=overdue_only,
+        skip=(page - 1) * per_page,
+        limit=per_page
+    )
+    totals = await fee_balance_crud.get_session_totals(db, session_year_id=session_year_id, class_id=class_id)
+
+    return {
+        "balances": [StudentFeeBalance(**balance) for balance in balances],
+        "totals": totals,
+        "total": total,
+        "page": page,
+        "per_page": per_page,
+        "total_pages": math.ceil(total / per_page)
     }
 
 
+@router.post("/balances/reconcile")
+async def reconcile_fee_balances(
+    session_year_id: Optional[int] = Query(None, description="Session year ID (default: all sessions)"),
+    repair: bool = Query(True, description="Rewrite rows that differ from the tracking tables"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """
+    Verify student_fee_balances against monthly and transport tracking and repair drift
+    """
+    return await fee_balance_crud.reconcile(db, session_year_id=session_year_id, repair=repair)
+
+
+@router.get("/balances/{student_id}", response_model=StudentFeeBalance)
+async def get_student_fee_balance(
+    student_id: int,
+    session_year_id: int = Query(4, description="Session year ID (default: 2025-26)"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Fee balance of one student for a session. Students can only view their own balance
+    """
+    if current_user.user_type_id == 3:  # 3 = STUDENT
+        own_student = await student_crud.get_by_user_id(db, user_id=current_user.id)
+        if not own_student or own_student.id != student_id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Students can only view their own fee balance"
+            )
+
+    balance = await fee_balance_crud.get(db, student_id=student_id, session_year_id=session_year_id)
+    if not balance:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No monthly fee tracking found for this student and session year"
+        )
+    return StudentFeeBalance(
+        **{column.name: getattr(balance, column.name) for column in balance.__table__.columns},
+        collection_percentage=balance.collection_percentage
+    )
+
+
 @router.get("/my-fees")
 async def get_my_fees(
     session_year_id: int = Query(4, description="Session year ID (default: 2025-26)"),
@@ -3687,6 +3628,74 @@ async def get_enhanced_student_monthly_history(
         )
 
 
+@router.get("/enhanced-monthly-history/class/{class_id}")
+async def get_class_monthly_history(
+    class_id: int,
+    session_year_id: int = Query(..., description="Session year ID"),
+    section: Optional[str] = Query(None, description="Filter by section"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Get monthly fee histories for every student of a class (optionally one section)
+    For a past session, students are selected by their class and section in that session
+    Students without a monthly-tracked fee record in the session are listed in students_without_tracking
+    Admin, teacher and super admin only
+    """
+    # 1=admin, 2=teacher, 6=super_admin can view class fee histories
+    if current_user.user_type_id not in [1, 2, 6]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions to view class fee histories"
+        )
+
+    current_session_result = await db.execute(
+        select(SessionYearModel.id).where(
+            and_(SessionYearModel.id == session_year_id, SessionYearModel.is_current == True)
+        )
+    )
+    is_past_session = current_session_result.scalar_one_or_none() is None
+
+    query = select(Student.id)
+    if is_past_session:
+        # Class, section and roll in that session come from its history row (as in StudentSessionView);
+        # students without one are still in that session. Students deleted since are included.
+        history = StudentSessionHistory
+        has_history = history.id.isnot(None)
+        query = query.outerjoin(
+            history, and_(history.student_id == Student.id, history.session_year_id == session_year_id)
+        )
+        class_column = case((has_history, history.class_id), else_=Student.class_id)
+        section_column = case((has_history, history.section), else_=Student.section)
+        roll_column = case((has_history, history.roll_number), else_=Student.roll_number)
+        conditions = [or_(has_history, Student.session_year_id == session_year_id)]
+    else:
+        class_column, section_column, roll_column = Student.class_id, Student.section, Student.roll_number
+        conditions = [or_(Student.is_deleted == False, Student.is_deleted.is_(None))]
+    conditions.append(class_column == class_id)
+    if section:
+        conditions.append(section_column == section)
+
+    result = await db.execute(
+        query.where(and_(*conditions))
+        .order_by(section_column, roll_column, Student.first_name, Student.id)
+    )
+    student_ids = list(result.scalars().all())
+
+    histories = await monthly_fee_tracking_crud.get_students_monthly_history(
+        db, student_ids=student_ids, session_year_id=session_year_id
+    )
+
+    return {
+        "class_id": class_id,
+        "section": section,
+        "session_year_id": session_year_id,
+        "total_students": len(student_ids),
+        "histories": [histories[student_id] for student_id in student_ids if student_id in histories],
+        "students_without_tracking": [student_id for student_id in student_ids if student_id not in histories]
+    }
+
+
 @router.post("/enable-monthly-tracking")
 async def enable_monthly_tracking(
     request: EnableMonthlyTrackingRequest,
@@ -3739,6 +3748,9 @@ async def enable_monthly_tracking(
                         total_records_created += row.monthly_records_created
                         if row.fee_record_created:
                             fee_records_created += 1
+                        # Tracking rows come from a database function; refresh the balance at commit
+                        mark_fee_balances_stale(db, [(row.student_id, request.session_year_id)])
+                        mark_dashboard_topic(db, "fees")
 
                     results.append({
                         "student_id": row.student_id,
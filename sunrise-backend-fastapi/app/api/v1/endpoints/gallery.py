@@ -8,11 +8,10 @@ from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, s
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, and_
 from sqlalchemy.orm import selectinload
-import cloudinary
-import cloudinary.uploader
 
 from app.core.database import get_db
 from app.core.cloudinary_config import configure_cloudinary
+from app.core.integrations import IntegrationUnavailableError, cloudinary_destroy, cloudinary_upload
 from app.models.gallery import GalleryCategory, GalleryImage
 from app.models.user import User
 from app.schemas.gallery import (
@@ -233,7 +232,7 @@ async def upload_gallery_image(
     
     try:
         # Upload to Cloudinary
-        cloudinary_response = cloudinary.uploader.upload(
+        cloudinary_response = await cloudinary_upload(
             file.file,
             folder="gallery",
             resource_type="image",
@@ -268,6 +267,12 @@ async def upload_gallery_image(
         
         return new_image
         
+    except IntegrationUnavailableError as e:
+        await db.rollback()
+        raise HTTPException(
+            status_code=503,
+            detail=f"Image storage is unavailable, please try again: {str(e)}"
+        )
     except Exception as e:
         await db.rollback()
         raise HTTPException(
@@ -407,12 +412,18 @@ async def delete_gallery_image(
     
     try:
         # Delete from Cloudinary
-        cloudinary.uploader.destroy(image.cloudinary_public_id)
+        await cloudinary_destroy(image.cloudinary_public_id)
         
         # Delete from database
         await db.delete(image)
         await db.commit()
         
+    except IntegrationUnavailableError as e:
+        await db.rollback()
+        raise HTTPException(
+            status_code=503,
+            detail=f"Image storage is unavailable, please try again: {str(e)}"
+        )
     except Exception as e:
         await db.rollback()
         raise HTTPException(
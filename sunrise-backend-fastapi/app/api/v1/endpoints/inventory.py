@@ -3,19 +3,19 @@ Inventory Management API Endpoints
 """
 from typing import Optional, List, Dict, Any
 from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File
+from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, and_, extract
 from sqlalchemy.orm import joinedload, selectinload
 from datetime import date
-import cloudinary
-import cloudinary.uploader
 
 from app.core.database import get_db
 from app.core.cloudinary_config import configure_cloudinary
+from app.core.integrations import IntegrationUnavailableError, cloudinary_destroy, cloudinary_upload
 from app.api.deps import get_current_active_user, get_current_admin_user
 from app.models.user import User
 from app.models.inventory import (
-    InventoryItemType, InventorySizeType, InventoryPricing,
+    InventoryItemType, InventoryPricing,
     InventoryPurchase, InventoryPurchaseItem,
     InventoryStock, InventoryStockProcurement, InventoryStockProcurementItem
 )
@@ -32,6 +32,7 @@ from app.crud.crud_inventory import crud_inventory_pricing, crud_inventory_purch
 from app.crud.crud_inventory_stock import crud_inventory_stock, crud_inventory_stock_procurement
 from app.crud.metadata import payment_method_crud
 from app.services.alert_service import alert_service
+from app.services.stock_reservation_engine import InsufficientStockError, StockLine, stock_reservation_engine
 
 router = APIRouter()
 
@@ -228,13 +229,13 @@ async def upload_item_type_image(
                 if 'inventory' in url_parts:
                     idx = url_parts.index('inventory')
                     public_id = 'inventory/' + url_parts[idx + 1].split('.')[0]
-                    cloudinary.uploader.destroy(public_id)
+                    await cloudinary_destroy(public_id)
             except Exception as e:
                 # Log but don't fail if deletion fails
                 print(f"Warning: Could not delete old image: {e}")
 
         # Upload to Cloudinary
-        cloudinary_response = cloudinary.uploader.upload(
+        cloudinary_response = await cloudinary_upload(
             file.file,
             folder="inventory",
             public_id=f"item_{item_type_id}_{item_type.name}",
@@ -258,6 +259,12 @@ async def upload_item_type_image(
             "cloudinary_public_id": cloudinary_response['public_id']
         }
 
+    except IntegrationUnavailableError as e:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Image storage is unavailable, please try again: {str(e)}"
+        )
     except Exception as e:
         await db.rollback()
         raise HTTPException(
@@ -360,57 +367,37 @@ async def create_purchase(
     Create new purchase transaction and decrement stock
     Admin only
     """
-    # Check stock availability for all items
-    for item in purchase_data.items:
-        is_available, current_qty = await crud_inventory_stock.check_stock_availability(
-            db,
-            item_type_id=item.inventory_item_type_id,
-            size_type_id=item.size_type_id,
-            required_quantity=item.quantity
+    # Take all lines from stock in one conditional statement (all or nothing)
+    lines = [
+        StockLine(item.inventory_item_type_id, item.size_type_id, item.quantity)
+        for item in purchase_data.items
+    ]
+    try:
+        reserved = await stock_reservation_engine.reserve(db, lines)
+    except InsufficientStockError as e:
+        await db.rollback()
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={"detail": str(e), "shortages": [shortage.to_dict() for shortage in e.shortages]}
         )
 
-        if not is_available:
-            # Get item details for error message
-            item_query = select(InventoryItemType).where(InventoryItemType.id == item.inventory_item_type_id)
-            item_result = await db.execute(item_query)
-            item_type = item_result.scalar_one_or_none()
-
-            size_name = ""
-            if item.size_type_id:
-                size_query = select(InventorySizeType).where(InventorySizeType.id == item.size_type_id)
-                size_result = await db.execute(size_query)
-                size_type = size_result.scalar_one_or_none()
-                size_name = f" (Size: {size_type.name})" if size_type else ""
-
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Insufficient stock for {item_type.description}{size_name}. Available: {current_qty}, Required: {item.quantity}"
-            )
-
-    # Create purchase
-    purchase = await crud_inventory_purchase.create_purchase(
-        db,
-        purchase_data=purchase_data,
-        created_by=current_user.id
-    )
-
-    # Decrement stock for each item
-    for item in purchase_data.items:
-        await crud_inventory_stock.adjust_stock_quantity(
+    # Purchase rows go into the same transaction as the stock decrement
+    try:
+        purchase = await crud_inventory_purchase.create_purchase(
             db,
-            item_type_id=item.inventory_item_type_id,
-            size_type_id=item.size_type_id,
-            quantity_change=-item.quantity  # Negative to decrement
+            purchase_data=purchase_data,
+            created_by=current_user.id,
+            auto_commit=False
         )
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
 
-    # Refresh to load all relationships
-    await db.refresh(purchase, ['student', 'session_year', 'payment_method', 'items'])
-    
-    # Load nested relationships
-    for item in purchase.items:
-        await db.refresh(item, ['item_type', 'size_type'])
+    # Load the purchase with student, session year, payment method and items
+    purchase = await crud_inventory_purchase.get_purchase_by_id(db, purchase_id=purchase.id)
 
-    await db.refresh(purchase.student, ['class_ref'])
+    actor_name = f"{current_user.first_name} {current_user.last_name}" if current_user.first_name else "Admin"
 
     # Generate alert for inventory purchase
     try:
@@ -425,9 +412,6 @@ async def create_purchase(
         payment_method = await payment_method_crud.get_by_id_async(db, id=purchase.payment_method_id)
         payment_method_desc = payment_method.description if payment_method else "Cash"
 
-        # Get current user name
-        actor_name = f"{current_user.first_name} {current_user.last_name}" if current_user.first_name else "Admin"
-
         # Get student info
         student_name = f"{purchase.student.first_name} {purchase.student.last_name}"
         class_name = purchase.student.class_ref.description if purchase.student.class_ref else "Unknown"
@@ -466,7 +450,7 @@ async def create_purchase(
         for item in purchase.items
     ]
     
-    return InventoryPurchaseResponse(
+    response = InventoryPurchaseResponse(
         id=purchase.id,
         student_id=purchase.student_id,
         session_year_id=purchase.session_year_id,
@@ -489,6 +473,22 @@ async def create_purchase(
         created_at=purchase.created_at
     )
 
+    # Low-stock alerts for items this purchase took to their minimum threshold
+    try:
+        await stock_reservation_engine.emit_low_stock_alerts(
+            db,
+            reserved,
+            actor_user_id=current_user.id,
+            actor_name=actor_name,
+            session_year_id=response.session_year_id
+        )
+    except Exception as e:
+        # Log error but don't fail the purchase
+        await db.rollback()
+        print(f"Failed to create low stock alerts: {e}")
+
+    return response
+
 
 @router.get("/purchases/{purchase_id}", response_model=InventoryPurchaseResponse)
 async def get_purchase(
@@ -0,0 +1,179 @@
+"""
+Monitoring Endpoints
+Runtime counters for in-process caches and workers (admin only)
+"""
+import hashlib
+
+from fastapi import APIRouter, Depends, Query
+
+from app.api.deps import get_current_admin_user
+from app.core.database import pool_metrics, read_router, replica_pool_metrics
+from app.core.integrations import get_integration_stats
+from app.core.metadata_cache import metadata_cache
+from app.core.principal_cache import principal_cache
+from app.core.public_cache import public_cache
+from app.core.query_instrumentation import route_metrics
+from app.core.security import password_hash_pool
+from app.models.user import User
+from app.services.alert_broker import alert_broker
+from app.services.dashboard_engine import dashboard_engine
+from app.services.fee_balance_reconciler import fee_balance_reconciler
+from app.utils.performance_monitor import db_perf_tracker
+
+router = APIRouter()
+
+
+@router.get("/principal-cache")
+async def get_principal_cache_stats(
+    current_user: User = Depends(get_current_admin_user)
+):
+    """
+    Principal cache hit/miss counters for this API process
+    """
+    return principal_cache.get_stats()
+
+
+@router.get("/password-hashing")
+async def get_password_hashing_stats(
+    current_user: User = Depends(get_current_admin_user)
+):
+    """
+    bcrypt pool queue metrics for this API process
+    """
+    return password_hash_pool.get_stats()
+
+
+@router.get("/metadata-cache")
+async def get_metadata_cache_stats(
+    current_user: User = Depends(get_current_admin_user)
+):
+    """
+    Configuration metadata cache counters and current version stamp
+    """
+    return metadata_cache.get_stats()
+
+
+@router.get("/fee-balances")
+async def get_fee_balance_reconciler_stats(
+    current_user: User = Depends(get_current_admin_user)
+):
+    """
+    Fee balance reconciliation runs and the last drift report for this API process
+    """
+    return fee_balance_reconciler.get_stats()
+
+
+@router.get("/dashboard")
+async def get_dashboard_engine_stats(
+    current_user: User = Depends(get_current_admin_user)
+):
+    """
+    Admin dashboard section cache counters and the last build time of each section
+    """
+    return dashboard_engine.get_stats()
+
+
+@router.get("/db-pool")
+async def get_db_pool_stats(
+    current_user: User = Depends(get_current_admin_user)
+):
+    """
+    Connection pool occupancy, saturation and checkout wait percentiles for this API process
+    """
+    return pool_metrics.get_stats()
+
+
+@router.get("/read-replica")
+async def get_read_replica_stats(
+    current_user: User = Depends(get_current_admin_user)
+):
+    """
+    Read routing between replica and primary: last measured lag, fallbacks by reason
+    and the replica connection pool
+    """
+    return {
+        **read_router.get_stats(),
+        "pool": replica_pool_metrics.get_stats() if replica_pool_metrics else None
+    }
+
+
+@router.get("/alert-stream")
+async def get_alert_stream_stats(
+    current_user: User = Depends(get_current_admin_user)
+):
+    """
+    Open alert streams in this API process and published/delivered/dropped event counters
+    """
+    return alert_broker.get_stats()
+
+
+@router.get("/integrations")
+async def get_integrations(
+    current_user: User = Depends(get_current_admin_user)
+):
+    """
+    Twilio and Cloudinary calls in this API process: circuit state, in-flight calls,
+    timeouts, rejections and latency percentiles
+    """
+    return get_integration_stats()
+
+
+@router.get("/public-cache")
+async def get_public_cache_stats(
+    current_user: User = Depends(get_current_admin_user)
+):
+    """
+    Public site content cache (faculty, gallery, home page) in this API process:
+    section versions, hits, stale hits served during rebuilds and misses
+    """
+    return public_cache.get_stats()
+
+
+@router.get("/routes")
+async def get_route_metrics(
+    current_user: User = Depends(get_current_admin_user)
+):
+    """
+    Per-route latency, DB time, query count and row percentiles for this API process,
+    with latency histograms and N+1 detections (heaviest routes by query count first)
+    """
+    return route_metrics.get_stats()
+
+
+@router.get("/queries")
+async def get_query_stats(
+    limit: int = Query(50, ge=1, le=500),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """
+    Statement shapes by total DB time for this API process
+
+    Shapes are tracked in full; long statements are truncated here for display
+    and told apart by ``shape_id``
+    """
+    stats = sorted(
+        db_perf_tracker.get_stats().items(),
+        key=lambda item: item[1]["total_time_ms"],
+        reverse=True
+    )
+    return [
+        {
+            "statement": statement[:200],
+            "shape_id": hashlib.sha1(statement.encode()).hexdigest()[:12],
+            **values
+        }
+        for statement, values in stats[:limit]
+    ]
+
+
+@router.delete("/routes")
+async def reset_route_metrics(
+    current_user: User = Depends(get_current_admin_user)
+):
+    """
+    Reset route and statement metrics
+    """
+    route_metrics.reset()
+    db_perf_tracker.reset_stats()
+    pool_metrics.reset()
+    return {"message": "Route, query and pool metrics reset"}
@@ -1,109 +1,155 @@
 from typing import Dict, Any, List, Optional
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Query, Request, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_
 import json
+import logging
 
-from app.core.database import get_db
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.public_cache import FACULTY, GALLERY, HOME_PAGE, etag_matches, gzip_etag, public_cache
 from app.crud import teacher_crud
 from app.models.gallery import GalleryCategory, GalleryImage
 from app.schemas.gallery import PublicGalleryCategory, PublicGalleryImage
 
 router = APIRouter()
 
+logger = logging.getLogger(__name__)
+
+# Browsers and CDNs reuse responses for max-age, then may serve them stale while revalidating
+CACHE_CONTROL = (
+    f"public, max-age={settings.PUBLIC_CACHE_MAX_AGE_SECONDS}, "
+    f"stale-while-revalidate={settings.PUBLIC_CACHE_STALE_SECONDS}"
+)
+
+# Bounds on the query parameters, which are part of the cache key
+MAX_CATEGORIES = 100
+MAX_HOME_PAGE_IMAGES = 50
+
+
+async def _load(loader, *args):
+    # Own session: stale entries are rebuilt in the background, after the request is gone
+    async with AsyncSessionLocal() as db:
+        return await loader(db, *args)
+
+
+async def _cached_response(request: Request, section: str, key: str, loader, *args) -> Response:
+    """
+    Serve a public payload from the public content cache
+
+    Hits return the pre-serialized (and pre-gzipped) bytes of the entry; requests
+    carrying the current ETag in If-None-Match get 304 Not Modified.
+    """
+    entry, cache_status = await public_cache.get_or_build(section, key, lambda: _load(loader, *args))
+
+    accepts_gzip = "gzip" in request.headers.get("accept-encoding", "").lower()
+    headers = {
+        "ETag": gzip_etag(entry.etag) if accepts_gzip else entry.etag,
+        "Cache-Control": CACHE_CONTROL,
+        "Vary": "Accept-Encoding",
+        "X-Cache-Status": cache_status
+    }
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag_matches(if_none_match, entry.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    if accepts_gzip:
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=entry.gzip_bytes, media_type="application/json", headers=headers)
+    return Response(content=entry.json_bytes, media_type="application/json", headers=headers)
+
+
+async def load_public_faculty(db: AsyncSession) -> Dict[str, Any]:
+    """Active teachers grouped by department, as shown on the public Faculty page"""
+    # Get only active teachers with basic information for public display
+    teachers, total = await teacher_crud.get_multi_with_filters(
+        db,
+        skip=0,
+        limit=100,  # Get up to 100 teachers for faculty page
+        is_active=True
+    )
+
+    logger.info(f"Retrieved {len(teachers)} teachers from database")
+
+    # Filter and format data for public display
+    public_teachers = []
+    for teacher in teachers:
+        # Parse subjects JSON if it exists
+        subjects_list = []
+        if teacher.get('subjects'):
+            try:
+                subjects_list = json.loads(teacher['subjects'])
+            except (json.JSONDecodeError, TypeError):
+                subjects_list = []
+
+        # Create public teacher profile
+        public_teacher = {
+            "id": teacher["id"],
+            "full_name": f"{teacher['first_name']} {teacher['last_name']}",
+            "first_name": teacher["first_name"],
+            "last_name": teacher["last_name"],
+            "position": teacher.get("position_description"),  # Use description for human-readable text
+            "department": teacher.get("department_description"),  # Use description for human-readable text
+            "department_id": teacher.get("department_id"),  # Include department ID
+            "subjects": subjects_list,
+            "experience_years": teacher.get("experience_years", 0),
+            "qualification_name": teacher.get("qualification_description"),  # Use description for consistency
+            "joining_date": teacher.get("joining_date"),
+            "email": teacher.get("email"),  # Include email for contact
+            "profile_picture_url": teacher.get("profile_picture_url"),  # Include profile picture
+        }
+        public_teachers.append(public_teacher)
+
+    # Group teachers by department for better organization
+    departments = {}
+    department_stats = []
+
+    for teacher in public_teachers:
+        dept = teacher.get("department") or "General"
+        dept_id = teacher.get("department_id")
+
+        if dept not in departments:
+            departments[dept] = []
+        departments[dept].append(teacher)
+
+    # Create department statistics with unique subjects
+    for dept_name, dept_teachers in departments.items():
+        # Get unique subjects across all teachers in this department
+        all_subjects = []
+        for t in dept_teachers:
+            all_subjects.extend(t.get("subjects", []))
+        # Sorted so the payload (and its ETag) is the same in every worker
+        unique_subjects = sorted(set(all_subjects), key=str)
+
+        # Get department ID from first teacher
+        dept_id = dept_teachers[0].get("department_id") if dept_teachers else None
+
+        department_stats.append({
+            "id": dept_id,
+            "name": dept_name,
+            "faculty_count": len(dept_teachers),
+            "subjects": unique_subjects,
+            "description": f"Our {dept_name} comprises {len(dept_teachers)} dedicated faculty members teaching {len(unique_subjects)} subjects."
+        })
+
+    return {
+        "teachers": public_teachers,
+        "departments": departments,
+        "department_stats": department_stats,
+        "total": len(public_teachers),
+        "message": "Faculty information retrieved successfully"
+    }
+
 
 @router.get("/faculty", response_model=Dict[str, Any])
-async def get_public_faculty(
-    db: AsyncSession = Depends(get_db)
-):
+async def get_public_faculty(request: Request):
     """
     Get active teachers for public Faculty page display
-    No authentication required - public endpoint
+    No authentication required - public endpoint (served from the public content cache)
     """
-    import logging
-    logger = logging.getLogger(__name__)
-
     try:
-        logger.info("Public faculty endpoint called")
-
-        # Get only active teachers with basic information for public display
-        teachers, total = await teacher_crud.get_multi_with_filters(
-            db,
-            skip=0,
-            limit=100,  # Get up to 100 teachers for faculty page
-            is_active=True
-        )
-
-        logger.info(f"Retrieved {len(teachers)} teachers from database")
-        
-        # Filter and format data for public display
-        public_teachers = []
-        for teacher in teachers:
-            # Parse subjects JSON if it exists
-            subjects_list = []
-            if teacher.get('subjects'):
-                try:
-                    subjects_list = json.loads(teacher['subjects'])
-                except (json.JSONDecodeError, TypeError):
-                    subjects_list = []
-
-            # Create public teacher profile
-            public_teacher = {
-                "id": teacher["id"],
-                "full_name": f"{teacher['first_name']} {teacher['last_name']}",
-                "first_name": teacher["first_name"],
-                "last_name": teacher["last_name"],
-                "position": teacher.get("position_description"),  # Use description for human-readable text
-                "department": teacher.get("department_description"),  # Use description for human-readable text
-                "department_id": teacher.get("department_id"),  # Include department ID
-                "subjects": subjects_list,
-                "experience_years": teacher.get("experience_years", 0),
-                "qualification_name": teacher.get("qualification_description"),  # Use description for consistency
-                "joining_date": teacher.get("joining_date"),
-                "email": teacher.get("email"),  # Include email for contact
-                "profile_picture_url": teacher.get("profile_picture_url"),  # Include profile picture
-            }
-            public_teachers.append(public_teacher)
-        
-        # Group teachers by department for better organization
-        departments = {}
-        department_stats = []
-
-        for teacher in public_teachers:
-            dept = teacher.get("department") or "General"
-            dept_id = teacher.get("department_id")
-
-            if dept not in departments:
-                departments[dept] = []
-            departments[dept].append(teacher)
-
-        # Create department statistics with unique subjects
-        for dept_name, dept_teachers in departments.items():
-            # Get unique subjects across all teachers in this department
-            all_subjects = []
-            for t in dept_teachers:
-                all_subjects.extend(t.get("subjects", []))
-            unique_subjects = list(set(all_subjects))
-
-            # Get department ID from first teacher
-            dept_id = dept_teachers[0].get("department_id") if dept_teachers else None
-
-            department_stats.append({
-                "id": dept_id,
-                "name": dept_name,
-                "faculty_count": len(dept_teachers),
-                "subjects": unique_subjects,
-                "description": f"Our {dept_name} comprises {len(dept_teachers)} dedicated faculty members teaching {len(unique_subjects)} subjects."
-            })
-
-        return {
-            "teachers": public_teachers,
-            "departments": departments,
-            "department_stats": department_stats,
-            "total": len(public_teachers),
-            "message": "Faculty information retrieved successfully"
-        }
-    
+        return await _cached_response(request, FACULTY, "all", load_public_faculty)
     except Exception as e:
         # Log the error for debugging
         logger.error(f"Error in get_public_faculty: {str(e)}")
@@ -127,85 +173,78 @@ async def public_health_check():
     return {"status": "ok", "message": "Public API is working"}
 
 
+async def load_public_gallery(db: AsyncSession, limit_categories: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Active categories with their active images, in one query"""
+    active_category = GalleryCategory.is_active == True
+    query = select(GalleryCategory, GalleryImage).outerjoin(
+        GalleryImage,
+        and_(
+            GalleryImage.category_id == GalleryCategory.id,
+            GalleryImage.is_active == True
+        )
+    ).where(active_category)
+
+    if limit_categories:
+        first_categories = select(GalleryCategory.id).where(active_category).order_by(
+            GalleryCategory.display_order.asc(), GalleryCategory.id.asc()
+        ).limit(limit_categories)
+        query = query.where(GalleryCategory.id.in_(first_categories))
+
+    query = query.order_by(
+        GalleryCategory.display_order.asc(),
+        GalleryCategory.id.asc(),
+        GalleryImage.display_order.asc(),
+        GalleryImage.upload_date.desc()
+    )
+
+    result = await db.execute(query)
+
+    # Group rows by category, keeping the query order
+    categories: Dict[int, Dict[str, Any]] = {}
+    for category, img in result.all():
+        category_dict = categories.get(category.id)
+        if category_dict is None:
+            category_dict = categories[category.id] = {
+                'id': category.id,
+                'name': category.name,
+                'description': category.description,
+                'icon': category.icon,
+                'display_order': category.display_order,
+                'images': []
+            }
+        if img is not None:
+            category_dict['images'].append({
+                'id': img.id,
+                'title': img.title,
+                'description': img.description,
+                'cloudinary_url': img.cloudinary_url,
+                'cloudinary_thumbnail_url': img.cloudinary_thumbnail_url,
+                'display_order': img.display_order,
+                'upload_date': img.upload_date
+            })
+
+    return [PublicGalleryCategory.model_validate(c).model_dump() for c in categories.values()]
+
+
 @router.get("/gallery", response_model=List[PublicGalleryCategory])
 async def get_public_gallery(
-    limit_categories: Optional[int] = None,
-    db: AsyncSession = Depends(get_db)
+    request: Request,
+    limit_categories: Optional[int] = Query(None, ge=0, le=MAX_CATEGORIES)
 ):
     """
     Get gallery images grouped by category for public display
     Returns only active categories and active images
-    Public endpoint - no authentication required
+    Public endpoint - no authentication required (served from the public content cache)
 
     Args:
         limit_categories: Optional limit on number of categories to return (for lazy loading)
     """
-    # Get active categories ordered by display_order
-    category_query = select(GalleryCategory).where(
-        GalleryCategory.is_active == True
-    ).order_by(GalleryCategory.display_order.asc())
-
-    if limit_categories:
-        category_query = category_query.limit(limit_categories)
-
-    category_result = await db.execute(category_query)
-    categories = category_result.scalars().all()
-
-    # For each category, get active images
-    result = []
-    for category in categories:
-        image_query = select(GalleryImage).where(
-            and_(
-                GalleryImage.category_id == category.id,
-                GalleryImage.is_active == True
-            )
-        ).order_by(
-            GalleryImage.display_order.asc(),
-            GalleryImage.upload_date.desc()
-        )
-
-        image_result = await db.execute(image_query)
-        images = image_result.scalars().all()
-
-        # Convert to response format
-        category_dict = {
-            'id': category.id,
-            'name': category.name,
-            'description': category.description,
-            'icon': category.icon,
-            'display_order': category.display_order,
-            'images': [
-                {
-                    'id': img.id,
-                    'title': img.title,
-                    'description': img.description,
-                    'cloudinary_url': img.cloudinary_url,
-                    'cloudinary_thumbnail_url': img.cloudinary_thumbnail_url,
-                    'display_order': img.display_order,
-                    'upload_date': img.upload_date
-                }
-                for img in images
-            ]
-        }
-        result.append(category_dict)
-
-    return result
-
+    key = f"categories-{limit_categories}" if limit_categories else "all"
+    return await _cached_response(request, GALLERY, key, load_public_gallery, limit_categories)
 
-@router.get("/gallery/home-page", response_model=List[PublicGalleryImage])
-async def get_public_home_page_images(
-    limit: int = 10,
-    db: AsyncSession = Depends(get_db)
-):
-    """
-    Get featured images for home page carousel
-    Returns images where is_visible_on_home_page = TRUE
-    Ordered by home_page_display_order (NULL values appear last), then upload_date
-    Public endpoint - no authentication required
 
-    Args:
-        limit: Maximum number of images to return (default: 10)
-    """
+async def load_home_page_images(db: AsyncSession, limit: int) -> List[Dict[str, Any]]:
+    """Featured carousel images of active categories"""
     query = select(GalleryImage).join(GalleryCategory).where(
         and_(
             GalleryImage.is_visible_on_home_page == True,
@@ -220,19 +259,21 @@ async def get_public_home_page_images(
     result = await db.execute(query)
     images = result.scalars().all()
 
-    # Convert to response format
-    response_images = [
-        {
-            'id': img.id,
-            'title': img.title,
-            'description': img.description,
-            'cloudinary_url': img.cloudinary_url,
-            'cloudinary_thumbnail_url': img.cloudinary_thumbnail_url,
-            'display_order': img.display_order,
-            'home_page_display_order': img.home_page_display_order,
-            'upload_date': img.upload_date
-        }
-        for img in images
-    ]
+    return [PublicGalleryImage.model_validate(img).model_dump() for img in images]
+
 
-    return response_images
+@router.get("/gallery/home-page", response_model=List[PublicGalleryImage])
+async def get_public_home_page_images(
+    request: Request,
+    limit: int = Query(10, ge=1, le=MAX_HOME_PAGE_IMAGES)
+):
+    """
+    Get featured images for home page carousel
+    Returns images where is_visible_on_home_page = TRUE
+    Ordered by home_page_display_order (NULL values appear last), then upload_date
+    Public endpoint - no authentication required (served from the public content cache)
+
+    Args:
+        limit: Maximum number of images to return (default: 10)
+    """
+    return await _cached_response(request, HOME_PAGE, f"limit-{limit}", load_home_page_images, limit)
@@ -1,11 +1,12 @@
 from typing import Optional
 from datetime import date
 from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 import math
 import logging
 
-from app.core.database import get_db
+from app.core.database import get_read_db, read_router
 from app.crud import report_crud
 from app.schemas.report import (
     UDISEReportResponse, StudentUDISEData,
@@ -14,11 +15,19 @@ from app.schemas.report import (
 )
 from app.api.deps import get_current_active_user
 from app.models.user import User
+from app.utils.report_export import EXPORT_MEDIA_TYPES, stream_export
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
 
+async def _stream_records(stream_records, **filters):
+    # Own session: the body is streamed after the endpoint returns and its dependencies are torn down
+    async with read_router() as db:
+        async for batch in stream_records(db, **filters):
+            yield batch
+
+
 @router.get("/student-udise", response_model=UDISEReportResponse)
 async def get_student_udise_report(
     session_year_id: Optional[int] = Query(None, description="Filter by session year ID"),
@@ -29,7 +38,7 @@ async def get_student_udise_report(
     search: Optional[str] = Query(None, description="Search by name, admission number, or parent name"),
     page: int = Query(1, ge=1, description="Page number"),
     per_page: int = Query(25, ge=1, le=100, description="Records per page"),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """
@@ -108,6 +117,82 @@ async def get_student_udise_report(
         )
 
 
+UDISE_EXPORT_COLUMNS = [
+    ("admission_number", "Admission Number"),
+    ("full_name", "Student Name"),
+    ("date_of_birth", "Date of Birth"),
+    ("age", "Age"),
+    ("gender_name", "Gender"),
+    ("class_name", "Class"),
+    ("section", "Section"),
+    ("roll_number", "Roll Number"),
+    ("session_year_name", "Session Year"),
+    ("admission_date", "Admission Date"),
+    ("blood_group", "Blood Group"),
+    ("aadhar_no", "Aadhar Number"),
+    ("phone", "Phone"),
+    ("email", "Email"),
+    ("address", "Address"),
+    ("city", "City"),
+    ("state", "State"),
+    ("postal_code", "Postal Code"),
+    ("country", "Country"),
+    ("father_name", "Father Name"),
+    ("father_phone", "Father Phone"),
+    ("father_email", "Father Email"),
+    ("father_occupation", "Father Occupation"),
+    ("mother_name", "Mother Name"),
+    ("mother_phone", "Mother Phone"),
+    ("mother_email", "Mother Email"),
+    ("mother_occupation", "Mother Occupation"),
+    ("guardian_name", "Guardian Name"),
+    ("guardian_phone", "Guardian Phone"),
+    ("guardian_email", "Guardian Email"),
+    ("guardian_relation", "Guardian Relation"),
+    ("is_active", "Active"),
+]
+
+
+@router.get("/student-udise/export")
+async def export_student_udise_report(
+    format: str = Query("csv", pattern="^(csv|xlsx|ndjson)$", description="Export format: csv, xlsx or ndjson"),
+    session_year_id: Optional[int] = Query(None, description="Filter by session year ID"),
+    class_id: Optional[int] = Query(None, description="Filter by class ID"),
+    section: Optional[str] = Query(None, description="Filter by section"),
+    gender_id: Optional[int] = Query(None, description="Filter by gender ID"),
+    is_active: Optional[bool] = Query(None, description="Filter by active status"),
+    search: Optional[str] = Query(None, description="Search by name, admission number, or parent name"),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Export the full Student UDISE Report as CSV, XLSX or NDJSON
+
+    Accepts the same filters as /student-udise without pagination. Rows are
+    streamed from the database in batches, by admission number.
+    """
+    logger.info(f"=== Student UDISE Report Export ({format}) ===")
+    logger.info(f"Filters: session_year={session_year_id}, class={class_id}, section={section}, "
+                f"gender={gender_id}, is_active={is_active}, search={search}")
+
+    batches = _stream_records(
+        report_crud.stream_udise_records,
+        session_year_id=session_year_id,
+        class_id=class_id,
+        section=section,
+        gender_id=gender_id,
+        is_active=is_active,
+        search=search
+    )
+    content = stream_export(format, UDISE_EXPORT_COLUMNS, batches, sheet_name="UDISE")
+
+    filename = f"student_udise_{session_year_id or 'all'}.{format}"
+    return StreamingResponse(
+        content,
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
 @router.get("/fee-tracking", response_model=FeeTrackingReportResponse)
 async def get_fee_tracking_report(
     session_year_id: int = Query(..., description="Session year ID (required)"),
@@ -119,7 +204,7 @@ async def get_fee_tracking_report(
     search: Optional[str] = Query(None, description="Search by name or admission number"),
     page: int = Query(1, ge=1, description="Page number"),
     per_page: int = Query(25, ge=1, le=100, description="Records per page"),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """
@@ -210,6 +295,73 @@ async def get_fee_tracking_report(
         )
 
 
+FEE_TRACKING_EXPORT_COLUMNS = [
+    ("admission_number", "Admission Number"),
+    ("full_name", "Student Name"),
+    ("class_name", "Class"),
+    ("section", "Section"),
+    ("session_year_name", "Session Year"),
+    ("total_fee_amount", "Total Fee"),
+    ("paid_fee_amount", "Fee Paid"),
+    ("pending_fee_amount", "Fee Pending"),
+    ("fee_payment_status", "Fee Status"),
+    ("transport_opted", "Transport Opted"),
+    ("transport_type", "Transport Type"),
+    ("monthly_transport_fee", "Monthly Transport Fee"),
+    ("total_transport_amount", "Total Transport"),
+    ("paid_transport_amount", "Transport Paid"),
+    ("pending_transport_amount", "Transport Pending"),
+    ("transport_payment_status", "Transport Status"),
+    ("total_amount", "Total Amount"),
+    ("total_paid", "Total Paid"),
+    ("total_pending", "Total Pending"),
+    ("overall_collection_rate", "Collection Rate (%)"),
+]
+
+
+@router.get("/fee-tracking/export")
+async def export_fee_tracking_report(
+    session_year_id: int = Query(..., description="Session year ID (required)"),
+    format: str = Query("csv", pattern="^(csv|xlsx|ndjson)$", description="Export format: csv, xlsx or ndjson"),
+    class_id: Optional[int] = Query(None, description="Filter by class ID"),
+    section: Optional[str] = Query(None, description="Filter by section"),
+    payment_status: Optional[str] = Query(None, description="Filter by payment status (paid/partial/pending)"),
+    transport_opted: Optional[bool] = Query(None, description="Filter by transport opted (true/false)"),
+    pending_only: bool = Query(False, description="Show only students with pending fees"),
+    search: Optional[str] = Query(None, description="Search by name or admission number"),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Export the full Fee Tracking Report as CSV, XLSX or NDJSON
+
+    Accepts the same filters as /fee-tracking without pagination or summary. Rows
+    are streamed from the database in batches, in the report's class/section order.
+    """
+    logger.info(f"=== Fee Tracking Report Export ({format}) ===")
+    logger.info(f"Session Year: {session_year_id}")
+    logger.info(f"Filters: class={class_id}, section={section}, payment_status={payment_status}, "
+                f"transport_opted={transport_opted}, pending_only={pending_only}, search={search}")
+
+    batches = _stream_records(
+        report_crud.stream_fee_tracking_records,
+        session_year_id=session_year_id,
+        class_id=class_id,
+        section=section,
+        payment_status=payment_status,
+        transport_opted=transport_opted,
+        pending_only=pending_only,
+        search=search
+    )
+    content = stream_export(format, FEE_TRACKING_EXPORT_COLUMNS, batches, sheet_name="Fee Tracking")
+
+    filename = f"fee_tracking_{session_year_id}.{format}"
+    return StreamingResponse(
+        content,
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
 @router.get("/daily-collection", response_model=DailyCollectionReportResponse)
 async def get_daily_collection_report(
     from_date: date = Query(..., description="Start date for collection report (YYYY-MM-DD)"),
@@ -220,7 +372,7 @@ async def get_daily_collection_report(
     search: Optional[str] = Query(None, description="Search by student name or admission number"),
     page: int = Query(1, ge=1, description="Page number"),
     per_page: int = Query(25, ge=1, le=100, description="Records per page"),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """
@@ -316,3 +468,67 @@ async def get_daily_collection_report(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to generate daily collection report: {str(e)}"
         )
+
+
+DAILY_COLLECTION_EXPORT_COLUMNS = [
+    ("payment_date", "Payment Date"),
+    ("receipt_number", "Receipt Number"),
+    ("payment_type", "Payment Type"),
+    ("admission_number", "Admission Number"),
+    ("student_name", "Student Name"),
+    ("class_name", "Class"),
+    ("section", "Section"),
+    ("session_year_name", "Session Year"),
+    ("amount", "Amount"),
+    ("payment_method", "Payment Method"),
+    ("transaction_id", "Transaction ID"),
+    ("remarks", "Remarks"),
+    ("created_by_name", "Collected By"),
+    ("created_at", "Created At"),
+]
+
+
+@router.get("/daily-collection/export")
+async def export_daily_collection_report(
+    from_date: date = Query(..., description="Start date for collection report (YYYY-MM-DD)"),
+    to_date: date = Query(..., description="End date for collection report (YYYY-MM-DD)"),
+    format: str = Query("csv", pattern="^(csv|xlsx|ndjson)$", description="Export format: csv, xlsx or ndjson"),
+    class_id: Optional[int] = Query(None, description="Filter by class ID"),
+    section: Optional[str] = Query(None, description="Filter by section"),
+    payment_method_id: Optional[int] = Query(None, description="Filter by payment method ID"),
+    search: Optional[str] = Query(None, description="Search by student name or admission number"),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Export the full Daily Collection Report as CSV, XLSX or NDJSON
+
+    Accepts the same filters as /daily-collection without pagination. Rows are
+    streamed from the database in batches and written to the response as they
+    arrive, oldest payment first.
+    """
+    logger.info(f"=== Daily Collection Report Export ({format}) ===")
+    logger.info(f"Date Range: {from_date} to {to_date}")
+
+    if from_date > to_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="from_date cannot be greater than to_date"
+        )
+
+    batches = _stream_records(
+        report_crud.stream_daily_collection_records,
+        from_date=from_date,
+        to_date=to_date,
+        class_id=class_id,
+        section=section,
+        payment_method_id=payment_method_id,
+        search=search
+    )
+    content = stream_export(format, DAILY_COLLECTION_EXPORT_COLUMNS, batches, sheet_name="Daily Collection")
+
+    filename = f"daily_collection_{from_date.isoformat()}_{to_date.isoformat()}.{format}"
+    return StreamingResponse(
+        content,
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
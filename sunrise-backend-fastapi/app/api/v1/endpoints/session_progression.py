@@ -16,17 +16,19 @@ from app.schemas.session_progression import (
     StudentProgressionPreviewRequest, StudentProgressionPreviewItem,
     StudentProgressionPreviewResponse, StudentProgressionItem,
     BulkProgressionRequest, BulkProgressionResultItem, BulkProgressionResponse,
+    ProgressionBatchStartResponse, ProgressionBatchStatusResponse,
     StudentProgressionHistoryItem, StudentProgressionHistoryResponse,
     RollbackRequest, RollbackResponse,
     ProgressionReportRequest, ProgressionReportResponse
 )
 from app.crud.crud_session_progression import (
     get_progression_actions, get_eligible_students_for_progression,
-    get_next_class_id, bulk_progress_students, get_student_progression_history,
+    get_class_transition_map, bulk_progress_students, get_student_progression_history,
     rollback_progression_batch, get_progression_statistics,
     ProgressionActionIds, HIGHEST_CLASS_ID
 )
-from app.crud.metadata import session_year_crud, class_crud
+from app.crud.metadata import session_year_crud
+from app.services.progression_engine import progression_engine
 
 router = APIRouter()
 
@@ -84,6 +86,9 @@ async def preview_eligible_students(
         db, request.from_session_year_id, request.class_ids
     )
     
+    # Next class of every class in one query instead of two per student
+    transitions = await get_class_transition_map(db)
+
     preview_items = []
     for student in students:
         # Default action is PROMOTED for all students
@@ -97,9 +102,8 @@ async def preview_eligible_students(
             target_class_name = student.class_ref.description if student.class_ref else None
         else:
             # Normal class - suggest next class
-            target_class_id = await get_next_class_id(db, student.class_id)
-            target_class = await class_crud.get_by_id_async(db, target_class_id) if target_class_id else None
-            target_class_name = target_class.description if target_class else None
+            target_class_id = transitions.get(student.class_id, {}).get("next")
+            target_class_name = transitions[target_class_id]["description"] if target_class_id else None
 
         preview_items.append(StudentProgressionPreviewItem(
             student_id=student.id,
@@ -189,11 +193,99 @@ async def bulk_progress_students_endpoint(
         total_processed=result["total_processed"],
         successful_count=result["successful_count"],
         failed_count=result["failed_count"],
+        status=result["status"],
         results=result_items,
         processed_at=datetime.now()
     )
 
 
+@router.post("/bulk-progress/start", response_model=ProgressionBatchStartResponse)
+async def start_bulk_progression(
+    request: BulkProgressionRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Stage a bulk progression and process it in the background.
+    Poll GET /batches/{batch_id} for progress; a FAILED batch can be resumed.
+    """
+    require_super_admin(current_user)
+
+    from_session = await session_year_crud.get_by_id_async(db, request.from_session_year_id)
+    to_session = await session_year_crud.get_by_id_async(db, request.to_session_year_id)
+
+    if not from_session:
+        raise HTTPException(status_code=404, detail="From session year not found")
+    if not to_session:
+        raise HTTPException(status_code=404, detail="To session year not found")
+
+    batch_id = await progression_engine.stage(
+        db,
+        from_session_year_id=request.from_session_year_id,
+        to_session_year_id=request.to_session_year_id,
+        students_data=[item.model_dump() for item in request.students],
+        progressed_by=current_user.id
+    )
+    progression_engine.start(batch_id)
+    batch = await progression_engine.get_status(db, batch_id)
+
+    return ProgressionBatchStartResponse(
+        batch_id=batch_id,
+        status=batch["status"],
+        total_students=batch["total_students"],
+        failed_count=batch["failed_count"],
+        message=f"Progression of {batch['total_students'] - batch['failed_count']} student(s) started"
+    )
+
+
+@router.get("/batches/{batch_id}", response_model=ProgressionBatchStatusResponse)
+async def get_progression_batch_status(
+    batch_id: str,
+    include_results: bool = Query(False, description="Include the per-student outcome"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Get the progress of a bulk progression batch.
+    """
+    require_super_admin(current_user)
+
+    batch = await progression_engine.get_status(db, batch_id)
+    if not batch:
+        raise HTTPException(status_code=404, detail="Progression batch not found")
+
+    if include_results:
+        batch["results"] = [
+            BulkProgressionResultItem(**r) for r in await progression_engine.get_results(db, batch_id)
+        ]
+    return ProgressionBatchStatusResponse(**batch)
+
+
+@router.post("/batches/{batch_id}/resume", response_model=ProgressionBatchStatusResponse)
+async def resume_progression_batch(
+    batch_id: str,
+    force: bool = Query(False, description="Resume a batch left RUNNING by a stopped worker"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Resume a FAILED or interrupted batch from its pending students.
+    """
+    require_super_admin(current_user)
+
+    batch = await progression_engine.get_status(db, batch_id)
+    if not batch:
+        raise HTTPException(status_code=404, detail="Progression batch not found")
+    if batch["status"] in ("COMPLETED", "ROLLED_BACK"):
+        raise HTTPException(status_code=400, detail=f"Batch is already {batch['status']}")
+    if batch["status"] == "RUNNING" and not force:
+        raise HTTPException(status_code=409, detail="Batch is already running")
+
+    if not progression_engine.start(batch_id, force=force):
+        raise HTTPException(status_code=409, detail="Batch is already running in this process")
+    return ProgressionBatchStatusResponse(**batch)
+
+
 @router.get("/history/{student_id}", response_model=StudentProgressionHistoryResponse)
 async def get_student_history(
     student_id: int,
@@ -1,10 +1,9 @@
 from typing import List, Dict, Any
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import text
 
 from app.core.database import get_db
-from app.api.deps import get_current_active_user
+from app.api.deps import get_current_active_user, get_current_admin_user
 from app.models.user import User
 from app.models.student import Student
 from app.models.metadata import Class
@@ -16,6 +15,7 @@ from app.schemas.student_sibling import (
     SiblingWaiverInfo,
     BulkSiblingLinkRequest,
     SiblingRecalculationResult,
+    SiblingClusteringReport,
     DetectedSibling,
     SiblingStudentInfo
 )
@@ -432,16 +432,7 @@ async def recalculate_sibling_waiver(
             # Get waiver reason
             waiver_reason = None
             if new_waiver > 0:
-                total_siblings = new_waiver_info["total_siblings_count"]
-                result = await db.execute(
-                    text("SELECT get_waiver_reason_text(:total, :order, :percentage)"),
-                    {
-                        "total": total_siblings,
-                        "order": new_birth_order,
-                        "percentage": float(new_waiver)
-                    }
-                )
-                waiver_reason = result.scalar()
+                waiver_reason = new_waiver_info["waiver_reason"]
 
             for monthly_record in monthly_records:
                 # Calculate original monthly amount if not set
@@ -477,3 +468,19 @@ async def recalculate_sibling_waiver(
         message=f"Waiver recalculated: {old_waiver}% -> {new_waiver}%. Fee records {'updated' if update_fee_records else 'not updated'}."
     )
 
+
+@router.post("/siblings/cluster", response_model=SiblingClusteringReport)
+async def cluster_sibling_families(
+    dry_run: bool = False,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """
+    Cluster the whole school into sibling families (same father name and phone,
+    plus existing links) and recompute birth orders and waivers in one pass.
+
+    Parameters:
+    - dry_run: If True, only report what would change
+    """
+    report = await student_sibling_crud.cluster_all_families(db, dry_run=dry_run)
+    return SiblingClusteringReport(**report)
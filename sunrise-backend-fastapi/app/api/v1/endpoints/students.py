@@ -54,10 +54,8 @@ async def get_students(
     Get all students with comprehensive filters and metadata
     Returns historical class/session data when querying past sessions
     """
-    from app.models.student_session_history import StudentSessionHistory
-    from app.models.metadata import SessionYear
-
     skip = (page - 1) * per_page
+    # Metadata and the past-session history overlay are loaded by the list query itself
     students, total = await student_crud.get_multi_with_filters(
         db,
         skip=skip,
@@ -70,49 +68,7 @@ async def get_students(
         session_year_id=session_year_id
     )
 
-    # Check if this is a past session query
-    is_past_session = False
-    if session_year_id:
-        current_session_query = select(SessionYear).where(
-            and_(
-                SessionYear.id == session_year_id,
-                SessionYear.is_current == True
-            )
-        )
-        current_session_result = await db.execute(current_session_query)
-        current_session = current_session_result.scalar_one_or_none()
-        is_past_session = current_session is None
-
-    # Convert to response schema with metadata
-    result_students = []
-    for student in students:
-        student_with_metadata = await student_crud.get_with_metadata(db, id=student.id)
-
-        # If querying past session, override with historical data from student_session_history
-        if is_past_session and session_year_id:
-            history_query = select(StudentSessionHistory).where(
-                and_(
-                    StudentSessionHistory.student_id == student.id,
-                    StudentSessionHistory.session_year_id == session_year_id
-                )
-            ).options(
-                selectinload(StudentSessionHistory.session_year),
-                selectinload(StudentSessionHistory.class_ref)
-            )
-
-            history_result = await db.execute(history_query)
-            history_record = history_result.scalar_one_or_none()
-
-            if history_record:
-                # Override with historical data
-                student_with_metadata.class_id = history_record.class_id
-                student_with_metadata.class_ref = history_record.class_ref
-                student_with_metadata.session_year_id = history_record.session_year_id
-                student_with_metadata.session_year = history_record.session_year
-                student_with_metadata.section = history_record.section
-                student_with_metadata.roll_number = history_record.roll_number
-
-        result_students.append(Student.from_orm_with_metadata(student_with_metadata))
+    result_students = [Student.from_orm_with_metadata(student) for student in students]
 
     total_pages = math.ceil(total / per_page)
 
@@ -562,11 +518,8 @@ async def get_my_class_students(
         is_active=is_active
     )
 
-    # Convert to response schema with metadata
-    result_students = []
-    for student in students:
-        student_with_metadata = await student_crud.get_with_metadata(db, id=student.id)
-        result_students.append(Student.from_orm_with_metadata(student_with_metadata))
+    # Convert to response schema with metadata (loaded by the list query)
+    result_students = [Student.from_orm_with_metadata(student) for student in students]
 
     total_pages = math.ceil(total / per_page)
 
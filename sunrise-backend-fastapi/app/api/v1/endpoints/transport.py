@@ -10,7 +10,7 @@ from decimal import Decimal
 import calendar
 import logging
 
-from app.core.database import get_db
+from app.core.database import get_db, get_read_db
 from app.api.deps import get_current_active_user
 from app.models.user import User
 from app.models.transport import TransportType, TransportDistanceSlab, TransportTypePricing
@@ -29,12 +29,10 @@ from app.schemas.transport import (
     TransportPaymentResponse, TransportPaymentAllocationResponse
 )
 from sqlalchemy import select, func
-from app.services.transport_receipt_generator import TransportReceiptGenerator
-from app.services.cloudinary_transport_receipt_service import CloudinaryTransportReceiptService
+from app.services.receipt_pipeline import receipt_pipeline, resolve_whatsapp_phone
 
 logger = logging.getLogger(__name__)
 from app.services.alert_service import alert_service
-from app.services.whatsapp_service import whatsapp_service
 
 router = APIRouter()
 
@@ -190,7 +188,7 @@ async def get_transport_students(
     session_year: str = Query(..., description="Session year (e.g., 2025-26)"),
     class_id: Optional[int] = Query(None, description="Filter by class ID"),
     is_enrolled: Optional[bool] = Query(None, description="Filter by enrollment status"),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """
@@ -434,10 +432,7 @@ async def pay_monthly_transport(
         distance_km = enrollment.distance_km or 0
         monthly_fee = enrollment.monthly_fee or 0
 
-        # Now commit the payment transaction (this persists the updated paid_amount values)
-        await db.commit()
-
-        # Calculate total paid and balance AFTER commit so we get the updated values
+        # Calculate total paid and balance (autoflush includes this payment's updates)
         from app.models.transport import TransportMonthlyTracking
 
         tracking_result = await db.execute(
@@ -450,87 +445,75 @@ async def pay_monthly_transport(
         total_paid = float(tracking_summary.total_paid or 0) if tracking_summary else 0
         total_balance = float(tracking_summary.total_balance or 0) if tracking_summary else 0
 
-        # Generate receipt PDF and upload to Cloudinary
-        receipt_url = None
-        receipt_number = None
-        try:
-            if student:
-                logger.info(f"Generating transport receipt for payment {payment.id}")
-
-                # Generate receipt number
-                receipt_number = f"TRANSPORT-{payment.id:06d}"
-
-                # Prepare payment data for receipt
-                payment_receipt_data = {
-                    'id': payment.id,
-                    'amount': float(payment.amount),
-                    'payment_method': payment_method_desc,
-                    'payment_date': payment.payment_date,
-                    'transaction_id': payment.transaction_id or 'N/A',
-                    'receipt_number': receipt_number
-                }
-
-                # Prepare student data for receipt
-                student_receipt_data = {
-                    'name': f"{student.first_name} {student.last_name}",
-                    'admission_number': student.admission_number,
-                    'class_name': student.class_ref.description if student.class_ref else 'N/A',
-                    'roll_number': student.roll_number or 'N/A',
-                    'father_name': student.father_name
-                }
-
-                # Prepare transport data for receipt (using pre-loaded data)
-                transport_receipt_data = {
-                    'transport_type': transport_type_name,
-                    'distance': float(distance_km),
-                    'monthly_fee': float(monthly_fee),
-                    'total_paid': total_paid,
-                    'balance': total_balance
-                }
-
-                # Prepare month breakdown for receipt
-                month_breakdown_receipt = []
-                for month_data in months_paid:
-                    month_breakdown_receipt.append({
-                        'month_name': month_data['month'],
-                        'academic_year': month_data['year'],
-                        'allocated_amount': month_data['amount_paid']
-                    })
-
-                # Generate receipt PDF
-                receipt_generator = TransportReceiptGenerator()
-                pdf_buffer = receipt_generator.generate_receipt(
-                    payment_data=payment_receipt_data,
-                    student_data=student_receipt_data,
-                    transport_data=transport_receipt_data,
-                    month_breakdown=month_breakdown_receipt
-                )
-
-                # Upload to Cloudinary
-                cloudinary_service = CloudinaryTransportReceiptService()
-                receipt_url, cloudinary_public_id = cloudinary_service.upload_receipt(
-                    pdf_buffer=pdf_buffer,
-                    payment_id=payment.id,
-                    receipt_number=receipt_number
-                )
-
-                # Update payment record with receipt information
-                payment.receipt_number = receipt_number
-                payment.receipt_url = receipt_url
-                payment.receipt_cloudinary_public_id = cloudinary_public_id
-                payment.receipt_generated_at = datetime.now()
+        # Queue receipt PDF generation, Cloudinary upload and WhatsApp delivery in the
+        # payment's transaction (handled by the receipt worker after this response is sent)
+        receipt_job = None
+        if student:
+            receipt_number = f"TRANSPORT-{payment.id:06d}"
+
+            # Prepare payment data for receipt
+            payment_receipt_data = {
+                'id': payment.id,
+                'amount': float(payment.amount),
+                'payment_method': payment_method_desc,
+                'payment_date': payment.payment_date.strftime('%d-%b-%Y') if payment.payment_date else 'N/A',
+                'transaction_id': payment.transaction_id or 'N/A',
+                'receipt_number': receipt_number
+            }
+
+            # Prepare student data for receipt
+            student_receipt_data = {
+                'name': f"{student.first_name} {student.last_name}",
+                'admission_number': student.admission_number,
+                'class_name': student.class_ref.description if student.class_ref else 'N/A',
+                'roll_number': student.roll_number or 'N/A',
+                'father_name': student.father_name
+            }
+
+            # Prepare transport data for receipt (using pre-loaded data)
+            transport_receipt_data = {
+                'transport_type': transport_type_name,
+                'distance': float(distance_km),
+                'monthly_fee': float(monthly_fee),
+                'total_paid': total_paid,
+                'balance': total_balance
+            }
+
+            # Prepare month breakdown for receipt
+            month_breakdown_receipt = []
+            for month_data in months_paid:
+                month_breakdown_receipt.append({
+                    'month_name': month_data['month'],
+                    'academic_year': month_data['year'],
+                    'allocated_amount': month_data['amount_paid']
+                })
 
-                await db.commit()
-                await db.refresh(payment)
+            receipt_job = receipt_pipeline.enqueue(
+                db,
+                job_type="TRANSPORT",
+                receipt_number=receipt_number,
+                payload={
+                    "payment_data": payment_receipt_data,
+                    "student_data": student_receipt_data,
+                    "transport_data": transport_receipt_data,
+                    "month_breakdown": month_breakdown_receipt
+                },
+                whatsapp={
+                    "phone": resolve_whatsapp_phone(student),
+                    "student_name": f"{student.first_name} {student.last_name}",
+                    "amount": float(payment_data.amount)
+                },
+                transport_payment_id=payment.id,
+                created_by=current_user.id
+            )
+            payment.receipt_number = receipt_number
 
-                logger.info(f"Transport receipt generated and uploaded successfully: {receipt_url}")
+        # Commit the payment together with its receipt job
+        await db.commit()
 
-        except Exception as e:
-            # Log error but don't fail the payment
-            logger.error(f"Failed to generate/upload transport receipt: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            # Continue with payment response even if receipt generation fails
+        if receipt_job is not None:
+            receipt_pipeline.notify()
+            logger.info(f"Transport receipt job {receipt_job.id} queued for payment {payment.id}")
 
         # Generate alert for transport fee payment
         try:
@@ -564,54 +547,17 @@ async def pay_monthly_transport(
             # Log error but don't fail the payment
             logger.error(f"Failed to create transport fee payment alert: {e}")
 
-        # =====================================================
-        # WhatsApp Notification - Using approved media template
-        # Template: school_fee_media_template_v2 (3 variables)
-        # =====================================================
-        whatsapp_result = None
-        whatsapp_status = None
-        whatsapp_error = None
-        try:
-            if student:
-                # Check available phone numbers in priority order: father > mother > guardian > student
-                contact_phone = None
-                for phone_field in [student.father_phone, student.mother_phone, student.guardian_phone, student.phone]:
-                    is_valid, validated_phone = whatsapp_service.validate_phone_number(phone_field)
-                    if is_valid and validated_phone:
-                        contact_phone = validated_phone
-                        break
-
-                if contact_phone:
-                    # Send WhatsApp notification using media receipt template (with PDF attachment)
-                    whatsapp_result = await whatsapp_service.send_fee_media_receipt(
-                        phone_number=contact_phone,
-                        student_name=f"{student.first_name} {student.last_name}",
-                        amount=float(payment_data.amount),
-                        receipt_url=receipt_url,
-                        payment_id=payment.id
-                    )
-
-                    logger.info(f"WhatsApp notification sent for transport payment {payment.id}: {whatsapp_result}")
-                    whatsapp_status = whatsapp_result.get("status", "UNKNOWN")
-                    whatsapp_error = whatsapp_result.get("error")
-                else:
-                    whatsapp_status = "NO_PHONE"
-                    whatsapp_error = "No valid phone number available (checked father, mother, guardian, student)"
-                    logger.info(f"WhatsApp not sent for transport payment {payment.id}: No valid phone number")
-
-        except Exception as e:
-            import traceback
-            logger.error(f"Failed to send WhatsApp notification for transport payment {payment.id}: {e}")
-            traceback.print_exc()
-            whatsapp_status = "ERROR"
-            whatsapp_error = str(e)[:500]
-
         return {
             "success": True,
             "message": "Payment processed successfully",
             "amount_paid": float(payment_data.amount),
             "months_paid": months_paid,
-            "remaining_amount": float(remaining_amount)
+            "remaining_amount": float(remaining_amount),
+            "receipt": {
+                "status": receipt_job.receipt_status if receipt_job else "NOT_GENERATED",
+                "job_id": receipt_job.id if receipt_job else None,
+                "receipt_number": receipt_job.receipt_number if receipt_job else None
+            }
         }
 
     except HTTPException:
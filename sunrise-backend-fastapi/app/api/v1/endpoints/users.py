@@ -15,7 +15,7 @@ from app.schemas.auth import (
     ChangePasswordResponse
 )
 from app.models.user import User
-from app.core.security import get_password_hash, verify_password
+from app.core.security import get_password_hash_async, verify_password_async
 from app.core.password_config import DEFAULT_PASSWORD
 from app.core.logging import log_crud_operation
 
@@ -216,7 +216,7 @@ async def reset_user_password(
 
     try:
         # Hash the default password
-        new_password_hash = get_password_hash(DEFAULT_PASSWORD)
+        new_password_hash = await get_password_hash_async(DEFAULT_PASSWORD)
 
         # Update password
         await user_crud.update(
@@ -282,8 +282,11 @@ async def change_own_password(
     user_crud = CRUDUser()
 
     try:
+        # current_user comes from the principal cache without the password hash
+        db_user = await user_crud.get(db, id=current_user.id)
+
         # Verify current password
-        if not verify_password(password_request.current_password, current_user.password):
+        if not await verify_password_async(password_request.current_password, db_user.password):
             log_crud_operation(
                 "PASSWORD_CHANGE_FAILED",
                 "Incorrect current password provided",
@@ -297,19 +300,19 @@ async def change_own_password(
             )
 
         # Check if new password is same as current
-        if verify_password(password_request.new_password, current_user.password):
+        if await verify_password_async(password_request.new_password, db_user.password):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="New password must be different from current password"
             )
 
         # Hash new password
-        new_password_hash = get_password_hash(password_request.new_password)
+        new_password_hash = await get_password_hash_async(password_request.new_password)
 
         # Update password and track change time
         await user_crud.update(
             db,
-            db_obj=current_user,
+            db_obj=db_user,
             obj_in={
                 "password": new_password_hash,
                 "password_last_changed": datetime.now(timezone.utc)
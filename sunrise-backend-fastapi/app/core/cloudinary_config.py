@@ -19,6 +19,8 @@ def configure_cloudinary():
         api_secret=settings.CLOUDINARY_API_SECRET,
         secure=True
     )
+    if settings.CLOUDINARY_UPLOAD_PREFIX:
+        cloudinary.config(upload_prefix=settings.CLOUDINARY_UPLOAD_PREFIX)
 
 
 # Initialize Cloudinary on module import
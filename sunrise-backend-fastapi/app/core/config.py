@@ -1,4 +1,5 @@
 import os
+import tempfile
 from typing import List
 from dotenv import load_dotenv
 
@@ -12,15 +13,87 @@ class Settings:
     API_V1_STR: str = "/api/v1"
 
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./sunrise_school.db")
+    # Connection pool per API process (size + overflow per worker must fit the database connection limit)
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT_SECONDS: float = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "30"))
+    # Replace connections older than this (the platform drops idle connections); -1 disables
+    DB_POOL_RECYCLE_SECONDS: int = int(os.getenv("DB_POOL_RECYCLE_SECONDS", "1800"))
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+    # Checkouts waiting this long are logged and counted as slow
+    DB_POOL_SLOW_CHECKOUT_MS: float = float(os.getenv("DB_POOL_SLOW_CHECKOUT_MS", "250"))
+    DB_HEALTH_TIMEOUT_SECONDS: float = float(os.getenv("DB_HEALTH_TIMEOUT_SECONDS", "3"))
+    # Optional read replica for reports and dashboards (empty: everything reads from DATABASE_URL)
+    DATABASE_READ_URL: str = os.getenv("DATABASE_READ_URL", "")
+    DB_READ_MAX_LAG_SECONDS: float = float(os.getenv("DB_READ_MAX_LAG_SECONDS", "30"))
+    DB_READ_LAG_CHECK_SECONDS: float = float(os.getenv("DB_READ_LAG_CHECK_SECONDS", "5"))
     SECRET_KEY: str = os.getenv("SECRET_KEY", "e4e9c822b488b0c741e8616712b415c1")
     JWT_SECRET_KEY: str = os.getenv("JWT_SECRET_KEY", "a436afdbaade6c5ae255289d8aa80103adbd4f622b4a99077bb40ac9140b8368a")
     JWT_ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 8  # 8 days
 
+    # Principal cache for get_current_user (0 entries or 0 seconds disables it)
+    PRINCIPAL_CACHE_TTL_SECONDS: float = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+    PRINCIPAL_CACHE_MAX_ENTRIES: int = int(os.getenv("PRINCIPAL_CACHE_MAX_ENTRIES", "2048"))
+
+    # Maximum concurrent bcrypt hash/verify operations (thread pool size)
+    PASSWORD_HASH_MAX_CONCURRENCY: int = int(os.getenv("PASSWORD_HASH_MAX_CONCURRENCY", "4"))
+
+    # Configuration endpoint metadata cache ("memory" per process, or "file" shared by workers on a host)
+    METADATA_CACHE_BACKEND: str = os.getenv("METADATA_CACHE_BACKEND", "memory").lower()
+    METADATA_CACHE_DIR: str = os.getenv(
+        "METADATA_CACHE_DIR", os.path.join(tempfile.gettempdir(), "sunrise-metadata-cache")
+    )
+    # Backstop for changes made outside the app; app writes invalidate immediately
+    METADATA_CACHE_TTL_SECONDS: float = float(os.getenv("METADATA_CACHE_TTL_SECONDS", "900"))
+
+    # Public site content (/public faculty, gallery, home page): server cache backstop TTL,
+    # browser/CDN max-age, and how long stale content may be served while it is rebuilt
+    PUBLIC_CACHE_TTL_SECONDS: float = float(os.getenv("PUBLIC_CACHE_TTL_SECONDS", "900"))
+    # "file" (under METADATA_CACHE_DIR) lets every worker of a host see a write at once; with "memory"
+    # other workers only notice it when their entry expires, so the TTL is capped to the memory TTL
+    PUBLIC_CACHE_BACKEND: str = os.getenv("PUBLIC_CACHE_BACKEND", "file").lower()
+    PUBLIC_CACHE_MEMORY_TTL_SECONDS: float = float(os.getenv("PUBLIC_CACHE_MEMORY_TTL_SECONDS", "60"))
+    PUBLIC_CACHE_MAX_AGE_SECONDS: int = int(os.getenv("PUBLIC_CACHE_MAX_AGE_SECONDS", "60"))
+    PUBLIC_CACHE_STALE_SECONDS: int = int(os.getenv("PUBLIC_CACHE_STALE_SECONDS", "600"))
+
+    # Per-request query instrumentation (Server-Timing / X-DB-Queries headers, /monitoring/routes)
+    QUERY_INSTRUMENTATION_ENABLED: bool = os.getenv("QUERY_INSTRUMENTATION_ENABLED", "true").lower() == "true"
+    QUERY_TIMING_HEADERS: bool = os.getenv("QUERY_TIMING_HEADERS", "true").lower() == "true"
+    # Same statement shape executed this many times in one request is reported as N+1
+    QUERY_N_PLUS_ONE_THRESHOLD: int = int(os.getenv("QUERY_N_PLUS_ONE_THRESHOLD", "10"))
+    # Requests kept per route for percentiles
+    QUERY_METRICS_WINDOW: int = int(os.getenv("QUERY_METRICS_WINDOW", "500"))
+
+    # Fee balance rollup verification (student_fee_balances); 0 disables the background job
+    FEE_BALANCE_RECONCILE_INTERVAL_SECONDS: float = float(os.getenv("FEE_BALANCE_RECONCILE_INTERVAL_SECONDS", "3600"))
+
+    # Admin dashboard sections: per-section result cache (0 disables) and concurrent section queries
+    DASHBOARD_CACHE_TTL_SECONDS: float = float(os.getenv("DASHBOARD_CACHE_TTL_SECONDS", "60"))
+    DASHBOARD_MAX_CONCURRENCY: int = int(os.getenv("DASHBOARD_MAX_CONCURRENCY", "4"))
+
+    # Bulk session progression: students committed per chunk
+    SESSION_PROGRESSION_CHUNK_SIZE: int = int(os.getenv("SESSION_PROGRESSION_CHUNK_SIZE", "500"))
+
+    # Alert push stream: "memory" fans out within one worker, "postgres" (LISTEN/NOTIFY) across workers;
+    # defaults to "postgres" on a PostgreSQL database since production runs several workers
+    ALERT_PUBSUB_BACKEND: str = os.getenv(
+        "ALERT_PUBSUB_BACKEND", "postgres" if DATABASE_URL.startswith("postgres") else "memory"
+    ).lower()
+    ALERT_PUBSUB_CHANNEL: str = os.getenv("ALERT_PUBSUB_CHANNEL", "sunrise_alerts")
+    ALERT_STREAM_HEARTBEAT_SECONDS: float = float(os.getenv("ALERT_STREAM_HEARTBEAT_SECONDS", "20"))
+    # Streams are closed after this long; the browser reconnects (and re-authenticates)
+    ALERT_STREAM_MAX_SECONDS: float = float(os.getenv("ALERT_STREAM_MAX_SECONDS", "1800"))
+    ALERT_STREAM_QUEUE_SIZE: int = int(os.getenv("ALERT_STREAM_QUEUE_SIZE", "100"))
+
     # Cloudinary Configuration
     CLOUDINARY_CLOUD_NAME: str = os.getenv("CLOUDINARY_CLOUD_NAME", "")
     CLOUDINARY_API_KEY: str = os.getenv("CLOUDINARY_API_KEY", "")
     CLOUDINARY_API_SECRET: str = os.getenv("CLOUDINARY_API_SECRET", "")
+    # API host override (e.g. a local fake server in tests); empty uses Cloudinary's
+    CLOUDINARY_UPLOAD_PREFIX: str = os.getenv("CLOUDINARY_UPLOAD_PREFIX", "")
+    CLOUDINARY_TIMEOUT_SECONDS: float = float(os.getenv("CLOUDINARY_TIMEOUT_SECONDS", "60"))
+    CLOUDINARY_MAX_CONCURRENCY: int = int(os.getenv("CLOUDINARY_MAX_CONCURRENCY", "4"))
 
     # Twilio WhatsApp Configuration
     TWILIO_ACCOUNT_SID: str = os.getenv("TWILIO_ACCOUNT_SID", "")
@@ -30,6 +103,32 @@ class Settings:
     TWILIO_WHATSAPP_TEMPLATE_SID: str = os.getenv("TWILIO_WHATSAPP_TEMPLATE_SID", "")
     # Approved WhatsApp template SID for media receipt (school_fee_media_template_v4 - 3 variables)
     TWILIO_WHATSAPP_MEDIA_RECEIPT_SID: str = os.getenv("TWILIO_WHATSAPP_MEDIA_RECEIPT_SID", "")
+    # API host override (e.g. a local fake server in tests); empty uses api.twilio.com
+    TWILIO_API_BASE_URL: str = os.getenv("TWILIO_API_BASE_URL", "")
+    TWILIO_TIMEOUT_SECONDS: float = float(os.getenv("TWILIO_TIMEOUT_SECONDS", "15"))
+    TWILIO_MAX_CONCURRENCY: int = int(os.getenv("TWILIO_MAX_CONCURRENCY", "4"))
+
+    # Outbound integrations: consecutive failures that open the circuit, and how long it stays open
+    INTEGRATION_BREAKER_FAILURES: int = int(os.getenv("INTEGRATION_BREAKER_FAILURES", "5"))
+    INTEGRATION_BREAKER_RESET_SECONDS: float = float(os.getenv("INTEGRATION_BREAKER_RESET_SECONDS", "30"))
+
+    # Receipt worker (PDF generation, Cloudinary upload and WhatsApp delivery after payment)
+    RECEIPT_WORKER_ENABLED: bool = os.getenv("RECEIPT_WORKER_ENABLED", "true").lower() == "true"
+    # Processes used to render PDFs; 0 renders in a thread instead
+    RECEIPT_WORKER_PROCESSES: int = int(os.getenv("RECEIPT_WORKER_PROCESSES", "2"))
+    RECEIPT_WORKER_POLL_SECONDS: float = float(os.getenv("RECEIPT_WORKER_POLL_SECONDS", "5"))
+    RECEIPT_WORKER_BATCH_SIZE: int = int(os.getenv("RECEIPT_WORKER_BATCH_SIZE", "4"))
+    RECEIPT_JOB_MAX_ATTEMPTS: int = int(os.getenv("RECEIPT_JOB_MAX_ATTEMPTS", "5"))
+    RECEIPT_JOB_RETRY_BASE_SECONDS: int = int(os.getenv("RECEIPT_JOB_RETRY_BASE_SECONDS", "30"))
+    # Rendered receipt PDFs kept in memory; a directory shares them between workers (empty: memory only)
+    RECEIPT_PDF_CACHE_MAX_MB: int = int(os.getenv("RECEIPT_PDF_CACHE_MAX_MB", "64"))
+    RECEIPT_PDF_CACHE_DIR: str = os.getenv("RECEIPT_PDF_CACHE_DIR", "")
+    # Batch reprints: render processes (0: threads), receipts per worker task, receipts per request
+    RECEIPT_BATCH_PROCESSES: int = int(os.getenv("RECEIPT_BATCH_PROCESSES", "2"))
+    RECEIPT_BATCH_CHUNK_SIZE: int = int(os.getenv("RECEIPT_BATCH_CHUNK_SIZE", "10"))
+    RECEIPT_BATCH_MAX_RECEIPTS: int = int(os.getenv("RECEIPT_BATCH_MAX_RECEIPTS", "1000"))
+    # Merged batch PDFs larger than this are spooled to a temporary file instead of memory
+    RECEIPT_BATCH_SPOOL_MB: int = int(os.getenv("RECEIPT_BATCH_SPOOL_MB", "8"))
 
     # CORS Origins - Support both environment variable and defaults
     @property
@@ -2,33 +2,51 @@ from sqlalchemy import create_engine, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import NullPool
 from typing import AsyncGenerator
 
 from app.core.config import settings
+from app.core.db_pool import PoolMetrics, install_pool_metrics, pool_options
+from app.core.query_instrumentation import install_query_instrumentation
+from app.core.read_replica import ReadReplicaRouter
 
-# Convert sync DATABASE_URL to async
-if settings.DATABASE_URL.startswith("sqlite"):
-    ASYNC_DATABASE_URL = settings.DATABASE_URL.replace("sqlite:///", "sqlite+aiosqlite:///")
-else:
-    ASYNC_DATABASE_URL = settings.DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://")
 
-# Create async engine with connection options for schema
-connect_args = {}
-if not settings.DATABASE_URL.startswith("sqlite"):
-    # Set search_path to sunrise schema for PostgreSQL
-    connect_args = {
+def to_async_url(database_url: str) -> str:
+    """Convert a sync database URL to its async driver"""
+    if database_url.startswith("sqlite"):
+        return database_url.replace("sqlite:///", "sqlite+aiosqlite:///")
+    return database_url.replace("postgresql://", "postgresql+asyncpg://")
+
+
+def engine_connect_args(database_url: str) -> dict:
+    """Connection options; PostgreSQL connections use the sunrise schema"""
+    if database_url.startswith("sqlite"):
+        return {}
+    return {
         "server_settings": {
             "search_path": "sunrise"
         }
     }
 
+
+# Convert sync DATABASE_URL to async
+ASYNC_DATABASE_URL = to_async_url(settings.DATABASE_URL)
+
 async_engine = create_async_engine(
     ASYNC_DATABASE_URL,
     echo=False,  # Disable SQL query logging
     future=True,
-    connect_args=connect_args
+    connect_args=engine_connect_args(settings.DATABASE_URL),
+    **pool_options(settings.DATABASE_URL)
 )
 
+# Checkout wait times and pool saturation (/monitoring/db-pool)
+pool_metrics = install_pool_metrics(async_engine.sync_engine, PoolMetrics("primary"))
+
+# Per-request query counts, DB time and N+1 detection
+if settings.QUERY_INSTRUMENTATION_ENABLED:
+    install_query_instrumentation(async_engine.sync_engine)
+
 # Create async session factory
 AsyncSessionLocal = sessionmaker(
     bind=async_engine,
@@ -36,8 +54,34 @@ AsyncSessionLocal = sessionmaker(
     expire_on_commit=False
 )
 
-# Create sync engine for migrations and initial setup
-sync_engine = create_engine(settings.DATABASE_URL)
+# Optional read replica for read-only endpoints (get_read_db)
+read_engine = None
+ReadSessionLocal = None
+replica_pool_metrics = None
+if settings.DATABASE_READ_URL:
+    read_engine = create_async_engine(
+        to_async_url(settings.DATABASE_READ_URL),
+        echo=False,
+        future=True,
+        connect_args=engine_connect_args(settings.DATABASE_READ_URL),
+        **pool_options(settings.DATABASE_READ_URL)
+    )
+    replica_pool_metrics = install_pool_metrics(read_engine.sync_engine, PoolMetrics("replica"))
+    if settings.QUERY_INSTRUMENTATION_ENABLED:
+        install_query_instrumentation(read_engine.sync_engine)
+    ReadSessionLocal = sessionmaker(
+        bind=read_engine,
+        class_=AsyncSession,
+        expire_on_commit=False
+    )
+
+# Replica when it is fresh enough, primary otherwise (see app/core/read_replica.py)
+read_router = ReadReplicaRouter(AsyncSessionLocal, ReadSessionLocal, read_engine)
+if read_router.enabled:
+    read_router.track_primary_writes(async_engine.sync_engine)
+
+# Create sync engine for migrations and initial setup (no idle connections held)
+sync_engine = create_engine(settings.DATABASE_URL, poolclass=NullPool)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=sync_engine)
 
 Base = declarative_base()
@@ -55,6 +99,15 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
             await session.close()
 
 
+async def get_read_db() -> AsyncGenerator[AsyncSession, None]:
+    """Session for read-only endpoints: the read replica when configured and fresh, else the primary"""
+    async with read_router() as session:
+        try:
+            yield session
+        finally:
+            await session.close()
+
+
 async def init_db():
     """Initialize database tables"""
     # Import all models here to ensure they are registered with SQLAlchemy
@@ -0,0 +1,204 @@
+"""
+Database connection pool configuration and metrics
+
+Pool sizing, pre-ping and recycle come from the environment (DB_POOL_* settings)
+so each deployment can fit its workers into the database's connection limit.
+
+``InstrumentedAsyncQueuePool`` times every checkout (queue wait, plus opening a
+connection when the pool grows and the pre-ping round trip) and ``PoolMetrics``
+keeps checkout wait percentiles, timeouts, invalidations and saturation for the
+/monitoring/db-pool endpoint. ``check_database`` is the cheap probe used by the
+health check: one pooled connection, ``SELECT 1``, bounded by a timeout.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+from sqlalchemy import event, exc, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Checkout waits kept for percentiles
+WAIT_SAMPLES = 1000
+
+
+def pool_options(database_url: str) -> Dict[str, Any]:
+    """Engine keyword arguments for the connection pool (SQLite keeps the driver default)"""
+    if database_url.startswith("sqlite"):
+        return {}
+    return {
+        "poolclass": InstrumentedAsyncQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+        "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING
+    }
+
+
+def _percentile(values, fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+class PoolMetrics:
+    """Checkout wait times and pool saturation for one engine"""
+
+    def __init__(self, name: str, slow_checkout_ms: Optional[float] = None):
+        self.name = name
+        self.slow_checkout_ms = settings.DB_POOL_SLOW_CHECKOUT_MS if slow_checkout_ms is None else slow_checkout_ms
+        self.pool: Optional[Pool] = None
+        self._lock = threading.Lock()
+        self._waits: Deque[float] = deque(maxlen=WAIT_SAMPLES)
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._waits.clear()
+            self.checkouts = 0
+            self.saturated_checkouts = 0
+            self.slow_checkouts = 0
+            self.timeouts = 0
+            self.connects = 0
+            self.invalidations = 0
+            self.total_wait_ms = 0.0
+            self.max_wait_ms = 0.0
+            self.peak_checked_out = 0
+
+    def record_checkout(self, wait_ms: float, saturated: bool) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait_ms += wait_ms
+            self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+            self._waits.append(wait_ms)
+            if saturated:
+                self.saturated_checkouts += 1
+            if wait_ms >= self.slow_checkout_ms:
+                self.slow_checkouts += 1
+            if self.pool is not None:
+                self.peak_checked_out = max(self.peak_checked_out, self.pool.checkedout())
+        if wait_ms >= self.slow_checkout_ms:
+            logger.warning(f"Slow {self.name} pool checkout: {wait_ms:.0f} ms ({self.pool_status()})")
+
+    def record_timeout(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+        logger.error(f"{self.name} pool checkout timed out ({self.pool_status()})")
+
+    def record_connect(self) -> None:
+        with self._lock:
+            self.connects += 1
+
+    def record_invalidation(self) -> None:
+        with self._lock:
+            self.invalidations += 1
+
+    def pool_status(self) -> str:
+        return self.pool.status() if self.pool is not None else "no pool"
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            waits = list(self._waits)
+            stats: Dict[str, Any] = {
+                "name": self.name,
+                "checkouts": self.checkouts,
+                "saturated_checkouts": self.saturated_checkouts,
+                "slow_checkouts": self.slow_checkouts,
+                "timeouts": self.timeouts,
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+                "avg_wait_ms": round(self.total_wait_ms / self.checkouts, 2) if self.checkouts else 0.0,
+                "p50_wait_ms": round(_percentile(waits, 0.50), 2),
+                "p95_wait_ms": round(_percentile(waits, 0.95), 2),
+                "p99_wait_ms": round(_percentile(waits, 0.99), 2),
+                "max_wait_ms": round(self.max_wait_ms, 2),
+                "peak_checked_out": self.peak_checked_out
+            }
+
+        pool = self.pool
+        if isinstance(pool, AsyncAdaptedQueuePool):
+            capacity = pool.size() + max(pool._max_overflow, 0)
+            checked_out = pool.checkedout()
+            stats.update({
+                "pool_size": pool.size(),
+                "max_overflow": pool._max_overflow,
+                "checked_out": checked_out,
+                "idle": pool.checkedin(),
+                "overflow": pool.overflow(),
+                "capacity": capacity,
+                "saturation": round(checked_out / capacity, 3) if capacity else 0.0,
+                "peak_saturation": round(self.peak_checked_out / capacity, 3) if capacity else 0.0
+            })
+        elif pool is not None:
+            stats["pool"] = pool.status()
+        return stats
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool that reports checkout wait times to its PoolMetrics"""
+
+    metrics: Optional[PoolMetrics] = None
+
+    def connect(self):
+        metrics = self.metrics
+        if metrics is None:
+            return super().connect()
+
+        # No idle connection and no overflow left: this checkout queues for a connection
+        saturated = self.checkedin() == 0 and 0 <= self._max_overflow <= self.overflow()
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            metrics.record_timeout()
+            raise
+        metrics.record_checkout((time.perf_counter() - started) * 1000, saturated)
+        return connection
+
+    def recreate(self):
+        # engine.dispose() swaps in a new pool; keep reporting to the same metrics
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        if self.metrics is not None:
+            self.metrics.pool = pool
+        return pool
+
+
+def install_pool_metrics(engine: Engine, metrics: PoolMetrics) -> PoolMetrics:
+    """Attach metrics to a (sync) engine's pool; async engines pass ``.sync_engine``"""
+    if isinstance(engine.pool, InstrumentedAsyncQueuePool):
+        engine.pool.metrics = metrics
+    metrics.pool = engine.pool
+
+    event.listen(engine, "connect", lambda dbapi_connection, record: metrics.record_connect())
+    event.listen(engine, "invalidate", lambda dbapi_connection, record, exception: metrics.record_invalidation())
+    return metrics
+
+
+async def check_database(engine: AsyncEngine, timeout: Optional[float] = None) -> Dict[str, Any]:
+    """Cheap connectivity probe over a pooled connection"""
+    timeout = settings.DB_HEALTH_TIMEOUT_SECONDS if timeout is None else timeout
+    started = time.perf_counter()
+
+    async def probe():
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    try:
+        await asyncio.wait_for(probe(), timeout=timeout)
+        return {"status": "connected", "latency_ms": round((time.perf_counter() - started) * 1000, 1)}
+    except asyncio.TimeoutError:
+        return {"status": f"error: no response within {timeout:g}s"}
+    except Exception as e:
+        return {"status": f"error: {str(e)}"}
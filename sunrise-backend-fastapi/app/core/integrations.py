@@ -0,0 +1,328 @@
+"""
+Outbound integrations (Twilio WhatsApp, Cloudinary)
+
+The Twilio and Cloudinary SDKs are synchronous. Calling them from an ``async def``
+endpoint freezes the event loop, and every other request on the worker, for the
+whole network round-trip. ``IntegrationClient.call`` runs an SDK call on the
+integration's own bounded thread pool instead, and adds:
+
+- a timeout covering the wait for a slot plus the call itself; a timeout after
+  the call was dispatched is flagged (``dispatched``) as its outcome is unknown
+- a concurrency limit: a slot is held until the SDK call really returns, so a
+  slow provider cannot pile up threads behind timed-out calls
+- a circuit breaker: after INTEGRATION_BREAKER_FAILURES consecutive failures
+  (timeouts, connection errors, 5xx) calls fail fast with ``CircuitOpenError``
+  for INTEGRATION_BREAKER_RESET_SECONDS, then a single trial call is let through
+- latency, timeout and rejection metrics (/monitoring/integrations)
+
+Errors the provider answered with (invalid phone number, bad upload) are raised
+to the caller unchanged and do not count against the breaker.
+"""
+
+import asyncio
+import functools
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Optional
+
+import cloudinary.exceptions
+import cloudinary.uploader
+from twilio.base.exceptions import TwilioRestException
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Call latencies kept for percentiles
+LATENCY_SAMPLES = 500
+
+
+class IntegrationUnavailableError(Exception):
+    """The integration cannot be called right now (caller should retry later)"""
+
+    def __init__(self, integration: str, message: str):
+        super().__init__(f"{integration}: {message}")
+        self.integration = integration
+
+
+class CircuitOpenError(IntegrationUnavailableError):
+    """Calls are short-circuited after repeated failures"""
+
+    def __init__(self, integration: str, retry_after_seconds: float):
+        super().__init__(integration, f"circuit open, retry in {retry_after_seconds:.0f}s")
+        self.retry_after_seconds = retry_after_seconds
+
+
+class IntegrationTimeoutError(IntegrationUnavailableError):
+    """
+    No response within the integration's timeout. ``dispatched`` is True when the
+    SDK call had already started: it keeps running and may still succeed, so the
+    outcome is unknown and the call must not be repeated blindly.
+    """
+
+    def __init__(self, integration: str, timeout_seconds: float, dispatched: bool = False):
+        message = f"no response within {timeout_seconds}s"
+        if dispatched:
+            message += " (the call may still complete)"
+        super().__init__(integration, message)
+        self.timeout_seconds = timeout_seconds
+        self.dispatched = dispatched
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker: closed -> open -> half_open (one trial call) -> closed"""
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.opens = 0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def retry_after(self) -> float:
+        return max(self.reset_seconds - (time.monotonic() - self.opened_at), 0.0)
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "open":
+                if self.retry_after() > 0:
+                    return False
+                self.state = "half_open"
+                self._trial_in_flight = False
+            if self.state == "half_open":
+                if self._trial_in_flight:
+                    return False
+                self._trial_in_flight = True
+            return True
+
+    def abandon_trial(self) -> None:
+        """The trial call ended without an outcome (cancelled): let the next call be the trial"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = "closed"
+            self.consecutive_failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+                if self.state != "open":
+                    self.opens += 1
+                    logger.warning(f"Circuit opened after {self.consecutive_failures} consecutive failures")
+                self.state = "open"
+                self.opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+
+class IntegrationClient:
+    """Runs blocking SDK calls of one integration off the event loop, with limits and metrics"""
+
+    def __init__(
+        self,
+        name: str,
+        timeout_seconds: float,
+        max_concurrency: int,
+        failure_threshold: Optional[int] = None,
+        reset_seconds: Optional[float] = None,
+        is_failure: Optional[Callable[[BaseException], bool]] = None
+    ):
+        self.name = name
+        self.timeout_seconds = timeout_seconds
+        self.max_concurrency = max(1, max_concurrency)
+        self.breaker = CircuitBreaker(
+            settings.INTEGRATION_BREAKER_FAILURES if failure_threshold is None else failure_threshold,
+            settings.INTEGRATION_BREAKER_RESET_SECONDS if reset_seconds is None else reset_seconds
+        )
+        self.is_failure = is_failure or (lambda exc: True)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # Slots are per event loop (asyncio primitives bind to the loop they are used on)
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._slots_loop: Optional[asyncio.AbstractEventLoop] = None
+        self.reset()
+
+    def reset(self) -> None:
+        self.calls = 0
+        self.successes = 0
+        self.errors = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.rejected = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._latencies: Deque[float] = deque(maxlen=LATENCY_SAMPLES)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_concurrency, thread_name_prefix=f"{self.name}-io"
+            )
+        return self._executor
+
+    def _get_slots(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._slots is None or self._slots_loop is not loop:
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+            self._slots_loop = loop
+        return self._slots
+
+    async def call(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run ``func(*args, **kwargs)`` on the integration's thread pool"""
+        if not self.breaker.allow():
+            self.rejected += 1
+            raise CircuitOpenError(self.name, self.breaker.retry_after())
+
+        trial = self.breaker.state == "half_open"
+        try:
+            return await self._dispatch(func, *args, **kwargs)
+        except asyncio.CancelledError:
+            # A cancelled call records neither success nor failure
+            if trial:
+                self.breaker.abandon_trial()
+            raise
+
+    async def _dispatch(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        self.calls += 1
+        started = time.perf_counter()
+        slots = self._get_slots()
+        try:
+            await asyncio.wait_for(slots.acquire(), timeout=self.timeout_seconds)
+        except asyncio.TimeoutError:
+            self._record_timeout(started)
+            raise IntegrationTimeoutError(self.name, self.timeout_seconds) from None
+
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        future = asyncio.get_running_loop().run_in_executor(
+            self._get_executor(), functools.partial(func, *args, **kwargs)
+        )
+
+        def release(_future) -> None:
+            # The slot frees when the SDK call returns, not when the caller stops waiting
+            self.in_flight -= 1
+            slots.release()
+
+        future.add_done_callback(release)
+
+        remaining = self.timeout_seconds - (time.perf_counter() - started)
+        try:
+            result = await asyncio.wait_for(asyncio.shield(future), timeout=max(remaining, 0.001))
+        except asyncio.TimeoutError:
+            self._record_timeout(started)
+            raise IntegrationTimeoutError(self.name, self.timeout_seconds, dispatched=True) from None
+        except Exception as e:
+            self._latencies.append((time.perf_counter() - started) * 1000)
+            self.errors += 1
+            if self.is_failure(e):
+                self.failures += 1
+                self.breaker.record_failure()
+            else:
+                # The provider answered: it is reachable
+                self.breaker.record_success()
+            raise
+
+        self._latencies.append((time.perf_counter() - started) * 1000)
+        self.successes += 1
+        self.breaker.record_success()
+        return result
+
+    def _record_timeout(self, started: float) -> None:
+        self._latencies.append((time.perf_counter() - started) * 1000)
+        self.timeouts += 1
+        self.failures += 1
+        self.breaker.record_failure()
+
+    def get_stats(self) -> Dict[str, Any]:
+        latencies = sorted(self._latencies)
+
+        def percentile(fraction: float) -> float:
+            if not latencies:
+                return 0.0
+            return round(latencies[min(int(len(latencies) * fraction), len(latencies) - 1)], 2)
+
+        return {
+            "name": self.name,
+            "state": self.breaker.state,
+            "timeout_seconds": self.timeout_seconds,
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "calls": self.calls,
+            "successes": self.successes,
+            "errors": self.errors,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "rejected": self.rejected,
+            "circuit_opens": self.breaker.opens,
+            "p50_ms": percentile(0.50),
+            "p95_ms": percentile(0.95),
+            "p99_ms": percentile(0.99),
+            "max_ms": round(latencies[-1], 2) if latencies else 0.0
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+def twilio_failure(exc: BaseException) -> bool:
+    """Throttling, 5xx and transport errors trip the breaker; 4xx answers (bad number) do not"""
+    if isinstance(exc, TwilioRestException):
+        return exc.status is None or exc.status >= 500 or exc.status == 429
+    return True
+
+
+# Transport-level errors of the Cloudinary SDK (API errors carry the provider's message)
+_CLOUDINARY_TRANSPORT_ERRORS = ("Unexpected error", "Socket error", "Error parsing server response")
+
+
+def cloudinary_failure(exc: BaseException) -> bool:
+    if isinstance(exc, cloudinary.exceptions.Error):
+        return str(exc).startswith(_CLOUDINARY_TRANSPORT_ERRORS)
+    return True
+
+
+# Global integration clients
+twilio_integration = IntegrationClient(
+    "twilio",
+    timeout_seconds=settings.TWILIO_TIMEOUT_SECONDS,
+    max_concurrency=settings.TWILIO_MAX_CONCURRENCY,
+    is_failure=twilio_failure
+)
+cloudinary_integration = IntegrationClient(
+    "cloudinary",
+    timeout_seconds=settings.CLOUDINARY_TIMEOUT_SECONDS,
+    max_concurrency=settings.CLOUDINARY_MAX_CONCURRENCY,
+    is_failure=cloudinary_failure
+)
+
+
+async def cloudinary_upload(file, **options) -> Dict[str, Any]:
+    """``cloudinary.uploader.upload`` through the Cloudinary integration client"""
+    options.setdefault("timeout", settings.CLOUDINARY_TIMEOUT_SECONDS)
+    return await cloudinary_integration.call(cloudinary.uploader.upload, file, **options)
+
+
+async def cloudinary_destroy(public_id: str, **options) -> Dict[str, Any]:
+    """``cloudinary.uploader.destroy`` through the Cloudinary integration client"""
+    options.setdefault("timeout", settings.CLOUDINARY_TIMEOUT_SECONDS)
+    return await cloudinary_integration.call(cloudinary.uploader.destroy, public_id, **options)
+
+
+def get_integration_stats() -> Dict[str, Any]:
+    return {client.name: client.get_stats() for client in (twilio_integration, cloudinary_integration)}
+
+
+def shutdown_integrations() -> None:
+    for client in (twilio_integration, cloudinary_integration):
+        client.shutdown()
@@ -0,0 +1,360 @@
+"""
+Metadata cache for the service configuration endpoints
+
+The configuration endpoints return metadata (classes, session years, payment
+methods, ...) that changes rarely but is requested on every page load. Each
+service payload is cached as pre-serialized JSON and pre-gzipped bytes together
+with an ETag, so a hit is a dictionary lookup and a 304 or a byte copy.
+
+Entries are tagged with a version stamp. The stamp is bumped after any committed
+ORM insert/update/delete of a metadata row (and by POST /configuration/refresh),
+which makes every cached entry stale at once. The TTL is only a backstop for
+changes made outside the application (SQL scripts).
+
+``get_name_map`` serves id -> name lookups (payment statuses, ...) to CRUD code
+from process memory under the same version stamp and TTL.
+
+Backends:
+- ``memory`` (default): per-process dictionaries.
+- ``file``: a directory shared by all workers on the host. The version stamp and
+  entries are files replaced atomically, so a bump in one worker is seen by all.
+"""
+
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, object_session
+
+from app.core.config import settings
+from app.models.alert import AlertStatus, AlertType
+from app.models.attendance import AttendancePeriod, AttendanceStatus
+from app.models.gallery import GalleryCategory
+from app.models.inventory import InventoryItemCategory, InventoryItemType, InventorySizeType
+from app.models.metadata import (
+    UserType, SessionYear, Gender, Class, PaymentType, PaymentStatus, PaymentMethod,
+    LeaveType, LeaveStatus, ExpenseCategory, ExpenseStatus, EmploymentStatus, Qualification,
+    Department, Position, ReversalReason
+)
+from app.models.progression_action import ProgressionAction
+from app.models.transport import TransportType
+
+logger = logging.getLogger(__name__)
+
+# Models served by the configuration endpoints; writes to any of them bump the version
+METADATA_MODELS = (
+    UserType, SessionYear, Gender, Class, PaymentType, PaymentStatus, PaymentMethod,
+    LeaveType, LeaveStatus, ExpenseCategory, ExpenseStatus, EmploymentStatus, Qualification,
+    Department, Position, ReversalReason, TransportType, GalleryCategory,
+    InventoryItemCategory, InventoryItemType, InventorySizeType,
+    AttendanceStatus, AttendancePeriod, AlertType, AlertStatus, ProgressionAction
+)
+
+# Session.info key set when a metadata row was written in the current transaction
+_PENDING_BUMP = "metadata_cache_dirty"
+
+
+def _new_version() -> str:
+    return format(time.time_ns(), "x")
+
+
+class MetadataCacheEntry:
+    """One cached payload in both encodings"""
+
+    __slots__ = ("version", "created_at", "etag", "record_count", "json_bytes", "gzip_bytes")
+
+    def __init__(
+        self, version: str, created_at: float, etag: str, record_count: int,
+        json_bytes: bytes, gzip_bytes: bytes
+    ):
+        self.version = version
+        self.created_at = created_at
+        self.etag = etag
+        self.record_count = record_count
+        self.json_bytes = json_bytes
+        self.gzip_bytes = gzip_bytes
+
+    @classmethod
+    def build(cls, payload: Dict[str, Any], version: str) -> "MetadataCacheEntry":
+        json_bytes = json.dumps(payload, default=str, separators=(',', ':')).encode('utf-8')
+        # Weak ETag: the gzip and identity bodies are semantically equivalent
+        etag = f'W/"{hashlib.sha1(json_bytes).hexdigest()[:20]}"'
+        return cls(
+            version=version,
+            created_at=time.time(),
+            etag=etag,
+            record_count=sum(len(v) for v in payload.values() if isinstance(v, list)),
+            json_bytes=json_bytes,
+            gzip_bytes=gzip.compress(json_bytes)
+        )
+
+
+class InProcessMetadataCacheBackend:
+    """Per-process store: each worker builds its own entries"""
+
+    name = "memory"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = _new_version()
+        self._entries: Dict[str, MetadataCacheEntry] = {}
+
+    def get_version(self) -> str:
+        return self._version
+
+    def bump_version(self) -> str:
+        with self._lock:
+            self._version = _new_version()
+            return self._version
+
+    def get(self, key: str) -> Optional[MetadataCacheEntry]:
+        return self._entries.get(key)
+
+    def set(self, key: str, entry: MetadataCacheEntry) -> None:
+        with self._lock:
+            self._entries[key] = entry
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class LocalFileMetadataCacheBackend:
+    """
+    Directory shared by the workers of one host
+
+    Layout: ``version`` holds the current stamp, ``<key>.entry`` holds a JSON header
+    line followed by the JSON and gzip bodies. Files are written to a temporary
+    name and moved into place, so readers never see a partial file. Entries read
+    from disk are memoized per file modification time.
+    """
+
+    name = "file"
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._version_path = os.path.join(directory, "version")
+        self._memo: Dict[str, Tuple[int, MetadataCacheEntry]] = {}
+
+    def get_version(self) -> str:
+        try:
+            with open(self._version_path, "r", encoding="utf-8") as version_file:
+                version = version_file.read().strip()
+        except FileNotFoundError:
+            version = ""
+        return version or self.bump_version()
+
+    def bump_version(self) -> str:
+        version = _new_version()
+        self._write_atomic(self._version_path, version.encode("utf-8"))
+        return version
+
+    def get(self, key: str) -> Optional[MetadataCacheEntry]:
+        path = self._entry_path(key)
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+            memo = self._memo.get(key)
+            if memo is not None and memo[0] == mtime_ns:
+                return memo[1]
+
+            with open(path, "rb") as entry_file:
+                header = json.loads(entry_file.readline())
+                body = entry_file.read()
+        except (FileNotFoundError, ValueError):
+            return None
+
+        json_length = header["json_length"]
+        entry = MetadataCacheEntry(
+            version=header["version"],
+            created_at=header["created_at"],
+            etag=header["etag"],
+            record_count=header["record_count"],
+            json_bytes=body[:json_length],
+            gzip_bytes=body[json_length:]
+        )
+        self._memo[key] = (mtime_ns, entry)
+        return entry
+
+    def set(self, key: str, entry: MetadataCacheEntry) -> None:
+        header = json.dumps({
+            "version": entry.version,
+            "created_at": entry.created_at,
+            "etag": entry.etag,
+            "record_count": entry.record_count,
+            "json_length": len(entry.json_bytes)
+        }).encode("utf-8")
+        self._write_atomic(self._entry_path(key), header + b"\n" + entry.json_bytes + entry.gzip_bytes)
+
+    def clear(self) -> None:
+        self._memo.clear()
+        for file_name in os.listdir(self.directory):
+            if file_name.endswith(".entry"):
+                try:
+                    os.remove(os.path.join(self.directory, file_name))
+                except FileNotFoundError:
+                    pass
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.entry")
+
+    def _write_atomic(self, path: str, data: bytes) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as tmp_file:
+                tmp_file.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+
+class MetadataCache:
+    """Versioned cache of pre-encoded configuration payloads"""
+
+    def __init__(self, backend, ttl_seconds: float):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self._build_locks: Dict[str, asyncio.Lock] = {}
+        # table name -> (version, loaded at, {id: name})
+        self._name_maps: Dict[str, Tuple[str, float, Dict[int, str]]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.last_build_ms = 0.0
+
+    def current_version(self) -> str:
+        return self.backend.get_version()
+
+    def invalidate(self) -> str:
+        """Bump the version stamp so every cached entry is rebuilt on next use"""
+        self.invalidations += 1
+        version = self.backend.bump_version()
+        logger.info(f"Metadata cache invalidated, version={version}")
+        return version
+
+    def clear(self) -> None:
+        self.backend.clear()
+        self._build_locks.clear()
+        self._name_maps.clear()
+
+    async def get_or_build(
+        self, key: str, builder: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> Tuple[MetadataCacheEntry, bool]:
+        """
+        Return (entry, cache_hit). On a miss ``builder()`` loads the payload;
+        concurrent misses for the same key in this process share one build.
+        """
+        entry = self._fresh_entry(key)
+        if entry is not None:
+            self.hits += 1
+            return entry, True
+
+        lock = self._build_locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            entry = self._fresh_entry(key)
+            if entry is not None:
+                self.hits += 1
+                return entry, True
+
+            self.misses += 1
+            # Read the version before loading so a write during the build leaves the entry stale
+            version = self.backend.get_version()
+            build_start = time.time()
+            payload = await builder()
+            entry = MetadataCacheEntry.build(payload, version)
+            self.last_build_ms = (time.time() - build_start) * 1000
+            self.backend.set(key, entry)
+            return entry, False
+
+    async def get_name_map(self, db: AsyncSession, model) -> Dict[int, str]:
+        """
+        {id: name} for a metadata table, kept in process memory until the version
+        stamp changes or the TTL expires
+        """
+        key = model.__tablename__
+        version = self.backend.get_version()
+        cached = self._name_maps.get(key)
+        if cached is not None and cached[0] == version and time.time() - cached[1] < self.ttl_seconds:
+            return cached[2]
+
+        result = await db.execute(select(model.id, model.name))
+        names = {row_id: name for row_id, name in result.all()}
+        self._name_maps[key] = (version, time.time(), names)
+        return names
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.backend.name,
+            "version": self.backend.get_version(),
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "last_build_ms": round(self.last_build_ms, 2)
+        }
+
+    def reset_stats(self) -> None:
+        self.hits = self.misses = self.invalidations = 0
+        self.last_build_ms = 0.0
+
+    def _fresh_entry(self, key: str) -> Optional[MetadataCacheEntry]:
+        entry = self.backend.get(key)
+        if entry is None or entry.version != self.backend.get_version():
+            return None
+        if time.time() - entry.created_at >= self.ttl_seconds:
+            return None
+        return entry
+
+
+def create_metadata_cache_backend(name: str):
+    if name == "file":
+        return LocalFileMetadataCacheBackend(settings.METADATA_CACHE_DIR)
+    if name != "memory":
+        logger.warning(f"Unknown METADATA_CACHE_BACKEND '{name}', using in-process cache")
+    return InProcessMetadataCacheBackend()
+
+
+# Global metadata cache
+metadata_cache = MetadataCache(
+    backend=create_metadata_cache_backend(settings.METADATA_CACHE_BACKEND),
+    ttl_seconds=settings.METADATA_CACHE_TTL_SECONDS
+)
+
+
+# =====================================================
+# Invalidation on committed metadata changes
+# =====================================================
+
+def _mark_metadata_change(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info[_PENDING_BUMP] = True
+
+
+for _model in METADATA_MODELS:
+    for _event_name in ("after_insert", "after_update", "after_delete"):
+        event.listen(_model, _event_name, _mark_metadata_change)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_metadata_commit(session):
+    if session.info.pop(_PENDING_BUMP, False):
+        metadata_cache.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back_metadata(session):
+    session.info.pop(_PENDING_BUMP, None)
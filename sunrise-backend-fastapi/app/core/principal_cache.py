@@ -0,0 +1,175 @@
+"""
+Principal cache for request authentication
+
+get_current_user used to load the user (with user type) from the database on every
+authenticated request. This cache keeps a minimal snapshot of identity, role and
+status per user id with a TTL and a bounded LRU, and rebuilds a detached User
+from it on a hit.
+
+Cached principals are NOT attached to a session and carry no password hash:
+endpoints that modify the current user must load the row first
+(``await user_crud.get(db, id=current_user.id)``).
+
+Entries are invalidated after any committed ORM update or delete of a User row
+(users.py admin actions, profile updates, student/teacher deactivation). Other
+API processes converge within the TTL.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from app.core.config import settings
+from app.models.metadata import UserType
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+# Columns needed by authorization checks and the /auth/me, /auth/profile responses
+PRINCIPAL_COLUMNS = (
+    "id", "email", "first_name", "last_name", "phone", "user_type_id",
+    "is_active", "is_deleted", "created_at", "updated_at"
+)
+USER_TYPE_COLUMNS = ("id", "name", "description", "is_active")
+
+# Session.info key collecting user ids to invalidate once the transaction commits
+_PENDING_INVALIDATIONS = "principal_cache_invalidations"
+
+
+class PrincipalCache:
+    """TTL + LRU cache of authenticated user snapshots keyed by user id"""
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[int, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl_seconds > 0
+
+    def get(self, user_id: int) -> Optional[User]:
+        """Return a detached User for a fresh entry, or None on a miss"""
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, snapshot = entry
+            if expires_at <= time.monotonic():
+                del self._entries[user_id]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+
+        return self._to_user(snapshot)
+
+    def set(self, user: User) -> User:
+        """
+        Snapshot a database-loaded user (with user_type loaded) and return the
+        detached principal, so hits and misses hand endpoints the same kind of object
+        """
+        if not self.enabled:
+            return user
+
+        snapshot = {
+            "user": {column: getattr(user, column) for column in PRINCIPAL_COLUMNS},
+            "user_type": (
+                {column: getattr(user.user_type, column) for column in USER_TYPE_COLUMNS}
+                if user.user_type is not None else None
+            )
+        }
+
+        with self._lock:
+            self._entries[user.id] = (time.monotonic() + self.ttl_seconds, snapshot)
+            self._entries.move_to_end(user.id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+        return self._to_user(snapshot)
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            if self._entries.pop(user_id, None) is not None:
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for monitoring"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "expirations": self.expirations,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations
+            }
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.hits = self.misses = self.expirations = self.evictions = self.invalidations = 0
+
+    @staticmethod
+    def _to_user(snapshot: Dict[str, Any]) -> User:
+        user = User(**snapshot["user"])
+        if snapshot["user_type"] is not None:
+            user.user_type = UserType(**snapshot["user_type"])
+        return user
+
+
+# Global principal cache
+principal_cache = PrincipalCache(
+    ttl_seconds=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+    max_entries=settings.PRINCIPAL_CACHE_MAX_ENTRIES
+)
+
+
+# =====================================================
+# Invalidation on committed User changes
+# =====================================================
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _collect_user_change(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(_PENDING_INVALIDATIONS, set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_users(session):
+    for user_id in session.info.pop(_PENDING_INVALIDATIONS, ()):
+        principal_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back_users(session):
+    session.info.pop(_PENDING_INVALIDATIONS, None)
@@ -0,0 +1,283 @@
+"""
+Public site content cache (faculty page, gallery, home-page carousel)
+
+The school website calls the /public endpoints anonymously on every page view,
+and traffic spikes (admissions season) hit exactly these pages. Each payload is
+cached as pre-serialized JSON and pre-gzipped bytes with a strong ETag, so
+website traffic is served from memory and revalidated by browsers and CDNs with
+cheap 304s.
+
+Content is split into sections with their own version stamp:
+
+- ``faculty``: teachers (and the department/position/qualification names shown)
+- ``gallery`` and ``home_page``: gallery categories and images
+
+A committed ORM write to a section's models bumps that section's version.
+Stale entries keep being served while a single background rebuild runs
+(server-side stale-while-revalidate), so a write costs one rebuild instead of
+a burst of database queries from every visitor. Entries older than TTL +
+PUBLIC_CACHE_STALE_SECONDS are rebuilt before answering. The TTL is only a
+backstop for changes made outside the application.
+
+Storage uses the metadata cache backends (PUBLIC_CACHE_BACKEND). The default,
+files shared by the workers of a host, lets a write made on one worker
+invalidate the entries of all of them. Per-process memory cannot see writes
+handled by another worker, so its TTL is capped (PUBLIC_CACHE_MEMORY_TTL_SECONDS)
+to bound how long workers serve different content.
+"""
+
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from app.core.config import settings
+from app.core.metadata_cache import (
+    InProcessMetadataCacheBackend, LocalFileMetadataCacheBackend, MetadataCacheEntry
+)
+from app.models.gallery import GalleryCategory, GalleryImage
+from app.models.metadata import Department, Position, Qualification
+from app.models.teacher import Teacher
+
+logger = logging.getLogger(__name__)
+
+FACULTY = "faculty"
+GALLERY = "gallery"
+HOME_PAGE = "home_page"
+
+# Models whose committed writes make a section stale
+SECTION_MODELS = {
+    FACULTY: (Teacher, Department, Position, Qualification),
+    GALLERY: (GalleryCategory, GalleryImage),
+    HOME_PAGE: (GalleryCategory, GalleryImage),
+}
+
+# Session.info key: sections written in the current transaction
+_PENDING_SECTIONS = "public_cache_dirty_sections"
+
+
+def build_public_entry(payload: Any, version: str) -> MetadataCacheEntry:
+    """Encode a payload the way FastAPI would, with a strong ETag of the JSON body"""
+    json_bytes = json.dumps(jsonable_encoder(payload), separators=(',', ':')).encode('utf-8')
+    return MetadataCacheEntry(
+        version=version,
+        created_at=time.time(),
+        etag=f'"{hashlib.sha1(json_bytes).hexdigest()[:20]}"',
+        record_count=len(payload) if isinstance(payload, list) else len(payload.get("teachers", [])),
+        json_bytes=json_bytes,
+        # mtime=0 keeps the gzip body byte-identical across rebuilds and workers
+        gzip_bytes=gzip.compress(json_bytes, mtime=0)
+    )
+
+
+def gzip_etag(etag: str) -> str:
+    """Strong ETag of the gzip representation of an entry"""
+    return f'{etag[:-1]}-gzip"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match (weak comparison) against either representation of an entry"""
+    if if_none_match.strip() == "*":
+        return True
+    accepted = {etag, gzip_etag(etag)}
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate in accepted:
+            return True
+    return False
+
+
+class PublicContentCache:
+    """Per-section versioned cache with stale-while-revalidate rebuilds"""
+
+    def __init__(
+        self,
+        backend_factory: Callable[[str], Any],
+        ttl_seconds: float,
+        stale_seconds: float,
+        memory_ttl_seconds: Optional[float] = None
+    ):
+        self.backends = {section: backend_factory(section) for section in SECTION_MODELS}
+        if memory_ttl_seconds is not None and any(backend.name == "memory" for backend in self.backends.values()):
+            # Writes on other workers are only picked up on expiry
+            ttl_seconds = min(ttl_seconds, memory_ttl_seconds)
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self._build_locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+        self._refreshing: Dict[Tuple[str, str], asyncio.Task] = {}
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+        self.invalidations = 0
+
+    def invalidate(self, *sections: str) -> None:
+        """Bump the version of the given sections (all when none are given)"""
+        for section in sections or tuple(self.backends):
+            self.invalidations += 1
+            version = self.backends[section].bump_version()
+            logger.info(f"Public cache section '{section}' invalidated, version={version}")
+
+    def clear(self) -> None:
+        for task in self._refreshing.values():
+            task.cancel()
+        self._refreshing.clear()
+        self._build_locks.clear()
+        for backend in self.backends.values():
+            backend.clear()
+
+    async def get_or_build(
+        self, section: str, key: str, builder: Callable[[], Awaitable[Any]]
+    ) -> Tuple[MetadataCacheEntry, str]:
+        """
+        Return (entry, cache status): "HIT", "STALE" (served while a background
+        rebuild runs) or "MISS" (built before answering). ``builder`` opens its
+        own database session, since a background rebuild outlives the request.
+        """
+        backend = self.backends[section]
+        entry = backend.get(key)
+        if entry is not None:
+            age = time.time() - entry.created_at
+            if entry.version == backend.get_version() and age < self.ttl_seconds:
+                self.hits += 1
+                return entry, "HIT"
+            if age < self.ttl_seconds + self.stale_seconds:
+                self.stale_hits += 1
+                self._schedule_refresh(section, key, builder)
+                return entry, "STALE"
+
+        lock = self._build_locks.setdefault((section, key), asyncio.Lock())
+        async with lock:
+            entry = self._fresh_entry(section, key)
+            if entry is not None:
+                self.hits += 1
+                return entry, "HIT"
+            self.misses += 1
+            return await self._build(section, key, builder), "MISS"
+
+    async def _build(self, section: str, key: str, builder: Callable[[], Awaitable[Any]]) -> MetadataCacheEntry:
+        backend = self.backends[section]
+        # Read the version before loading so a write during the build leaves the entry stale
+        version = backend.get_version()
+        entry = build_public_entry(await builder(), version)
+        backend.set(key, entry)
+        return entry
+
+    def _schedule_refresh(self, section: str, key: str, builder: Callable[[], Awaitable[Any]]) -> None:
+        if (section, key) not in self._refreshing:
+            task = asyncio.get_running_loop().create_task(self._refresh(section, key, builder))
+            self._refreshing[(section, key)] = task
+
+    async def _refresh(self, section: str, key: str, builder: Callable[[], Awaitable[Any]]) -> None:
+        try:
+            async with self._build_locks.setdefault((section, key), asyncio.Lock()):
+                if self._fresh_entry(section, key) is None:
+                    self.refreshes += 1
+                    await self._build(section, key, builder)
+        except Exception as e:
+            # Keep serving the stale entry; the next request retries
+            self.refresh_errors += 1
+            logger.warning(f"Public cache refresh of '{section}/{key}' failed: {e}")
+        finally:
+            self._refreshing.pop((section, key), None)
+
+    def _fresh_entry(self, section: str, key: str) -> Optional[MetadataCacheEntry]:
+        backend = self.backends[section]
+        entry = backend.get(key)
+        if entry is None or entry.version != backend.get_version():
+            return None
+        if time.time() - entry.created_at >= self.ttl_seconds:
+            return None
+        return entry
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "versions": {section: backend.get_version() for section, backend in self.backends.items()},
+            "ttl_seconds": self.ttl_seconds,
+            "stale_seconds": self.stale_seconds,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
+            "refreshes": self.refreshes,
+            "refresh_errors": self.refresh_errors,
+            "invalidations": self.invalidations
+        }
+
+
+def create_public_cache_backend(section: str):
+    if settings.PUBLIC_CACHE_BACKEND == "file":
+        try:
+            return LocalFileMetadataCacheBackend(os.path.join(settings.METADATA_CACHE_DIR, "public", section))
+        except OSError as e:
+            logger.warning(f"Public cache directory unavailable ({e}), using in-process cache")
+    elif settings.PUBLIC_CACHE_BACKEND != "memory":
+        logger.warning(f"Unknown PUBLIC_CACHE_BACKEND '{settings.PUBLIC_CACHE_BACKEND}', using in-process cache")
+    return InProcessMetadataCacheBackend()
+
+
+# Global public content cache
+public_cache = PublicContentCache(
+    backend_factory=create_public_cache_backend,
+    ttl_seconds=settings.PUBLIC_CACHE_TTL_SECONDS,
+    stale_seconds=settings.PUBLIC_CACHE_STALE_SECONDS,
+    memory_ttl_seconds=settings.PUBLIC_CACHE_MEMORY_TTL_SECONDS
+)
+
+
+# =====================================================
+# Invalidation on committed content changes
+# =====================================================
+
+_SECTIONS_BY_MODEL: Dict[type, Set[str]] = {}
+for _section, _models in SECTION_MODELS.items():
+    for _model in _models:
+        _SECTIONS_BY_MODEL.setdefault(_model, set()).add(_section)
+
+
+def _mark_sections(session: Optional[Session], sections: Set[str]) -> None:
+    if session is not None:
+        session.info.setdefault(_PENDING_SECTIONS, set()).update(sections)
+
+
+def _mark_public_content_change(mapper, connection, target):
+    _mark_sections(object_session(target), _SECTIONS_BY_MODEL[mapper.class_])
+
+
+for _model in _SECTIONS_BY_MODEL:
+    for _event_name in ("after_insert", "after_update", "after_delete"):
+        event.listen(_model, _event_name, _mark_public_content_change)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _mark_public_content_bulk_change(orm_execute_state):
+    # update()/delete() statements bypass the mapper events
+    if orm_execute_state.is_update or orm_execute_state.is_delete:
+        for mapper in orm_execute_state.all_mappers:
+            sections = _SECTIONS_BY_MODEL.get(mapper.class_)
+            if sections:
+                _mark_sections(orm_execute_state.session, sections)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_public_content_commit(session):
+    sections = session.info.pop(_PENDING_SECTIONS, None)
+    if sections:
+        public_cache.invalidate(*sorted(sections))
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back_public_content(session):
+    session.info.pop(_PENDING_SECTIONS, None)
@@ -0,0 +1,282 @@
+"""
+Request-level database query instrumentation
+
+Engine events on the async engine count statements, DB time and rows for the
+request that issued them (tracked through a context variable set by
+``QueryInstrumentationMiddleware``) and feed ``db_perf_tracker`` with per
+statement-shape totals.
+
+Within one request, the same statement shape executed QUERY_N_PLUS_ONE_THRESHOLD
+times or more is reported as a likely N+1 (logged, counted per route and flagged
+with the X-DB-N-Plus-One header).
+
+The middleware adds ``Server-Timing`` and ``X-DB-Queries`` headers and keeps a
+bounded window of samples per route for the /monitoring/routes endpoint.
+"""
+
+import logging
+import re
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+
+from app.core.config import settings
+from app.utils.performance_monitor import db_perf_tracker
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (ms) of the request latency histogram buckets
+LATENCY_BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+# asyncpg renders binds as "$1::INTEGER" / "$2::TIMESTAMP WITHOUT TIME ZONE"
+_TYPE_CAST = re.compile(
+    r'::\s*"?\w+"?'
+    r"(?:\s+(?:WITH(?:OUT)?\s+TIME\s+ZONE|PRECISION|VARYING))?"
+    r"(?:\s*\(\s*\d+(?:\s*,\s*\d+)?\s*\))?"
+    r"(?:\[\])*",
+    re.IGNORECASE
+)
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"\$\d+|%\(\w+\)s|:\w+|\?")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    """
+    Normalize SQL so that executions differing only in parameters, literals,
+    bind casts or expanded IN-list length share one shape
+    """
+    shape = _STRING_LITERAL.sub("?", statement)
+    shape = _TYPE_CAST.sub("", shape)
+    shape = _PLACEHOLDER.sub("?", shape)
+    shape = _NUMBER_LITERAL.sub("?", shape)
+    shape = _PLACEHOLDER_LIST.sub("(?)", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+
+class RequestQueryStats:
+    """Queries executed while handling one request"""
+
+    __slots__ = ("query_count", "db_time_ms", "rows", "shapes")
+
+    def __init__(self):
+        self.query_count = 0
+        self.db_time_ms = 0.0
+        self.rows = 0
+        self.shapes: Counter = Counter()
+
+    def record(self, shape: str, duration_ms: float, rows: int) -> None:
+        self.query_count += 1
+        self.db_time_ms += duration_ms
+        self.rows += rows
+        self.shapes[shape] += 1
+
+    def repeated_shapes(self, threshold: int) -> List[Tuple[str, int]]:
+        """Shapes executed at least ``threshold`` times, most repeated first"""
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+
+_current_request_stats: ContextVar[Optional[RequestQueryStats]] = ContextVar(
+    "current_request_query_stats", default=None
+)
+
+
+def get_request_query_stats() -> Optional[RequestQueryStats]:
+    return _current_request_stats.get()
+
+
+def _percentile(ordered: List[float], pct: float) -> float:
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return round(ordered[index], 2)
+
+
+class RouteStats:
+    """Rolling samples for one route"""
+
+    def __init__(self, window: int):
+        self.requests = 0
+        self.n_plus_one_requests = 0
+        self.last_n_plus_one: Optional[Dict[str, Any]] = None
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.samples: Deque[Tuple[float, float, int, int]] = deque(maxlen=window)
+
+    def add(self, duration_ms: float, stats: RequestQueryStats, repeated: List[Tuple[str, int]]) -> None:
+        self.requests += 1
+        self.samples.append((duration_ms, stats.db_time_ms, stats.query_count, stats.rows))
+        for index, upper in enumerate(LATENCY_BUCKETS_MS):
+            if duration_ms <= upper:
+                self.buckets[index] += 1
+                break
+        else:
+            self.buckets[-1] += 1
+
+        if repeated:
+            self.n_plus_one_requests += 1
+            shape, count = repeated[0]
+            self.last_n_plus_one = {"statement": shape[:300], "executions": count}
+
+    def summary(self) -> Dict[str, Any]:
+        durations = sorted(sample[0] for sample in self.samples)
+        db_times = sorted(sample[1] for sample in self.samples)
+        queries = sorted(sample[2] for sample in self.samples)
+        rows = sorted(sample[3] for sample in self.samples)
+        return {
+            "requests": self.requests,
+            "window": len(self.samples),
+            "latency_ms": {pct: _percentile(durations, value) for pct, value in (("p50", 50), ("p95", 95), ("p99", 99))},
+            "db_time_ms": {pct: _percentile(db_times, value) for pct, value in (("p50", 50), ("p95", 95), ("p99", 99))},
+            "queries": {
+                "p50": _percentile(queries, 50),
+                "p95": _percentile(queries, 95),
+                "max": queries[-1] if queries else 0
+            },
+            "rows": {"p50": _percentile(rows, 50), "max": rows[-1] if rows else 0},
+            "latency_histogram": {
+                **{f"le_{upper}ms": count for upper, count in zip(LATENCY_BUCKETS_MS, self.buckets)},
+                "gt_{}ms".format(LATENCY_BUCKETS_MS[-1]): self.buckets[-1]
+            },
+            "n_plus_one_requests": self.n_plus_one_requests,
+            "last_n_plus_one": self.last_n_plus_one
+        }
+
+
+class RouteMetrics:
+    """Per-route request samples collected by the middleware"""
+
+    def __init__(self, window: int):
+        self.window = window
+        self._routes: Dict[str, RouteStats] = {}
+        self._lock = threading.Lock()
+
+    def record(self, route: str, duration_ms: float, stats: RequestQueryStats,
+               repeated: List[Tuple[str, int]]) -> None:
+        with self._lock:
+            route_stats = self._routes.get(route)
+            if route_stats is None:
+                route_stats = self._routes[route] = RouteStats(self.window)
+            route_stats.add(duration_ms, stats, repeated)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            routes = {route: route_stats.summary() for route, route_stats in self._routes.items()}
+        # Heaviest routes (by p95 query count) first
+        return dict(sorted(routes.items(), key=lambda item: item[1]["queries"]["p95"], reverse=True))
+
+    def reset(self) -> None:
+        with self._lock:
+            self._routes.clear()
+
+
+# Global per-route metrics
+route_metrics = RouteMetrics(window=settings.QUERY_METRICS_WINDOW)
+
+
+# =====================================================
+# Engine events
+# =====================================================
+
+_QUERY_START_KEY = "query_instrumentation_start"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault(_QUERY_START_KEY, []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get(_QUERY_START_KEY)
+    if not started:
+        return
+    duration_ms = (time.perf_counter() - started.pop()) * 1000
+    rows = max(getattr(cursor, "rowcount", -1) or 0, 0)
+    shape = statement_shape(statement)
+
+    db_perf_tracker.track_query(shape, duration_ms, rows)
+    stats = _current_request_stats.get()
+    if stats is not None:
+        stats.record(shape, duration_ms, rows)
+
+
+def _handle_error(exception_context):
+    started = exception_context.connection.info.get(_QUERY_START_KEY) if exception_context.connection else None
+    if started:
+        started.pop()
+
+
+def install_query_instrumentation(engine: Engine) -> None:
+    """Attach the counting hooks to a (sync) engine; async engines pass ``.sync_engine``"""
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+# =====================================================
+# Middleware
+# =====================================================
+
+def _route_label(scope) -> str:
+    route = scope.get("route")
+    path = getattr(route, "path", None) or "unmatched"
+    return f"{scope.get('method', '')} {path}"
+
+
+class QueryInstrumentationMiddleware:
+    """
+    Pure ASGI middleware (safe for streaming responses): opens a RequestQueryStats
+    for each HTTP request, adds the timing headers when the response starts and
+    records the request in ``route_metrics`` when it completes
+    """
+
+    def __init__(self, app, n_plus_one_threshold: Optional[int] = None, timing_headers: Optional[bool] = None):
+        self.app = app
+        self.n_plus_one_threshold = n_plus_one_threshold or settings.QUERY_N_PLUS_ONE_THRESHOLD
+        self.timing_headers = settings.QUERY_TIMING_HEADERS if timing_headers is None else timing_headers
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestQueryStats()
+        token = _current_request_stats.set(stats)
+        start = time.perf_counter()
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start" and self.timing_headers:
+                app_ms = (time.perf_counter() - start) * 1000
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "Server-Timing",
+                    f'db;dur={stats.db_time_ms:.1f};desc="{stats.query_count} queries", app;dur={app_ms:.1f}'
+                )
+                headers.append("X-DB-Queries", str(stats.query_count))
+                repeated = stats.repeated_shapes(self.n_plus_one_threshold)
+                if repeated:
+                    headers.append("X-DB-N-Plus-One", str(repeated[0][1]))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            _current_request_stats.reset(token)
+            duration_ms = (time.perf_counter() - start) * 1000
+            route = _route_label(scope)
+            repeated = stats.repeated_shapes(self.n_plus_one_threshold)
+            if repeated:
+                shape, count = repeated[0]
+                logger.warning(
+                    f"Possible N+1 on {route}: statement executed {count} times "
+                    f"({stats.query_count} queries total): {shape[:200]}"
+                )
+            route_metrics.record(route, duration_ms, stats, repeated)
@@ -0,0 +1,267 @@
+"""
+Read replica routing for read-only endpoints
+
+When DATABASE_READ_URL is set, reports, dashboards and the large summary
+endpoints read through ``get_read_db`` and are served by the replica instead of
+competing with cashier writes on the primary. A read falls back to the primary
+when:
+
+- the replica is unreachable (probe failed)
+- its replication lag exceeds DB_READ_MAX_LAG_SECONDS
+- the same client (bearer token) committed a write through this process that
+  the replica has not replayed yet, so an admin who just recorded a payment sees
+  it in the next report. Only transactions that ran INSERT/UPDATE/DELETE count,
+  and other clients (and background workers) keep reading from the replica
+
+The lag is probed every DB_READ_LAG_CHECK_SECONDS, and sooner (at most every
+RECHECK_AFTER_WRITE_SECONDS) when a write is newer than the point in time the
+last probe showed the replica consistent up to, so a caught-up replica keeps
+serving reads while cashiers are writing.
+"""
+
+import asyncio
+import hashlib
+import logging
+import re
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Minimum interval between probes triggered by a write the replica may not have yet
+RECHECK_AFTER_WRITE_SECONDS = 0.25
+
+# Clients whose last write time is remembered (least recently written dropped first)
+MAX_TRACKED_WRITERS = 1024
+
+# Connection.info flag: the current transaction changed data
+_WROTE = "read_replica_wrote"
+# Raw SQL writes (text() statements do not set the execution context's isinsert/isupdate/isdelete)
+_WRITE_STATEMENT = re.compile(r"^\s*(INSERT|UPDATE|DELETE|MERGE)\b", re.IGNORECASE)
+
+# Client (hashed bearer token) of the current request; None outside requests and for anonymous ones
+_current_writer: ContextVar[Optional[str]] = ContextVar("read_replica_writer", default=None)
+
+
+def writer_key(authorization: Optional[str]) -> Optional[str]:
+    """Read-your-writes scope of a request: its Authorization header, hashed"""
+    if not authorization:
+        return None
+    return hashlib.sha1(authorization.encode("utf-8")).hexdigest()
+
+
+def set_current_writer(key: Optional[str]):
+    """Scope read-your-writes to ``key``; returns the token for ``reset_current_writer``"""
+    return _current_writer.set(key)
+
+
+def reset_current_writer(token) -> None:
+    _current_writer.reset(token)
+
+# Seconds the replica is behind the primary (0 when it has replayed everything it received)
+POSTGRES_REPLICA_LAG_SQL = """
+SELECT CASE
+    WHEN NOT pg_is_in_recovery() THEN 0
+    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+END
+"""
+
+
+async def measure_replica_lag(engine: AsyncEngine) -> float:
+    """Replication lag of the replica behind ``engine`` in seconds (0 for non-PostgreSQL stand-ins)"""
+    if engine.dialect.name != "postgresql":
+        return 0.0
+    async with engine.connect() as conn:
+        lag = (await conn.execute(text(POSTGRES_REPLICA_LAG_SQL))).scalar()
+    return max(float(lag or 0), 0.0)
+
+
+class ReadReplicaRouter:
+    """
+    Session factory for read-only work: ``async with read_router() as db`` opens
+    a session on the replica when it is fresh enough, otherwise on the primary
+    """
+
+    def __init__(
+        self,
+        primary_factory: Callable[[], AsyncSession],
+        replica_factory: Optional[Callable[[], AsyncSession]] = None,
+        replica_engine: Optional[AsyncEngine] = None,
+        max_lag_seconds: Optional[float] = None,
+        check_interval_seconds: Optional[float] = None,
+        lag_probe: Optional[Callable[[], Awaitable[float]]] = None
+    ):
+        self.primary_factory = primary_factory
+        self.replica_factory = replica_factory
+        self.replica_engine = replica_engine
+        self.max_lag_seconds = settings.DB_READ_MAX_LAG_SECONDS if max_lag_seconds is None else max_lag_seconds
+        self.check_interval_seconds = (
+            settings.DB_READ_LAG_CHECK_SECONDS if check_interval_seconds is None else check_interval_seconds
+        )
+        self._lag_probe = lag_probe
+        self._probe_lock: Optional[asyncio.Lock] = None
+
+        self.last_lag_seconds: Optional[float] = None
+        self.last_check_at = 0.0
+        self.last_error: Optional[str] = None
+        # Wall-clock time the replica is known to have replayed up to (None: unavailable)
+        self.replica_consistent_at: Optional[float] = None
+        # Client -> wall-clock time of its last committed write
+        self._last_writes: "OrderedDict[str, float]" = OrderedDict()
+
+        self.replica_reads = 0
+        self.primary_reads = 0
+        self.fallbacks: Dict[str, int] = {"unavailable": 0, "lag": 0, "recent_write": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.replica_factory is not None
+
+    @property
+    def last_write_at(self) -> float:
+        """Last committed write of the current client (0 when it has none)"""
+        writer = _current_writer.get()
+        return self._last_writes.get(writer, 0.0) if writer is not None else 0.0
+
+    def note_write(self, writer: Optional[str] = None) -> None:
+        """``writer`` committed a write on the primary; its reads wait for the replica to replay it"""
+        writer = _current_writer.get() if writer is None else writer
+        if writer is None:
+            return
+        self._last_writes[writer] = time.time()
+        self._last_writes.move_to_end(writer)
+        while len(self._last_writes) > MAX_TRACKED_WRITERS:
+            self._last_writes.popitem(last=False)
+
+    def track_primary_writes(self, primary_engine: Engine) -> None:
+        """Record commits that changed data on the primary (sync) engine; async engines pass ``.sync_engine``"""
+        event.listen(primary_engine, "after_cursor_execute", _flag_write)
+        event.listen(primary_engine, "commit", self._on_commit)
+        event.listen(primary_engine, "rollback", _clear_write)
+
+    def _on_commit(self, conn) -> None:
+        if conn.info.pop(_WROTE, False):
+            self.note_write()
+
+    def _needs_probe(self) -> bool:
+        since_check = time.monotonic() - self.last_check_at
+        if since_check >= self.check_interval_seconds:
+            return True
+        behind_write = self.replica_consistent_at is not None and self.last_write_at > self.replica_consistent_at
+        return behind_write and since_check >= RECHECK_AFTER_WRITE_SECONDS
+
+    async def _refresh_lag(self) -> None:
+        if self._probe_lock is None:
+            self._probe_lock = asyncio.Lock()
+        async with self._probe_lock:
+            # Another read may have probed while this one waited for the lock
+            if not self._needs_probe():
+                return
+            probed_at = time.time()
+            try:
+                if self._lag_probe is not None:
+                    lag = await self._lag_probe()
+                else:
+                    lag = await asyncio.wait_for(
+                        measure_replica_lag(self.replica_engine), timeout=settings.DB_HEALTH_TIMEOUT_SECONDS
+                    )
+                self.last_lag_seconds = lag
+                self.replica_consistent_at = probed_at - lag
+                self.last_error = None
+            except Exception as e:
+                if self.last_error is None:
+                    logger.warning(f"Read replica unavailable, reading from primary: {e}")
+                self.last_lag_seconds = None
+                self.replica_consistent_at = None
+                self.last_error = str(e) or e.__class__.__name__
+            self.last_check_at = time.monotonic()
+
+    async def choose(self) -> str:
+        """Target of the next read: 'replica' or 'primary'"""
+        if not self.enabled:
+            self.primary_reads += 1
+            return "primary"
+
+        if self._needs_probe():
+            await self._refresh_lag()
+
+        if self.replica_consistent_at is None:
+            reason = "unavailable"
+        elif self.last_lag_seconds > self.max_lag_seconds:
+            reason = "lag"
+        elif self.last_write_at > self.replica_consistent_at:
+            reason = "recent_write"
+        else:
+            self.replica_reads += 1
+            return "replica"
+
+        self.fallbacks[reason] += 1
+        self.primary_reads += 1
+        return "primary"
+
+    @asynccontextmanager
+    async def session(self) -> AsyncIterator[AsyncSession]:
+        target = await self.choose()
+        factory = self.replica_factory if target == "replica" else self.primary_factory
+        async with factory() as session:
+            session.info["read_target"] = target
+            yield session
+
+    __call__ = session
+
+    def get_stats(self) -> Dict[str, Any]:
+        reads = self.replica_reads + self.primary_reads
+        return {
+            "enabled": self.enabled,
+            "max_lag_seconds": self.max_lag_seconds,
+            "last_lag_seconds": round(self.last_lag_seconds, 3) if self.last_lag_seconds is not None else None,
+            "last_error": self.last_error,
+            "replica_reads": self.replica_reads,
+            "primary_reads": self.primary_reads,
+            "replica_share": round(self.replica_reads / reads, 4) if reads else 0.0,
+            "fallbacks": dict(self.fallbacks),
+            "tracked_writers": len(self._last_writes)
+        }
+
+
+def _flag_write(conn, cursor, statement, parameters, context, executemany) -> None:
+    if context is not None and (context.isinsert or context.isupdate or context.isdelete):
+        conn.info[_WROTE] = True
+    elif _WRITE_STATEMENT.match(statement):
+        conn.info[_WROTE] = True
+
+
+def _clear_write(conn) -> None:
+    conn.info.pop(_WROTE, None)
+
+
+class ReadYourWritesMiddleware:
+    """
+    Pure ASGI middleware: scopes read-your-writes to the client of each HTTP
+    request, so one client's write only routes that client's reads to the primary
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        authorization = dict(scope.get("headers") or []).get(b"authorization")
+        token = set_current_writer(writer_key(authorization.decode("latin-1") if authorization else None))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            reset_current_writer(token)
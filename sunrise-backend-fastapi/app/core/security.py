@@ -1,5 +1,9 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Any, Union, Optional
+from typing import Any, Callable, Dict, Union, Optional
 from jose import jwt
 from passlib.context import CryptContext
 from fastapi import HTTPException, status
@@ -56,6 +60,119 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+class PasswordHashPool:
+    """
+    Bounded thread pool for bcrypt work called from async handlers.
+
+    A bcrypt verify takes ~200ms of CPU; running it on the event loop stalls every
+    other request. The bcrypt extension releases the GIL, so a small thread pool
+    runs hashes in parallel while the loop keeps serving. At most ``max_concurrency``
+    hashes run at once; further callers wait in FIFO order and are counted as queued.
+    """
+
+    def __init__(self, max_concurrency: int):
+        self.max_concurrency = max(1, max_concurrency)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._semaphores: Dict[int, asyncio.Semaphore] = {}
+        self._lock = threading.Lock()
+        self._reset_counters()
+
+    def _reset_counters(self) -> None:
+        self.queued = 0
+        self.running = 0
+        self.max_queued = 0
+        self.completed = 0
+        self.failed = 0
+        self.total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+        self.total_run_ms = 0.0
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # One semaphore per event loop (tests and workers may run several loops)
+        loop_id = id(asyncio.get_running_loop())
+        with self._lock:
+            if loop_id not in self._semaphores:
+                self._semaphores[loop_id] = asyncio.Semaphore(self.max_concurrency)
+            return self._semaphores[loop_id]
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_concurrency, thread_name_prefix="password-hash"
+                )
+            return self._executor
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Run a blocking hash function in the pool, respecting the concurrency cap"""
+        semaphore = self._get_semaphore()
+        enqueued_at = time.perf_counter()
+        self.queued += 1
+        self.max_queued = max(self.max_queued, self.queued)
+        try:
+            await semaphore.acquire()
+        finally:
+            self.queued -= 1
+
+        started_at = time.perf_counter()
+        wait_ms = (started_at - enqueued_at) * 1000
+        self.total_wait_ms += wait_ms
+        self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+        self.running += 1
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._get_executor(), func, *args)
+            self.completed += 1
+            return result
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.running -= 1
+            self.total_run_ms += (time.perf_counter() - started_at) * 1000
+            semaphore.release()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Queue metrics for monitoring"""
+        finished = self.completed + self.failed
+        return {
+            "max_concurrency": self.max_concurrency,
+            "running": self.running,
+            "queued": self.queued,
+            "max_queued": self.max_queued,
+            "completed": self.completed,
+            "failed": self.failed,
+            "avg_wait_ms": round(self.total_wait_ms / finished, 2) if finished else 0.0,
+            "max_wait_ms": round(self.max_wait_ms, 2),
+            "avg_run_ms": round(self.total_run_ms / finished, 2) if finished else 0.0
+        }
+
+    def reset_stats(self) -> None:
+        self._reset_counters()
+
+
+# Global password hashing pool
+password_hash_pool = PasswordHashPool(max_concurrency=settings.PASSWORD_HASH_MAX_CONCURRENCY)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """
+    verify_password for async handlers: bcrypt runs in the password hash pool.
+    Raises ValueError if password exceeds 72 bytes for bcrypt compatibility.
+    """
+    _validate_password_length(plain_password)
+    return await password_hash_pool.run(pwd_context.verify, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """
+    get_password_hash for async handlers: bcrypt runs in the password hash pool.
+    Raises ValueError if password exceeds 72 bytes for bcrypt compatibility.
+    """
+    _validate_password_length(password)
+    return await password_hash_pool.run(pwd_context.hash, password)
+
+
 def verify_token(token: str) -> Optional[str]:
     """
     Verify a JWT token and return the user ID if valid.
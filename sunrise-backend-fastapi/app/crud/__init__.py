@@ -3,6 +3,7 @@ from .crud_user import user_crud
 from .crud_student import student_crud
 from .crud_teacher import teacher_crud
 from .crud_fee import fee_structure_crud, fee_record_crud, fee_payment_crud
+from .crud_fee_balance import fee_balance_crud
 from .crud_leave import leave_request_crud
 from .crud_expense import expense_crud
 from .crud_report import report_crud
@@ -31,6 +32,7 @@ __all__ = [
     "fee_structure_crud",
     "fee_record_crud",
     "fee_payment_crud",
+    "fee_balance_crud",
     "leave_request_crud",
     "expense_crud",
     "alert_crud",
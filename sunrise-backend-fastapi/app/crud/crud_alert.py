@@ -1,19 +1,140 @@
 """
 CRUD operations for Alert system
 Following established patterns from crud_leave.py and crud_fee.py
+
+Unread counts are served from alert_unread_counters, one row per visibility
+bucket (a targeted user, a role, everyone). The counters move with every alert
+write in the writer's transaction: ORM inserts/updates of alerts adjust them from
+mapper events, and mark_all_as_read applies the buckets its UPDATE returned.
+Status changes lock the alert row first, so two users reading the same role or
+broadcast alert at once decrement its bucket only once.
 """
 
+from collections import Counter
 from typing import List, Optional, Dict, Any, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import joinedload
-from sqlalchemy import and_, or_, func, desc, update, text
+from sqlalchemy import String, and_, case, or_, func, desc, update, text, delete, event, inspect, tuple_
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from datetime import datetime, timedelta
 
 from app.crud.base import CRUDBase
-from app.models.alert import Alert, AlertType, AlertStatus
+from app.models.alert import Alert, AlertType, AlertStatus, AlertUnreadCounter
 from app.schemas.alert import AlertCreate, AlertUpdate, AlertFilters
 
+UNREAD_STATUS_ID = 1
+
+# (recipient_type, recipient_key) of alert_unread_counters
+RecipientKey = Tuple[str, str]
+
+BROADCAST_RECIPIENT: RecipientKey = ("ALL", "*")
+
+
+def recipient_of(target_user_id: Optional[int], target_role: Optional[str]) -> RecipientKey:
+    """Counter bucket of an alert: its target user, else its target role, else everyone"""
+    if target_user_id is not None:
+        return ("USER", str(target_user_id))
+    if target_role is not None:
+        return ("ROLE", target_role)
+    return BROADCAST_RECIPIENT
+
+
+def recipients_for_user(user_id: int, user_role: str) -> List[RecipientKey]:
+    """Counter buckets whose alerts a user sees"""
+    return [("USER", str(user_id)), ("ROLE", user_role), BROADCAST_RECIPIENT]
+
+
+def visible_to(user_id: int, user_role: str):
+    """
+    Alerts a user sees (one branch per partial index in T810_alerts.sql):
+    1. If target_user_id is set, ONLY that specific user should see it
+    2. If target_user_id is NULL and target_role is set, all users with that role see it
+    3. If both target_role and target_user_id are NULL, it's a broadcast (everyone sees it)
+    """
+    return and_(
+        Alert.is_deleted == False,
+        or_(
+            Alert.target_user_id == user_id,
+            and_(
+                Alert.target_role == user_role,
+                Alert.target_user_id.is_(None)
+            ),
+            and_(
+                Alert.target_role.is_(None),
+                Alert.target_user_id.is_(None)
+            )
+        )
+    )
+
+
+def apply_unread_deltas(connection, deltas: Dict[RecipientKey, int]) -> None:
+    """Add ``deltas`` to the counter rows (created on first use) on ``connection``"""
+    rows = [
+        {"recipient_type": recipient_type, "recipient_key": recipient_key, "unread_count": delta}
+        for (recipient_type, recipient_key), delta in sorted(deltas.items()) if delta
+    ]
+    if not rows:
+        return
+    insert = postgresql_insert if connection.dialect.name == "postgresql" else sqlite_insert
+    statement = insert(AlertUnreadCounter).values(rows)
+    statement = statement.on_conflict_do_update(
+        index_elements=["recipient_type", "recipient_key"],
+        set_={
+            "unread_count": AlertUnreadCounter.unread_count + statement.excluded.unread_count,
+            "updated_at": func.now()
+        }
+    )
+    connection.execute(statement)
+
+
+# =====================================================
+# Maintenance hooks
+# =====================================================
+
+def _history_value(state, attribute: str, before: bool):
+    history = state.attrs[attribute].history
+    if before and history.deleted:
+        return history.deleted[0]
+    return getattr(state.object, attribute)
+
+
+def _unread_bucket(state, before: bool) -> Optional[RecipientKey]:
+    """Counter bucket the alert counted in before/after this flush (None: not unread)"""
+    status_id = _history_value(state, "alert_status_id", before)
+    is_deleted = _history_value(state, "is_deleted", before)
+    if status_id != UNREAD_STATUS_ID or is_deleted:
+        return None
+    return recipient_of(_history_value(state, "target_user_id", before), _history_value(state, "target_role", before))
+
+
+@event.listens_for(Alert, "after_insert")
+def _count_inserted_alert(mapper, connection, target):
+    bucket = _unread_bucket(inspect(target), before=False)
+    if bucket is not None:
+        apply_unread_deltas(connection, {bucket: 1})
+
+
+@event.listens_for(Alert, "after_update")
+def _count_updated_alert(mapper, connection, target):
+    state = inspect(target)
+    deltas = Counter()
+    before, after = _unread_bucket(state, before=True), _unread_bucket(state, before=False)
+    if before != after:
+        if before is not None:
+            deltas[before] -= 1
+        if after is not None:
+            deltas[after] += 1
+        apply_unread_deltas(connection, deltas)
+
+
+@event.listens_for(Alert, "after_delete")
+def _count_deleted_alert(mapper, connection, target):
+    bucket = _unread_bucket(inspect(target), before=True)
+    if bucket is not None:
+        apply_unread_deltas(connection, {bucket: -1})
+
 
 class CRUDAlert(CRUDBase[Alert, AlertCreate, AlertUpdate]):
     """
@@ -87,36 +208,15 @@ class CRUDAlert(CRUDBase[Alert, AlertCreate, AlertUpdate]):
     ) -> Tuple[List[Alert], int]:
         """Get alerts visible to a specific user/role with filtering and pagination"""
 
-        # Base query with relationships
-        # Alert visibility logic:
-        # 1. If target_user_id is set, ONLY that specific user should see it
-        # 2. If target_user_id is NULL and target_role is set, all users with that role see it
-        # 3. If both target_role and target_user_id are NULL, it's a broadcast (everyone sees it)
+        # Base query with relationships; the total comes from a window count over the
+        # filtered rows, so the page and its total are read in one scan
         query = (
-            select(Alert)
+            select(Alert, func.count(Alert.id).over().label("total_count"))
             .options(
                 joinedload(Alert.alert_type),
                 joinedload(Alert.alert_status)
             )
-            .where(
-                and_(
-                    or_(Alert.is_deleted == False, Alert.is_deleted.is_(None)),
-                    or_(
-                        # Case 1: Targeted to specific user (ignore role, only user_id matters)
-                        Alert.target_user_id == user_id,
-                        # Case 2: Targeted to role only (no specific user)
-                        and_(
-                            Alert.target_role == user_role,
-                            Alert.target_user_id.is_(None)
-                        ),
-                        # Case 3: Broadcast - visible to everyone (both NULL)
-                        and_(
-                            Alert.target_role.is_(None),
-                            Alert.target_user_id.is_(None)
-                        )
-                    )
-                )
-            )
+            .where(visible_to(user_id, user_role))
         )
 
         # Apply filters if provided
@@ -146,18 +246,23 @@ class CRUDAlert(CRUDBase[Alert, AlertCreate, AlertUpdate]):
                     AlertType.category == filters.category
                 )
 
-        # Get total count before pagination
-        count_subquery = query.with_only_columns(func.count(Alert.id)).order_by(None)
-        total_result = await db.execute(count_subquery)
-        total = total_result.scalar() or 0
-
         # Apply ordering and pagination
-        query = query.order_by(desc(Alert.created_at)).offset(skip).limit(limit)
+        query = query.order_by(desc(Alert.created_at), desc(Alert.id)).offset(skip).limit(limit)
         
         result = await db.execute(query)
-        alerts = result.unique().scalars().all()
+        rows = result.unique().all()
+        alerts = [row[0] for row in rows]
+
+        if rows:
+            total = rows[0].total_count
+        elif skip == 0:
+            total = 0
+        else:
+            # Page past the end: no row carries the total
+            count_query = query.with_only_columns(func.count(Alert.id)).order_by(None).offset(None).limit(None)
+            total = (await db.execute(count_query)).scalar() or 0
 
-        return list(alerts), total
+        return alerts, total
 
     async def get_with_details(self, db: AsyncSession, id: int) -> Optional[Alert]:
         """Get a single alert with all relationship details"""
@@ -179,30 +284,67 @@ class CRUDAlert(CRUDBase[Alert, AlertCreate, AlertUpdate]):
         user_id: int,
         user_role: str
     ) -> int:
-        """Get count of unread alerts for a user"""
-        # Same visibility logic as get_alerts_for_user
-        query = select(func.count(Alert.id)).where(
-            and_(
-                or_(Alert.is_deleted == False, Alert.is_deleted.is_(None)),
-                Alert.alert_status_id == 1,  # UNREAD
-                or_(
-                    # Case 1: Targeted to specific user
-                    Alert.target_user_id == user_id,
-                    # Case 2: Targeted to role only (no specific user)
-                    and_(
-                        Alert.target_role == user_role,
-                        Alert.target_user_id.is_(None)
-                    ),
-                    # Case 3: Broadcast - visible to everyone
-                    and_(
-                        Alert.target_role.is_(None),
-                        Alert.target_user_id.is_(None)
-                    )
-                )
+        """Get count of unread alerts for a user (sum of their three counter rows)"""
+        query = select(func.coalesce(func.sum(AlertUnreadCounter.unread_count), 0)).where(
+            tuple_(AlertUnreadCounter.recipient_type, AlertUnreadCounter.recipient_key).in_(
+                recipients_for_user(user_id, user_role)
             )
         )
         result = await db.execute(query)
-        return result.scalar() or 0
+        return max(result.scalar() or 0, 0)
+
+    async def rebuild_unread_counters(self, db: AsyncSession) -> Dict[str, int]:
+        """
+        Recount every counter row from the alerts table (repairs drift from writes
+        made outside the application); returns the number of buckets that changed
+
+        On PostgreSQL the counter table is locked first (EXCLUSIVE: plain reads go on,
+        counter writes wait). Alert writes that already moved a counter have committed
+        by the time the lock is granted, so the recount sees them; later ones apply
+        their delta on top of the rebuilt rows. Without the lock, a write committed
+        between the two reads below would be counted twice or dropped.
+        """
+        if db.get_bind().dialect.name == "postgresql":
+            await db.execute(text("LOCK TABLE alert_unread_counters IN EXCLUSIVE MODE"))
+
+        bucket_type = case(
+            (Alert.target_user_id.isnot(None), "USER"),
+            (Alert.target_role.isnot(None), "ROLE"),
+            else_="ALL"
+        )
+        bucket_key = case(
+            (Alert.target_user_id.isnot(None), func.cast(Alert.target_user_id, String)),
+            (Alert.target_role.isnot(None), Alert.target_role),
+            else_="*"
+        )
+        actual_rows = await db.execute(
+            select(bucket_type, bucket_key, func.count(Alert.id))
+            .where(Alert.alert_status_id == UNREAD_STATUS_ID, Alert.is_deleted == False)
+            .group_by(bucket_type, bucket_key)
+        )
+        actual = {(row[0], row[1]): row[2] for row in actual_rows}
+        stored_rows = await db.execute(
+            select(AlertUnreadCounter.recipient_type, AlertUnreadCounter.recipient_key, AlertUnreadCounter.unread_count)
+        )
+        stored = {(row[0], row[1]): row[2] for row in stored_rows}
+
+        deltas = {
+            key: actual.get(key, 0) - stored.get(key, 0)
+            for key in set(actual) | set(stored)
+            if actual.get(key, 0) != stored.get(key, 0)
+        }
+        if deltas:
+            connection = await db.connection()
+            await connection.run_sync(lambda sync_connection: apply_unread_deltas(sync_connection, deltas))
+        await db.execute(delete(AlertUnreadCounter).where(AlertUnreadCounter.unread_count == 0))
+        await db.commit()
+        return {"buckets": len(actual), "repaired": len(deltas)}
+
+    async def _get_for_update(self, db: AsyncSession, alert_id: int) -> Optional[Alert]:
+        """Load an alert with its row locked, so concurrent status changes apply once"""
+        query = select(Alert).where(Alert.id == alert_id).with_for_update().execution_options(populate_existing=True)
+        result = await db.execute(query)
+        return result.scalar_one_or_none()
 
     async def mark_as_read(
         self,
@@ -212,7 +354,7 @@ class CRUDAlert(CRUDBase[Alert, AlertCreate, AlertUpdate]):
         user_id: int
     ) -> Optional[Alert]:
         """Mark an alert as read"""
-        alert = await self.get(db, id=alert_id)
+        alert = await self._get_for_update(db, alert_id)
         if alert and alert.alert_status_id == 1:  # Only update if UNREAD
             alert.alert_status_id = 2  # READ
             alert.read_at = datetime.utcnow()
@@ -231,27 +373,14 @@ class CRUDAlert(CRUDBase[Alert, AlertCreate, AlertUpdate]):
         user_role: str
     ) -> int:
         """Mark all unread alerts as read for a user"""
-        # Same visibility logic as get_alerts_for_user
+        from app.services.alert_broker import mark_alert_counts_changed
+
         stmt = (
             update(Alert)
             .where(
                 and_(
-                    or_(Alert.is_deleted == False, Alert.is_deleted.is_(None)),
-                    Alert.alert_status_id == 1,  # UNREAD
-                    or_(
-                        # Case 1: Targeted to specific user
-                        Alert.target_user_id == user_id,
-                        # Case 2: Targeted to role only (no specific user)
-                        and_(
-                            Alert.target_role == user_role,
-                            Alert.target_user_id.is_(None)
-                        ),
-                        # Case 3: Broadcast - visible to everyone
-                        and_(
-                            Alert.target_role.is_(None),
-                            Alert.target_user_id.is_(None)
-                        )
-                    )
+                    visible_to(user_id, user_role),
+                    Alert.alert_status_id == UNREAD_STATUS_ID
                 )
             )
             .values(
@@ -260,10 +389,21 @@ class CRUDAlert(CRUDBase[Alert, AlertCreate, AlertUpdate]):
                 read_by=user_id,
                 updated_at=datetime.utcnow()
             )
+            .returning(Alert.target_user_id, Alert.target_role)
+            .execution_options(synchronize_session=False)
         )
         result = await db.execute(stmt)
+        targets = result.all()
+        deltas = Counter()
+        for target_user_id, target_role in targets:
+            deltas[recipient_of(target_user_id, target_role)] -= 1
+        # Only the streams that can see the updated alerts recount
+        mark_alert_counts_changed(db, targets)
+        if deltas:
+            connection = await db.connection()
+            await connection.run_sync(lambda sync_connection: apply_unread_deltas(sync_connection, deltas))
         await db.commit()
-        return result.rowcount
+        return -sum(deltas.values())
 
     async def acknowledge_alert(
         self,
@@ -273,7 +413,7 @@ class CRUDAlert(CRUDBase[Alert, AlertCreate, AlertUpdate]):
         user_id: int
     ) -> Optional[Alert]:
         """Acknowledge an alert (for alerts that require acknowledgment)"""
-        alert = await self.get(db, id=alert_id)
+        alert = await self._get_for_update(db, alert_id)
         if alert:
             alert.alert_status_id = 3  # ACKNOWLEDGED
             alert.acknowledged_at = datetime.utcnow()
@@ -296,7 +436,7 @@ class CRUDAlert(CRUDBase[Alert, AlertCreate, AlertUpdate]):
         user_id: int
     ) -> Optional[Alert]:
         """Dismiss/soft-delete an alert"""
-        alert = await self.get(db, id=alert_id)
+        alert = await self._get_for_update(db, alert_id)
         if alert:
             alert.is_deleted = True
             alert.deleted_date = datetime.utcnow()
@@ -318,23 +458,7 @@ class CRUDAlert(CRUDBase[Alert, AlertCreate, AlertUpdate]):
         """Get alert statistics for dashboard"""
 
         # Base filter for user's visible alerts (same visibility logic as get_alerts_for_user)
-        base_conditions = [
-            or_(Alert.is_deleted == False, Alert.is_deleted.is_(None)),
-            or_(
-                # Case 1: Targeted to specific user
-                Alert.target_user_id == user_id,
-                # Case 2: Targeted to role only (no specific user)
-                and_(
-                    Alert.target_role == user_role,
-                    Alert.target_user_id.is_(None)
-                ),
-                # Case 3: Broadcast - visible to everyone
-                and_(
-                    Alert.target_role.is_(None),
-                    Alert.target_user_id.is_(None)
-                )
-            )
-        ]
+        base_conditions = [visible_to(user_id, user_role)]
 
         # Add session year filter if provided
         if session_year_id:
@@ -347,12 +471,15 @@ class CRUDAlert(CRUDBase[Alert, AlertCreate, AlertUpdate]):
         total_result = await db.execute(total_query)
         total_alerts = total_result.scalar() or 0
 
-        # Unread count
-        unread_query = select(func.count(Alert.id)).where(
-            and_(base_filter, Alert.alert_status_id == 1)
-        )
-        unread_result = await db.execute(unread_query)
-        unread_count = unread_result.scalar() or 0
+        # Unread count (counters cover all sessions)
+        if session_year_id:
+            unread_query = select(func.count(Alert.id)).where(
+                and_(base_filter, Alert.alert_status_id == UNREAD_STATUS_ID)
+            )
+            unread_result = await db.execute(unread_query)
+            unread_count = unread_result.scalar() or 0
+        else:
+            unread_count = await self.get_unread_count(db, user_id=user_id, user_role=user_role)
 
         # By category
         category_query = (
@@ -2,7 +2,9 @@ from typing import List, Optional, Tuple, Dict, Any
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload, joinedload
-from sqlalchemy import and_, or_, func, desc, text
+from sqlalchemy import and_, or_, func, desc, text, literal_column
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from datetime import date, datetime, timedelta
 
 from app.crud.base import CRUDBase
@@ -12,9 +14,12 @@ from app.models.user import User
 from app.models.metadata import Class, SessionYear
 from app.schemas.attendance import (
     AttendanceRecordCreate, AttendanceRecordUpdate, AttendanceFilters,
-    BulkAttendanceCreate
+    BulkAttendanceCreate, BulkAttendanceItem, BulkAttendanceSchoolCreate
 )
 
+# Rows per INSERT ... ON CONFLICT statement (keeps bind parameters well below driver limits)
+UPSERT_BATCH_SIZE = 500
+
 
 class CRUDAttendanceRecord(CRUDBase[AttendanceRecord, AttendanceRecordCreate, AttendanceRecordUpdate]):
     """
@@ -46,63 +51,139 @@ class CRUDAttendanceRecord(CRUDBase[AttendanceRecord, AttendanceRecordCreate, At
         bulk_data: BulkAttendanceCreate,
         marked_by: int
     ) -> Dict[str, Any]:
-        """Create multiple attendance records at once"""
-        created_count = 0
-        updated_count = 0
-        errors = []
-        
-        for item in bulk_data.records:
-            try:
-                # Check if record already exists
-                existing_query = select(AttendanceRecord).where(
-                    and_(
-                        AttendanceRecord.student_id == item.student_id,
-                        AttendanceRecord.attendance_date == bulk_data.attendance_date,
-                        AttendanceRecord.attendance_period_id == bulk_data.attendance_period_id
-                    )
-                )
-                result = await db.execute(existing_query)
-                existing_record = result.scalar_one_or_none()
-                
-                if existing_record:
-                    # Update existing record
-                    existing_record.attendance_status_id = item.attendance_status_id
-                    existing_record.check_in_time = item.check_in_time
-                    existing_record.remarks = item.remarks
-                    existing_record.marked_by = marked_by
-                    existing_record.updated_at = datetime.utcnow()
-                    updated_count += 1
-                else:
-                    # Create new record
-                    new_record = AttendanceRecord(
-                        student_id=item.student_id,
-                        class_id=bulk_data.class_id,
-                        session_year_id=bulk_data.session_year_id,
-                        attendance_date=bulk_data.attendance_date,
-                        attendance_status_id=item.attendance_status_id,
-                        attendance_period_id=bulk_data.attendance_period_id,
-                        check_in_time=item.check_in_time,
-                        remarks=item.remarks,
-                        marked_by=marked_by
-                    )
-                    db.add(new_record)
-                    created_count += 1
-                    
-            except Exception as e:
-                errors.append({
-                    "student_id": item.student_id,
-                    "error": str(e)
-                })
-        
+        """Create or update attendance records for one class in a single upsert"""
+        counts = await self._upsert_records(
+            db,
+            session_year_id=bulk_data.session_year_id,
+            attendance_date=bulk_data.attendance_date,
+            attendance_period_id=bulk_data.attendance_period_id,
+            records_by_class={bulk_data.class_id: bulk_data.records},
+            marked_by=marked_by
+        )
         await db.commit()
-        
+
+        created_count = counts[bulk_data.class_id]["created"]
+        updated_count = counts[bulk_data.class_id]["updated"]
         return {
             "created": created_count,
             "updated": updated_count,
-            "errors": errors,
+            "errors": [],
             "total_processed": created_count + updated_count
         }
 
+    async def create_bulk_school(
+        self,
+        db: AsyncSession,
+        *,
+        bulk_data: BulkAttendanceSchoolCreate,
+        marked_by: int
+    ) -> Dict[str, Any]:
+        """Create or update attendance records for several classes in one transaction"""
+        counts = await self._upsert_records(
+            db,
+            session_year_id=bulk_data.session_year_id,
+            attendance_date=bulk_data.attendance_date,
+            attendance_period_id=bulk_data.attendance_period_id,
+            records_by_class={item.class_id: item.records for item in bulk_data.classes},
+            marked_by=marked_by
+        )
+        await db.commit()
+
+        created_count = sum(class_counts["created"] for class_counts in counts.values())
+        updated_count = sum(class_counts["updated"] for class_counts in counts.values())
+        return {
+            "created": created_count,
+            "updated": updated_count,
+            "errors": [],
+            "total_processed": created_count + updated_count,
+            "classes": [
+                {"class_id": class_id, **class_counts}
+                for class_id, class_counts in counts.items()
+            ]
+        }
+
+    async def _upsert_records(
+        self,
+        db: AsyncSession,
+        *,
+        session_year_id: int,
+        attendance_date: date,
+        attendance_period_id: int,
+        records_by_class: Dict[int, List[BulkAttendanceItem]],
+        marked_by: int
+    ) -> Dict[int, Dict[str, int]]:
+        """
+        INSERT ... ON CONFLICT (student_id, attendance_date, attendance_period_id) DO UPDATE
+        in chunks of UPSERT_BATCH_SIZE rows. Existing records keep their class and
+        session; status, check-in time, remarks and marker are overwritten.
+
+        PostgreSQL reports inserted vs updated rows through RETURNING (xmax = 0).
+        Other dialects (SQLite in tests) look up the existing keys with one SELECT
+        per chunk before the upsert.
+
+        Returns {class_id: {"created": n, "updated": n}}.
+        """
+        # A student listed twice keeps the last entry (one row per conflict key per statement)
+        rows_by_student: Dict[int, Dict[str, Any]] = {}
+        class_by_student: Dict[int, int] = {}
+        for class_id, records in records_by_class.items():
+            for item in records:
+                rows_by_student[item.student_id] = {
+                    "student_id": item.student_id,
+                    "class_id": class_id,
+                    "session_year_id": session_year_id,
+                    "attendance_date": attendance_date,
+                    "attendance_status_id": item.attendance_status_id,
+                    "attendance_period_id": attendance_period_id,
+                    "check_in_time": item.check_in_time,
+                    "remarks": item.remarks,
+                    "marked_by": marked_by
+                }
+                class_by_student[item.student_id] = class_id
+
+        counts = {class_id: {"created": 0, "updated": 0} for class_id in records_by_class}
+        is_postgresql = db.get_bind().dialect.name == "postgresql"
+        insert = postgresql_insert if is_postgresql else sqlite_insert
+        rows = list(rows_by_student.values())
+
+        for start in range(0, len(rows), UPSERT_BATCH_SIZE):
+            batch = rows[start:start + UPSERT_BATCH_SIZE]
+            statement = insert(AttendanceRecord).values(batch)
+            statement = statement.on_conflict_do_update(
+                index_elements=["student_id", "attendance_date", "attendance_period_id"],
+                set_={
+                    "attendance_status_id": statement.excluded.attendance_status_id,
+                    "check_in_time": statement.excluded.check_in_time,
+                    "remarks": statement.excluded.remarks,
+                    "marked_by": statement.excluded.marked_by,
+                    "updated_at": func.now()
+                }
+            )
+
+            if is_postgresql:
+                result = await db.execute(statement.returning(
+                    AttendanceRecord.student_id, literal_column("(xmax = 0)").label("inserted")
+                ))
+                outcomes = [(row.student_id, bool(row.inserted)) for row in result]
+            else:
+                existing_result = await db.execute(
+                    select(AttendanceRecord.student_id).where(
+                        and_(
+                            AttendanceRecord.student_id.in_([row["student_id"] for row in batch]),
+                            AttendanceRecord.attendance_date == attendance_date,
+                            AttendanceRecord.attendance_period_id == attendance_period_id
+                        )
+                    )
+                )
+                existing = set(existing_result.scalars().all())
+                await db.execute(statement)
+                outcomes = [(row["student_id"], row["student_id"] not in existing) for row in batch]
+
+            for student_id, inserted in outcomes:
+                counts[class_by_student[student_id]]["created" if inserted else "updated"] += 1
+
+        return counts
+
     async def get_with_details(self, db: AsyncSession, id: int) -> Optional[Dict[str, Any]]:
         """Get attendance record with all related details"""
         query = """
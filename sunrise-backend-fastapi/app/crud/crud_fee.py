@@ -54,6 +54,23 @@ class CRUDFeeStructure(CRUDBase[FeeStructure, FeeStructureCreate, FeeStructureUp
         )
         return result.scalar_one_or_none()
 
+    async def get_by_class_ids_and_session_id(
+        self, db: AsyncSession, *, class_ids: List[int], session_year_id: int
+    ) -> Dict[int, FeeStructure]:
+        """Get fee structures for several classes in one query, keyed by class ID"""
+        if not class_ids:
+            return {}
+
+        result = await db.execute(
+            select(FeeStructure).where(
+                and_(
+                    FeeStructure.class_id.in_(class_ids),
+                    FeeStructure.session_year_id == session_year_id
+                )
+            )
+        )
+        return {structure.class_id: structure for structure in result.scalars().all()}
+
     async def get_all_structures(self, db: AsyncSession) -> List[FeeStructure]:
         result = await db.execute(
             select(FeeStructure)
@@ -351,6 +368,26 @@ class CRUDFeePayment(CRUDBase[FeePayment, FeePaymentCreate, FeePaymentUpdate]):
         result = await db.execute(query)
         return result.scalars().all()
 
+    async def get_total_paid_by_students(
+        self, db: AsyncSession, *, student_ids: List[int], session_year_id: int
+    ) -> Dict[int, float]:
+        """Get the net amount paid per student for a session in one grouped query"""
+        if not student_ids:
+            return {}
+
+        result = await db.execute(
+            select(FeeRecord.student_id, func.coalesce(func.sum(FeePayment.amount), 0))
+            .join(FeeRecord, FeePayment.fee_record_id == FeeRecord.id)
+            .where(
+                and_(
+                    FeeRecord.student_id.in_(student_ids),
+                    FeeRecord.session_year_id == session_year_id
+                )
+            )
+            .group_by(FeeRecord.student_id)
+        )
+        return {student_id: float(total) for student_id, total in result.all()}
+
     async def reverse_payment_full(
         self,
         db: AsyncSession,
@@ -0,0 +1,494 @@
+"""
+CRUD operations for the student_fee_balances rollup
+
+A balance row summarizes one student's tuition and transport monthly tracking
+for a session. It is kept current inside the writer's transaction:
+
+- ORM inserts/updates/deletes of MonthlyFeeTracking, TransportMonthlyTracking
+  and FeeRecord mark their (student_id, session_year_id) key in Session.info;
+- raw SQL writers (allocate_payment_to_months, the enable_*_tracking database
+  functions) call ``mark_fee_balances_stale``;
+- before the transaction commits, the marked keys are recomputed from their
+  tracking rows and written with one upsert.
+
+A key is recomputed from its own tracking rows (a couple of dozen, read through
+the student indexes) rather than adjusted by deltas, so capped allocations and
+reversals can never leave it off by an amount. ``reconcile`` recomputes whole
+sessions to repair drift from writes that bypass the application (SQL scripts)
+and to roll the overdue figures forward to the current date.
+"""
+
+import logging
+import time
+from datetime import date
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import and_, case, delete, event, func, or_, select, tuple_
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, object_session
+
+from app.models.fee import FeePayment, FeeRecord, MonthlyFeeTracking, StudentFeeBalance
+from app.models.metadata import Class
+from app.models.student import Student
+from app.models.transport import StudentTransportEnrollment, TransportMonthlyTracking, TransportPayment
+
+logger = logging.getLogger(__name__)
+
+# (student_id, session_year_id)
+BalanceKey = Tuple[int, int]
+
+# Session.info key holding the balance keys written in the current transaction
+_STALE_KEYS = "fee_balances_stale"
+
+UPSERT_BATCH_SIZE = 500
+
+_CENT = Decimal("0.01")
+
+# Columns that only change when tracking rows change
+LEDGER_FIELDS = (
+    "months_tracked", "paid_months", "partial_months", "pending_months",
+    "tuition_expected", "tuition_paid", "tuition_balance",
+    "transport_months", "transport_expected", "transport_paid", "transport_balance",
+    "expected_amount", "paid_amount", "balance_amount",
+    "oldest_unpaid_due_date", "last_payment_date"
+)
+# Columns that also move with the calendar (months falling due)
+OVERDUE_FIELDS = ("tuition_overdue_months", "tuition_overdue_amount", "overdue_months", "overdue_amount")
+
+
+def _money(value: Any) -> Decimal:
+    return Decimal(str(value or 0)).quantize(_CENT)
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, (Decimal, float)):
+        return _money(value)
+    return value
+
+
+def mark_fee_balances_stale(db, keys: Iterable[BalanceKey]) -> None:
+    """Queue balance keys for recompute at commit (for writes the ORM does not see)"""
+    db.info.setdefault(_STALE_KEYS, set()).update(
+        (student_id, session_year_id) for student_id, session_year_id in keys
+        if student_id is not None and session_year_id is not None
+    )
+
+
+# =====================================================
+# Recompute (sync Session; async callers use run_sync)
+# =====================================================
+
+def _key_filter(student_column, session_column, student_ids, session_year_ids) -> list:
+    conditions = []
+    if student_ids is not None:
+        conditions.append(student_column.in_(sorted(student_ids)))
+    if session_year_ids is not None:
+        conditions.append(session_column.in_(sorted(session_year_ids)))
+    return conditions
+
+
+def _tracking_totals(model, conditions: list, as_of: date):
+    unpaid = model.paid_amount < model.monthly_amount
+    overdue = and_(unpaid, model.due_date < as_of)
+    return (
+        select(
+            model.student_id,
+            model.session_year_id,
+            func.count(model.id).label("months"),
+            func.sum(case((model.paid_amount >= model.monthly_amount, 1), else_=0)).label("paid_months"),
+            func.sum(case((and_(model.paid_amount > 0, unpaid), 1), else_=0)).label("partial_months"),
+            func.sum(model.monthly_amount).label("expected"),
+            func.sum(model.paid_amount).label("paid"),
+            func.sum(case((overdue, 1), else_=0)).label("overdue_months"),
+            func.sum(case((overdue, model.monthly_amount - model.paid_amount), else_=0)).label("overdue_amount"),
+            func.min(case((unpaid, model.due_date))).label("oldest_unpaid_due_date")
+        )
+        .where(*conditions)
+        .group_by(model.student_id, model.session_year_id)
+    )
+
+
+def compute_fee_balances(
+    session: Session,
+    *,
+    student_ids: Optional[Set[int]] = None,
+    session_year_ids: Optional[Set[int]] = None,
+    as_of: Optional[date] = None
+) -> Dict[BalanceKey, Dict[str, Any]]:
+    """
+    Balance rows computed from the tracking tables, keyed by (student_id, session_year_id).
+    Only keys with tuition or enabled transport months are returned.
+    """
+    as_of = as_of or date.today()
+
+    tuition = {
+        (row.student_id, row.session_year_id): row
+        for row in session.execute(_tracking_totals(
+            MonthlyFeeTracking,
+            _key_filter(MonthlyFeeTracking.student_id, MonthlyFeeTracking.session_year_id,
+                        student_ids, session_year_ids),
+            as_of
+        ))
+    }
+    transport = {
+        (row.student_id, row.session_year_id): row
+        for row in session.execute(_tracking_totals(
+            TransportMonthlyTracking,
+            [TransportMonthlyTracking.is_service_enabled == True] + _key_filter(
+                TransportMonthlyTracking.student_id, TransportMonthlyTracking.session_year_id,
+                student_ids, session_year_ids
+            ),
+            as_of
+        ))
+    }
+    if not tuition and not transport:
+        return {}
+
+    last_payment: Dict[BalanceKey, date] = {}
+    payment_dates = [
+        select(FeeRecord.student_id, FeeRecord.session_year_id, func.max(FeePayment.payment_date))
+        .join(FeePayment, FeePayment.fee_record_id == FeeRecord.id)
+        .where(FeePayment.is_reversal == False,
+               *_key_filter(FeeRecord.student_id, FeeRecord.session_year_id, student_ids, session_year_ids))
+        .group_by(FeeRecord.student_id, FeeRecord.session_year_id),
+        select(TransportPayment.student_id, StudentTransportEnrollment.session_year_id,
+               func.max(TransportPayment.payment_date))
+        .join(StudentTransportEnrollment, TransportPayment.enrollment_id == StudentTransportEnrollment.id)
+        .where(TransportPayment.is_reversal == False,
+               *_key_filter(TransportPayment.student_id, StudentTransportEnrollment.session_year_id,
+                            student_ids, session_year_ids))
+        .group_by(TransportPayment.student_id, StudentTransportEnrollment.session_year_id)
+    ]
+    for statement in payment_dates:
+        for student_id, session_year_id, payment_date in session.execute(statement):
+            key = (student_id, session_year_id)
+            if payment_date is not None and (key not in last_payment or payment_date > last_payment[key]):
+                last_payment[key] = payment_date
+
+    balances = {}
+    for key in tuition.keys() | transport.keys():
+        fee = tuition.get(key)
+        bus = transport.get(key)
+        months = fee.months if fee else 0
+        paid_months = int(fee.paid_months or 0) if fee else 0
+        partial_months = int(fee.partial_months or 0) if fee else 0
+        tuition_expected = _money(fee.expected if fee else 0)
+        tuition_paid = _money(fee.paid if fee else 0)
+        transport_expected = _money(bus.expected if bus else 0)
+        transport_paid = _money(bus.paid if bus else 0)
+        unpaid_dates = [row.oldest_unpaid_due_date for row in (fee, bus) if row and row.oldest_unpaid_due_date]
+
+        balances[key] = {
+            "student_id": key[0],
+            "session_year_id": key[1],
+            "months_tracked": months,
+            "paid_months": paid_months,
+            "partial_months": partial_months,
+            "pending_months": months - paid_months - partial_months,
+            "tuition_expected": tuition_expected,
+            "tuition_paid": tuition_paid,
+            "tuition_balance": tuition_expected - tuition_paid,
+            "tuition_overdue_months": int(fee.overdue_months or 0) if fee else 0,
+            "tuition_overdue_amount": _money(fee.overdue_amount if fee else 0),
+            "transport_months": bus.months if bus else 0,
+            "transport_expected": transport_expected,
+            "transport_paid": transport_paid,
+            "transport_balance": transport_expected - transport_paid,
+            "expected_amount": tuition_expected + transport_expected,
+            "paid_amount": tuition_paid + transport_paid,
+            "balance_amount": tuition_expected + transport_expected - tuition_paid - transport_paid,
+            "overdue_months": sum(int(row.overdue_months or 0) for row in (fee, bus) if row),
+            "overdue_amount": sum((_money(row.overdue_amount) for row in (fee, bus) if row), Decimal("0.00")),
+            "oldest_unpaid_due_date": min(unpaid_dates) if unpaid_dates else None,
+            "last_payment_date": last_payment.get(key),
+            "as_of_date": as_of
+        }
+    return balances
+
+
+def write_fee_balances(
+    session: Session, keys: Iterable[BalanceKey], balances: Dict[BalanceKey, Dict[str, Any]]
+) -> int:
+    """Upsert the computed rows for ``keys``; keys without tracking rows are deleted"""
+    keys = list(keys)
+    rows = [balances[key] for key in keys if key in balances]
+    removed = [key for key in keys if key not in balances]
+
+    if rows:
+        insert = postgresql_insert if session.get_bind().dialect.name == "postgresql" else sqlite_insert
+        for start in range(0, len(rows), UPSERT_BATCH_SIZE):
+            statement = insert(StudentFeeBalance).values(rows[start:start + UPSERT_BATCH_SIZE])
+            statement = statement.on_conflict_do_update(
+                index_elements=["student_id", "session_year_id"],
+                set_={
+                    **{column: statement.excluded[column] for column in rows[0]
+                       if column not in ("student_id", "session_year_id")},
+                    "updated_at": func.now()
+                }
+            )
+            session.execute(statement)
+
+    if removed:
+        session.execute(
+            delete(StudentFeeBalance).where(
+                tuple_(StudentFeeBalance.student_id, StudentFeeBalance.session_year_id).in_(removed)
+            )
+        )
+    return len(rows) + len(removed)
+
+
+def refresh_fee_balances(session: Session, keys: Iterable[BalanceKey], as_of: Optional[date] = None) -> int:
+    """Recompute and store the balance rows for ``keys`` in the session's transaction"""
+    keys = set(keys)
+    if not keys:
+        return 0
+    balances = compute_fee_balances(
+        session,
+        student_ids={student_id for student_id, _ in keys},
+        session_year_ids={session_year_id for _, session_year_id in keys},
+        as_of=as_of
+    )
+    return write_fee_balances(session, keys, balances)
+
+
+# =====================================================
+# Maintenance hooks
+# =====================================================
+
+def _mark_tracking_change(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        mark_fee_balances_stale(session, [(target.student_id, target.session_year_id)])
+
+
+for _model in (MonthlyFeeTracking, TransportMonthlyTracking, FeeRecord):
+    for _event_name in ("after_insert", "after_update", "after_delete"):
+        event.listen(_model, _event_name, _mark_tracking_change)
+
+
+@event.listens_for(Session, "before_commit")
+def _refresh_stale_fee_balances(session):
+    # before_commit runs ahead of the commit's own flush: flush pending ORM writes
+    # here so their mapper events mark keys and the recompute sees them
+    if session.new or session.dirty or session.deleted:
+        session.flush()
+    if not session.info.get(_STALE_KEYS):
+        return
+    keys = session.info.pop(_STALE_KEYS, None)
+    if keys:
+        refresh_fee_balances(session, keys)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_stale_fee_balances(session):
+    session.info.pop(_STALE_KEYS, None)
+
+
+class CRUDStudentFeeBalance:
+    """Reads and maintenance of the student_fee_balances rollup"""
+
+    async def refresh(self, db: AsyncSession, keys: Iterable[BalanceKey]) -> int:
+        """Recompute balance rows now (without waiting for commit)"""
+        keys = set(keys)
+        return await db.run_sync(lambda session: refresh_fee_balances(session, keys))
+
+    async def get(
+        self, db: AsyncSession, *, student_id: int, session_year_id: int
+    ) -> Optional[StudentFeeBalance]:
+        result = await db.execute(
+            select(StudentFeeBalance).where(
+                and_(
+                    StudentFeeBalance.student_id == student_id,
+                    StudentFeeBalance.session_year_id == session_year_id
+                )
+            )
+        )
+        return result.scalar_one_or_none()
+
+    def _list_filters(
+        self, session_year_id: int, class_id: Optional[int], outstanding_only: bool, overdue_only: bool
+    ) -> list:
+        conditions = [
+            StudentFeeBalance.session_year_id == session_year_id,
+            or_(Student.is_deleted == False, Student.is_deleted.is_(None))
+        ]
+        if class_id is not None:
+            conditions.append(Student.class_id == class_id)
+        if outstanding_only:
+            conditions.append(StudentFeeBalance.balance_amount > 0)
+        if overdue_only:
+            conditions.append(StudentFeeBalance.overdue_months > 0)
+        return conditions
+
+    async def get_multi(
+        self,
+        db: AsyncSession,
+        *,
+        session_year_id: int,
+        class_id: Optional[int] = None,
+        outstanding_only: bool = False,
+        overdue_only: bool = False,
+        skip: int = 0,
+        limit: int = 100
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """Balance rows with student and class names, largest balance first"""
+        conditions = self._list_filters(session_year_id, class_id, outstanding_only, overdue_only)
+
+        total = (await db.execute(
+            select(func.count())
+            .select_from(StudentFeeBalance)
+            .join(Student, Student.id == StudentFeeBalance.student_id)
+            .where(*conditions)
+        )).scalar() or 0
+
+        result = await db.execute(
+            select(
+                StudentFeeBalance,
+                Student.admission_number,
+                (Student.first_name + " " + Student.last_name).label("student_name"),
+                Class.description.label("class_name")
+            )
+            .join(Student, Student.id == StudentFeeBalance.student_id)
+            .outerjoin(Class, Class.id == Student.class_id)
+            .where(*conditions)
+            .order_by(StudentFeeBalance.balance_amount.desc(), StudentFeeBalance.student_id)
+            .offset(skip)
+            .limit(limit)
+        )
+
+        balances = []
+        for balance, admission_number, student_name, class_name in result.all():
+            data = {column.name: getattr(balance, column.name) for column in StudentFeeBalance.__table__.columns}
+            data.update(
+                admission_number=admission_number,
+                student_name=student_name,
+                class_name=class_name,
+                collection_percentage=balance.collection_percentage
+            )
+            balances.append(data)
+        return balances, total
+
+    async def get_session_totals(
+        self, db: AsyncSession, *, session_year_id: int, class_id: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """Session (or class) totals in one aggregate query"""
+        row = (await db.execute(
+            select(
+                func.count().label("students"),
+                func.coalesce(func.sum(StudentFeeBalance.expected_amount), 0).label("expected_amount"),
+                func.coalesce(func.sum(StudentFeeBalance.paid_amount), 0).label("paid_amount"),
+                func.coalesce(func.sum(StudentFeeBalance.balance_amount), 0).label("balance_amount"),
+                func.coalesce(func.sum(StudentFeeBalance.overdue_amount), 0).label("overdue_amount"),
+                func.sum(case((StudentFeeBalance.balance_amount <= 0, 1), else_=0)).label("students_cleared"),
+                func.sum(case((StudentFeeBalance.overdue_months > 0, 1), else_=0)).label("students_overdue")
+            )
+            .select_from(StudentFeeBalance)
+            .join(Student, Student.id == StudentFeeBalance.student_id)
+            .where(*self._list_filters(session_year_id, class_id, False, False))
+        )).one()
+
+        expected = _money(row.expected_amount)
+        paid = _money(row.paid_amount)
+        return {
+            "students": row.students or 0,
+            "expected_amount": float(expected),
+            "paid_amount": float(paid),
+            "balance_amount": float(_money(row.balance_amount)),
+            "overdue_amount": float(_money(row.overdue_amount)),
+            "students_cleared": int(row.students_cleared or 0),
+            "students_overdue": int(row.students_overdue or 0),
+            "collection_percentage": round(float(paid * 100 / expected), 2) if expected else 0.0
+        }
+
+    async def reconcile(
+        self,
+        db: AsyncSession,
+        *,
+        session_year_id: Optional[int] = None,
+        repair: bool = True,
+        as_of: Optional[date] = None,
+        sample_size: int = 20
+    ) -> Dict[str, Any]:
+        """
+        Recompute every balance row (of one session, or all) from the tracking tables
+        and compare with what is stored.
+
+        - missing: keys with tracking rows but no balance row
+        - orphaned: balance rows whose tracking rows are gone
+        - drifted: stored amounts, month counts or dates differ from the tracking rows
+        - overdue_refreshed: only the date-dependent overdue figures moved
+
+        With ``repair`` all of them are rewritten and the transaction is committed.
+        """
+        start = time.perf_counter()
+        as_of = as_of or date.today()
+        session_year_ids = {session_year_id} if session_year_id is not None else None
+
+        computed = await db.run_sync(
+            lambda session: compute_fee_balances(session, session_year_ids=session_year_ids, as_of=as_of)
+        )
+
+        stored_query = select(*StudentFeeBalance.__table__.columns)
+        if session_year_id is not None:
+            stored_query = stored_query.where(StudentFeeBalance.session_year_id == session_year_id)
+        stored = {
+            (row["student_id"], row["session_year_id"]): row
+            for row in (await db.execute(stored_query)).mappings()
+        }
+
+        missing = [key for key in computed if key not in stored]
+        orphaned = [key for key in stored if key not in computed]
+        drifted: List[BalanceKey] = []
+        overdue_refreshed: List[BalanceKey] = []
+        samples = []
+
+        for key, expected in computed.items():
+            current = stored.get(key)
+            if current is None:
+                continue
+            differences = {
+                field: {"stored": str(current[field]), "expected": str(expected[field])}
+                for field in LEDGER_FIELDS
+                if _normalize(current[field]) != _normalize(expected[field])
+            }
+            if differences:
+                drifted.append(key)
+                if len(samples) < sample_size:
+                    samples.append({"student_id": key[0], "session_year_id": key[1], "fields": differences})
+            elif current["as_of_date"] != as_of or any(
+                _normalize(current[field]) != _normalize(expected[field]) for field in OVERDUE_FIELDS
+            ):
+                overdue_refreshed.append(key)
+
+        repaired = 0
+        if repair:
+            keys = missing + orphaned + drifted + overdue_refreshed
+            if keys:
+                repaired = await db.run_sync(lambda session: write_fee_balances(session, keys, computed))
+                await db.commit()
+
+        if missing or orphaned or drifted:
+            logger.warning(
+                f"Fee balance drift (session_year_id={session_year_id}): missing={len(missing)}, "
+                f"orphaned={len(orphaned)}, drifted={len(drifted)}, repaired={repaired}"
+            )
+
+        return {
+            "session_year_id": session_year_id,
+            "as_of_date": as_of.isoformat(),
+            "checked": len(computed.keys() | stored.keys()),
+            "missing": len(missing),
+            "orphaned": len(orphaned),
+            "drifted": len(drifted),
+            "overdue_refreshed": len(overdue_refreshed),
+            "repaired": repaired,
+            "drift_samples": samples,
+            "duration_ms": round((time.perf_counter() - start) * 1000, 2)
+        }
+
+
+# Create singleton instance
+fee_balance_crud = CRUDStudentFeeBalance()
@@ -190,7 +190,7 @@ class CRUDInventoryPurchase:
             joinedload(InventoryPurchase.payment_method),
             selectinload(InventoryPurchase.items).joinedload(InventoryPurchaseItem.item_type),
             selectinload(InventoryPurchase.items).joinedload(InventoryPurchaseItem.size_type)
-        ).where(InventoryPurchase.id == purchase_id)
+        ).where(InventoryPurchase.id == purchase_id).execution_options(populate_existing=True)
         
         result = await db.execute(query)
         return result.scalar_one_or_none()
@@ -199,9 +199,10 @@ class CRUDInventoryPurchase:
         self,
         db: AsyncSession,
         purchase_data: InventoryPurchaseCreate,
-        created_by: int
+        created_by: int,
+        auto_commit: bool = True
     ) -> InventoryPurchase:
-        """Create new purchase with items"""
+        """Create new purchase with items (auto_commit=False: flush into the caller's transaction)"""
         # Calculate total amount
         total_amount = sum(
             item.quantity * item.unit_price
@@ -242,6 +243,10 @@ class CRUDInventoryPurchase:
             )
             db.add(purchase_item)
         
+        if not auto_commit:
+            await db.flush()
+            return purchase
+
         await db.commit()
         await db.refresh(purchase)
         return purchase
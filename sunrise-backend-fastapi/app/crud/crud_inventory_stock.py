@@ -3,7 +3,8 @@ CRUD operations for Inventory Stock Management
 """
 from typing import Optional, List, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, or_, func
+from sqlalchemy import select, update, and_, or_, func, case
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import joinedload, selectinload
 from datetime import date
 
@@ -140,30 +141,63 @@ class CRUDInventoryStock:
         """
         Adjust stock quantity (positive for increase, negative for decrease)
         Creates stock record if it doesn't exist
+
+        The change is applied in the database (current_quantity = current_quantity + change),
+        so it cannot overwrite a concurrent purchase reservation (stock_reservation_engine).
         """
-        stock = await self.get_stock_by_item(db, item_type_id, size_type_id)
-        
-        if not stock:
+        stock_id = await self._apply_quantity_change(db, item_type_id, size_type_id, quantity_change, restock_date)
+
+        if stock_id is None:
             # Create new stock record
             stock = InventoryStock(
                 inventory_item_type_id=item_type_id,
                 size_type_id=size_type_id,
                 current_quantity=max(0, quantity_change),
                 minimum_threshold=10,
-                reorder_quantity=50
+                reorder_quantity=50,
+                last_restocked_date=restock_date if quantity_change > 0 else None
             )
-            db.add(stock)
-        else:
-            # Update existing stock
-            stock.current_quantity = max(0, stock.current_quantity + quantity_change)
-        
+            try:
+                async with db.begin_nested():
+                    db.add(stock)
+                    await db.flush()
+                stock_id = stock.id
+            except IntegrityError:
+                # Created by a concurrent request (unique item/size): adjust that row instead
+                stock_id = await self._apply_quantity_change(
+                    db, item_type_id, size_type_id, quantity_change, restock_date
+                )
+
+        await db.commit()
+        return await db.get(InventoryStock, stock_id, populate_existing=True)
+
+    async def _apply_quantity_change(
+        self,
+        db: AsyncSession,
+        item_type_id: int,
+        size_type_id: Optional[int],
+        quantity_change: int,
+        restock_date: Optional[date]
+    ) -> Optional[int]:
+        """Add ``quantity_change`` (floored at 0) to the stock row in one UPDATE; None if there is no row"""
+        size_match = (
+            InventoryStock.size_type_id == size_type_id if size_type_id is not None
+            else InventoryStock.size_type_id.is_(None)
+        )
+        new_quantity = InventoryStock.current_quantity + quantity_change
+        values = {"current_quantity": case((new_quantity < 0, 0), else_=new_quantity)}
         # Update restock date if provided and quantity increased
         if restock_date and quantity_change > 0:
-            stock.last_restocked_date = restock_date
-        
-        await db.commit()
-        await db.refresh(stock)
-        return stock
+            values["last_restocked_date"] = restock_date
+
+        statement = (
+            update(InventoryStock)
+            .where(InventoryStock.inventory_item_type_id == item_type_id, size_match)
+            .values(**values)
+            .returning(InventoryStock.id)
+            .execution_options(synchronize_session=False)
+        )
+        return (await db.execute(statement)).scalars().first()
     
     async def get_low_stock_alerts(
         self,
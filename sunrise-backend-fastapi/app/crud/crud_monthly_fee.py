@@ -1,14 +1,20 @@
+import base64
+import json
 import logging
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy.orm import selectinload, joinedload
+from sqlalchemy.orm import selectinload
 from sqlalchemy import and_, or_, func, extract, case, exists, text
 from datetime import date, datetime
 
 from app.crud.base import CRUDBase
+from app.core.metadata_cache import metadata_cache
+from app.crud.crud_fee_balance import mark_fee_balances_stale
+from app.services.dashboard_engine import mark_dashboard_topic
 
 logger = logging.getLogger(__name__)
+
 from app.models.fee import MonthlyFeeTracking, MonthlyPaymentAllocation, FeeRecord, FeePayment
 from app.models.student import Student
 from app.models.metadata import SessionYear, PaymentStatus, Class
@@ -17,6 +23,30 @@ from app.schemas.fee import (
     MonthlyFeeStatus, StudentMonthlyFeeHistory, EnhancedStudentFeeSummary
 )
 
+# Enhanced student summary orderings; class_roll supports keyset pagination
+SUMMARY_ORDER_NAME = "name"
+SUMMARY_ORDER_CLASS_ROLL = "class_roll"
+# (session class id, zero-padded roll number, student id) of the last row on a page
+SummaryKey = Tuple[int, str, int]
+
+
+def encode_summary_cursor(key: SummaryKey) -> str:
+    """Opaque, URL-safe cursor for a summary page key"""
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_summary_cursor(cursor: str) -> SummaryKey:
+    """Inverse of encode_summary_cursor; raises ValueError for anything it did not produce"""
+    try:
+        class_id, roll_sort_key, student_id = json.loads(
+            base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        )
+    except (TypeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not (isinstance(class_id, int) and isinstance(roll_sort_key, str) and isinstance(student_id, int)):
+        raise ValueError("Invalid cursor")
+    return class_id, roll_sort_key, student_id
+
 
 class CRUDMonthlyFeeTracking(CRUDBase[MonthlyFeeTracking, MonthlyFeeTrackingCreate, MonthlyFeeTrackingUpdate]):
     
@@ -32,158 +62,155 @@ class CRUDMonthlyFeeTracking(CRUDBase[MonthlyFeeTracking, MonthlyFeeTrackingCrea
             .order_by(MonthlyFeeTracking.academic_year, MonthlyFeeTracking.academic_month)
         )
         return result.scalars().all()
-    
-    async def get_student_monthly_history(
+
+    async def get_monthly_amounts_by_students(
         self,
         db: AsyncSession,
-        student_id: int,
+        student_ids: List[int],
         session_year_id: int
-    ) -> Optional[StudentMonthlyFeeHistory]:
+    ) -> Dict[int, Dict[int, Dict[str, float]]]:
         """
-        Get detailed monthly fee history for a student
-        Returns None if student not found or monthly tracking not enabled
+        Get expected and paid amounts per academic month for many students in one grouped query
+        Returns {student_id: {academic_month: {"monthly_amount": x, "paid_amount": y}}}
         """
+        if not student_ids:
+            return {}
 
-        # Get student and class info
-        student_query = await db.execute(
-            select(Student)
-            .options(joinedload(Student.class_ref))
-            .where(Student.id == student_id)
-        )
-        student = student_query.scalar_one_or_none()
-
-        if not student:
-            # Return None instead of raising exception for better error handling
-            return None
-
-        # Get session year info
-        session_query = await db.execute(
-            select(SessionYear).where(SessionYear.id == session_year_id)
-        )
-        session_year = session_query.scalar_one_or_none()
-
-        # Get fee record for this student and session
-        # IMPORTANT: Find the fee record that actually has tracking records linked to it
-        # This handles the case where duplicate fee records exist
-
-        # First, try to find a fee record that has tracking records
-        fee_record_with_tracking_query = await db.execute(
-            select(FeeRecord)
+        result = await db.execute(
+            select(
+                MonthlyFeeTracking.student_id,
+                MonthlyFeeTracking.academic_month,
+                func.sum(MonthlyFeeTracking.monthly_amount),
+                func.sum(MonthlyFeeTracking.paid_amount)
+            )
             .where(
                 and_(
-                    FeeRecord.student_id == student_id,
-                    FeeRecord.session_year_id == session_year_id,
-                    FeeRecord.is_monthly_tracked == True,
-                    exists(
-                        select(MonthlyFeeTracking.id)
-                        .where(MonthlyFeeTracking.fee_record_id == FeeRecord.id)
-                    )
+                    MonthlyFeeTracking.student_id.in_(student_ids),
+                    MonthlyFeeTracking.session_year_id == session_year_id
                 )
             )
-            .order_by(FeeRecord.created_at.desc())
+            .group_by(MonthlyFeeTracking.student_id, MonthlyFeeTracking.academic_month)
         )
-        fee_record = fee_record_with_tracking_query.scalars().first()
-
-        # If no fee record with tracking records found, fall back to any fee record with is_monthly_tracked=True
-        if not fee_record:
-            fee_record_query = await db.execute(
-                select(FeeRecord)
-                .where(
-                    and_(
-                        FeeRecord.student_id == student_id,
-                        FeeRecord.session_year_id == session_year_id,
-                        FeeRecord.is_monthly_tracked == True
-                    )
-                )
-                .order_by(FeeRecord.created_at.desc())
-            )
-            fee_record = fee_record_query.scalars().first()
 
-        if not fee_record:
-            # Return None instead of raising exception for better error handling
-            return None
+        amounts_by_student: Dict[int, Dict[int, Dict[str, float]]] = {}
+        for student_id, academic_month, monthly_amount, paid_amount in result.all():
+            amounts_by_student.setdefault(student_id, {})[academic_month] = {
+                "monthly_amount": float(monthly_amount or 0),
+                "paid_amount": float(paid_amount or 0)
+            }
+        return amounts_by_student
 
-        # Get monthly tracking records
-        monthly_records_query = await db.execute(
-            select(MonthlyFeeTracking)
-            .where(MonthlyFeeTracking.fee_record_id == fee_record.id)
-            .order_by(MonthlyFeeTracking.academic_year, MonthlyFeeTracking.academic_month)
+    def _history_source_query(self, student_ids: List[int], session_year_id: int):
+        """
+        Student, class and session names plus the monthly-tracked fee record and its
+        payment total, one row per candidate fee record. Per student, rows come
+        preferred record first: one that has tracking rows linked to it (this handles
+        duplicate fee records), then the newest.
+        """
+        has_tracking = exists(
+            select(MonthlyFeeTracking.id).where(MonthlyFeeTracking.fee_record_id == FeeRecord.id)
         )
-        monthly_records = list(monthly_records_query.scalars().all())
-
-        # DEBUG: Log tracking records count
-        logger.info(f"DEBUG: Monthly tracking records found: {len(monthly_records)} for fee_record_id={fee_record.id}")
-
-        # If no monthly tracking records exist, create all 12 months
-        if not monthly_records:
-            import calendar
-            from app.crud.crud_fee import fee_structure as fee_structure_crud
-
-            # Get fee structure to determine monthly fee
-            fee_structure = await fee_structure_crud.get_by_class_id_and_session_id(
-                db,
-                class_id=student.class_id,
-                session_year_id=session_year_id
+        # Actual payments from fee_payments, consistent with the Payment History dialog
+        total_paid = (
+            select(func.coalesce(func.sum(FeePayment.amount), 0))
+            .where(FeePayment.fee_record_id == FeeRecord.id)
+            .scalar_subquery()
+        )
+        return (
+            select(
+                Student.id.label("student_id"),
+                Student.first_name,
+                Student.last_name,
+                Student.admission_number,
+                Student.roll_number,
+                Student.class_id,
+                Class.description.label("class_name"),
+                SessionYear.name.label("session_year_name"),
+                FeeRecord.id.label("fee_record_id"),
+                FeeRecord.total_amount,
+                total_paid.label("total_paid")
             )
-
-            if fee_structure:
-                monthly_fee = float(fee_structure.total_annual_fee) / 12
-
-                # Create tracking records for all 12 months (Apr-Mar academic year)
-                academic_months = [4, 5, 6, 7, 8, 9, 10, 11, 12, 1, 2, 3]
-
-                for month_num in academic_months:
-                    # Calculate year (Apr-Dec = 2025, Jan-Mar = 2026 for 2025-26 session)
-                    year = 2025 if month_num >= 4 else 2026
-
-                    # Calculate due date (10th of each month)
-                    due_date_for_month = date(year, month_num, 10)
-
-                    new_tracking = MonthlyFeeTracking(
-                        fee_record_id=fee_record.id,
-                        student_id=student_id,
-                        session_year_id=session_year_id,
-                        academic_month=month_num,
-                        academic_year=year,
-                        month_name=calendar.month_name[month_num],
-                        monthly_amount=monthly_fee,
-                        paid_amount=0,
-                        due_date=due_date_for_month,
-                        payment_status_id=1  # Pending
-                    )
-                    db.add(new_tracking)
-                    monthly_records.append(new_tracking)
-
-                await db.commit()
-                # Refresh to get IDs
-                for record in monthly_records:
-                    await db.refresh(record)
-        
-        # Get actual total payments made by the student (from fee_payments table)
-        # This ensures consistency with Payment History dialog
-        from app.models.fee import FeePayment
-        payments_query = await db.execute(
-            select(func.sum(FeePayment.amount))
-            .where(FeePayment.fee_record_id == fee_record.id)
+            .select_from(Student)
+            .join(FeeRecord, and_(
+                FeeRecord.student_id == Student.id,
+                FeeRecord.session_year_id == session_year_id,
+                FeeRecord.is_monthly_tracked == True
+            ))
+            .outerjoin(Class, Class.id == Student.class_id)
+            .outerjoin(SessionYear, SessionYear.id == FeeRecord.session_year_id)
+            .where(Student.id.in_(student_ids))
+            .order_by(Student.id, case((has_tracking, 0), else_=1), FeeRecord.created_at.desc())
         )
-        actual_total_paid = payments_query.scalar() or 0
 
+    async def _create_month_records(
+        self,
+        db: AsyncSession,
+        source,
+        session_year_id: int
+    ) -> List[MonthlyFeeTracking]:
+        """
+        Add tracking rows for all 12 months of a fee record that has none, priced from
+        the class fee structure. Nothing is added when there is no fee structure.
+        The caller commits.
+        """
+        import calendar
+        from app.crud.crud_fee import fee_structure_crud
+
+        # Get fee structure to determine monthly fee
+        fee_structure = await fee_structure_crud.get_by_class_id_and_session_id(
+            db,
+            class_id=source.class_id,
+            session_year_id=session_year_id
+        )
+        if not fee_structure:
+            return []
+
+        monthly_fee = float(fee_structure.total_annual_fee) / 12
+
+        # Create tracking records for all 12 months (Apr-Mar academic year)
+        academic_months = [4, 5, 6, 7, 8, 9, 10, 11, 12, 1, 2, 3]
+
+        monthly_records = []
+        for month_num in academic_months:
+            # Calculate year (Apr-Dec = 2025, Jan-Mar = 2026 for 2025-26 session)
+            year = 2025 if month_num >= 4 else 2026
+
+            # Calculate due date (10th of each month)
+            due_date_for_month = date(year, month_num, 10)
+
+            new_tracking = MonthlyFeeTracking(
+                fee_record_id=source.fee_record_id,
+                student_id=source.student_id,
+                session_year_id=session_year_id,
+                academic_month=month_num,
+                academic_year=year,
+                month_name=calendar.month_name[month_num],
+                monthly_amount=monthly_fee,
+                paid_amount=0,
+                due_date=due_date_for_month,
+                payment_status_id=1  # Pending
+            )
+            db.add(new_tracking)
+            monthly_records.append(new_tracking)
+        return monthly_records
+
+    @staticmethod
+    def _build_monthly_history(
+        source,
+        monthly_records: List[MonthlyFeeTracking],
+        status_names: Dict[int, str],
+        current_date: date
+    ) -> StudentMonthlyFeeHistory:
         # Convert to MonthlyFeeStatus objects
         monthly_history = []
-        total_paid = float(actual_total_paid)  # Use actual payments for consistency
+        total_paid = float(source.total_paid or 0)  # Use actual payments for consistency
         total_balance = 0
         paid_months = 0
         overdue_months = 0
         pending_months = 0
 
-        current_date = date.today()
-        
         for record in monthly_records:
-            # Get payment status name
-            status_query = await db.execute(
-                select(PaymentStatus.name).where(PaymentStatus.id == record.payment_status_id)
-            )
-            status_name = status_query.scalar_one_or_none() or "Unknown"
+            status_name = status_names.get(record.payment_status_id) or "Unknown"
 
             # Calculate status color and overdue info
             status_color = "#28a745"  # Green for paid
@@ -209,7 +236,7 @@ class CRUDMonthlyFeeTracking(CRUDBase[MonthlyFeeTracking, MonthlyFeeTrackingCrea
                 is_overdue = True
                 days_overdue = (current_date - record.due_date).days
                 overdue_months += 1
-            
+
             # Fix balance calculation to prevent negative values
             # If paid_amount > monthly_amount, show balance as 0 (fully paid)
             corrected_balance = max(0, float(record.monthly_amount) - float(record.paid_amount))
@@ -231,21 +258,20 @@ class CRUDMonthlyFeeTracking(CRUDBase[MonthlyFeeTracking, MonthlyFeeTrackingCrea
             )
             monthly_history.append(monthly_status)
 
-            # Don't add individual month payments to total_paid (already calculated above from raw payments)
-            # total_paid += float(record.paid_amount)  # OLD: This caused discrepancy
+            # Month paid amounts are not added to total_paid (taken from raw payments above)
             total_balance += corrected_balance  # Use corrected balance
-        
+
         # Calculate collection percentage
-        total_annual_fee = float(fee_record.total_amount)
+        total_annual_fee = float(source.total_amount)
         collection_percentage = (total_paid / total_annual_fee * 100) if total_annual_fee > 0 else 0
-        
+
         return StudentMonthlyFeeHistory(
-            student_id=student.id,
-            student_name=f"{student.first_name} {student.last_name}",
-            admission_number=student.admission_number,
-            roll_number=student.roll_number,
-            class_name=student.class_ref.description if student.class_ref else "",
-            session_year=session_year.name if session_year else "",
+            student_id=source.student_id,
+            student_name=f"{source.first_name} {source.last_name}",
+            admission_number=source.admission_number,
+            roll_number=source.roll_number,
+            class_name=source.class_name or "",
+            session_year=source.session_year_name or "",
             monthly_fee_amount=float(monthly_records[0].monthly_amount) if monthly_records else 0,
             total_annual_fee=total_annual_fee,
             monthly_history=monthly_history,
@@ -257,7 +283,82 @@ class CRUDMonthlyFeeTracking(CRUDBase[MonthlyFeeTracking, MonthlyFeeTrackingCrea
             total_balance=total_balance,
             collection_percentage=round(collection_percentage, 2)
         )
-    
+
+    async def get_students_monthly_history(
+        self,
+        db: AsyncSession,
+        student_ids: List[int],
+        session_year_id: int
+    ) -> Dict[int, StudentMonthlyFeeHistory]:
+        """
+        Get detailed monthly fee histories for many students (e.g. a class) in two queries
+        Returns {student_id: history}. Students whose monthly-tracked fee record has no
+        tracking rows yet get all 12 months created (and committed); students without a
+        monthly-tracked fee record in the session are omitted.
+        """
+        if not student_ids:
+            return {}
+
+        # Student, names, preferred fee record and payment total
+        result = await db.execute(self._history_source_query(list(student_ids), session_year_id))
+        sources = {}
+        for row in result.all():
+            sources.setdefault(row.student_id, row)
+        if not sources:
+            return {}
+
+        # Monthly tracking records of the chosen fee records
+        tracking_result = await db.execute(
+            select(MonthlyFeeTracking)
+            .where(MonthlyFeeTracking.fee_record_id.in_([source.fee_record_id for source in sources.values()]))
+            .order_by(
+                MonthlyFeeTracking.fee_record_id,
+                MonthlyFeeTracking.academic_year,
+                MonthlyFeeTracking.academic_month
+            )
+        )
+        records_by_fee_record: Dict[int, List[MonthlyFeeTracking]] = {}
+        for record in tracking_result.scalars().all():
+            records_by_fee_record.setdefault(record.fee_record_id, []).append(record)
+
+        # Fee records without tracking rows get all 12 months created
+        created = []
+        for source in sources.values():
+            if source.fee_record_id not in records_by_fee_record:
+                monthly_records = await self._create_month_records(db, source, session_year_id)
+                if monthly_records:
+                    records_by_fee_record[source.fee_record_id] = monthly_records
+                    created.extend(monthly_records)
+        if created:
+            logger.info(f"Created {len(created)} monthly tracking records for {len(created) // 12} fee records")
+            await db.commit()
+            # Refresh to get IDs
+            for record in created:
+                await db.refresh(record)
+
+        status_names = await metadata_cache.get_name_map(db, PaymentStatus)
+        current_date = date.today()
+
+        return {
+            student_id: self._build_monthly_history(
+                source, records_by_fee_record.get(source.fee_record_id, []), status_names, current_date
+            )
+            for student_id, source in sources.items()
+        }
+
+    async def get_student_monthly_history(
+        self,
+        db: AsyncSession,
+        student_id: int,
+        session_year_id: int
+    ) -> Optional[StudentMonthlyFeeHistory]:
+        """
+        Get detailed monthly fee history for a student
+        Returns None if student not found or monthly tracking not enabled
+        """
+        histories = await self.get_students_monthly_history(db, [student_id], session_year_id)
+        return histories.get(student_id)
+
     async def get_enhanced_student_summary(
         self,
         db: AsyncSession,
@@ -268,12 +369,44 @@ class CRUDMonthlyFeeTracking(CRUDBase[MonthlyFeeTracking, MonthlyFeeTrackingCrea
         limit: int = 20,
         offset: int = 0
     ) -> List[EnhancedStudentFeeSummary]:
+        """Get one page of the enhanced student fee summary (ordered by student name)"""
+        page = await self.get_enhanced_student_summary_page(
+            db,
+            session_year_id=session_year_id,
+            class_id=class_id,
+            payment_status_id=payment_status_id,
+            search=search,
+            limit=limit,
+            offset=offset
+        )
+        return page["students"]
+
+    async def get_enhanced_student_summary_page(
+        self,
+        db: AsyncSession,
+        session_year_id: int,
+        class_id: Optional[int] = None,
+        payment_status_id: Optional[int] = None,
+        search: Optional[str] = None,
+        limit: int = 20,
+        offset: int = 0,
+        order: str = SUMMARY_ORDER_NAME,
+        after: Optional[SummaryKey] = None
+    ) -> Dict[str, Any]:
         """
         Get enhanced student fee summary by querying underlying tables.
 
         For current session year: Uses students table directly
         For historical session years: Uses student_session_history to get
         students who were in that session with their historical class info
+
+        The exact number of matching students comes back with the page (window
+        count over the filtered set), so one round-trip serves both. ``order``
+        is "name" (OFFSET paging) or "class_roll"; for the latter ``after``
+        (the key of the last row of the previous page) seeks past earlier rows
+        instead of counting through them, and the result carries ``next_key``.
+
+        Returns {"students", "total", "next_key"}.
         """
 
         # Build the query using student_session_history for historical data
@@ -344,27 +477,30 @@ class CRUDMonthlyFeeTracking(CRUDBase[MonthlyFeeTracking, MonthlyFeeTrackingCrea
                 fr.total_amount as annual_fee,
                 fr.paid_amount as total_paid,
                 fr.balance_amount as total_balance,
-                COALESCE(monthly_stats.total_months_tracked, 0) as total_months_tracked,
-                COALESCE(monthly_stats.paid_months, 0) as paid_months,
-                COALESCE(monthly_stats.pending_months, 0) as pending_months,
-                COALESCE(monthly_stats.overdue_months, 0) as overdue_months,
-                COALESCE(monthly_stats.monthly_total, 0) as monthly_total,
-                COALESCE(monthly_stats.monthly_paid, 0) as monthly_paid,
-                COALESCE(monthly_stats.monthly_balance, 0) as monthly_balance,
+                COALESCE(sfb.months_tracked, 0) as total_months_tracked,
+                COALESCE(sfb.paid_months, 0) as paid_months,
+                COALESCE(sfb.pending_months, 0) as pending_months,
+                COALESCE(sfb.tuition_overdue_months, 0) as overdue_months,
+                COALESCE(sfb.tuition_expected, 0) as monthly_total,
+                COALESCE(sfb.tuition_paid, 0) as monthly_paid,
+                COALESCE(sfb.tuition_balance, 0) as monthly_balance,
                 CASE
                     WHEN fr.total_amount > 0 THEN
                         ROUND((fr.paid_amount * 100.0 / fr.total_amount), 2)
                     ELSE 0
                 END as collection_percentage,
                 CASE
-                    WHEN monthly_stats.total_months_tracked > 0 THEN true
+                    WHEN sfb.months_tracked > 0 THEN true
                     ELSE false
                 END as has_monthly_tracking,
                 CASE
                     WHEN ste.id IS NOT NULL AND ste.is_active = true AND ste.discontinue_date IS NULL THEN true
                     ELSE false
                 END as has_transport_enrollment,
-                ste.id as transport_enrollment_id
+                ste.id as transport_enrollment_id,
+                ssd.session_class_id,
+                LPAD(COALESCE(ssd.session_roll_number, s.roll_number, ''), 20, '0') as roll_sort_key,
+                COUNT(*) OVER () as total_count
             FROM student_session_data ssd
             INNER JOIN students s ON s.id = ssd.student_id
             INNER JOIN classes c ON ssd.session_class_id = c.id
@@ -376,23 +512,10 @@ class CRUDMonthlyFeeTracking(CRUDBase[MonthlyFeeTracking, MonthlyFeeTrackingCrea
                 ORDER BY fr_inner.created_at DESC
                 LIMIT 1
             ) fr ON true
-            LEFT JOIN (
-                SELECT
-                    mft.student_id,
-                    mft.session_year_id,
-                    COUNT(*) as total_months_tracked,
-                    COUNT(CASE WHEN ps.name = 'PAID' THEN 1 END) as paid_months,
-                    COUNT(CASE WHEN ps.name = 'PENDING' THEN 1 END) as pending_months,
-                    COUNT(CASE WHEN ps.name = 'OVERDUE' THEN 1 END) as overdue_months,
-                    SUM(mft.monthly_amount) as monthly_total,
-                    SUM(mft.paid_amount) as monthly_paid,
-                    SUM(mft.balance_amount) as monthly_balance
-                FROM monthly_fee_tracking mft
-                LEFT JOIN payment_statuses ps ON mft.payment_status_id = ps.id
-                WHERE mft.session_year_id = :session_year_id
-                  AND ps.is_active = true
-                GROUP BY mft.student_id, mft.session_year_id
-            ) monthly_stats ON s.id = monthly_stats.student_id
+            -- Maintained rollup of the student's monthly tracking (see crud_fee_balance)
+            LEFT JOIN student_fee_balances sfb
+                ON sfb.student_id = s.id
+                AND sfb.session_year_id = :session_year_id
             LEFT JOIN student_transport_enrollment ste
                 ON s.id = ste.student_id
                 AND ste.session_year_id = :session_year_id
@@ -420,16 +543,43 @@ class CRUDMonthlyFeeTracking(CRUDBase[MonthlyFeeTracking, MonthlyFeeTrackingCrea
             base_query += " AND (s.first_name || ' ' || s.last_name ILIKE :search OR s.admission_number ILIKE :search)"
             params["search"] = f"%{search}%"
 
-        # Add ordering and pagination
-        base_query += " ORDER BY s.first_name || ' ' || s.last_name LIMIT :limit OFFSET :offset"
-        params["limit"] = limit
+        # Exact total over the filtered set, then ordering and pagination (keyset or offset)
+        filter_params = dict(params)
+        page_query = f"SELECT * FROM ({base_query}) page"
+        if order == SUMMARY_ORDER_CLASS_ROLL:
+            if after is not None:
+                page_query += (
+                    " WHERE (page.session_class_id, page.roll_sort_key, page.student_id)"
+                    " > (:after_class_id, :after_roll_sort_key, :after_student_id)"
+                )
+                params["after_class_id"], params["after_roll_sort_key"], params["after_student_id"] = after
+            page_query += " ORDER BY page.session_class_id, page.roll_sort_key, page.student_id"
+        else:
+            page_query += " ORDER BY page.student_name, page.student_id"
+        # One extra row tells whether another keyset page exists
+        page_query += " LIMIT :limit OFFSET :offset"
+        params["limit"] = limit + 1
         params["offset"] = offset
 
-        # Execute the query
-        query = text(base_query)
-        result = await db.execute(query, params)
+        result = await db.execute(text(page_query), params)
         rows = result.fetchall()
-        
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        if rows:
+            total = rows[0].total_count
+        elif offset or after is not None:
+            # Past the last page: the window count has no row to ride on
+            total_result = await db.execute(text(f"SELECT COUNT(*) FROM ({base_query}) page"), filter_params)
+            total = total_result.scalar() or 0
+        else:
+            total = 0
+
+        next_key = None
+        if order == SUMMARY_ORDER_CLASS_ROLL and has_more:
+            last = rows[-1]
+            next_key = (last.session_class_id, last.roll_sort_key, last.student_id)
+
         summaries = []
         for row in rows:
             # Use collection_percentage and has_monthly_tracking from the view
@@ -467,7 +617,7 @@ class CRUDMonthlyFeeTracking(CRUDBase[MonthlyFeeTracking, MonthlyFeeTrackingCrea
             )
             summaries.append(summary)
 
-        return summaries
+        return {"students": summaries, "total": total, "next_key": next_key}
     
     async def enable_monthly_tracking(
         self,
@@ -492,6 +642,11 @@ class CRUDMonthlyFeeTracking(CRUDBase[MonthlyFeeTracking, MonthlyFeeTrackingCrea
         )
         
         records_created = result.scalar()
+        fee_record_keys = await db.execute(
+            select(FeeRecord.student_id, FeeRecord.session_year_id).where(FeeRecord.id == fee_record_id)
+        )
+        mark_fee_balances_stale(db, fee_record_keys.all())
+        mark_dashboard_topic(db, "fees")
         await db.commit()
         
         return records_created
@@ -503,9 +658,10 @@ class CRUDMonthlyPaymentAllocation(CRUDBase[MonthlyPaymentAllocation, dict, dict
         self,
         db: AsyncSession,
         payment_id: int,
-        allocations: List[Dict[str, Any]]
+        allocations: List[Dict[str, Any]],
+        auto_commit: bool = True
     ) -> List[MonthlyPaymentAllocation]:
-        """Allocate a payment to specific monthly tracking records"""
+        """Allocate a payment to specific monthly tracking records (auto_commit=False: flush into the caller's transaction)"""
         
         created_allocations = []
         
@@ -527,7 +683,7 @@ class CRUDMonthlyPaymentAllocation(CRUDBase[MonthlyPaymentAllocation, dict, dict
                 created_allocations.append(allocation_obj)
             
             # Update the monthly tracking record with validation
-            await db.execute(
+            tracking_result = await db.execute(
                 text("""
                     UPDATE monthly_fee_tracking
                     SET
@@ -539,14 +695,21 @@ class CRUDMonthlyPaymentAllocation(CRUDBase[MonthlyPaymentAllocation, dict, dict
                         END,
                         updated_at = NOW()
                     WHERE id = :tracking_id
+                    RETURNING student_id, session_year_id
                 """),
                 {
                     "amount": allocation["amount"],
                     "tracking_id": allocation["monthly_tracking_id"]
                 }
             )
-        
-        await db.commit()
+            # Raw UPDATE bypasses the ORM events; refresh the student's balance at commit
+            mark_fee_balances_stale(db, tracking_result.fetchall())
+            mark_dashboard_topic(db, "fees")
+
+        if auto_commit:
+            await db.commit()
+        else:
+            await db.flush()
         return created_allocations
 
 
@@ -0,0 +1,135 @@
+"""
+CRUD operations for the receipt job queue
+"""
+
+from typing import List, Optional
+from datetime import date, datetime
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy import and_, func, update
+
+from app.crud.base import CRUDBase
+from app.models.fee import FeePayment
+from app.models.receipt_job import ReceiptJob
+from app.models.transport import TransportPayment
+
+
+class CRUDReceiptJob(CRUDBase[ReceiptJob, dict, dict]):
+    """
+    Queue operations for ReceiptJob
+
+    Jobs are claimed with SELECT ... FOR UPDATE SKIP LOCKED so several API
+    processes can run the worker against the same table without double sending.
+    """
+
+    async def claim_due_jobs(
+        self,
+        db: AsyncSession,
+        *,
+        limit: int,
+        now: datetime
+    ) -> List[ReceiptJob]:
+        """Lock up to ``limit`` due PENDING jobs, mark them PROCESSING and commit"""
+        result = await db.execute(
+            select(ReceiptJob)
+            .where(and_(ReceiptJob.status == "PENDING", ReceiptJob.next_attempt_at <= now))
+            .order_by(ReceiptJob.next_attempt_at, ReceiptJob.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        jobs = result.scalars().all()
+
+        for job in jobs:
+            job.status = "PROCESSING"
+            job.locked_at = now
+            job.attempts = (job.attempts or 0) + 1
+
+        await db.commit()
+        return jobs
+
+    async def release_stale_jobs(self, db: AsyncSession, *, locked_before: datetime) -> int:
+        """Return PROCESSING jobs abandoned by a crashed worker to the queue"""
+        result = await db.execute(
+            update(ReceiptJob)
+            .where(and_(ReceiptJob.status == "PROCESSING", ReceiptJob.locked_at < locked_before))
+            .values(status="PENDING", locked_at=None)
+        )
+        await db.commit()
+        return result.rowcount or 0
+
+    async def get_latest_for_fee_payment(
+        self, db: AsyncSession, *, fee_payment_id: int
+    ) -> Optional[ReceiptJob]:
+        """Most recent receipt job for a tuition / combined payment"""
+        result = await db.execute(
+            select(ReceiptJob)
+            .where(ReceiptJob.fee_payment_id == fee_payment_id)
+            .order_by(ReceiptJob.id.desc())
+            .limit(1)
+        )
+        return result.scalar_one_or_none()
+
+    async def get_latest_for_transport_payment(
+        self, db: AsyncSession, *, transport_payment_id: int
+    ) -> Optional[ReceiptJob]:
+        """Most recent receipt job for a transport payment"""
+        result = await db.execute(
+            select(ReceiptJob)
+            .where(ReceiptJob.transport_payment_id == transport_payment_id)
+            .order_by(ReceiptJob.id.desc())
+            .limit(1)
+        )
+        return result.scalar_one_or_none()
+
+    async def get_latest_for_payments(
+        self,
+        db: AsyncSession,
+        *,
+        fee_payment_ids: Optional[List[int]] = None,
+        transport_payment_ids: Optional[List[int]] = None,
+        from_date: Optional[date] = None,
+        to_date: Optional[date] = None,
+        job_types: Optional[List[str]] = None
+    ) -> List[ReceiptJob]:
+        """
+        Latest receipt job of each selected payment: fee receipts, then transport
+        receipts, each in payment date order.
+        Payments are selected by id, by payment date range, or both (ids within
+        the range); reversal entries are skipped. One query per payment table.
+        """
+        job_types = job_types or ["FEE", "TRANSPORT"]
+        jobs = []
+
+        sources = []
+        if "FEE" in job_types and (fee_payment_ids is not None or from_date or to_date):
+            sources.append((FeePayment, ReceiptJob.fee_payment_id, fee_payment_ids))
+        if "TRANSPORT" in job_types and (transport_payment_ids is not None or from_date or to_date):
+            sources.append((TransportPayment, ReceiptJob.transport_payment_id, transport_payment_ids))
+
+        for payment_model, payment_column, payment_ids in sources:
+            latest = (
+                select(func.max(ReceiptJob.id).label("job_id"))
+                .join(payment_model, payment_model.id == payment_column)
+                .where(payment_model.is_reversal == False)
+                .group_by(payment_column)
+            )
+            if payment_ids is not None:
+                latest = latest.where(payment_model.id.in_(payment_ids))
+            if from_date:
+                latest = latest.where(payment_model.payment_date >= from_date)
+            if to_date:
+                latest = latest.where(payment_model.payment_date <= to_date)
+            latest = latest.subquery()
+
+            result = await db.execute(
+                select(ReceiptJob)
+                .join(latest, latest.c.job_id == ReceiptJob.id)
+                .join(payment_model, payment_model.id == payment_column)
+                .order_by(payment_model.payment_date, payment_model.id)
+            )
+            jobs.extend(result.scalars().all())
+
+        return jobs
+
+
+receipt_job_crud = CRUDReceiptJob(ReceiptJob)
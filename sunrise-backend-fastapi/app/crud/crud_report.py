@@ -1,8 +1,9 @@
-from typing import List, Optional, Dict, Any, Tuple
+from typing import List, Optional, Dict, Any, Tuple, AsyncIterator
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy.orm import selectinload, joinedload
-from sqlalchemy import and_, or_, func, case, desc, text
+from sqlalchemy.orm import selectinload, aliased, join
+from sqlalchemy import and_, or_, func, case, desc, text, literal, union_all, inspect
+import time
 from decimal import Decimal
 from datetime import datetime, date
 
@@ -16,33 +17,34 @@ from app.models.user import User
 class CRUDReport:
     """CRUD operations for reports"""
 
-    async def get_udise_report_data(
-        self,
-        db: AsyncSession,
+    # Student columns carried into the UDISE report as-is
+    UDISE_STUDENT_COLUMNS = (
+        "id", "admission_number", "first_name", "last_name", "date_of_birth", "class_id", "section",
+        "roll_number", "session_year_id", "admission_date", "gender_id", "blood_group", "aadhar_no",
+        "phone", "email", "address", "city", "state", "postal_code", "country",
+        "father_name", "father_phone", "father_email", "father_occupation",
+        "mother_name", "mother_phone", "mother_email", "mother_occupation",
+        "guardian_name", "guardian_phone", "guardian_email", "guardian_relation", "is_active",
+    )
+
+    # Transport tables (deploy_database.sql does not create them): found once they exist;
+    # while missing, re-checked at most every TRANSPORT_TABLES_RECHECK_SECONDS
+    TRANSPORT_TABLES_RECHECK_SECONDS = 60.0
+    _transport_tables_present = False
+    _transport_tables_checked_at: Optional[float] = None
+
+    @staticmethod
+    def _udise_filters(
         *,
         session_year_id: Optional[int] = None,
         class_id: Optional[int] = None,
         section: Optional[str] = None,
         gender_id: Optional[int] = None,
         is_active: Optional[bool] = None,
-        search: Optional[str] = None,
-        page: int = 1,
-        per_page: int = 25
-    ) -> Tuple[List[Dict[str, Any]], int]:
-        """
-        Get UDISE report data with comprehensive student information
-        Returns: (list of student data, total count)
-        """
-        # Build base query
-        query = select(Student).options(
-            joinedload(Student.gender),
-            joinedload(Student.class_ref),
-            joinedload(Student.session_year)
-        )
-
-        # Apply filters
+        search: Optional[str] = None
+    ) -> List[Any]:
         filters = []
-        
+
         # Exclude soft deleted
         filters.append(
             or_(Student.is_deleted == False, Student.is_deleted.is_(None))
@@ -73,105 +75,126 @@ class CRUDReport:
             )
             filters.append(search_filter)
 
-        if filters:
-            query = query.where(and_(*filters))
+        return filters
+
+    def _udise_query(self, filters: List[Any]):
+        """Flat UDISE rows: student columns plus class, session year and gender descriptions"""
+        return (
+            select(
+                *[getattr(Student, column) for column in self.UDISE_STUDENT_COLUMNS],
+                Class.description.label("class_name"),
+                SessionYear.description.label("session_year_name"),
+                Gender.description.label("gender_name")
+            )
+            .select_from(Student)
+            .outerjoin(Class, Class.id == Student.class_id)
+            .outerjoin(SessionYear, SessionYear.id == Student.session_year_id)
+            .outerjoin(Gender, Gender.id == Student.gender_id)
+            .where(and_(*filters))
+        )
+
+    @staticmethod
+    def _udise_record(row, today: date) -> Dict[str, Any]:
+        data = dict(row._mapping)
+
+        # Calculate age
+        age = None
+        date_of_birth = data["date_of_birth"]
+        if date_of_birth:
+            age = today.year - date_of_birth.year - (
+                (today.month, today.day) < (date_of_birth.month, date_of_birth.day)
+            )
+
+        data["full_name"] = f"{data['first_name']} {data['last_name']}"
+        data["age"] = age
+        data["class_name"] = data["class_name"] or ""
+        data["session_year_name"] = data["session_year_name"] or ""
+        data["gender_name"] = data["gender_name"] or ""
+        return data
+
+    async def get_udise_report_data(
+        self,
+        db: AsyncSession,
+        *,
+        session_year_id: Optional[int] = None,
+        class_id: Optional[int] = None,
+        section: Optional[str] = None,
+        gender_id: Optional[int] = None,
+        is_active: Optional[bool] = None,
+        search: Optional[str] = None,
+        page: int = 1,
+        per_page: int = 25
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Get UDISE report data with comprehensive student information
+        Returns: (list of student data, total count)
+        """
+        filters = self._udise_filters(
+            session_year_id=session_year_id, class_id=class_id, section=section,
+            gender_id=gender_id, is_active=is_active, search=search
+        )
 
         # Get total count
-        count_query = select(func.count()).select_from(Student)
-        if filters:
-            count_query = count_query.where(and_(*filters))
-        
+        count_query = select(func.count()).select_from(Student).where(and_(*filters))
         total_result = await db.execute(count_query)
         total = total_result.scalar()
 
         # Apply pagination and ordering
-        query = query.order_by(Student.admission_number)
-        query = query.offset((page - 1) * per_page).limit(per_page)
-
-        # Execute query
+        query = (
+            self._udise_query(filters)
+            .order_by(Student.admission_number)
+            .offset((page - 1) * per_page)
+            .limit(per_page)
+        )
         result = await db.execute(query)
-        students = result.scalars().all()
-
-        # Transform to dict format
-        student_data = []
-        for student in students:
-            # Calculate age
-            age = None
-            if student.date_of_birth:
-                today = date.today()
-                age = today.year - student.date_of_birth.year - (
-                    (today.month, today.day) < (student.date_of_birth.month, student.date_of_birth.day)
-                )
 
-            data = {
-                "id": student.id,
-                "admission_number": student.admission_number,
-                "first_name": student.first_name,
-                "last_name": student.last_name,
-                "full_name": f"{student.first_name} {student.last_name}",
-                "date_of_birth": student.date_of_birth,
-                "age": age,
-                "class_id": student.class_id,
-                "class_name": student.class_ref.description if student.class_ref else "",
-                "section": student.section,
-                "roll_number": student.roll_number,
-                "session_year_id": student.session_year_id,
-                "session_year_name": student.session_year.description if student.session_year else "",
-                "admission_date": student.admission_date,
-                "gender_id": student.gender_id,
-                "gender_name": student.gender.description if student.gender else "",
-                "blood_group": student.blood_group,
-                "aadhar_no": student.aadhar_no,
-                "phone": student.phone,
-                "email": student.email,
-                "address": student.address,
-                "city": student.city,
-                "state": student.state,
-                "postal_code": student.postal_code,
-                "country": student.country,
-                "father_name": student.father_name,
-                "father_phone": student.father_phone,
-                "father_email": student.father_email,
-                "father_occupation": student.father_occupation,
-                "mother_name": student.mother_name,
-                "mother_phone": student.mother_phone,
-                "mother_email": student.mother_email,
-                "mother_occupation": student.mother_occupation,
-                "guardian_name": student.guardian_name,
-                "guardian_phone": student.guardian_phone,
-                "guardian_email": student.guardian_email,
-                "guardian_relation": student.guardian_relation,
-                "is_active": student.is_active,
-            }
-            student_data.append(data)
+        today = date.today()
+        student_data = [self._udise_record(row, today) for row in result]
 
         return student_data, total
 
-    async def get_fee_tracking_report_data(
+    async def stream_udise_records(
         self,
         db: AsyncSession,
         *,
-        session_year_id: int,
+        session_year_id: Optional[int] = None,
         class_id: Optional[int] = None,
         section: Optional[str] = None,
-        payment_status: Optional[str] = None,
-        transport_opted: Optional[bool] = None,
-        pending_only: bool = False,
+        gender_id: Optional[int] = None,
+        is_active: Optional[bool] = None,
         search: Optional[str] = None,
-        page: int = 1,
-        per_page: int = 25
-    ) -> Tuple[List[Dict[str, Any]], int, Dict[str, Any]]:
+        batch_size: int = 1000
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
         """
-        Get fee tracking report data with fee and transport information
-        Returns: (list of fee tracking data, total count, summary statistics)
-
-        Note: Uses subqueries to pre-aggregate fee and transport amounts separately
-        to prevent Cartesian product multiplication when students have multiple
-        monthly tracking records in both tables.
+        Yield the full UDISE report in batches, by admission number, from a
+        streamed result so exports never load the whole school at once
         """
-        # Build complex query with JOINs and pre-aggregated subqueries
-        # Using raw SQL for better performance with complex aggregations
+        filters = self._udise_filters(
+            session_year_id=session_year_id, class_id=class_id, section=section,
+            gender_id=gender_id, is_active=is_active, search=search
+        )
+        result = await db.stream(
+            self._udise_query(filters)
+            .order_by(Student.admission_number, Student.id)
+            .execution_options(yield_per=batch_size)
+        )
+        today = date.today()
+        async for partition in result.partitions(batch_size):
+            yield [self._udise_record(row, today) for row in partition]
 
+    @staticmethod
+    def _fee_tracking_query(
+        *,
+        session_year_id: int,
+        class_id: Optional[int] = None,
+        section: Optional[str] = None,
+        transport_opted: Optional[bool] = None,
+        search: Optional[str] = None
+    ) -> Tuple[str, Dict[str, Any]]:
+        """
+        Fee tracking SQL (one row per student, amounts from student_fee_balances)
+        and its bind parameters
+        """
         base_query = """
         SELECT
             s.id as student_id,
@@ -184,54 +207,32 @@ class CRUDReport:
             s.session_year_id,
             sy.description as session_year_name,
 
-            -- Fee aggregations from subquery (prevents Cartesian product)
-            COALESCE(fee_agg.total_fee_amount, 0) as total_fee_amount,
-            COALESCE(fee_agg.paid_fee_amount, 0) as paid_fee_amount,
-            COALESCE(fee_agg.pending_fee_amount, 0) as pending_fee_amount,
+            -- Tuition totals from the balance rollup
+            COALESCE(sfb.tuition_expected, 0) as total_fee_amount,
+            COALESCE(sfb.tuition_paid, 0) as paid_fee_amount,
+            COALESCE(sfb.tuition_balance, 0) as pending_fee_amount,
 
             -- Transport information
             CASE WHEN ste.id IS NOT NULL THEN TRUE ELSE FALSE END as transport_opted,
             tt.description as transport_type,
             ste.monthly_fee as monthly_transport_fee,
 
-            -- Transport aggregations from subquery (prevents Cartesian product)
-            COALESCE(transport_agg.total_transport_amount, 0) as total_transport_amount,
-            COALESCE(transport_agg.paid_transport_amount, 0) as paid_transport_amount,
-            COALESCE(transport_agg.pending_transport_amount, 0) as pending_transport_amount
+            -- Transport totals (service-enabled months) from the balance rollup
+            COALESCE(sfb.transport_expected, 0) as total_transport_amount,
+            COALESCE(sfb.transport_paid, 0) as paid_transport_amount,
+            COALESCE(sfb.transport_balance, 0) as pending_transport_amount
 
         FROM students s
         LEFT JOIN classes c ON s.class_id = c.id
         LEFT JOIN session_years sy ON s.session_year_id = sy.id
 
-        -- Pre-aggregated fee amounts per student (subquery to avoid Cartesian product)
-        LEFT JOIN (
-            SELECT
-                mft.student_id,
-                mft.session_year_id,
-                SUM(mft.monthly_amount) as total_fee_amount,
-                SUM(mft.paid_amount) as paid_fee_amount,
-                SUM(mft.balance_amount) as pending_fee_amount
-            FROM monthly_fee_tracking mft
-            WHERE mft.session_year_id = :session_year_id
-            GROUP BY mft.student_id, mft.session_year_id
-        ) fee_agg ON s.id = fee_agg.student_id AND s.session_year_id = fee_agg.session_year_id
+        LEFT JOIN student_fee_balances sfb ON s.id = sfb.student_id AND s.session_year_id = sfb.session_year_id
 
         LEFT JOIN student_transport_enrollment ste ON s.id = ste.student_id
             AND ste.session_year_id = :session_year_id
             AND ste.is_active = TRUE
         LEFT JOIN transport_types tt ON ste.transport_type_id = tt.id
 
-        -- Pre-aggregated transport amounts per enrollment (subquery to avoid Cartesian product)
-        LEFT JOIN (
-            SELECT
-                tmt.enrollment_id,
-                SUM(tmt.monthly_amount) as total_transport_amount,
-                SUM(tmt.paid_amount) as paid_transport_amount,
-                SUM(tmt.balance_amount) as pending_transport_amount
-            FROM transport_monthly_tracking tmt
-            GROUP BY tmt.enrollment_id
-        ) transport_agg ON ste.id = transport_agg.enrollment_id
-
         WHERE (s.is_deleted = FALSE OR s.is_deleted IS NULL)
             AND s.session_year_id = :session_year_id
         """
@@ -264,103 +265,139 @@ class CRUDReport:
         if additional_filters:
             base_query += " " + " ".join(additional_filters)
 
-        # Add GROUP BY (includes pre-aggregated subquery columns)
+        # Add GROUP BY (includes the balance rollup columns) and a stable order for paging and exports
         base_query += """
         GROUP BY s.id, s.admission_number, s.first_name, s.last_name, s.class_id,
                  c.description, s.section, s.session_year_id, sy.description,
                  ste.id, tt.description, ste.monthly_fee,
-                 fee_agg.total_fee_amount, fee_agg.paid_fee_amount, fee_agg.pending_fee_amount,
-                 transport_agg.total_transport_amount, transport_agg.paid_transport_amount, transport_agg.pending_transport_amount
+                 sfb.tuition_expected, sfb.tuition_paid, sfb.tuition_balance,
+                 sfb.transport_expected, sfb.transport_paid, sfb.transport_balance
+        ORDER BY s.class_id, s.section, s.admission_number, s.id
+        """
+
+        return base_query, params
+
+    @staticmethod
+    def _fee_tracking_record(
+        record,
+        payment_status: Optional[str] = None,
+        pending_only: bool = False
+    ) -> Optional[Dict[str, Any]]:
+        """Derived amounts, rates and statuses for one row; None when the row is filtered out"""
+        # Calculate derived fields
+        total_fee = Decimal(str(record.total_fee_amount))
+        paid_fee = Decimal(str(record.paid_fee_amount))
+        pending_fee = Decimal(str(record.pending_fee_amount))
+
+        total_transport = Decimal(str(record.total_transport_amount)) if record.transport_opted else Decimal("0")
+        paid_transport = Decimal(str(record.paid_transport_amount)) if record.transport_opted else Decimal("0")
+        pending_transport = Decimal(str(record.pending_transport_amount)) if record.transport_opted else Decimal("0")
+
+        total_amount = total_fee + total_transport
+        total_paid = paid_fee + paid_transport
+        total_pending = pending_fee + pending_transport
+
+        # Calculate collection rates
+        fee_collection_rate = float((paid_fee / total_fee * 100) if total_fee > 0 else 0)
+        transport_collection_rate = float((paid_transport / total_transport * 100) if total_transport > 0 else 0) if record.transport_opted else None
+        overall_collection_rate = float((total_paid / total_amount * 100) if total_amount > 0 else 0)
+
+        # Determine payment status
+        if paid_fee >= total_fee and total_fee > 0:
+            fee_payment_status = "Paid"
+        elif paid_fee > 0:
+            fee_payment_status = "Partial"
+        else:
+            fee_payment_status = "Pending"
+
+        if record.transport_opted:
+            if paid_transport >= total_transport and total_transport > 0:
+                transport_payment_status = "Paid"
+            elif paid_transport > 0:
+                transport_payment_status = "Partial"
+            else:
+                transport_payment_status = "Pending"
+        else:
+            transport_payment_status = None
+
+        # Apply payment_status filter
+        if payment_status:
+            if payment_status.lower() == "paid" and fee_payment_status != "Paid":
+                return None
+            elif payment_status.lower() == "partial" and fee_payment_status != "Partial":
+                return None
+            elif payment_status.lower() == "pending" and fee_payment_status != "Pending":
+                return None
+
+        # Apply pending_only filter
+        if pending_only and total_pending <= 0:
+            return None
+
+        return {
+            "student_id": record.student_id,
+            "admission_number": record.admission_number,
+            "first_name": record.first_name,
+            "last_name": record.last_name,
+            "full_name": f"{record.first_name} {record.last_name}",
+            "class_id": record.class_id,
+            "class_name": record.class_name or "",
+            "section": record.section,
+            "session_year_id": record.session_year_id,
+            "session_year_name": record.session_year_name or "",
+            "total_fee_amount": total_fee,
+            "paid_fee_amount": paid_fee,
+            "pending_fee_amount": pending_fee,
+            "fee_collection_rate": fee_collection_rate,
+            "fee_payment_status": fee_payment_status,
+            "transport_opted": record.transport_opted,
+            "transport_type": record.transport_type,
+            "monthly_transport_fee": Decimal(str(record.monthly_transport_fee)) if record.monthly_transport_fee else None,
+            "total_transport_amount": total_transport if record.transport_opted else None,
+            "paid_transport_amount": paid_transport if record.transport_opted else None,
+            "pending_transport_amount": pending_transport if record.transport_opted else None,
+            "transport_collection_rate": transport_collection_rate,
+            "transport_payment_status": transport_payment_status,
+            "total_amount": total_amount,
+            "total_paid": total_paid,
+            "total_pending": total_pending,
+            "overall_collection_rate": overall_collection_rate,
+        }
+
+    async def get_fee_tracking_report_data(
+        self,
+        db: AsyncSession,
+        *,
+        session_year_id: int,
+        class_id: Optional[int] = None,
+        section: Optional[str] = None,
+        payment_status: Optional[str] = None,
+        transport_opted: Optional[bool] = None,
+        pending_only: bool = False,
+        search: Optional[str] = None,
+        page: int = 1,
+        per_page: int = 25
+    ) -> Tuple[List[Dict[str, Any]], int, Dict[str, Any]]:
         """
+        Get fee tracking report data with fee and transport information
+        Returns: (list of fee tracking data, total count, summary statistics)
+
+        Note: Fee and transport amounts come from the maintained student_fee_balances
+        rollup (one row per student and session), so no tracking rows are aggregated here.
+        """
+        base_query, params = self._fee_tracking_query(
+            session_year_id=session_year_id, class_id=class_id, section=section,
+            transport_opted=transport_opted, search=search
+        )
 
         # Execute query to get all matching records (for filtering and summary)
         result = await db.execute(text(base_query), params)
-        all_records = result.fetchall()
 
         # Apply post-query filters (payment_status, pending_only)
         filtered_records = []
-        for record in all_records:
-            # Calculate derived fields
-            total_fee = Decimal(str(record.total_fee_amount))
-            paid_fee = Decimal(str(record.paid_fee_amount))
-            pending_fee = Decimal(str(record.pending_fee_amount))
-
-            total_transport = Decimal(str(record.total_transport_amount)) if record.transport_opted else Decimal("0")
-            paid_transport = Decimal(str(record.paid_transport_amount)) if record.transport_opted else Decimal("0")
-            pending_transport = Decimal(str(record.pending_transport_amount)) if record.transport_opted else Decimal("0")
-
-            total_amount = total_fee + total_transport
-            total_paid = paid_fee + paid_transport
-            total_pending = pending_fee + pending_transport
-
-            # Calculate collection rates
-            fee_collection_rate = float((paid_fee / total_fee * 100) if total_fee > 0 else 0)
-            transport_collection_rate = float((paid_transport / total_transport * 100) if total_transport > 0 else 0) if record.transport_opted else None
-            overall_collection_rate = float((total_paid / total_amount * 100) if total_amount > 0 else 0)
-
-            # Determine payment status
-            if paid_fee >= total_fee and total_fee > 0:
-                fee_payment_status = "Paid"
-            elif paid_fee > 0:
-                fee_payment_status = "Partial"
-            else:
-                fee_payment_status = "Pending"
-
-            if record.transport_opted:
-                if paid_transport >= total_transport and total_transport > 0:
-                    transport_payment_status = "Paid"
-                elif paid_transport > 0:
-                    transport_payment_status = "Partial"
-                else:
-                    transport_payment_status = "Pending"
-            else:
-                transport_payment_status = None
-
-            # Apply payment_status filter
-            if payment_status:
-                if payment_status.lower() == "paid" and fee_payment_status != "Paid":
-                    continue
-                elif payment_status.lower() == "partial" and fee_payment_status != "Partial":
-                    continue
-                elif payment_status.lower() == "pending" and fee_payment_status != "Pending":
-                    continue
-
-            # Apply pending_only filter
-            if pending_only and total_pending <= 0:
-                continue
-
-            # Build record dict
-            record_dict = {
-                "student_id": record.student_id,
-                "admission_number": record.admission_number,
-                "first_name": record.first_name,
-                "last_name": record.last_name,
-                "full_name": f"{record.first_name} {record.last_name}",
-                "class_id": record.class_id,
-                "class_name": record.class_name or "",
-                "section": record.section,
-                "session_year_id": record.session_year_id,
-                "session_year_name": record.session_year_name or "",
-                "total_fee_amount": total_fee,
-                "paid_fee_amount": paid_fee,
-                "pending_fee_amount": pending_fee,
-                "fee_collection_rate": fee_collection_rate,
-                "fee_payment_status": fee_payment_status,
-                "transport_opted": record.transport_opted,
-                "transport_type": record.transport_type,
-                "monthly_transport_fee": Decimal(str(record.monthly_transport_fee)) if record.monthly_transport_fee else None,
-                "total_transport_amount": total_transport if record.transport_opted else None,
-                "paid_transport_amount": paid_transport if record.transport_opted else None,
-                "pending_transport_amount": pending_transport if record.transport_opted else None,
-                "transport_collection_rate": transport_collection_rate,
-                "transport_payment_status": transport_payment_status,
-                "total_amount": total_amount,
-                "total_paid": total_paid,
-                "total_pending": total_pending,
-                "overall_collection_rate": overall_collection_rate,
-            }
-
-            filtered_records.append(record_dict)
+        for record in result.fetchall():
+            record_dict = self._fee_tracking_record(record, payment_status, pending_only)
+            if record_dict is not None:
+                filtered_records.append(record_dict)
 
         # Calculate summary statistics
         total_count = len(filtered_records)
@@ -388,6 +425,157 @@ class CRUDReport:
 
         return paginated_records, total_count, summary
 
+    async def stream_fee_tracking_records(
+        self,
+        db: AsyncSession,
+        *,
+        session_year_id: int,
+        class_id: Optional[int] = None,
+        section: Optional[str] = None,
+        payment_status: Optional[str] = None,
+        transport_opted: Optional[bool] = None,
+        pending_only: bool = False,
+        search: Optional[str] = None,
+        batch_size: int = 1000
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Yield every fee tracking row matching the filters in batches from a
+        streamed result; same rows and order as the paged report, without the summary
+        """
+        base_query, params = self._fee_tracking_query(
+            session_year_id=session_year_id, class_id=class_id, section=section,
+            transport_opted=transport_opted, search=search
+        )
+        result = await db.stream(
+            text(base_query).execution_options(yield_per=batch_size), params
+        )
+        async for partition in result.partitions(batch_size):
+            batch = []
+            for record in partition:
+                record_dict = self._fee_tracking_record(record, payment_status, pending_only)
+                if record_dict is not None:
+                    batch.append(record_dict)
+            if batch:
+                yield batch
+
+    async def _has_transport_tables(self, db: AsyncSession) -> bool:
+        """Whether the transport payment tables exist (databases without them report fees only)"""
+        if self._transport_tables_present:
+            return True
+        now = time.monotonic()
+        if (
+            self._transport_tables_checked_at is None
+            or now - self._transport_tables_checked_at >= self.TRANSPORT_TABLES_RECHECK_SECONDS
+        ):
+            connection = await db.connection()
+            self._transport_tables_present = await connection.run_sync(
+                lambda sync_connection: all(
+                    inspect(sync_connection).has_table(table)
+                    for table in (TransportPayment.__tablename__, StudentTransportEnrollment.__tablename__)
+                )
+            )
+            self._transport_tables_checked_at = now
+        return self._transport_tables_present
+
+    def _daily_collection_query(
+        self,
+        *,
+        from_date: date,
+        to_date: date,
+        class_id: Optional[int] = None,
+        section: Optional[str] = None,
+        payment_method_id: Optional[int] = None,
+        search: Optional[str] = None,
+        include_transport: bool = True
+    ):
+        """
+        UNION ALL of fee and transport payments for the daily collection report,
+        one row per payment with the student, class, session and collector columns
+        the report needs. Filters are applied inside each branch. Without
+        ``include_transport`` only fee payments are selected.
+
+        Excludes reversal records (is_reversal) and payments that have been reversed
+        (reversed_by_payment_id IS NOT NULL).
+        """
+        def branch(payment_model, from_clause, parent_id, session_year_id, payment_type: str):
+            creator = aliased(User)
+            conditions = [
+                payment_model.payment_date >= from_date,
+                payment_model.payment_date <= to_date,
+                payment_model.is_reversal == False,
+                payment_model.reversed_by_payment_id.is_(None)
+            ]
+            if class_id:
+                conditions.append(Student.class_id == class_id)
+            if section:
+                conditions.append(Student.section == section)
+            if payment_method_id:
+                conditions.append(payment_model.payment_method_id == payment_method_id)
+            if search:
+                search_lower = search.lower()
+                conditions.append(or_(
+                    func.lower(Student.first_name).contains(search_lower, autoescape=True),
+                    func.lower(Student.last_name).contains(search_lower, autoescape=True),
+                    func.lower(func.coalesce(Student.admission_number, "")).contains(search_lower, autoescape=True)
+                ))
+
+            return (
+                select(
+                    payment_model.id.label("payment_id"),
+                    payment_model.receipt_number.label("receipt_number"),
+                    payment_model.payment_date.label("payment_date"),
+                    payment_model.amount.label("amount"),
+                    func.coalesce(PaymentMethod.name, "Cash").label("payment_method"),
+                    payment_model.payment_method_id.label("payment_method_id"),
+                    payment_model.transaction_id.label("transaction_id"),
+                    Student.id.label("student_id"),
+                    Student.admission_number.label("admission_number"),
+                    (Student.first_name + " " + Student.last_name).label("student_name"),
+                    func.coalesce(Class.description, "").label("class_name"),
+                    Student.section.label("section"),
+                    parent_id.label("fee_record_id"),
+                    func.coalesce(SessionYear.name, "").label("session_year_name"),
+                    literal(payment_type).label("payment_type"),
+                    payment_model.remarks.label("remarks"),
+                    case(
+                        (creator.id.isnot(None), creator.first_name + " " + creator.last_name),
+                        else_=None
+                    ).label("created_by_name"),
+                    payment_model.created_at.label("created_at")
+                )
+                .select_from(from_clause)
+                .outerjoin(PaymentMethod, PaymentMethod.id == payment_model.payment_method_id)
+                .outerjoin(Class, Class.id == Student.class_id)
+                .outerjoin(SessionYear, SessionYear.id == session_year_id)
+                .outerjoin(creator, creator.id == payment_model.created_by)
+                .where(and_(*conditions))
+            )
+
+        fee_branch = branch(
+            FeePayment,
+            join(FeePayment, FeeRecord, FeeRecord.id == FeePayment.fee_record_id)
+            .join(Student, Student.id == FeeRecord.student_id),
+            FeeRecord.id, FeeRecord.session_year_id, "Fee"
+        )
+        if not include_transport:
+            return fee_branch.subquery("collections")
+
+        transport_branch = branch(
+            TransportPayment,
+            join(TransportPayment, StudentTransportEnrollment,
+                 StudentTransportEnrollment.id == TransportPayment.enrollment_id)
+            .join(Student, Student.id == StudentTransportEnrollment.student_id),
+            StudentTransportEnrollment.id, StudentTransportEnrollment.session_year_id, "Transport"
+        )
+
+        return union_all(fee_branch, transport_branch).subquery("collections")
+
+    @staticmethod
+    def _daily_collection_record(row) -> Dict[str, Any]:
+        record = dict(row._mapping)
+        record["amount"] = float(record["amount"])
+        return record
+
     async def get_daily_collection_report_data(
         self,
         db: AsyncSession,
@@ -404,175 +592,92 @@ class CRUDReport:
         """
         Get daily collection report data with fee and transport payments
         Returns: (list of payment data, total count, summary statistics)
+
+        Filtering, ordering (most recent first), pagination and the summary totals
+        all run in the database: one aggregate query and one page query.
         """
-        all_records = []
-
-        # Query Fee Payments
-        # Exclude:
-        # 1. Reversal records (is_reversal == True) - these are the reversal transactions
-        # 2. Payments that have been reversed (reversed_by_payment_id IS NOT NULL) - original payments that were reversed
-        fee_query = (
-            select(FeePayment)
-            .options(
-                joinedload(FeePayment.fee_record).joinedload(FeeRecord.student).joinedload(Student.class_ref),
-                joinedload(FeePayment.fee_record).joinedload(FeeRecord.session_year),
-                joinedload(FeePayment.payment_method),
-                joinedload(FeePayment.creator)
-            )
-            .where(
-                and_(
-                    FeePayment.payment_date >= from_date,
-                    FeePayment.payment_date <= to_date,
-                    FeePayment.is_reversal == False,
-                    FeePayment.reversed_by_payment_id.is_(None)  # Exclude payments that have been reversed
-                )
-            )
+        collections = self._daily_collection_query(
+            from_date=from_date,
+            to_date=to_date,
+            class_id=class_id,
+            section=section,
+            payment_method_id=payment_method_id,
+            search=search,
+            include_transport=await self._has_transport_tables(db)
         )
 
-        fee_result = await db.execute(fee_query)
-        fee_payments = fee_result.unique().scalars().all()
-
-        for payment in fee_payments:
-            fee_record = payment.fee_record
-            student = fee_record.student if fee_record else None
-
-            if not student:
-                continue
-
-            # Apply filters
-            if class_id and student.class_id != class_id:
-                continue
-            if section and student.section != section:
-                continue
-            if payment_method_id and payment.payment_method_id != payment_method_id:
-                continue
-            if search:
-                search_lower = search.lower()
-                if not (
-                    search_lower in student.first_name.lower() or
-                    search_lower in student.last_name.lower() or
-                    search_lower in (student.admission_number or "").lower()
-                ):
-                    continue
-
-            all_records.append({
-                "payment_id": payment.id,
-                "receipt_number": payment.receipt_number,
-                "payment_date": payment.payment_date,
-                "amount": float(payment.amount),
-                "payment_method": payment.payment_method.name if payment.payment_method else "Cash",
-                "payment_method_id": payment.payment_method_id,
-                "transaction_id": payment.transaction_id,
-                "student_id": student.id,
-                "admission_number": student.admission_number,
-                "student_name": f"{student.first_name} {student.last_name}",
-                "class_name": student.class_ref.description if student.class_ref else "",
-                "section": student.section,
-                "fee_record_id": fee_record.id,
-                "session_year_name": fee_record.session_year.name if fee_record.session_year else "",
-                "payment_type": "Fee",
-                "remarks": payment.remarks,
-                "created_by_name": f"{payment.creator.first_name} {payment.creator.last_name}" if payment.creator else None,
-                "created_at": payment.created_at
-            })
-
-        # Query Transport Payments
-        # Exclude:
-        # 1. Reversal records (is_reversal == True) - these are the reversal transactions
-        # 2. Payments that have been reversed (reversed_by_payment_id IS NOT NULL) - original payments that were reversed
-        try:
-            transport_query = (
-                select(TransportPayment)
-                .options(
-                    joinedload(TransportPayment.enrollment).joinedload(StudentTransportEnrollment.student).joinedload(Student.class_ref),
-                    joinedload(TransportPayment.enrollment).joinedload(StudentTransportEnrollment.session_year),
-                    joinedload(TransportPayment.payment_method),
-                    joinedload(TransportPayment.creator)
-                )
-                .where(
-                    and_(
-                        TransportPayment.payment_date >= from_date,
-                        TransportPayment.payment_date <= to_date,
-                        TransportPayment.is_reversal == False,
-                        TransportPayment.reversed_by_payment_id.is_(None)  # Exclude payments that have been reversed
-                    )
-                )
+        def amount_where(condition):
+            return func.coalesce(func.sum(case((condition, collections.c.amount), else_=0)), 0)
+
+        method = func.lower(collections.c.payment_method)
+        summary_result = await db.execute(
+            select(
+                func.count().label("total_collections"),
+                func.coalesce(func.sum(collections.c.amount), 0).label("total_amount"),
+                amount_where(method == "cash").label("cash_amount"),
+                amount_where(method == "online").label("online_amount"),
+                amount_where(method == "upi").label("upi_amount"),
+                amount_where(method == "cheque").label("cheque_amount"),
+                amount_where(method == "card").label("card_amount"),
+                amount_where(collections.c.payment_type == "Fee").label("fee_collections"),
+                amount_where(collections.c.payment_type == "Transport").label("transport_collections")
             )
-
-            transport_result = await db.execute(transport_query)
-            transport_payments = transport_result.unique().scalars().all()
-
-            for payment in transport_payments:
-                enrollment = payment.enrollment
-                student = enrollment.student if enrollment else None
-
-                if not student:
-                    continue
-
-                # Apply filters
-                if class_id and student.class_id != class_id:
-                    continue
-                if section and student.section != section:
-                    continue
-                if payment_method_id and payment.payment_method_id != payment_method_id:
-                    continue
-                if search:
-                    search_lower = search.lower()
-                    if not (
-                        search_lower in student.first_name.lower() or
-                        search_lower in student.last_name.lower() or
-                        search_lower in (student.admission_number or "").lower()
-                    ):
-                        continue
-
-                all_records.append({
-                    "payment_id": payment.id,
-                    "receipt_number": payment.receipt_number,
-                    "payment_date": payment.payment_date,
-                    "amount": float(payment.amount),
-                    "payment_method": payment.payment_method.name if payment.payment_method else "Cash",
-                    "payment_method_id": payment.payment_method_id,
-                    "transaction_id": payment.transaction_id,
-                    "student_id": student.id,
-                    "admission_number": student.admission_number,
-                    "student_name": f"{student.first_name} {student.last_name}",
-                    "class_name": student.class_ref.description if student.class_ref else "",
-                    "section": student.section,
-                    "fee_record_id": enrollment.id,
-                    "session_year_name": enrollment.session_year.name if enrollment.session_year else "",
-                    "payment_type": "Transport",
-                    "remarks": payment.remarks,
-                    "created_by_name": f"{payment.creator.first_name} {payment.creator.last_name}" if payment.creator else None,
-                    "created_at": payment.created_at
-                })
-        except Exception as e:
-            # Transport payments table might not exist or have different structure
-            pass
-
-        # Sort by payment date and created_at (most recent first)
-        all_records.sort(key=lambda x: (x["payment_date"], x["created_at"]), reverse=True)
-
-        total_count = len(all_records)
-
-        # Calculate summary
+        )
+        totals = summary_result.one()._mapping
+        total_count = totals["total_collections"]
         summary = {
-            "total_collections": total_count,
-            "total_amount": sum(r["amount"] for r in all_records),
-            "cash_amount": sum(r["amount"] for r in all_records if r["payment_method"].lower() == "cash"),
-            "online_amount": sum(r["amount"] for r in all_records if r["payment_method"].lower() == "online"),
-            "upi_amount": sum(r["amount"] for r in all_records if r["payment_method"].lower() == "upi"),
-            "cheque_amount": sum(r["amount"] for r in all_records if r["payment_method"].lower() == "cheque"),
-            "card_amount": sum(r["amount"] for r in all_records if r["payment_method"].lower() == "card"),
-            "fee_collections": sum(r["amount"] for r in all_records if r["payment_type"] == "Fee"),
-            "transport_collections": sum(r["amount"] for r in all_records if r["payment_type"] == "Transport"),
+            key: (value if key == "total_collections" else float(value))
+            for key, value in totals.items()
         }
 
-        # Apply pagination
-        start_idx = (page - 1) * per_page
-        end_idx = start_idx + per_page
-        paginated_records = all_records[start_idx:end_idx]
+        records = []
+        if total_count:
+            page_result = await db.execute(
+                select(collections)
+                .order_by(
+                    collections.c.payment_date.desc(),
+                    collections.c.created_at.desc(),
+                    collections.c.payment_id.desc()
+                )
+                .offset((page - 1) * per_page)
+                .limit(per_page)
+            )
+            records = [self._daily_collection_record(row) for row in page_result]
 
-        return paginated_records, total_count, summary
+        return records, total_count, summary
+
+    async def stream_daily_collection_records(
+        self,
+        db: AsyncSession,
+        *,
+        from_date: date,
+        to_date: date,
+        class_id: Optional[int] = None,
+        section: Optional[str] = None,
+        payment_method_id: Optional[int] = None,
+        search: Optional[str] = None,
+        batch_size: int = 1000
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Yield the full daily collection report in batches, oldest first, from a
+        streamed result so exports never load the whole range at once
+        """
+        collections = self._daily_collection_query(
+            from_date=from_date,
+            to_date=to_date,
+            class_id=class_id,
+            section=section,
+            payment_method_id=payment_method_id,
+            search=search,
+            include_transport=await self._has_transport_tables(db)
+        )
+        result = await db.stream(
+            select(collections)
+            .order_by(collections.c.payment_date, collections.c.created_at, collections.c.payment_id)
+            .execution_options(yield_per=batch_size)
+        )
+        async for partition in result.partitions(batch_size):
+            yield [self._daily_collection_record(row) for row in partition]
 
 
 # Create singleton instance
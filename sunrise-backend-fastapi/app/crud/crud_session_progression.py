@@ -6,11 +6,11 @@ from typing import List, Optional, Dict, Any
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload, joinedload
-from sqlalchemy import and_, func
+from sqlalchemy import and_, func, delete, update
 from datetime import datetime
-import uuid
 
 from app.models.student import Student
+from app.models.progression_batch import ProgressionBatch
 from app.models.student_session_history import StudentSessionHistory
 from app.models.progression_action import ProgressionAction
 from app.models.metadata import SessionYear, Class
@@ -101,6 +101,30 @@ async def get_next_class_id(db: AsyncSession, current_class_id: int) -> Optional
     return next_cls.id if next_cls else None
 
 
+async def get_class_transition_map(db: AsyncSession) -> Dict[int, Dict[str, Optional[int]]]:
+    """
+    Description and previous/next active class of every class by sort_order, in
+    one query. Same answers as get_next_class_id / get_previous_class_id per class.
+    """
+    result = await db.execute(
+        select(Class.id, Class.description, Class.sort_order, Class.is_active)
+        .order_by(Class.sort_order, Class.id)
+    )
+    classes = result.all()
+    active = [(row.sort_order, row.id) for row in classes if row.is_active]
+
+    transitions = {}
+    for row in classes:
+        previous = [class_id for sort_order, class_id in active if sort_order < row.sort_order]
+        following = [class_id for sort_order, class_id in active if sort_order > row.sort_order]
+        transitions[row.id] = {
+            "description": row.description,
+            "previous": previous[-1] if previous else None,
+            "next": following[0] if following else None
+        }
+    return transitions
+
+
 async def get_previous_class_id(db: AsyncSession, current_class_id: int) -> Optional[int]:
     """Get the previous class ID for demotion"""
     current_class = await db.execute(
@@ -266,53 +290,25 @@ async def bulk_progress_students(
     """
     Bulk progress multiple students.
     Returns summary of successful and failed progressions.
-    """
-    batch_id = f"PROG-{datetime.now().strftime('%Y%m%d%H%M%S')}-{str(uuid.uuid4())[:8]}"
-    results = []
-    successful_count = 0
-    failed_count = 0
-
-    for student_data in students_data:
-        try:
-            result = await progress_student(
-                db=db,
-                student_id=student_data["student_id"],
-                from_session_year_id=from_session_year_id,
-                to_session_year_id=to_session_year_id,
-                progression_action_id=student_data["progression_action_id"],
-                target_class_id=student_data.get("target_class_id"),
-                progressed_by=progressed_by,
-                batch_id=batch_id,
-                section=student_data.get("target_section"),
-                roll_number=student_data.get("target_roll_number"),
-                remarks=student_data.get("remarks")
-            )
-
-            if result["success"]:
-                successful_count += 1
-            else:
-                failed_count += 1
 
-            results.append(result)
-
-        except Exception as e:
-            failed_count += 1
-            results.append({
-                "success": False,
-                "student_id": student_data["student_id"],
-                "error_message": str(e)
-            })
+    The batch is staged and processed set-based in committed chunks by the
+    progression engine; progress_student remains for single corrections.
+    """
+    from app.services.progression_engine import progression_engine
 
-    # Commit all changes
-    await db.commit()
+    batch_id, status = await progression_engine.progress(
+        db, from_session_year_id, to_session_year_id, students_data, progressed_by
+    )
+    results = await progression_engine.get_results(db, batch_id, students_data)
 
     return {
         "batch_id": batch_id,
         "from_session_year_id": from_session_year_id,
         "to_session_year_id": to_session_year_id,
         "total_processed": len(students_data),
-        "successful_count": successful_count,
-        "failed_count": failed_count,
+        "successful_count": status["successful_count"],
+        "failed_count": len(students_data) - status["successful_count"],
+        "status": status["status"],
         "results": results
     }
 
@@ -345,19 +341,27 @@ async def rollback_progression_batch(
 ) -> Dict[str, Any]:
     """
     Rollback all progressions in a batch.
-    Restores students to their previous state.
+    Restores students to their previous state with one UPDATE ... FROM the
+    batch's history rows, then deletes those rows.
     """
-    # Get all history records for this batch
-    query = select(StudentSessionHistory).options(
-        joinedload(StudentSessionHistory.student)
-    ).where(
-        StudentSessionHistory.progression_batch_id == batch_id
+    batch_query = await db.execute(
+        select(ProgressionBatch.status).where(ProgressionBatch.batch_id == batch_id)
     )
+    batch_status = batch_query.scalar_one_or_none()
+    if batch_status == "RUNNING":
+        return {
+            "batch_id": batch_id,
+            "students_affected": 0,
+            "success": False,
+            "message": "Batch is still running; wait for it to finish before rolling back"
+        }
 
-    result = await db.execute(query)
-    history_records = result.scalars().unique().all()
-
-    if not history_records:
+    history_count = await db.execute(
+        select(func.count(StudentSessionHistory.id)).where(
+            StudentSessionHistory.progression_batch_id == batch_id
+        )
+    )
+    if not history_count.scalar():
         return {
             "batch_id": batch_id,
             "students_affected": 0,
@@ -365,28 +369,37 @@ async def rollback_progression_batch(
             "message": "No records found for this batch ID"
         }
 
-    students_affected = 0
-
-    for record in history_records:
-        student = record.student
-        if student and record.from_session_year_id and record.from_class_id:
-            # Restore student to previous state
-            student.session_year_id = record.from_session_year_id
-            student.class_id = record.from_class_id
-
-            # Restore section and roll number from snapshot if available
-            if record.snapshot_data:
-                student.section = record.snapshot_data.get("section")
-                student.roll_number = record.snapshot_data.get("roll_number")
-
-            # Reactivate if was deactivated
-            student.is_active = True
-
-            students_affected += 1
-
-        # Delete the history record
-        await db.delete(record)
+    # Restore session, class, section and roll number; reactivate if was deactivated
+    restored = await db.execute(
+        update(Student)
+        .where(and_(
+            Student.id == StudentSessionHistory.student_id,
+            StudentSessionHistory.progression_batch_id == batch_id,
+            StudentSessionHistory.from_session_year_id.isnot(None),
+            StudentSessionHistory.from_class_id.isnot(None)
+        ))
+        .values(
+            session_year_id=StudentSessionHistory.from_session_year_id,
+            class_id=StudentSessionHistory.from_class_id,
+            section=StudentSessionHistory.section,
+            roll_number=StudentSessionHistory.roll_number,
+            is_active=True
+        )
+        .execution_options(synchronize_session=False)
+    )
+    students_affected = restored.rowcount
 
+    await db.execute(
+        delete(StudentSessionHistory)
+        .where(StudentSessionHistory.progression_batch_id == batch_id)
+        .execution_options(synchronize_session=False)
+    )
+    await db.execute(
+        update(ProgressionBatch)
+        .where(ProgressionBatch.batch_id == batch_id)
+        .values(status="ROLLED_BACK", last_error=reason)
+        .execution_options(synchronize_session=False)
+    )
     await db.commit()
 
     return {
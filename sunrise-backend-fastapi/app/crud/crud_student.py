@@ -2,7 +2,7 @@ from typing import List, Optional, Dict, Any, Union
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload, joinedload
-from sqlalchemy import and_, or_, func, desc, text
+from sqlalchemy import and_, or_, case, func, desc, text
 from sqlalchemy.exc import IntegrityError
 from datetime import datetime
 
@@ -13,13 +13,32 @@ from app.models.fee import FeeRecord
 from app.models.metadata import Gender, Class, SessionYear, UserType
 from app.schemas.student import StudentCreate, StudentUpdate, ClassEnum, GenderEnum
 from app.schemas.user import UserCreate
-from app.core.security import get_password_hash
+from app.core.security import get_password_hash_async
 from app.core.error_handler import (
     DatabaseErrorHandler, ValidationErrorHandler,
     raise_database_http_exception
 )
 
 
+class StudentSessionView:
+    """
+    Read-only view of a student as listed in a past session: class, section,
+    roll number and session year come from that session's history row, every
+    other attribute from the student. Keeps the persistent Student unmodified.
+    """
+
+    _HISTORY_FIELDS = ("class_id", "class_ref", "session_year_id", "session_year", "section", "roll_number")
+
+    def __init__(self, student: Student, history_record):
+        self._student = student
+        self._history = history_record
+
+    def __getattr__(self, name: str):
+        if name in StudentSessionView._HISTORY_FIELDS:
+            return getattr(self._history, name)
+        return getattr(self._student, name)
+
+
 class CRUDStudent(CRUDBase[Student, StudentCreate, StudentUpdate]):
     def __init__(self):
         super().__init__(Student)
@@ -367,7 +386,7 @@ class CRUDStudent(CRUDBase[Student, StudentCreate, StudentUpdate]):
 
                         user_account = User(
                             email=user_email,
-                            password=get_password_hash("Sunrise@001"),  # Default password
+                            password=await get_password_hash_async("Sunrise@001"),  # Default password
                             first_name=obj_in.first_name,
                             last_name=obj_in.last_name,
                             phone=obj_in.phone,
@@ -458,73 +477,43 @@ class CRUDStudent(CRUDBase[Student, StudentCreate, StudentUpdate]):
         search: Optional[str] = None,
         is_active: Optional[bool] = None,
         session_year_id: Optional[int] = None
-    ) -> tuple[List[Student], int]:
+    ) -> tuple[List[Union[Student, "StudentSessionView"]], int]:
+        """
+        Page of students with gender, class and session year loaded, ready for
+        Student.from_orm_with_metadata.
+
+        For a past session the student_session_history row of that session is
+        LEFT JOINed in the same statement: students with a history row are
+        listed (and filtered) with their historical class/section/roll and
+        returned as a StudentSessionView; the rest are students still in that
+        session. Runs a fixed number of queries regardless of page size.
+        """
         from app.models.student_session_history import StudentSessionHistory
-        from app.models.metadata import SessionYear
 
         # Check if querying for a past session (not current)
         is_past_session = False
         if session_year_id:
-            # Check if this is the current session
-            current_session_query = select(SessionYear).where(
+            current_session_query = select(SessionYear.id).where(
                 and_(
                     SessionYear.id == session_year_id,
                     SessionYear.is_current == True
                 )
             )
             current_session_result = await db.execute(current_session_query)
-            current_session = current_session_result.scalar_one_or_none()
-            is_past_session = current_session is None
+            is_past_session = current_session_result.scalar_one_or_none() is None
 
-        # If querying past session, get student IDs from both students and history tables
+        conditions = []
+        history = None
         if is_past_session and session_year_id:
-            # Get student IDs from history table (those who were promoted)
-            # Apply class/section filter against historical values from history table
-            history_conditions = [StudentSessionHistory.session_year_id == session_year_id]
-            if class_filter:
-                history_conditions.append(StudentSessionHistory.class_id == class_filter)
-            if section_filter:
-                history_conditions.append(StudentSessionHistory.section == section_filter)
-
-            history_query = select(StudentSessionHistory.student_id).where(
-                and_(*history_conditions)
-            ).distinct()
-            history_result = await db.execute(history_query)
-            history_student_ids = [row[0] for row in history_result.all()]
-
-            # Get all history student_ids (without class/section filter) to identify
-            # students who were promoted from this session vs never promoted
-            all_history_query = select(StudentSessionHistory.student_id).where(
-                StudentSessionHistory.session_year_id == session_year_id
-            ).distinct()
-            all_history_result = await db.execute(all_history_query)
-            all_history_student_ids = [row[0] for row in all_history_result.all()]
-
-            # Get student IDs from students table (those never promoted from that session)
-            # For these students, class/section filter applies against current Student fields
-            remaining_conditions = [Student.session_year_id == session_year_id]
-            if all_history_student_ids:
-                remaining_conditions.append(~Student.id.in_(all_history_student_ids))
+            history = StudentSessionHistory
+            has_history = history.id.isnot(None)
+            # Students progressed to that session, or still in it and never progressed
+            conditions.append(or_(has_history, Student.session_year_id == session_year_id))
+            # Class/section filters apply to the historical values when there is a history row
             if class_filter:
-                remaining_conditions.append(Student.class_id == class_filter)
+                conditions.append(case((has_history, history.class_id), else_=Student.class_id) == class_filter)
             if section_filter:
-                remaining_conditions.append(Student.section == section_filter)
-
-            remaining_query = select(Student.id).where(and_(*remaining_conditions))
-            remaining_result = await db.execute(remaining_query)
-            remaining_student_ids = [row[0] for row in remaining_result.all()]
-
-            # Combine both lists
-            all_student_ids = list(set(history_student_ids + remaining_student_ids))
-
-            # Now query students table with these IDs
-            query = select(Student).where(Student.id.in_(all_student_ids))
-        else:
-            # Current session or no session filter - normal query
-            query = select(Student)
-
-        # Apply filters
-        conditions = []
+                conditions.append(case((has_history, history.section), else_=Student.section) == section_filter)
 
         # Only filter by is_active if explicitly provided
         if is_active is not None:
@@ -539,9 +528,6 @@ class CRUDStudent(CRUDBase[Student, StudentCreate, StudentUpdate]):
                 (Student.is_deleted == False) | (Student.is_deleted.is_(None))
             )
 
-        # For past sessions, class/section filter is applied above (against history or
-        # current fields based on whether student was promoted). Skip here to avoid
-        # double-filtering against current Student.class_id/section.
         if class_filter and not is_past_session:
             conditions.append(Student.class_id == class_filter)
 
@@ -566,21 +552,37 @@ class CRUDStudent(CRUDBase[Student, StudentCreate, StudentUpdate]):
             ]
             conditions.append(or_(*search_conditions))
 
-        query = query.where(and_(*conditions))
+        def with_history(query):
+            if history is None:
+                return query
+            return query.outerjoin(
+                history,
+                and_(history.student_id == Student.id, history.session_year_id == session_year_id)
+            )
 
-        # Get total count - include the same base filter as main query
-        count_query = select(func.count(Student.id))
-        if is_past_session and session_year_id:
-            count_query = count_query.where(Student.id.in_(all_student_ids))
-        count_query = count_query.where(and_(*conditions))
+        # Get total count - same joins and filters as the page
+        count_query = with_history(select(func.count(Student.id)).select_from(Student)).where(and_(*conditions))
         total_result = await db.execute(count_query)
         total = total_result.scalar()
 
-        # Get paginated results
-        query = query.order_by(Student.first_name, Student.last_name).offset(skip).limit(limit)
+        # Get paginated results with metadata (many-to-one, joined into the same statement)
+        entities = (Student,) if history is None else (Student, history)
+        query = with_history(select(*entities)).where(and_(*conditions)).options(
+            joinedload(Student.gender),
+            joinedload(Student.class_ref),
+            joinedload(Student.session_year)
+        )
+        if history is not None:
+            query = query.options(joinedload(history.class_ref), joinedload(history.session_year))
+        query = query.order_by(Student.first_name, Student.last_name, Student.id).offset(skip).limit(limit)
         result = await db.execute(query)
 
-        return result.scalars().all(), total
+        if history is None:
+            return result.scalars().all(), total
+        return [
+            StudentSessionView(student, history_record) if history_record else student
+            for student, history_record in result.all()
+        ], total
 
     async def get_by_class(
         self, db: AsyncSession, *, class_name: str, section: Optional[str] = None
@@ -2,16 +2,69 @@ from typing import List, Optional, Dict, Any, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload, joinedload
-from sqlalchemy import and_, or_, func, text
+from sqlalchemy import and_, or_, text, insert, update
 from decimal import Decimal
 from datetime import date
+import time
 
 from app.crud.base import CRUDBase
 from app.models.student_sibling import StudentSibling
-from app.models.student import Student
+from app.models.student import Student, family_key_for
 from app.schemas.student_sibling import StudentSiblingCreate, StudentSiblingUpdate
 
 
+class SiblingWaiverRules:
+    """
+    In-memory table of the sibling waiver slabs.
+
+    The rules live in the calculate_sibling_fee_waiver / get_waiver_reason_text
+    SQL functions; the table is loaded from them in one query (all family sizes up
+    to max_total) and kept for the life of the process, so recalculating a family
+    no longer calls the database twice per child. Larger families reload a bigger table.
+    """
+
+    def __init__(self, max_total: int = 12):
+        self.max_total = max_total
+        self._rules: Dict[Tuple[int, int], Tuple[Decimal, Optional[str]]] = {}
+        self._loaded_total = 0
+
+    async def _load(self, db: AsyncSession, max_total: int) -> None:
+        result = await db.execute(
+            text("""
+                SELECT total, birth_order, waiver,
+                       get_waiver_reason_text(total, birth_order, waiver) AS reason
+                FROM (
+                    SELECT t.total, o.birth_order,
+                           calculate_sibling_fee_waiver(t.total, o.birth_order) AS waiver
+                    FROM generate_series(1, :max_total) AS t(total)
+                    CROSS JOIN LATERAL generate_series(1, t.total) AS o(birth_order)
+                ) slabs
+            """),
+            {"max_total": max_total}
+        )
+        self._rules = {
+            (row.total, row.birth_order): (Decimal(str(row.waiver or 0)), row.reason if row.waiver else None)
+            for row in result.fetchall()
+        }
+        self._loaded_total = max_total
+
+    async def get(self, db: AsyncSession, total_siblings: int, birth_order: int) -> Tuple[Decimal, Optional[str]]:
+        """(waiver_percentage, waiver_reason) for a position in a family"""
+        if not total_siblings or not birth_order or birth_order > total_siblings:
+            return Decimal("0.00"), None
+        if total_siblings > self._loaded_total:
+            await self._load(db, max(self.max_total, total_siblings))
+        return self._rules.get((total_siblings, birth_order), (Decimal("0.00"), None))
+
+    def clear(self) -> None:
+        self._rules = {}
+        self._loaded_total = 0
+
+
+# Global waiver rule table
+sibling_waiver_rules = SiblingWaiverRules()
+
+
 class CRUDStudentSibling(CRUDBase[StudentSibling, StudentSiblingCreate, StudentSiblingUpdate]):
     def __init__(self):
         super().__init__(StudentSibling)
@@ -27,27 +80,16 @@ class CRUDStudentSibling(CRUDBase[StudentSibling, StudentSiblingCreate, StudentS
         Detect potential siblings based on matching father_name and father_phone.
         Returns list of students ordered by date_of_birth (eldest first).
 
-        Handles multi-word names with varying whitespace patterns by:
-        - Normalizing multiple spaces to single space
-        - Case-insensitive comparison
-        - Trimming leading/trailing whitespace
+        Matches on the persisted family key (father name with whitespace collapsed,
+        case-insensitive, plus the father phone), which is indexed.
         """
-        if not father_name or not father_phone:
+        family_key = family_key_for(father_name, father_phone)
+        if not family_key:
             return []
 
-        # Normalize the input father name: trim and collapse multiple spaces to single space
-        import re
-        normalized_father_name = re.sub(r'\s+', ' ', father_name.strip()).lower()
-        normalized_phone = father_phone.strip()
-
-        # Build query to find students with matching father details
-        # Use REGEXP_REPLACE in PostgreSQL to normalize whitespace in database values
         query = select(Student).where(
             and_(
-                func.lower(
-                    func.regexp_replace(Student.father_name, r'\s+', ' ', 'g')
-                ) == normalized_father_name,
-                Student.father_phone == normalized_phone,
+                Student.family_key == family_key,
                 Student.is_active == True,
                 or_(Student.is_deleted == False, Student.is_deleted.is_(None))
             )
@@ -58,7 +100,7 @@ class CRUDStudentSibling(CRUDBase[StudentSibling, StudentSiblingCreate, StudentS
             query = query.where(Student.id != exclude_student_id)
 
         # Order by date of birth (eldest first)
-        query = query.order_by(Student.date_of_birth.asc())
+        query = query.order_by(Student.date_of_birth.asc(), Student.id.asc())
 
         result = await db.execute(query)
         return result.scalars().all()
@@ -71,27 +113,10 @@ class CRUDStudentSibling(CRUDBase[StudentSibling, StudentSiblingCreate, StudentS
     ) -> Tuple[Decimal, Optional[str]]:
         """
         Calculate fee waiver percentage based on total siblings and birth order.
-        Uses the database function for calculation.
+        Uses the cached waiver rule table.
         Returns: (waiver_percentage, waiver_reason)
         """
-        # Call database function to calculate waiver
-        result = await db.execute(
-            text("SELECT calculate_sibling_fee_waiver(:total, :order)"),
-            {"total": total_siblings, "order": birth_order}
-        )
-        waiver_percentage = result.scalar() or Decimal("0.00")
-        
-        # Get waiver reason text
-        if waiver_percentage > 0:
-            reason_result = await db.execute(
-                text("SELECT get_waiver_reason_text(:total, :order, :waiver)"),
-                {"total": total_siblings, "order": birth_order, "waiver": float(waiver_percentage)}
-            )
-            waiver_reason = reason_result.scalar()
-        else:
-            waiver_reason = None
-        
-        return Decimal(str(waiver_percentage)), waiver_reason
+        return await sibling_waiver_rules.get(db, total_siblings, birth_order)
 
     async def get_siblings_for_student(
         self,
@@ -259,7 +284,7 @@ class CRUDStudentSibling(CRUDBase[StudentSibling, StudentSiblingCreate, StudentS
         result = await db.execute(
             select(Student.id, Student.date_of_birth).where(
                 Student.id.in_(family_student_ids)
-            ).order_by(Student.date_of_birth.asc())
+            ).order_by(Student.date_of_birth.asc(), Student.id.asc())
         )
         students_by_dob = result.all()
 
@@ -274,23 +299,22 @@ class CRUDStudentSibling(CRUDBase[StudentSibling, StudentSiblingCreate, StudentS
         # Create bidirectional relationships for each pair
         for i, (student_id, _) in enumerate(students_by_dob):
             birth_order = i + 1
-            waiver_percentage, waiver_reason = await self.calculate_sibling_waiver(
-                db, total_siblings, birth_order
-            )
+            waiver_percentage, _ = await sibling_waiver_rules.get(db, total_siblings, birth_order)
 
             # Create relationships with all other siblings
-            for j, (other_student_id, _) in enumerate(students_by_dob):
-                if i != j:
-                    sibling_relationship = StudentSibling(
-                        student_id=student_id,
-                        sibling_student_id=other_student_id,
-                        relationship_type="SIBLING",
-                        is_auto_detected=True,
-                        birth_order=birth_order,
-                        fee_waiver_percentage=waiver_percentage,
-                        is_active=True
-                    )
-                    db.add(sibling_relationship)
+            db.add_all([
+                StudentSibling(
+                    student_id=student_id,
+                    sibling_student_id=other_student_id,
+                    relationship_type="SIBLING",
+                    is_auto_detected=True,
+                    birth_order=birth_order,
+                    fee_waiver_percentage=waiver_percentage,
+                    is_active=True
+                )
+                for j, (other_student_id, _) in enumerate(students_by_dob)
+                if i != j
+            ])
 
         await db.flush()
 
@@ -321,6 +345,166 @@ class CRUDStudentSibling(CRUDBase[StudentSibling, StudentSiblingCreate, StudentS
         )
         return result.scalars().all()
 
+    async def cluster_all_families(
+        self,
+        db: AsyncSession,
+        dry_run: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Cluster the whole school into sibling families in one pass and bring
+        student_siblings in line with it set-wise.
+
+        Families are the connected groups of active students sharing a family key,
+        joined with the existing active sibling links (so manual links are kept).
+        Birth orders and waivers are recomputed per family from the cached rule
+        table; only missing or changed relationship rows are written, in bulk.
+        Stale family keys (e.g. after raw SQL edits of father details) are refreshed.
+        Fee records are not touched: waiver_changes lists the students whose fee
+        records need recalculating.
+        """
+        start = time.perf_counter()
+
+        # 1. Active students with their father details
+        student_rows = (await db.execute(
+            select(
+                Student.id, Student.father_name, Student.father_phone,
+                Student.family_key, Student.date_of_birth
+            ).where(
+                and_(
+                    Student.is_active == True,
+                    or_(Student.is_deleted == False, Student.is_deleted.is_(None))
+                )
+            )
+        )).all()
+
+        birth_dates: Dict[int, Optional[date]] = {}
+        families_by_key: Dict[str, List[int]] = {}
+        stale_keys: List[Dict[str, Any]] = []
+        for row in student_rows:
+            birth_dates[row.id] = row.date_of_birth
+            family_key = family_key_for(row.father_name, row.father_phone)
+            if family_key != row.family_key:
+                stale_keys.append({"id": row.id, "family_key": family_key})
+            if family_key:
+                families_by_key.setdefault(family_key, []).append(row.id)
+
+        # 2. Existing relationship rows (all, since the pair is unique) and the active links
+        existing_rows = (await db.execute(
+            select(
+                StudentSibling.id, StudentSibling.student_id, StudentSibling.sibling_student_id,
+                StudentSibling.birth_order, StudentSibling.fee_waiver_percentage, StudentSibling.is_active
+            )
+        )).all()
+        existing = {(row.student_id, row.sibling_student_id): row for row in existing_rows}
+
+        # 3. Union students sharing a key and students already linked
+        parent: Dict[int, int] = {}
+
+        def find(student_id: int) -> int:
+            parent.setdefault(student_id, student_id)
+            while parent[student_id] != student_id:
+                parent[student_id] = parent[parent[student_id]]
+                student_id = parent[student_id]
+            return student_id
+
+        def union(first: int, second: int) -> None:
+            parent[find(first)] = find(second)
+
+        for member_ids in families_by_key.values():
+            for member_id in member_ids[1:]:
+                union(member_ids[0], member_id)
+        for row in existing_rows:
+            if row.is_active:
+                union(row.student_id, row.sibling_student_id)
+
+        # Linked students outside the active set (inactive/deleted) keep their links
+        missing_birth_dates = [student_id for student_id in parent if student_id not in birth_dates]
+        if missing_birth_dates:
+            result = await db.execute(
+                select(Student.id, Student.date_of_birth).where(Student.id.in_(missing_birth_dates))
+            )
+            birth_dates.update({row.id: row.date_of_birth for row in result.all()})
+
+        families: Dict[int, List[int]] = {}
+        for student_id in parent:
+            if student_id in birth_dates:
+                families.setdefault(find(student_id), []).append(student_id)
+
+        # 4. Desired rows per family: eldest first, waiver from the rule table
+        inserts: List[Dict[str, Any]] = []
+        updates: List[Dict[str, Any]] = []
+        waiver_changes: List[Dict[str, Any]] = []
+        family_count = 0
+        students_in_families = 0
+        for member_ids in families.values():
+            if len(member_ids) < 2:
+                continue
+            family_count += 1
+            students_in_families += len(member_ids)
+            ordered = sorted(member_ids, key=lambda student_id: (birth_dates[student_id] or date.max, student_id))
+            total_siblings = len(ordered)
+
+            for index, student_id in enumerate(ordered):
+                birth_order = index + 1
+                waiver_percentage, _ = await sibling_waiver_rules.get(db, total_siblings, birth_order)
+                previous_waiver = None
+
+                for other_student_id in ordered:
+                    if other_student_id == student_id:
+                        continue
+                    row = existing.get((student_id, other_student_id))
+                    if row is None:
+                        inserts.append({
+                            "student_id": student_id,
+                            "sibling_student_id": other_student_id,
+                            "relationship_type": "SIBLING",
+                            "is_auto_detected": True,
+                            "birth_order": birth_order,
+                            "fee_waiver_percentage": waiver_percentage,
+                            "is_active": True
+                        })
+                        continue
+                    if row.is_active and previous_waiver is None:
+                        previous_waiver = Decimal(str(row.fee_waiver_percentage or 0))
+                    if (row.birth_order, Decimal(str(row.fee_waiver_percentage or 0)), row.is_active) != (
+                        birth_order, waiver_percentage, True
+                    ):
+                        updates.append({
+                            "id": row.id,
+                            "birth_order": birth_order,
+                            "fee_waiver_percentage": waiver_percentage,
+                            "is_active": True
+                        })
+
+                if (previous_waiver or Decimal("0.00")) != waiver_percentage:
+                    waiver_changes.append({
+                        "student_id": student_id,
+                        "previous_waiver_percentage": previous_waiver or Decimal("0.00"),
+                        "new_waiver_percentage": waiver_percentage
+                    })
+
+        # 5. Write in bulk
+        if not dry_run:
+            if stale_keys:
+                await db.execute(update(Student), stale_keys)
+            if updates:
+                await db.execute(update(StudentSibling), updates)
+            if inserts:
+                await db.execute(insert(StudentSibling), inserts)
+            await db.commit()
+
+        return {
+            "dry_run": dry_run,
+            "students_scanned": len(student_rows),
+            "family_keys_refreshed": len(stale_keys),
+            "families": family_count,
+            "students_in_families": students_in_families,
+            "relationships_inserted": len(inserts),
+            "relationships_updated": len(updates),
+            "waiver_changes": waiver_changes,
+            "duration_ms": round((time.perf_counter() - start) * 1000, 2)
+        }
+
     async def get_sibling_waiver_info(
         self,
         db: AsyncSession,
@@ -379,6 +563,11 @@ class CRUDStudentSibling(CRUDBase[StudentSibling, StudentSiblingCreate, StudentS
         if waiver_percentage == 0:
             return None
 
+        rule_percentage, rule_reason = await sibling_waiver_rules.get(db, total_siblings, birth_order)
+        if rule_percentage == waiver_percentage:
+            return rule_reason
+
+        # Stored waiver differs from the current rules (e.g. set before a rule change)
         result = await db.execute(
             text("SELECT get_waiver_reason_text(:total, :order, :waiver)"),
             {"total": total_siblings, "order": birth_order, "waiver": float(waiver_percentage)}
@@ -10,6 +10,8 @@ from datetime import date, datetime
 from decimal import Decimal
 import calendar
 
+from app.crud.crud_fee_balance import mark_fee_balances_stale
+from app.services.dashboard_engine import mark_dashboard_topic
 from app.models.transport import (
     TransportType, TransportDistanceSlab, StudentTransportEnrollment,
     TransportMonthlyTracking, TransportPayment, TransportPaymentAllocation
@@ -322,6 +324,12 @@ class CRUDTransportMonthlyTracking:
         )
         
         records_created = result.scalar()
+        enrollment_keys = await db.execute(
+            select(StudentTransportEnrollment.student_id, StudentTransportEnrollment.session_year_id)
+            .where(StudentTransportEnrollment.id == enrollment_id)
+        )
+        mark_fee_balances_stale(db, enrollment_keys.all())
+        mark_dashboard_topic(db, "transport")
         await db.commit()
         
         return records_created
@@ -8,7 +8,7 @@ from app.crud.base import CRUDBase
 from app.models.user import User, UserTypeEnum
 from app.models.metadata import UserType
 from app.schemas.user import UserCreate, UserUpdate
-from app.core.security import get_password_hash, verify_password
+from app.core.security import get_password_hash_async, verify_password_async
 from app.core.logging import log_crud_operation
 
 
@@ -38,7 +38,7 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
 
         db_obj = User(
             email=obj_in.email,
-            password=get_password_hash(obj_in.password),
+            password=await get_password_hash_async(obj_in.password),
             first_name=obj_in.first_name,
             last_name=obj_in.last_name,
             phone=obj_in.phone,
@@ -131,7 +131,7 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
 
             # Step 2: Verify password
             try:
-                password_valid = verify_password(password, user.password)
+                password_valid = await verify_password_async(password, user.password)
                 log_crud_operation("AUTHENTICATE", f"Password verification completed",
                                  email=email, valid=password_valid)
             except Exception as password_error:
@@ -6,15 +6,17 @@ from .metadata import (
 from .user import User
 from .teacher import Teacher
 from .student import Student
-from .fee import FeeStructure, FeeRecord, FeePayment, MonthlyFeeTracking, MonthlyPaymentAllocation
+from .fee import FeeStructure, FeeRecord, FeePayment, MonthlyFeeTracking, MonthlyPaymentAllocation, StudentFeeBalance
 from .leave import LeaveRequest, LeaveBalance, LeavePolicy, LeaveApprover
 from .expense import Expense, Vendor, Budget, ExpenseReport
 from .gallery import GalleryCategory, GalleryImage
 from .inventory import InventoryItemType, InventorySizeType, InventoryPricing, InventoryPurchase, InventoryPurchaseItem
 from .attendance import AttendanceStatus, AttendancePeriod, AttendanceRecord
-from .alert import AlertType, AlertStatus, Alert
+from .alert import AlertType, AlertStatus, Alert, AlertUnreadCounter
 from .progression_action import ProgressionAction
 from .student_session_history import StudentSessionHistory
+from .progression_batch import ProgressionBatch, ProgressionBatchItem
+from .receipt_job import ReceiptJob
 
 __all__ = [
     # Metadata models
@@ -31,11 +33,14 @@ __all__ = [
     "Teacher",
     "Student",
     "StudentSessionHistory",
+    "ProgressionBatch",
+    "ProgressionBatchItem",
     "FeeStructure",
     "FeeRecord",
     "FeePayment",
     "MonthlyFeeTracking",
     "MonthlyPaymentAllocation",
+    "StudentFeeBalance",
     "LeaveRequest",
     "LeaveBalance",
     "LeavePolicy",
@@ -52,5 +57,7 @@ __all__ = [
     "InventoryPurchase",
     "InventoryPurchaseItem",
     "AttendanceRecord",
-    "Alert"
+    "Alert",
+    "AlertUnreadCounter",
+    "ReceiptJob"
 ]
@@ -1,7 +1,8 @@
 """
 Alert/Notification models for the school management system
 Follows metadata-driven architecture pattern
-Matches database schema in T800_alert_types.sql, T805_alert_statuses.sql, T810_alerts.sql
+Matches database schema in T800_alert_types.sql, T805_alert_statuses.sql, T810_alerts.sql,
+T815_alert_unread_counters.sql
 """
 
 from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, ForeignKey, JSON
@@ -107,7 +108,7 @@ class Alert(Base):
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     # Soft Delete
-    is_deleted = Column(Boolean, default=False)
+    is_deleted = Column(Boolean, nullable=False, default=False)
     deleted_date = Column(DateTime(timezone=True))
 
     # Relationships
@@ -119,3 +120,17 @@ class Alert(Base):
     reader = relationship("User", foreign_keys=[read_by])
     acknowledger = relationship("User", foreign_keys=[acknowledged_by])
 
+
+class AlertUnreadCounter(Base):
+    """
+    Unread, not deleted alerts per visibility bucket: one row per targeted user
+    ('USER', user id), per role of role-wide alerts ('ROLE', role name) and one
+    for broadcasts ('ALL', '*'). A user's unread count is the sum of their three
+    rows. Maintained by crud_alert in the transaction of every alert write.
+    """
+    __tablename__ = "alert_unread_counters"
+
+    recipient_type = Column(String(10), primary_key=True)
+    recipient_key = Column(String(50), primary_key=True)
+    unread_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
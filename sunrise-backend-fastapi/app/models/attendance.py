@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Date, Time, ForeignKey, Text, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, Date, Time, ForeignKey, Text, DateTime, Boolean, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
@@ -48,6 +48,10 @@ class AttendanceRecord(Base):
     Matches database schema in T800_attendance_records.sql
     """
     __tablename__ = "attendance_records"
+    __table_args__ = (
+        # One record per student, date and period (target of the bulk upsert)
+        UniqueConstraint("student_id", "attendance_date", "attendance_period_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     
@@ -351,3 +351,57 @@ class FeePaymentAuditLog(Base):
             'REVERSAL_CREATED': 'Reversal Payment Created'
         }
         return action_map.get(self.action, self.action)
+
+
+class StudentFeeBalance(Base):
+    """
+    Per student and session rollup of monthly_fee_tracking (tuition) and
+    transport_monthly_tracking (enabled months only). Rows are recomputed in the
+    transaction that changes the underlying tracking rows; see crud_fee_balance.
+
+    Overdue figures count unpaid months due before ``as_of_date`` and are rolled
+    forward by the reconciliation job.
+    """
+    __tablename__ = "student_fee_balances"
+
+    student_id = Column(Integer, ForeignKey("students.id"), primary_key=True)
+    session_year_id = Column(Integer, ForeignKey("session_years.id"), primary_key=True)
+
+    # Tuition months
+    months_tracked = Column(Integer, nullable=False, default=0)
+    paid_months = Column(Integer, nullable=False, default=0)
+    partial_months = Column(Integer, nullable=False, default=0)
+    pending_months = Column(Integer, nullable=False, default=0)
+    tuition_expected = Column(DECIMAL(12, 2), nullable=False, default=0.00)
+    tuition_paid = Column(DECIMAL(12, 2), nullable=False, default=0.00)
+    tuition_balance = Column(DECIMAL(12, 2), nullable=False, default=0.00)
+    tuition_overdue_months = Column(Integer, nullable=False, default=0)
+    tuition_overdue_amount = Column(DECIMAL(12, 2), nullable=False, default=0.00)
+
+    # Transport months (service enabled)
+    transport_months = Column(Integer, nullable=False, default=0)
+    transport_expected = Column(DECIMAL(12, 2), nullable=False, default=0.00)
+    transport_paid = Column(DECIMAL(12, 2), nullable=False, default=0.00)
+    transport_balance = Column(DECIMAL(12, 2), nullable=False, default=0.00)
+
+    # Tuition + transport
+    expected_amount = Column(DECIMAL(12, 2), nullable=False, default=0.00)
+    paid_amount = Column(DECIMAL(12, 2), nullable=False, default=0.00)
+    balance_amount = Column(DECIMAL(12, 2), nullable=False, default=0.00)
+    overdue_months = Column(Integer, nullable=False, default=0)
+    overdue_amount = Column(DECIMAL(12, 2), nullable=False, default=0.00)
+    oldest_unpaid_due_date = Column(Date, nullable=True)
+    last_payment_date = Column(Date, nullable=True)
+    as_of_date = Column(Date, nullable=False)
+
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    # Relationships
+    student = relationship("Student")
+    session_year = relationship("SessionYear")
+
+    @property
+    def collection_percentage(self) -> float:
+        if not self.expected_amount:
+            return 0.0
+        return round(float(self.paid_amount) * 100 / float(self.expected_amount), 2)
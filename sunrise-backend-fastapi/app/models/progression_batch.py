@@ -0,0 +1,67 @@
+"""
+Progression batch models - staged, resumable bulk session progression
+Matches database schema in T317_progression_batches.sql
+"""
+
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+
+
+class ProgressionBatch(Base):
+    """
+    One row per bulk progression request. Students are staged as items and
+    processed in committed chunks, so the counters show progress and an
+    interrupted batch resumes from its pending items.
+
+    status: PENDING, RUNNING, COMPLETED, FAILED (a chunk failed; resumable), ROLLED_BACK
+    """
+    __tablename__ = "progression_batches"
+
+    id = Column(Integer, primary_key=True, index=True)
+    batch_id = Column(String(50), nullable=False, unique=True, index=True)
+    from_session_year_id = Column(Integer, ForeignKey("session_years.id"), nullable=False)
+    to_session_year_id = Column(Integer, ForeignKey("session_years.id"), nullable=False)
+
+    status = Column(String(20), nullable=False, default="PENDING")
+    total_students = Column(Integer, nullable=False, default=0)
+    processed_count = Column(Integer, nullable=False, default=0)
+    successful_count = Column(Integer, nullable=False, default=0)
+    failed_count = Column(Integer, nullable=False, default=0)
+    chunk_size = Column(Integer, nullable=False, default=500)
+    last_error = Column(Text, nullable=True)
+
+    created_by = Column(Integer, ForeignKey("users.id"), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    completed_at = Column(DateTime(timezone=True), nullable=True)
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<ProgressionBatch(batch_id='{self.batch_id}', status='{self.status}')>"
+
+
+class ProgressionBatchItem(Base):
+    """
+    One student of a progression batch with the requested action and target
+
+    status: PENDING, DONE, FAILED (validation error, or already progressed when applied; see error_message)
+    """
+    __tablename__ = "progression_batch_items"
+
+    id = Column(Integer, primary_key=True, index=True)
+    batch_id = Column(String(50), ForeignKey("progression_batches.batch_id", ondelete="CASCADE"), nullable=False, index=True)
+    student_id = Column(Integer, ForeignKey("students.id", ondelete="CASCADE"), nullable=False)
+    progression_action_id = Column(Integer, ForeignKey("progression_actions.id"), nullable=True)  # NULL when the requested action is invalid
+    creates_new_session = Column(Boolean, nullable=False, default=True)
+    target_class_id = Column(Integer, ForeignKey("classes.id"), nullable=True)
+    target_section = Column(String(10), nullable=True)
+    target_roll_number = Column(String(20), nullable=True)
+    remarks = Column(Text, nullable=True)
+
+    status = Column(String(20), nullable=False, default="PENDING")
+    error_message = Column(Text, nullable=True)
+
+    def __repr__(self):
+        return f"<ProgressionBatchItem(batch_id='{self.batch_id}', student_id={self.student_id}, status='{self.status}')>"
@@ -0,0 +1,58 @@
+"""
+Receipt job model - durable queue for post-payment receipt delivery
+Matches database schema in T475_receipt_jobs.sql
+"""
+
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, JSON
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+
+
+class ReceiptJob(Base):
+    """
+    One row per payment receipt. The payment handler stores everything needed to
+    render the PDF in ``payload`` and returns; the receipt worker renders, uploads
+    to Cloudinary and sends the WhatsApp message, retrying failed steps.
+
+    job_type: FEE, COMBINED (tuition + transport) or TRANSPORT
+    status: PENDING, PROCESSING, COMPLETED, FAILED
+    receipt_status: PENDING, GENERATED, FAILED
+    whatsapp_status: PENDING, SENT, NO_PHONE, FAILED or the WhatsApp service status
+    """
+    __tablename__ = "receipt_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    job_type = Column(String(20), nullable=False)
+    fee_payment_id = Column(Integer, ForeignKey("fee_payments.id"), nullable=True, index=True)
+    transport_payment_id = Column(Integer, ForeignKey("transport_payments.id"), nullable=True, index=True)
+    receipt_number = Column(String(50), nullable=False)
+
+    # Receipt generator inputs and WhatsApp recipient (JSONB in database)
+    payload = Column(JSON, nullable=False, default=dict)
+
+    # Queue state
+    status = Column(String(20), nullable=False, default="PENDING")
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=5)
+    next_attempt_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    locked_at = Column(DateTime(timezone=True), nullable=True)
+    last_error = Column(Text, nullable=True)
+
+    # Receipt step
+    receipt_status = Column(String(20), nullable=False, default="PENDING")
+    receipt_url = Column(Text, nullable=True)
+    receipt_public_id = Column(String(255), nullable=True)
+
+    # WhatsApp step
+    whatsapp_status = Column(String(30), nullable=False, default="PENDING")
+    whatsapp_phone = Column(String(20), nullable=True)
+    whatsapp_message_sid = Column(String(50), nullable=True)
+
+    created_by = Column(Integer, ForeignKey("users.id"), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    completed_at = Column(DateTime(timezone=True), nullable=True)
+
+    def __repr__(self):
+        return f"<ReceiptJob(id={self.id}, type='{self.job_type}', receipt='{self.receipt_number}', status='{self.status}')>"
@@ -1,7 +1,9 @@
-from sqlalchemy import Column, Integer, String, Date, ForeignKey, Text, DateTime, Boolean
+from typing import Optional
+from sqlalchemy import Column, Integer, String, Date, ForeignKey, Text, DateTime, Boolean, event
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
+import re
 
 from app.core.database import Base
 
@@ -88,6 +90,9 @@ class Student(Base):
     father_email = Column(String(100), nullable=True)
     father_occupation = Column(String(100), nullable=True)
 
+    # Normalized "father name|father phone" used for sibling detection (maintained on write)
+    family_key = Column(String(230), nullable=True)
+
     mother_name = Column(String(100), nullable=False)
     mother_phone = Column(String(15), nullable=True)
     mother_email = Column(String(100), nullable=True)
@@ -162,3 +167,20 @@ class Student(Base):
             return ClassEnum.CLASS_1
         except (AttributeError, TypeError):
             return ClassEnum.CLASS_1
+
+
+def family_key_for(father_name: Optional[str], father_phone: Optional[str]) -> Optional[str]:
+    """
+    Sibling family key: father name trimmed, whitespace collapsed and lowercased,
+    joined with the trimmed father phone. None unless both are present.
+    """
+    if not father_name or not father_name.strip() or not father_phone or not father_phone.strip():
+        return None
+    normalized_name = re.sub(r'\s+', ' ', father_name.strip()).lower()
+    return f"{normalized_name}|{father_phone.strip()}"
+
+
+@event.listens_for(Student, "before_insert")
+@event.listens_for(Student, "before_update")
+def _set_family_key(mapper, connection, target):
+    target.family_key = family_key_for(target.father_name, target.father_phone)
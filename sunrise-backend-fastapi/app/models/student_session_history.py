@@ -2,7 +2,7 @@
 StudentSessionHistory model for tracking student progression across sessions
 """
 
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, UniqueConstraint
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
@@ -16,6 +16,9 @@ class StudentSessionHistory(Base):
     Records how a student moved from one session to another (promoted, retained, etc.)
     """
     __tablename__ = "student_session_history"
+    __table_args__ = (
+        UniqueConstraint('student_id', 'session_year_id', name='uq_student_session_year'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
 
@@ -142,6 +142,30 @@ class BulkAttendanceCreate(BaseModel):
         return v
 
 
+class BulkAttendanceClass(BaseModel):
+    """Records of one class in a whole-school bulk request"""
+    class_id: int
+    records: List[BulkAttendanceItem]
+
+
+class BulkAttendanceSchoolCreate(BaseModel):
+    """Schema for marking attendance for several classes in one request"""
+    session_year_id: int
+    attendance_date: date
+    attendance_period_id: int = 1
+    classes: List[BulkAttendanceClass]
+
+    @field_validator('classes')
+    @classmethod
+    def validate_classes(cls, v):
+        if not v or not any(item.records for item in v):
+            raise ValueError('At least one attendance record is required')
+        class_ids = [item.class_id for item in v]
+        if len(class_ids) != len(set(class_ids)):
+            raise ValueError('Each class can only appear once')
+        return v
+
+
 # ============================================
 # Filters and List Response
 # ============================================
@@ -526,6 +526,46 @@ class StudentMonthlyFeeHistory(BaseModel):
         from_attributes = True
 
 
+# Student Fee Balance (maintained rollup)
+class StudentFeeBalance(BaseModel):
+    student_id: int
+    session_year_id: int
+    admission_number: Optional[str] = None
+    student_name: Optional[str] = None
+    class_name: Optional[str] = None
+
+    # Tuition months
+    months_tracked: int = 0
+    paid_months: int = 0
+    partial_months: int = 0
+    pending_months: int = 0
+    tuition_expected: float = 0
+    tuition_paid: float = 0
+    tuition_balance: float = 0
+    tuition_overdue_months: int = 0
+    tuition_overdue_amount: float = 0
+
+    # Transport months (service enabled)
+    transport_months: int = 0
+    transport_expected: float = 0
+    transport_paid: float = 0
+    transport_balance: float = 0
+
+    # Tuition + transport
+    expected_amount: float = 0
+    paid_amount: float = 0
+    balance_amount: float = 0
+    overdue_months: int = Field(0, description="Unpaid months due before as_of_date")
+    overdue_amount: float = 0
+    oldest_unpaid_due_date: Optional[date] = None
+    last_payment_date: Optional[date] = None
+    as_of_date: date
+    collection_percentage: float = 0
+
+    class Config:
+        from_attributes = True
+
+
 # Enhanced Payment Request
 class EnhancedPaymentRequest(BaseModel):
     student_id: int
@@ -545,3 +585,25 @@ class EnableMonthlyTrackingRequest(BaseModel):
     session_year_id: int = Field(..., description="Session year ID for which to enable tracking")
     start_month: int = Field(4, ge=1, le=12, description="Starting academic month (default: April)")
     start_year: Optional[int] = Field(None, description="Starting academic year (default: current year)")
+
+
+# Batch Receipt Reprint
+class ReceiptBatchIncludeEnum(str, Enum):
+    FEE = "FEE"
+    TRANSPORT = "TRANSPORT"
+    ALL = "ALL"
+
+
+class ReceiptBatchOutputEnum(str, Enum):
+    MERGED = "merged"
+    ZIP = "zip"
+
+
+class ReceiptBatchRequest(BaseModel):
+    """Receipts to reprint: payment ids, a payment date range, or ids within a range"""
+    payment_ids: Optional[List[int]] = Field(None, description="Fee payment IDs")
+    transport_payment_ids: Optional[List[int]] = Field(None, description="Transport payment IDs")
+    from_date: Optional[date] = Field(None, description="First payment date (inclusive)")
+    to_date: Optional[date] = Field(None, description="Last payment date (inclusive)")
+    include: ReceiptBatchIncludeEnum = Field(ReceiptBatchIncludeEnum.ALL, description="Fee receipts, transport receipts or both")
+    output: ReceiptBatchOutputEnum = Field(ReceiptBatchOutputEnum.MERGED, description="One print-ready PDF or a ZIP of receipts")
@@ -106,9 +106,39 @@ class BulkProgressionResponse(BaseModel):
     total_processed: int
     successful_count: int
     failed_count: int
+    status: Optional[str] = None
     results: List[BulkProgressionResultItem]
 
 
+class ProgressionBatchStartResponse(BaseModel):
+    """Response schema for a bulk progression started in the background"""
+    batch_id: str
+    status: str
+    total_students: int
+    failed_count: int
+    message: str
+
+
+class ProgressionBatchStatusResponse(BaseModel):
+    """Progress of a bulk progression batch"""
+    batch_id: str
+    status: str
+    from_session_year_id: int
+    to_session_year_id: int
+    total_students: int
+    processed_count: int
+    successful_count: int
+    failed_count: int
+    pending_count: int
+    progress_percentage: float
+    running_in_process: bool = False
+    last_error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+    results: Optional[List[BulkProgressionResultItem]] = None
+
+
 # =====================================================
 # Progression History Schemas
 # =====================================================
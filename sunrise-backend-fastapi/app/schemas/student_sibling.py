@@ -129,3 +129,22 @@ class SiblingRecalculationResult(BaseModel):
     total_siblings_count: int
     message: str
 
+
+class SiblingWaiverChange(BaseModel):
+    """A student whose sibling waiver changed during clustering"""
+    student_id: int
+    previous_waiver_percentage: Decimal
+    new_waiver_percentage: Decimal
+
+
+class SiblingClusteringReport(BaseModel):
+    """Result of clustering the whole school into sibling families"""
+    dry_run: bool
+    students_scanned: int
+    family_keys_refreshed: int
+    families: int
+    students_in_families: int
+    relationships_inserted: int
+    relationships_updated: int
+    waiver_changes: List[SiblingWaiverChange]
+    duration_ms: float
@@ -0,0 +1,421 @@
+"""
+Alert Broker - server push for new alerts and unread-count changes
+
+Committed alert writes are published as events and fanned out to the open
+/alerts/stream connections of the users who can see them (same visibility
+rules as the alert queries: a targeted user, a role, or everyone):
+
+- "alert_created" when an alert is inserted (AlertService.create_* and any
+  other alert_crud.create_alert caller)
+- "count_changed" when an alert's status changes (read, acknowledged,
+  dismissed, mark-all-read)
+
+Events are collected by ORM events on the session (bulk update(Alert) writers
+queue theirs with mark_alert_counts_changed) and published only after the
+transaction commits, so rolled-back alerts are never pushed.
+
+The fan-out backend is pluggable (ALERT_PUBSUB_BACKEND):
+
+- "memory": in-process, for a single API worker
+- "postgres": LISTEN/NOTIFY on the application database, so an alert created
+  by one worker reaches streams held by every worker (the default when
+  DATABASE_URL is PostgreSQL)
+"""
+
+import asyncio
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+
+from app.core.config import settings
+from app.models.alert import Alert
+
+logger = logging.getLogger(__name__)
+
+ALERT_CREATED = "alert_created"
+COUNT_CHANGED = "count_changed"
+
+UNREAD_STATUS_ID = 1
+
+_PENDING_EVENTS = "pending_alert_events"
+
+
+@dataclass
+class AlertEvent:
+    """One alert change and the users it concerns"""
+    event: str
+    user_ids: FrozenSet[int] = frozenset()
+    roles: FrozenSet[str] = frozenset()
+    everyone: bool = False
+    alert: Optional[Dict[str, Any]] = None
+
+    @classmethod
+    def for_alert(cls, event_name: str, alert: Alert, with_alert: bool = False) -> "AlertEvent":
+        """Audience of an alert: its target user, else its target role, else everyone"""
+        if alert.target_user_id is not None:
+            audience = {"user_ids": frozenset({alert.target_user_id})}
+        elif alert.target_role is not None:
+            audience = {"roles": frozenset({alert.target_role})}
+        else:
+            audience = {"everyone": True}
+        summary = None
+        if with_alert:
+            summary = {
+                "id": alert.id,
+                "alert_type_id": alert.alert_type_id,
+                "alert_status_id": alert.alert_status_id,
+                "title": alert.title,
+                "message": alert.message,
+                "entity_type": alert.entity_type,
+                "entity_id": alert.entity_id,
+                "priority_level": alert.priority_level,
+                "actor_name": alert.actor_name
+            }
+        return cls(event=event_name, alert=summary, **audience)
+
+    def reaches(self, user_id: int, role: Optional[str]) -> bool:
+        return self.everyone or user_id in self.user_ids or (role is not None and role in self.roles)
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "event": self.event,
+            "user_ids": sorted(self.user_ids),
+            "roles": sorted(self.roles),
+            "everyone": self.everyone,
+            "alert": self.alert
+        }, default=str)
+
+    @classmethod
+    def from_json(cls, payload: str) -> "AlertEvent":
+        data = json.loads(payload)
+        return cls(
+            event=data["event"],
+            user_ids=frozenset(data.get("user_ids") or ()),
+            roles=frozenset(data.get("roles") or ()),
+            everyone=bool(data.get("everyone")),
+            alert=data.get("alert")
+        )
+
+
+@dataclass(eq=False)
+class AlertSubscription:
+    """Events for one open stream"""
+    user_id: int
+    role: Optional[str]
+    queue: asyncio.Queue = field(default_factory=lambda: asyncio.Queue(maxsize=settings.ALERT_STREAM_QUEUE_SIZE))
+    # Set when events were dropped because the client fell behind; the stream resyncs the count
+    overflowed: bool = False
+
+
+class InProcessAlertBackend:
+    """Delivers published events to the streams of this process only"""
+
+    name = "memory"
+
+    def __init__(self):
+        self.deliver: Optional[Callable[[str], None]] = None
+
+    async def start(self, deliver: Callable[[str], None]) -> None:
+        self.deliver = deliver
+
+    async def stop(self) -> None:
+        pass
+
+    async def publish(self, payload: str) -> None:
+        if self.deliver is not None:
+            self.deliver(payload)
+
+
+class PostgresAlertBackend:
+    """
+    Cross-worker fan-out with PostgreSQL LISTEN/NOTIFY. Every worker listens on
+    one dedicated connection; a published event is delivered to all of them,
+    including the publisher. The listening connection is re-opened if it drops.
+    """
+
+    name = "postgres"
+    RECONNECT_SECONDS = 5
+
+    def __init__(self, dsn: Optional[str] = None, channel: Optional[str] = None):
+        self.dsn = dsn or settings.DATABASE_URL
+        self.channel = channel or settings.ALERT_PUBSUB_CHANNEL
+        self.deliver: Optional[Callable[[str], None]] = None
+        self._conn = None
+        self._lock = asyncio.Lock()
+        self._reconnect_task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    async def start(self, deliver: Callable[[str], None]) -> None:
+        self.deliver = deliver
+        self._stopping = False
+        await self._connect()
+
+    async def _connect(self) -> None:
+        import asyncpg
+
+        conn = await asyncpg.connect(self.dsn)
+        await conn.add_listener(self.channel, self._on_notify)
+        conn.add_termination_listener(self._on_terminated)
+        self._conn = conn
+        logger.info(f"Alert broker listening on PostgreSQL channel '{self.channel}'")
+
+    def _on_notify(self, connection, pid, channel, payload) -> None:
+        if self.deliver is not None:
+            self.deliver(payload)
+
+    def _on_terminated(self, connection) -> None:
+        self._conn = None
+        if not self._stopping and self._reconnect_task is None:
+            self._reconnect_task = asyncio.get_running_loop().create_task(self._reconnect())
+
+    async def _reconnect(self) -> None:
+        try:
+            while not self._stopping and self._conn is None:
+                await asyncio.sleep(self.RECONNECT_SECONDS)
+                try:
+                    await self._connect()
+                except Exception as e:
+                    logger.warning(f"Alert broker could not reconnect to PostgreSQL: {e}")
+        finally:
+            self._reconnect_task = None
+
+    async def stop(self) -> None:
+        self._stopping = True
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            await conn.close()
+
+    async def publish(self, payload: str) -> None:
+        if self._conn is None:
+            raise ConnectionError("alert broker is not connected")
+        async with self._lock:
+            await self._conn.execute("SELECT pg_notify($1, $2)", self.channel, payload)
+
+
+def create_alert_backend(name: Optional[str] = None):
+    name = (name or settings.ALERT_PUBSUB_BACKEND).lower()
+    if name == "postgres":
+        return PostgresAlertBackend()
+    return InProcessAlertBackend()
+
+
+class AlertBroker:
+    """Fans committed alert events out to subscribed streams"""
+
+    def __init__(self, backend=None):
+        self.backend = backend or create_alert_backend()
+        self._by_user: Dict[int, Set[AlertSubscription]] = {}
+        self._by_role: Dict[str, Set[AlertSubscription]] = {}
+        self._all: Set[AlertSubscription] = set()
+        self._started = False
+
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.publish_errors = 0
+
+    async def start(self) -> None:
+        if not self._started:
+            await self.backend.start(self._deliver)
+            self._started = True
+
+    async def stop(self) -> None:
+        if self._started:
+            self._started = False
+            await self.backend.stop()
+
+    def subscribe(self, user_id: int, role: Optional[str]) -> AlertSubscription:
+        subscription = AlertSubscription(user_id=user_id, role=role)
+        self._all.add(subscription)
+        self._by_user.setdefault(user_id, set()).add(subscription)
+        if role is not None:
+            self._by_role.setdefault(role, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: AlertSubscription) -> None:
+        self._all.discard(subscription)
+        for index, key in ((self._by_user, subscription.user_id), (self._by_role, subscription.role)):
+            subscriptions = index.get(key)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del index[key]
+
+    async def publish(self, events: List[AlertEvent]) -> None:
+        if not self._started:
+            await self.start()
+        for alert_event in events:
+            try:
+                await self.backend.publish(alert_event.to_json())
+                self.published += 1
+            except Exception as e:
+                self.publish_errors += 1
+                logger.warning(f"Could not publish alert event '{alert_event.event}': {e}")
+
+    def publish_after_commit(self, events: List[AlertEvent]) -> None:
+        """Schedule publication from synchronous code (session commit hooks)"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # no event loop (sync scripts): nobody is streaming from this process
+        loop.create_task(self.publish(events))
+
+    def _deliver(self, payload: str) -> None:
+        try:
+            alert_event = AlertEvent.from_json(payload)
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Ignoring malformed alert event: {e}")
+            return
+
+        if alert_event.everyone:
+            targets = self._all
+        else:
+            targets = set()
+            for user_id in alert_event.user_ids:
+                targets |= self._by_user.get(user_id, set())
+            for role in alert_event.roles:
+                targets |= self._by_role.get(role, set())
+
+        for subscription in list(targets):
+            try:
+                subscription.queue.put_nowait(alert_event)
+                self.delivered += 1
+            except asyncio.QueueFull:
+                subscription.overflowed = True
+                self.dropped += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend.name,
+            "started": self._started,
+            "subscribers": len(self._all),
+            "subscribed_users": len(self._by_user),
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "publish_errors": self.publish_errors
+        }
+
+
+def sse_message(event_name: str, data: Dict[str, Any]) -> str:
+    return f"event: {event_name}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+async def stream_alert_events(
+    subscription: AlertSubscription,
+    count_unread: Callable[[], Awaitable[int]],
+    is_disconnected: Callable[[], Awaitable[bool]],
+    heartbeat_seconds: Optional[float] = None,
+    max_seconds: Optional[float] = None
+) -> AsyncIterator[str]:
+    """
+    Server-sent events for one subscription:
+
+    - ``unread_count`` on connect, after status changes and after an overflow
+      (status changes arriving together are answered with a single recount)
+    - ``alert`` for each new alert, with the unread count it brings
+    - a comment line every heartbeat so proxies keep the connection open
+
+    Ends when the client disconnects or after ``max_seconds``; the browser's
+    EventSource reconnects on its own.
+    """
+    heartbeat_seconds = settings.ALERT_STREAM_HEARTBEAT_SECONDS if heartbeat_seconds is None else heartbeat_seconds
+    max_seconds = settings.ALERT_STREAM_MAX_SECONDS if max_seconds is None else max_seconds
+    deadline = time.monotonic() + max_seconds
+
+    unread = await count_unread()
+    yield sse_message("unread_count", {"unread_count": unread})
+
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0 or await is_disconnected():
+            return
+        try:
+            alert_event = await asyncio.wait_for(subscription.queue.get(), timeout=min(heartbeat_seconds, remaining))
+        except asyncio.TimeoutError:
+            yield ": keepalive\n\n"
+            continue
+
+        batch = [alert_event]
+        while not subscription.queue.empty():
+            batch.append(subscription.queue.get_nowait())
+
+        recount = subscription.overflowed or any(e.event == COUNT_CHANGED for e in batch)
+        subscription.overflowed = False
+        if recount:
+            unread = await count_unread()
+
+        for created in (e for e in batch if e.event == ALERT_CREATED):
+            status_id = (created.alert or {}).get("alert_status_id")
+            if not recount and status_id in (None, UNREAD_STATUS_ID):
+                unread += 1
+            yield sse_message("alert", {"alert": created.alert, "unread_count": unread})
+
+        if recount:
+            yield sse_message("unread_count", {"unread_count": unread})
+
+
+# Global alert broker
+alert_broker = AlertBroker()
+
+
+# =====================================================
+# Publication on committed alert writes
+# =====================================================
+
+def _queue_event(session: Optional[Session], alert_event: AlertEvent) -> None:
+    if session is not None:
+        session.info.setdefault(_PENDING_EVENTS, []).append(alert_event)
+
+
+@event.listens_for(Alert, "after_insert")
+def _alert_created(mapper, connection, target):
+    _queue_event(object_session(target), AlertEvent.for_alert(ALERT_CREATED, target, with_alert=True))
+
+
+@event.listens_for(Alert, "after_update")
+def _alert_updated(mapper, connection, target):
+    status_history = inspect(target).attrs.alert_status_id.history
+    deleted_history = inspect(target).attrs.is_deleted.history
+    if status_history.has_changes() or deleted_history.has_changes():
+        _queue_event(object_session(target), AlertEvent.for_alert(COUNT_CHANGED, target))
+
+
+def mark_alert_counts_changed(db, targets: Iterable[Tuple[Optional[int], Optional[str]]]) -> None:
+    """
+    Queue count_changed at commit for alerts changed by a bulk update(Alert) (the ORM
+    events do not see those rows); targets are the updated rows' (target_user_id, target_role)
+    """
+    user_ids: Set[int] = set()
+    roles: Set[str] = set()
+    everyone = False
+    for target_user_id, target_role in targets:
+        if target_user_id is not None:
+            user_ids.add(target_user_id)
+        elif target_role is not None:
+            roles.add(target_role)
+        else:
+            everyone = True
+    if user_ids or roles or everyone:
+        _queue_event(db, AlertEvent(
+            event=COUNT_CHANGED, user_ids=frozenset(user_ids), roles=frozenset(roles), everyone=everyone
+        ))
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_committed_alert_events(session):
+    events = session.info.pop(_PENDING_EVENTS, None)
+    if events:
+        alert_broker.publish_after_commit(events)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back_alert_events(session):
+    session.info.pop(_PENDING_EVENTS, None)
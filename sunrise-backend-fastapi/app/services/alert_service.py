@@ -328,6 +328,51 @@ class AlertService:
             expires_at=datetime.utcnow() + timedelta(days=30)
         )
 
+    @staticmethod
+    async def create_inventory_low_stock_alert(
+        db: AsyncSession,
+        *,
+        stock_id: int,
+        item_name: str,
+        size_name: Optional[str],
+        remaining_quantity: int,
+        minimum_threshold: int,
+        reorder_quantity: int,
+        actor_user_id: int,
+        actor_name: str,
+        session_year_id: Optional[int] = None,
+        auto_commit: bool = True
+    ) -> Alert:
+        """Create alert when a purchase takes an item to its minimum stock threshold"""
+        size_info = f" (Size {size_name})" if size_name else ""
+        title = f"Low Stock: {item_name}{size_info}"
+        message = f"Only {remaining_quantity} left of {item_name}{size_info} (minimum {minimum_threshold}). Suggested reorder: {reorder_quantity}."
+
+        return await alert_crud.create_alert(
+            db,
+            alert_type_id=AlertService.AlertTypes.INVENTORY_LOW_STOCK,
+            title=title,
+            message=message,
+            entity_type="INVENTORY_STOCK",
+            entity_id=stock_id,
+            entity_display_name=f"{item_name}{size_info}",
+            session_year_id=session_year_id,
+            actor_user_id=actor_user_id,
+            actor_type="ADMIN",
+            actor_name=actor_name,
+            target_role="ADMIN",  # Visible to all admins
+            alert_metadata={
+                "item_name": item_name,
+                "size_name": size_name,
+                "remaining_quantity": remaining_quantity,
+                "minimum_threshold": minimum_threshold,
+                "reorder_quantity": reorder_quantity
+            },
+            priority_level=3,
+            expires_at=datetime.utcnow() + timedelta(days=7),
+            auto_commit=auto_commit
+        )
+
     @staticmethod
     async def create_inventory_stock_procurement_alert(
         db: AsyncSession,
@@ -9,10 +9,10 @@ from typing import Tuple, Dict, Any, Optional
 from datetime import datetime
 
 import cloudinary
-import cloudinary.uploader
 from fastapi import HTTPException, status
 
 from app.core.cloudinary_config import configure_cloudinary
+from app.core.integrations import IntegrationUnavailableError, cloudinary_destroy, cloudinary_upload
 
 
 logger = logging.getLogger(__name__)
@@ -29,7 +29,7 @@ class CloudinaryReceiptService:
         # Ensure Cloudinary is configured
         configure_cloudinary()
 
-    def upload_receipt(
+    async def upload_receipt(
         self,
         pdf_buffer: io.BytesIO,
         payment_id: int,
@@ -75,7 +75,7 @@ class CloudinaryReceiptService:
             # Upload to Cloudinary
             # Note: flags="attachment:false" allows browser to display PDF inline
             # format="pdf" explicitly tells Cloudinary this is a PDF file and adds .pdf extension
-            cloudinary_response = cloudinary.uploader.upload(
+            cloudinary_response = await cloudinary_upload(
                 pdf_buffer,
                 folder=self.RECEIPT_FOLDER,
                 public_id=filename,
@@ -97,6 +97,12 @@ class CloudinaryReceiptService:
         except HTTPException:
             # Re-raise HTTP exceptions
             raise
+        except IntegrationUnavailableError as e:
+            logger.warning(f"Cloudinary unavailable, receipt not uploaded: {e}")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=f"Receipt storage temporarily unavailable: {e}"
+            )
         except Exception as e:
             logger.error(f"Failed to upload receipt to Cloudinary: {str(e)}")
             raise HTTPException(
@@ -104,7 +110,7 @@ class CloudinaryReceiptService:
                 detail=f"Failed to upload receipt to Cloudinary: {str(e)}"
             )
 
-    def delete_receipt(self, cloudinary_public_id: str) -> bool:
+    async def delete_receipt(self, cloudinary_public_id: str) -> bool:
         """
         Delete receipt PDF from Cloudinary
 
@@ -122,7 +128,7 @@ class CloudinaryReceiptService:
             logger.info(f"Deleting receipt from Cloudinary: {cloudinary_public_id}")
 
             # Delete from Cloudinary
-            result = cloudinary.uploader.destroy(
+            result = await cloudinary_destroy(
                 cloudinary_public_id,
                 resource_type="raw"
             )
@@ -8,11 +8,10 @@ import logging
 from typing import Tuple
 from datetime import datetime
 
-import cloudinary
-import cloudinary.uploader
 from fastapi import HTTPException, status
 
 from app.core.cloudinary_config import configure_cloudinary
+from app.core.integrations import IntegrationUnavailableError, cloudinary_destroy, cloudinary_upload
 
 
 logger = logging.getLogger(__name__)
@@ -29,7 +28,7 @@ class CloudinaryTransportReceiptService:
         # Ensure Cloudinary is configured
         configure_cloudinary()
 
-    def upload_receipt(
+    async def upload_receipt(
         self,
         pdf_buffer: io.BytesIO,
         payment_id: int,
@@ -75,7 +74,7 @@ class CloudinaryTransportReceiptService:
             # Upload to Cloudinary
             # Note: flags="attachment:false" allows browser to display PDF inline
             # format="pdf" explicitly tells Cloudinary this is a PDF file and adds .pdf extension
-            cloudinary_response = cloudinary.uploader.upload(
+            cloudinary_response = await cloudinary_upload(
                 pdf_buffer,
                 folder=self.RECEIPT_FOLDER,
                 public_id=filename,
@@ -96,6 +95,12 @@ class CloudinaryTransportReceiptService:
 
         except HTTPException:
             raise
+        except IntegrationUnavailableError as e:
+            logger.warning(f"Cloudinary unavailable, transport receipt not uploaded: {e}")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=f"Receipt storage temporarily unavailable: {e}"
+            )
         except Exception as e:
             logger.error(f"Failed to upload transport receipt to Cloudinary: {str(e)}")
             raise HTTPException(
@@ -103,7 +108,7 @@ class CloudinaryTransportReceiptService:
                 detail=f"Failed to upload transport receipt: {str(e)}"
             )
 
-    def delete_receipt(self, cloudinary_public_id: str) -> bool:
+    async def delete_receipt(self, cloudinary_public_id: str) -> bool:
         """
         Delete transport receipt PDF from Cloudinary
 
@@ -121,7 +126,7 @@ class CloudinaryTransportReceiptService:
             logger.info(f"Deleting transport receipt from Cloudinary: {cloudinary_public_id}")
 
             # Delete from Cloudinary
-            result = cloudinary.uploader.destroy(
+            result = await cloudinary_destroy(
                 cloudinary_public_id,
                 resource_type="raw"
             )
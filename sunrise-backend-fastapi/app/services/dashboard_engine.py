@@ -0,0 +1,942 @@
+"""
+Dashboard Engine - concurrent, cached aggregation of the admin dashboard cards
+
+Each dashboard card is a section: an independent set of aggregate queries that
+runs on its own pooled session (from the read replica router, so the read
+replica when one is configured and fresh), so the sections of one request execute
+concurrently (bounded by DASHBOARD_MAX_CONCURRENCY) instead of one after another
+on the request session. A failing section returns its defaults with an "error"
+and does not affect the others.
+
+Section results are cached per session year (per day, since the cards use
+"this week/month" ranges) for DASHBOARD_CACHE_TTL_SECONDS. Committed ORM writes
+to the tables behind a section (payments, expenses, leave requests, enrollments,
+...) invalidate it immediately through the topics below, and raw SQL writes
+mark their topic with mark_dashboard_topic; the TTL is the backstop for writes
+made outside the application and by other worker processes.
+"""
+
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, event, func, or_, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, object_session
+
+from app.core.config import settings
+from app.core.database import read_router
+from app.crud import fee_record_crud, teacher_crud
+from app.crud.crud_expense import expense_crud
+from app.crud.crud_fee_balance import fee_balance_crud
+from app.crud.crud_inventory_stock import crud_inventory_stock
+from app.crud.crud_leave import leave_request_crud
+from app.models.expense import Expense as ExpenseModel
+from app.models.fee import FeeRecord as FeeRecordModel, FeePayment as FeePaymentModel, MonthlyFeeTracking
+from app.models.inventory import InventoryStock
+from app.models.leave import LeaveRequest
+from app.models.student import Student
+from app.models.student_session_history import StudentSessionHistory
+from app.models.teacher import Teacher
+from app.models.transport import StudentTransportEnrollment, TransportMonthlyTracking, TransportPayment
+
+logger = logging.getLogger(__name__)
+
+# Invalidation topics and the models whose committed writes raise them
+TOPIC_MODELS = {
+    "students": (Student, StudentSessionHistory),
+    "teachers": (Teacher,),
+    "fees": (FeeRecordModel, FeePaymentModel, MonthlyFeeTracking),
+    "leaves": (LeaveRequest,),
+    "expenses": (ExpenseModel,),
+    "transport": (StudentTransportEnrollment, TransportMonthlyTracking, TransportPayment),
+    "inventory": (InventoryStock,),
+}
+
+# Session.info key holding the topics written in the current transaction
+_PENDING_TOPICS = "dashboard_topics_dirty"
+
+
+@dataclass(frozen=True)
+class DashboardContext:
+    """Session year and reference date shared by the sections of one request"""
+    session_year_id: int
+    session_year_name: str
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+    is_current: bool = False
+    today: date = field(default_factory=lambda: datetime.now().date())
+
+    @property
+    def current_month_start(self) -> date:
+        return self.today.replace(day=1)
+
+    @property
+    def last_month_start(self) -> date:
+        return (self.current_month_start - timedelta(days=1)).replace(day=1)
+
+    @property
+    def current_week_start(self) -> date:
+        return self.today - timedelta(days=self.today.weekday())
+
+
+SectionBuilder = Callable[[AsyncSession, DashboardContext], Awaitable[Dict[str, Any]]]
+
+
+@dataclass(frozen=True)
+class DashboardSection:
+    """One dashboard card: its builder, the topics it reads and its defaults on error"""
+    name: str
+    build: SectionBuilder
+    topics: Tuple[str, ...]
+    default: Dict[str, Any]
+    session_scoped: bool = True
+
+
+class DashboardEngine:
+    """Runs dashboard sections concurrently and caches their results"""
+
+    def __init__(self, session_factory=None, ttl_seconds: Optional[float] = None,
+                 max_concurrency: Optional[int] = None):
+        self.session_factory = session_factory or read_router
+        self.ttl_seconds = settings.DASHBOARD_CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self.max_concurrency = max(1, max_concurrency or settings.DASHBOARD_MAX_CONCURRENCY)
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        # key -> (created_at, topic versions at build start, payload)
+        self._entries: Dict[Tuple, Tuple[float, Tuple[int, ...], Dict[str, Any]]] = {}
+        self._build_locks: Dict[Tuple, asyncio.Lock] = {}
+        self._topic_versions: Dict[str, int] = defaultdict(int)
+        self._last_timings: Dict[str, float] = {}
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.invalidations = 0
+
+    async def run(
+        self, sections: Sequence[DashboardSection], ctx: DashboardContext, refresh: bool = False
+    ) -> Tuple[Dict[str, Any], Dict[str, Dict[str, Any]]]:
+        """
+        Build (or serve from cache) every section concurrently.
+        Returns (payload by section name, timing by section name).
+        """
+        results = await asyncio.gather(*(self._run_section(section, ctx, refresh) for section in sections))
+        payloads = {section.name: payload for section, (payload, _) in zip(sections, results)}
+        timings = {section.name: timing for section, (_, timing) in zip(sections, results)}
+        return payloads, timings
+
+    def invalidate(self, topics: Iterable[str]) -> None:
+        """Drop cached sections that read any of the given topics"""
+        topics = set(topics)
+        if not topics:
+            return
+        self.invalidations += 1
+        for topic in topics:
+            self._topic_versions[topic] += 1
+        for key in [key for key in self._entries if topics.intersection(key[1])]:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._build_locks.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "ttl_seconds": self.ttl_seconds,
+            "max_concurrency": self.max_concurrency,
+            "cached_sections": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "errors": self.errors,
+            "invalidations": self.invalidations,
+            "last_build_ms": dict(sorted(self._last_timings.items(), key=lambda item: item[1], reverse=True))
+        }
+
+    def _key(self, section: DashboardSection, ctx: DashboardContext) -> Tuple:
+        scope = (ctx.session_year_id, ctx.is_current) if section.session_scoped else None
+        return (section.name, section.topics, scope, ctx.today)
+
+    def _versions(self, section: DashboardSection) -> Tuple[int, ...]:
+        return tuple(self._topic_versions[topic] for topic in section.topics)
+
+    def _fresh(self, key: Tuple, section: DashboardSection) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        created_at, versions, payload = entry
+        if versions != self._versions(section) or time.time() - created_at >= self.ttl_seconds:
+            self._entries.pop(key, None)
+            return None
+        return payload
+
+    async def _run_section(
+        self, section: DashboardSection, ctx: DashboardContext, refresh: bool
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        caching = self.ttl_seconds > 0
+        key = self._key(section, ctx)
+
+        if caching and not refresh:
+            payload = self._fresh(key, section)
+            if payload is not None:
+                self.hits += 1
+                return payload, {"ms": 0.0, "cached": True}
+
+        # Concurrent misses for the same section share one build (locks are not keyed by day)
+        lock = self._build_locks.setdefault(key[:3], asyncio.Lock()) if caching else None
+        if lock is not None:
+            await lock.acquire()
+        try:
+            if caching and not refresh:
+                payload = self._fresh(key, section)
+                if payload is not None:
+                    self.hits += 1
+                    return payload, {"ms": 0.0, "cached": True}
+
+            self.misses += 1
+            # Read the versions before building so a write during the build leaves the result uncached
+            versions = self._versions(section)
+            payload, duration_ms, failed = await self._build(section, ctx)
+            self._last_timings[section.name] = duration_ms
+            if caching and not failed and versions == self._versions(section):
+                self._entries[key] = (time.time(), versions, payload)
+
+            timing = {"ms": duration_ms, "cached": False}
+            if failed:
+                timing["error"] = True
+            return payload, timing
+        finally:
+            if lock is not None:
+                lock.release()
+
+    async def _build(self, section: DashboardSection, ctx: DashboardContext) -> Tuple[Dict[str, Any], float, bool]:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async with self._semaphore:
+            start = time.perf_counter()
+            try:
+                async with self.session_factory() as db:
+                    payload = await section.build(db, ctx)
+                failed = False
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Dashboard section '{section.name}' failed: {e}", exc_info=True)
+                payload = {**section.default, "error": str(e)}
+                failed = True
+            duration_ms = round((time.perf_counter() - start) * 1000, 2)
+
+        if duration_ms >= 500:
+            logger.warning(f"Slow dashboard section '{section.name}': {duration_ms}ms")
+        return payload, duration_ms, failed
+
+
+# =====================================================
+# Admin dashboard overview cards (/admin-dashboard-stats)
+# =====================================================
+
+async def _past_session_student_count(db: AsyncSession, session_year_id: int) -> int:
+    """
+    Students enrolled in a past session: history rows (promoted) plus students still in
+    that session without one. No is_deleted filter - they were part of that session even
+    if they left school later.
+    """
+    in_history = select(StudentSessionHistory.student_id).where(
+        StudentSessionHistory.session_year_id == session_year_id
+    )
+    history_students = select(func.count(func.distinct(StudentSessionHistory.student_id))).where(
+        StudentSessionHistory.session_year_id == session_year_id
+    ).scalar_subquery()
+    remaining_students = select(func.count(Student.id)).where(
+        and_(Student.session_year_id == session_year_id, ~Student.id.in_(in_history))
+    ).scalar_subquery()
+    result = await db.execute(select(history_students + remaining_students))
+    return result.scalar() or 0
+
+
+async def _students_card(db: AsyncSession, ctx: DashboardContext) -> Dict[str, Any]:
+    session_year_id = ctx.session_year_id
+    if ctx.is_current:
+        # Current session: Query from students table directly
+        result = await db.execute(
+            select(
+                func.count(Student.id).label("total"),
+                func.count(Student.id).filter(Student.created_at >= ctx.current_month_start).label("this_month")
+            ).where(
+                and_(
+                    Student.is_active == True,
+                    or_(Student.is_deleted == False, Student.is_deleted.is_(None)),
+                    Student.session_year_id == session_year_id
+                )
+            )
+        )
+        row = result.one()
+        total_students = row.total or 0
+        students_this_month = row.this_month or 0
+    else:
+        total_students = await _past_session_student_count(db, session_year_id)
+        # For past sessions, "added this month" doesn't make sense
+        students_this_month = 0
+
+    return {
+        "total": total_students,
+        "added_this_month": students_this_month,
+        "change_text": f"+{students_this_month} this month" if ctx.is_current else "Historical data",
+        "is_session_filtered": True,
+        "is_historical": not ctx.is_current
+    }
+
+
+async def _teachers_card(db: AsyncSession, ctx: DashboardContext) -> Dict[str, Any]:
+    teacher_stats = await teacher_crud.get_dashboard_stats(db)
+    teachers_this_month_result = await db.execute(
+        select(func.count(Teacher.id)).where(
+            and_(
+                Teacher.is_active == True,
+                or_(Teacher.is_deleted == False, Teacher.is_deleted.is_(None)),
+                Teacher.created_at >= ctx.current_month_start
+            )
+        )
+    )
+    teachers_this_month = teachers_this_month_result.scalar() or 0
+    return {
+        "total": teacher_stats['total_teachers'],
+        "added_this_month": teachers_this_month,
+        "change_text": f"+{teachers_this_month} this month",
+        "is_session_filtered": False  # Teachers are not session-specific
+    }
+
+
+async def _fees_card(db: AsyncSession, ctx: DashboardContext) -> Dict[str, Any]:
+    fee_summary = await fee_record_crud.get_collection_summary(db, session_year=ctx.session_year_name)
+    fees_this_week_result = await db.execute(
+        select(func.sum(FeePaymentModel.amount)).join(FeeRecordModel).where(
+            and_(
+                FeePaymentModel.payment_date >= ctx.current_week_start,
+                FeeRecordModel.session_year_id == ctx.session_year_id
+            )
+        )
+    )
+    fees_collected_this_week = float(fees_this_week_result.scalar() or 0)
+    return {
+        "pending_amount": fee_summary['pending_amount'],
+        "collected_this_week": fees_collected_this_week,
+        "change_text": f"-₹{fees_collected_this_week:,.0f} this week",
+        "total_collected": fee_summary['paid_amount'],
+        "collection_rate": fee_summary['collection_rate'],
+        "is_session_filtered": True
+    }
+
+
+async def _session_leave_stats(db: AsyncSession, session_year_id: int) -> Dict[str, int]:
+    result = await db.execute(
+        text("""
+            SELECT
+                COUNT(*) as total_requests,
+                COUNT(CASE WHEN leave_status_id = 1 THEN 1 END) as pending_requests,
+                COUNT(CASE WHEN leave_status_id = 2 THEN 1 END) as approved_requests,
+                COUNT(CASE WHEN leave_status_id = 3 THEN 1 END) as rejected_requests
+            FROM sunrise.leave_requests
+            WHERE session_year_id = :session_year_id
+        """),
+        {"session_year_id": session_year_id}
+    )
+    row = result.fetchone()
+    return {
+        'total_requests': row.total_requests or 0,
+        'pending_requests': row.pending_requests or 0,
+        'approved_requests': row.approved_requests or 0,
+        'rejected_requests': row.rejected_requests or 0
+    }
+
+
+async def _leave_requests_card(db: AsyncSession, ctx: DashboardContext) -> Dict[str, Any]:
+    if ctx.session_year_id:
+        leave_stats = await _session_leave_stats(db, ctx.session_year_id)
+    else:
+        # Fallback to all-time stats if no session_year_id available
+        leave_stats = await leave_request_crud.get_leave_statistics(db)
+    return {
+        "total": leave_stats.get('total_requests', 0),
+        "pending": leave_stats.get('pending_requests', 0),
+        "change_text": f"{leave_stats.get('pending_requests', 0)} pending approval",
+        "is_session_filtered": True
+    }
+
+
+async def _expenses_card(db: AsyncSession, ctx: DashboardContext) -> Dict[str, Any]:
+    conditions = [
+        ExpenseModel.is_deleted != True,
+        ExpenseModel.expense_status_id.in_([2, 4])  # Approved or Paid
+    ]
+    if ctx.session_year_id:
+        conditions.append(ExpenseModel.session_year_id == ctx.session_year_id)
+
+    result = await db.execute(
+        select(
+            func.sum(ExpenseModel.amount).filter(
+                and_(ExpenseModel.expense_date >= ctx.current_month_start, ExpenseModel.expense_date <= ctx.today)
+            ).label("current_month"),
+            func.sum(ExpenseModel.amount).filter(
+                and_(
+                    ExpenseModel.expense_date >= ctx.last_month_start,
+                    ExpenseModel.expense_date < ctx.current_month_start
+                )
+            ).label("last_month")
+        ).where(and_(*conditions))
+    )
+    row = result.one()
+    current_month_expenses = float(row.current_month or 0)
+    last_month_expenses = float(row.last_month or 0)
+    expense_change = current_month_expenses - last_month_expenses
+
+    return {
+        "current_month": current_month_expenses,
+        "last_month": last_month_expenses,
+        "change": expense_change,
+        "change_text": f"+₹{expense_change:,.0f} from last month" if expense_change >= 0 else f"-₹{abs(expense_change):,.0f} from last month",
+        "is_session_filtered": True
+    }
+
+
+async def _revenue_growth_card(db: AsyncSession, ctx: DashboardContext) -> Dict[str, Any]:
+    current_quarter_start = ctx.today.replace(month=((ctx.today.month - 1) // 3) * 3 + 1, day=1)
+    last_quarter_start = (current_quarter_start - timedelta(days=90)).replace(day=1)
+
+    result = await db.execute(
+        select(
+            func.sum(FeePaymentModel.amount).filter(
+                FeePaymentModel.payment_date >= current_quarter_start
+            ).label("current_quarter"),
+            func.sum(FeePaymentModel.amount).filter(
+                and_(
+                    FeePaymentModel.payment_date >= last_quarter_start,
+                    FeePaymentModel.payment_date < current_quarter_start
+                )
+            ).label("last_quarter")
+        ).join(FeeRecordModel).where(FeeRecordModel.session_year_id == ctx.session_year_id)
+    )
+    row = result.one()
+    current_quarter_fees = float(row.current_quarter or 0)
+    last_quarter_fees = float(row.last_quarter or 0)
+
+    revenue_growth = 0.0
+    if last_quarter_fees > 0:
+        revenue_growth = ((current_quarter_fees - last_quarter_fees) / last_quarter_fees) * 100
+
+    return {
+        "percentage": round(revenue_growth, 1),
+        "current_quarter": current_quarter_fees,
+        "last_quarter": last_quarter_fees,
+        "change_text": f"+{revenue_growth:.1f}% from last quarter" if revenue_growth >= 0 else f"{revenue_growth:.1f}% from last quarter",
+        "is_session_filtered": True
+    }
+
+
+async def _inventory_stock_alerts_card(db: AsyncSession, ctx: DashboardContext) -> Dict[str, Any]:
+    low_stock_items = await crud_inventory_stock.get_low_stock_alerts(db)
+    critical_count = sum(1 for item in low_stock_items if item.current_quantity == 0)
+    return {
+        "total_alerts": len(low_stock_items),
+        "critical_count": critical_count,
+        "warning_count": len(low_stock_items) - critical_count,
+        "alerts": [
+            {
+                "item_name": item.item_type.description,
+                "size": item.size_type.name if item.size_type else "N/A",
+                "current_quantity": item.current_quantity,
+                "minimum_threshold": item.minimum_threshold,
+                "alert_level": "CRITICAL" if item.current_quantity == 0 else "WARNING"
+            }
+            for item in low_stock_items[:10]  # Limit to top 10 for dashboard
+        ],
+        "is_session_filtered": False  # Inventory is operational data
+    }
+
+
+OVERVIEW_SECTIONS: List[DashboardSection] = [
+    DashboardSection(
+        "students", _students_card, ("students",),
+        {"total": 0, "added_this_month": 0, "change_text": "+0 this month", "is_session_filtered": True}
+    ),
+    DashboardSection(
+        "teachers", _teachers_card, ("teachers",),
+        {"total": 0, "added_this_month": 0, "change_text": "+0 this month", "is_session_filtered": False},
+        session_scoped=False
+    ),
+    DashboardSection(
+        "fees", _fees_card, ("fees",),
+        {"pending_amount": 0, "collected_this_week": 0, "change_text": "-₹0 this week", "total_collected": 0,
+         "collection_rate": 0, "is_session_filtered": True}
+    ),
+    DashboardSection(
+        "leave_requests", _leave_requests_card, ("leaves",),
+        {"total": 0, "pending": 0, "change_text": "0 pending approval", "is_session_filtered": True}
+    ),
+    DashboardSection(
+        "expenses", _expenses_card, ("expenses",),
+        {"current_month": 0, "last_month": 0, "change": 0, "change_text": "+₹0 from last month",
+         "is_session_filtered": True}
+    ),
+    DashboardSection(
+        "revenue_growth", _revenue_growth_card, ("fees",),
+        {"percentage": 0, "current_quarter": 0, "last_quarter": 0, "change_text": "+0.0% from last quarter",
+         "is_session_filtered": True}
+    ),
+    DashboardSection(
+        "inventory_stock_alerts", _inventory_stock_alerts_card, ("inventory",),
+        {"total_alerts": 0, "critical_count": 0, "warning_count": 0, "alerts": [], "is_session_filtered": False},
+        session_scoped=False
+    ),
+]
+
+
+# =====================================================
+# Enhanced dashboard breakdowns (/admin-dashboard-enhanced-stats)
+# =====================================================
+
+async def _student_management(db: AsyncSession, ctx: DashboardContext) -> Dict[str, Any]:
+    params = {"session_year_id": ctx.session_year_id}
+    if ctx.is_current:
+        class_result = await db.execute(
+            text("""
+                SELECT
+                    c.description as class_name,
+                    COUNT(s.id) as total_students,
+                    COUNT(CASE WHEN s.gender_id = 1 THEN 1 END) as male_count,
+                    COUNT(CASE WHEN s.gender_id = 2 THEN 1 END) as female_count
+                FROM sunrise.students s
+                LEFT JOIN sunrise.classes c ON s.class_id = c.id
+                WHERE s.is_active = TRUE
+                    AND (s.is_deleted = FALSE OR s.is_deleted IS NULL)
+                    AND s.session_year_id = :session_year_id
+                GROUP BY c.id, c.description
+                ORDER BY c.id
+            """),
+            params
+        )
+        class_breakdown = list(class_result)
+
+        # Total and active/inactive counts for the session (excluding soft deleted)
+        stats_result = await db.execute(
+            text("""
+                SELECT
+                    COUNT(CASE WHEN is_active = TRUE THEN 1 END) as total_students,
+                    COUNT(CASE WHEN is_active = TRUE THEN 1 END) as active_students,
+                    COUNT(CASE WHEN is_active = FALSE THEN 1 END) as inactive_students,
+                    COUNT(CASE WHEN is_active = TRUE AND created_at >= :month_start THEN 1 END) as recent_enrollments
+                FROM sunrise.students
+                WHERE (is_deleted = FALSE OR is_deleted IS NULL)
+                    AND session_year_id = :session_year_id
+            """),
+            {**params, "month_start": ctx.current_month_start}
+        )
+        stats = stats_result.fetchone()
+        total, active, inactive, recent = (
+            stats.total_students, stats.active_students, stats.inactive_students, stats.recent_enrollments
+        )
+    else:
+        # Past session: history (promoted) plus students still in that session, without the
+        # is_deleted filter - they were enrolled during that session even if they left later
+        class_result = await db.execute(
+            text("""
+                SELECT
+                    class_name,
+                    SUM(total_students) as total_students,
+                    SUM(male_count) as male_count,
+                    SUM(female_count) as female_count
+                FROM (
+                    SELECT
+                        c.description as class_name,
+                        COUNT(DISTINCT ssh.student_id) as total_students,
+                        COUNT(DISTINCT CASE WHEN s.gender_id = 1 THEN ssh.student_id END) as male_count,
+                        COUNT(DISTINCT CASE WHEN s.gender_id = 2 THEN ssh.student_id END) as female_count
+                    FROM sunrise.student_session_history ssh
+                    LEFT JOIN sunrise.classes c ON ssh.class_id = c.id
+                    LEFT JOIN sunrise.students s ON ssh.student_id = s.id
+                    WHERE ssh.session_year_id = :session_year_id
+                    GROUP BY c.id, c.description
+
+                    UNION ALL
+
+                    SELECT
+                        c.description as class_name,
+                        COUNT(s.id) as total_students,
+                        COUNT(CASE WHEN s.gender_id = 1 THEN 1 END) as male_count,
+                        COUNT(CASE WHEN s.gender_id = 2 THEN 1 END) as female_count
+                    FROM sunrise.students s
+                    LEFT JOIN sunrise.classes c ON s.class_id = c.id
+                    WHERE s.session_year_id = :session_year_id
+                        AND s.id NOT IN (
+                            SELECT student_id
+                            FROM sunrise.student_session_history
+                            WHERE session_year_id = :session_year_id
+                        )
+                    GROUP BY c.id, c.description
+                ) combined
+                GROUP BY class_name
+                ORDER BY class_name
+            """),
+            params
+        )
+        class_breakdown = list(class_result)
+        # Everyone in a past session was active during it: no inactive count, no recent enrollments
+        total = await _past_session_student_count(db, ctx.session_year_id)
+        active, inactive, recent = total, 0, 0
+
+    return {
+        'total_students': total,
+        'active_students': active,
+        'inactive_students': inactive,
+        'recent_enrollments': recent,
+        'class_breakdown': [
+            {
+                'class_name': row.class_name or 'Not Assigned',
+                'total': row.total_students,
+                'male': row.male_count,
+                'female': row.female_count
+            }
+            for row in class_breakdown
+        ],
+        'is_session_filtered': True,
+        'is_historical': not ctx.is_current
+    }
+
+
+async def _fee_management(db: AsyncSession, ctx: DashboardContext) -> Dict[str, Any]:
+    fee_summary = await fee_record_crud.get_collection_summary(db, session_year=ctx.session_year_name)
+
+    # Monthly collection trends in academic order (April=1, ..., March=12)
+    monthly_result = await db.execute(
+        text("""
+            SELECT
+                TO_CHAR(fp.payment_date, 'Mon YYYY') as month,
+                EXTRACT(YEAR FROM fp.payment_date) as year,
+                EXTRACT(MONTH FROM fp.payment_date) as month_num,
+                CASE
+                    WHEN EXTRACT(MONTH FROM fp.payment_date) >= 4 THEN EXTRACT(MONTH FROM fp.payment_date) - 3
+                    ELSE EXTRACT(MONTH FROM fp.payment_date) + 9
+                END as academic_month,
+                CASE
+                    WHEN EXTRACT(MONTH FROM fp.payment_date) >= 4 THEN EXTRACT(YEAR FROM fp.payment_date)
+                    ELSE EXTRACT(YEAR FROM fp.payment_date) - 1
+                END as academic_year,
+                SUM(fp.amount) as total_collected,
+                COUNT(DISTINCT fp.fee_record_id) as payment_count
+            FROM sunrise.fee_payments fp
+            JOIN sunrise.fee_records fr ON fp.fee_record_id = fr.id
+            WHERE fr.session_year_id = :session_year_id
+            GROUP BY
+                EXTRACT(YEAR FROM fp.payment_date),
+                EXTRACT(MONTH FROM fp.payment_date),
+                TO_CHAR(fp.payment_date, 'Mon YYYY'),
+                academic_month,
+                academic_year
+            ORDER BY academic_year, academic_month
+        """),
+        {"session_year_id": ctx.session_year_id}
+    )
+
+    # Outstanding and overdue amounts (tuition + transport) from the maintained balance rollup
+    balances = await fee_balance_crud.get_session_totals(db, session_year_id=ctx.session_year_id)
+
+    return {
+        'total_collected': float(fee_summary['paid_amount']),
+        'pending_fees': float(fee_summary['pending_amount']),
+        'collection_rate': float(fee_summary['collection_rate']),
+        'total_records': fee_summary['total_records'],
+        'paid_records': fee_summary['paid_records'],
+        'monthly_trends': [
+            {'month': row.month, 'amount': float(row.total_collected), 'count': row.payment_count}
+            for row in monthly_result
+        ],
+        'overdue_amount': balances['overdue_amount'],
+        'students_overdue': balances['students_overdue'],
+        'is_session_filtered': True
+    }
+
+
+async def _leave_management(db: AsyncSession, ctx: DashboardContext) -> Dict[str, Any]:
+    leave_type_sql = """
+        SELECT
+            lt.description as leave_type,
+            COUNT(lr.id) as count,
+            COUNT(CASE WHEN lr.leave_status_id = 2 THEN 1 END) as approved,
+            COUNT(CASE WHEN lr.leave_status_id = 3 THEN 1 END) as rejected,
+            COUNT(CASE WHEN lr.leave_status_id = 1 THEN 1 END) as pending
+        FROM sunrise.leave_requests lr
+        LEFT JOIN sunrise.leave_types lt ON lr.leave_type_id = lt.id
+        {where}
+        GROUP BY lt.id, lt.description
+        ORDER BY count DESC
+    """
+    if ctx.session_year_id:
+        leave_stats = await _session_leave_stats(db, ctx.session_year_id)
+        leave_type_result = await db.execute(
+            text(leave_type_sql.format(where="WHERE lr.session_year_id = :session_year_id")),
+            {"session_year_id": ctx.session_year_id}
+        )
+    else:
+        # Fallback to all-time stats if no session available
+        leave_stats = await leave_request_crud.get_leave_statistics(db)
+        leave_type_result = await db.execute(text(leave_type_sql.format(where="")))
+
+    return {
+        'total_requests': leave_stats.get('total_requests', 0),
+        'pending_approvals': leave_stats.get('pending_requests', 0),
+        'approved_count': leave_stats.get('approved_requests', 0),
+        'rejected_count': leave_stats.get('rejected_requests', 0),
+        'leave_type_breakdown': [
+            {
+                'type': row.leave_type or 'Not Specified',
+                'total': row.count,
+                'approved': row.approved,
+                'rejected': row.rejected,
+                'pending': row.pending
+            }
+            for row in leave_type_result
+        ],
+        'is_session_filtered': True
+    }
+
+
+async def _expense_management(db: AsyncSession, ctx: DashboardContext) -> Dict[str, Any]:
+    monthly_sql = """
+        SELECT
+            TO_CHAR(e.expense_date, 'Mon YYYY') as month,
+            EXTRACT(YEAR FROM e.expense_date) as year,
+            EXTRACT(MONTH FROM e.expense_date) as month_num,
+            SUM(e.total_amount) as total_amount,
+            COUNT(e.id) as expense_count
+        FROM sunrise.expenses e
+        WHERE {where}
+            AND e.is_deleted = FALSE
+            AND e.expense_status_id IN (2, 4)
+        GROUP BY EXTRACT(YEAR FROM e.expense_date), EXTRACT(MONTH FROM e.expense_date), TO_CHAR(e.expense_date, 'Mon YYYY')
+        ORDER BY year, month_num
+    """
+    if ctx.session_year_id:
+        params = {"session_year_id": ctx.session_year_id}
+        expense_row = (await db.execute(
+            text("""
+                SELECT
+                    COALESCE(SUM(total_amount), 0) as total_amount,
+                    COUNT(CASE WHEN expense_status_id = 1 THEN 1 END) as pending_expenses
+                FROM sunrise.expenses
+                WHERE session_year_id = :session_year_id
+                    AND is_deleted = FALSE
+            """),
+            params
+        )).fetchone()
+        category_result = await db.execute(
+            text("""
+                SELECT
+                    ec.description as category,
+                    COALESCE(SUM(e.total_amount), 0) as amount
+                FROM sunrise.expenses e
+                LEFT JOIN sunrise.expense_categories ec ON e.expense_category_id = ec.id
+                WHERE e.session_year_id = :session_year_id
+                    AND e.is_deleted = FALSE
+                    AND e.expense_status_id IN (2, 4)
+                GROUP BY ec.id, ec.description
+                ORDER BY amount DESC
+            """),
+            params
+        )
+        expense_stats = {
+            'total_amount': float(expense_row.total_amount or 0),
+            'pending_expenses': expense_row.pending_expenses or 0,
+            'category_breakdown': [
+                {'category': row.category or 'Uncategorized', 'amount': float(row.amount)}
+                for row in category_result
+            ]
+        }
+        monthly_result = await db.execute(
+            text(monthly_sql.format(where="e.session_year_id = :session_year_id")), params
+        )
+    else:
+        # Fallback to all-time stats
+        expense_stats = await expense_crud.get_expense_statistics(db)
+        monthly_result = await db.execute(
+            text(monthly_sql.format(where="e.expense_date >= :start_date")),
+            {"start_date": ctx.today - timedelta(days=365)}
+        )
+
+    return {
+        'total_expenses': float(expense_stats['total_amount']),
+        'pending_approvals': expense_stats['pending_expenses'],
+        'category_breakdown': expense_stats['category_breakdown'],
+        'monthly_trends': [
+            {'month': row.month, 'amount': float(row.total_amount), 'count': row.expense_count}
+            for row in monthly_result
+        ],
+        'is_session_filtered': True
+    }
+
+
+async def _staff_management(db: AsyncSession, ctx: DashboardContext) -> Dict[str, Any]:
+    teacher_stats = await teacher_crud.get_dashboard_stats(db)
+    return {
+        'total_staff': teacher_stats['total_teachers'],
+        'active_staff': teacher_stats['active_teachers'],
+        'inactive_staff': teacher_stats['total_teachers'] - teacher_stats['active_teachers'],
+        'department_breakdown': teacher_stats['departments'],
+        'qualification_breakdown': teacher_stats['qualification_breakdown'],
+        'is_session_filtered': False  # Staff is not session-specific
+    }
+
+
+async def _transport_service(db: AsyncSession, ctx: DashboardContext) -> Dict[str, Any]:
+    params = {"session_year_id": ctx.session_year_id}
+    transport_stats = (await db.execute(
+        text("""
+            SELECT
+                COUNT(DISTINCT ste.id) as total_enrollments,
+                COUNT(DISTINCT ste.student_id) as students_using_transport,
+                COUNT(DISTINCT tt.id) as transport_types,
+                COALESCE(SUM(CASE WHEN tmt.payment_status_id = 1 THEN tmt.monthly_amount - tmt.paid_amount ELSE 0 END), 0) as pending_transport_fees,
+                COALESCE(SUM(tmt.paid_amount), 0) as collected_transport_fees
+            FROM sunrise.student_transport_enrollment ste
+            LEFT JOIN sunrise.transport_types tt ON ste.transport_type_id = tt.id
+            LEFT JOIN sunrise.transport_monthly_tracking tmt ON ste.id = tmt.enrollment_id
+            WHERE ste.session_year_id = :session_year_id
+                AND ste.is_active = TRUE
+        """),
+        params
+    )).fetchone()
+
+    # Transport type breakdown (Van, E-Rickshaw counts)
+    transport_type_result = await db.execute(
+        text("""
+            SELECT
+                tt.name as transport_type_name,
+                tt.description as transport_type,
+                COUNT(ste.id) as enrollment_count
+            FROM sunrise.student_transport_enrollment ste
+            LEFT JOIN sunrise.transport_types tt ON ste.transport_type_id = tt.id
+            WHERE ste.session_year_id = :session_year_id
+                AND ste.is_active = TRUE
+            GROUP BY tt.id, tt.name, tt.description
+            ORDER BY enrollment_count DESC
+        """),
+        params
+    )
+
+    # Monthly transport fee collection in academic order (academic_month stores the calendar month)
+    transport_monthly_result = await db.execute(
+        text("""
+            SELECT
+                tmt.month_name,
+                tmt.academic_month,
+                tmt.academic_year,
+                CASE
+                    WHEN tmt.academic_month >= 4 THEN tmt.academic_month - 3
+                    ELSE tmt.academic_month + 9
+                END as academic_sequence,
+                COALESCE(SUM(tmt.paid_amount), 0) as collected_amount,
+                COALESCE(SUM(tmt.monthly_amount), 0) as total_amount
+            FROM sunrise.transport_monthly_tracking tmt
+            JOIN sunrise.student_transport_enrollment ste ON tmt.enrollment_id = ste.id
+            WHERE tmt.session_year_id = :session_year_id
+                AND ste.is_active = TRUE
+            GROUP BY tmt.month_name, tmt.academic_month, tmt.academic_year, academic_sequence
+            ORDER BY tmt.academic_year, academic_sequence
+        """),
+        params
+    )
+
+    collected_fees = float(transport_stats.collected_transport_fees or 0)
+    pending_fees = float(transport_stats.pending_transport_fees or 0)
+    total_fees = collected_fees + pending_fees
+    collection_percentage = (collected_fees / total_fees * 100) if total_fees > 0 else 0
+
+    return {
+        'students_using_transport': transport_stats.students_using_transport or 0,
+        'total_enrollments': transport_stats.total_enrollments or 0,
+        'pending_fees': pending_fees,
+        'collected_fees': collected_fees,
+        'total_fees': total_fees,
+        'collection_percentage': round(collection_percentage, 2),
+        'transport_type_breakdown': [
+            {
+                'name': row.transport_type_name or 'Not Specified',
+                'type': row.transport_type or 'Not Specified',
+                'count': row.enrollment_count
+            }
+            for row in transport_type_result
+        ],
+        'monthly_trends': [
+            {'month': row.month_name, 'collected': float(row.collected_amount), 'total': float(row.total_amount)}
+            for row in transport_monthly_result
+        ],
+        'is_session_filtered': True
+    }
+
+
+ENHANCED_SECTIONS: List[DashboardSection] = [
+    DashboardSection("student_management", _student_management, ("students",), {'is_session_filtered': True}),
+    DashboardSection("fee_management", _fee_management, ("fees",), {'is_session_filtered': True}),
+    DashboardSection("leave_management", _leave_management, ("leaves",), {'is_session_filtered': True}),
+    DashboardSection("expense_management", _expense_management, ("expenses",), {'is_session_filtered': True}),
+    DashboardSection(
+        "staff_management", _staff_management, ("teachers",), {'is_session_filtered': False}, session_scoped=False
+    ),
+    DashboardSection("transport_service", _transport_service, ("transport",), {'is_session_filtered': True}),
+]
+
+
+# Create singleton instance
+dashboard_engine = DashboardEngine()
+
+
+# =====================================================
+# Invalidation on committed writes
+# =====================================================
+
+_MODEL_TOPICS: Dict[type, str] = {
+    model: topic for topic, models in TOPIC_MODELS.items() for model in models
+}
+
+
+def _mark_topic(session: Optional[Session], model: type) -> None:
+    topic = _MODEL_TOPICS.get(model)
+    if session is not None and topic is not None:
+        session.info.setdefault(_PENDING_TOPICS, set()).add(topic)
+
+
+def mark_dashboard_topic(db, topic: str) -> None:
+    """Invalidate a topic at commit (for writes the ORM does not see: raw SQL, database functions)"""
+    db.info.setdefault(_PENDING_TOPICS, set()).add(topic)
+
+
+def _mark_dashboard_change(mapper, connection, target):
+    _mark_topic(object_session(target), mapper.class_)
+
+
+for _model in _MODEL_TOPICS:
+    for _event_name in ("after_insert", "after_update", "after_delete"):
+        event.listen(_model, _event_name, _mark_dashboard_change)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _mark_dashboard_bulk_change(orm_execute_state):
+    # update()/delete() statements; after_bulk_update/after_bulk_delete only cover Query.update/delete
+    if orm_execute_state.is_update or orm_execute_state.is_delete:
+        for mapper in orm_execute_state.all_mappers:
+            _mark_topic(orm_execute_state.session, mapper.class_)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_dashboard_after_commit(session):
+    topics = session.info.pop(_PENDING_TOPICS, None)
+    if topics:
+        dashboard_engine.invalidate(topics)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back_dashboard_topics(session):
+    session.info.pop(_PENDING_TOPICS, None)
@@ -0,0 +1,236 @@
+"""
+Due Fee Engine - Set-based fee due status for a page of students
+Resolves fee structures, monthly tracking and payments for every student on the
+page with a fixed number of grouped queries, then derives the monthly / quarterly /
+half-yearly / yearly status from per-student month vectors
+"""
+
+import calendar
+from datetime import date
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud.crud_fee import fee_structure_crud, fee_payment_crud
+from app.crud.crud_monthly_fee import monthly_fee_tracking_crud
+from app.models.student import Student
+
+# Academic year runs April to March; vectors below are indexed in this order
+ACADEMIC_MONTHS = [4, 5, 6, 7, 8, 9, 10, 11, 12, 1, 2, 3]
+
+
+def _period(name: str, months: List[int], overdue_after_month: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Build a billing period spec. Unpaid balance becomes overdue once the academic
+    month ``overdue_after_month`` (default: the period's last month) has passed.
+    """
+    indexes = [ACADEMIC_MONTHS.index(month) for month in months]
+    overdue_after = ACADEMIC_MONTHS.index(overdue_after_month) if overdue_after_month else max(indexes)
+    return {"name": name, "months": months, "indexes": indexes, "overdue_after": overdue_after}
+
+
+FREQUENCY_PERIODS: Dict[str, List[Dict[str, Any]]] = {
+    "monthly": [_period(calendar.month_name[month], [month]) for month in ACADEMIC_MONTHS],
+    "quarterly": [
+        _period("Q1 (Apr-Jun)", [4, 5, 6]),
+        _period("Q2 (Jul-Sep)", [7, 8, 9]),
+        _period("Q3 (Oct-Dec)", [10, 11, 12]),
+        _period("Q4 (Jan-Mar)", [1, 2, 3]),
+    ],
+    "half_yearly": [
+        _period("First Half (Apr-Sep)", [4, 5, 6, 7, 8, 9]),
+        _period("Second Half (Oct-Mar)", [10, 11, 12, 1, 2, 3]),
+    ],
+    # Yearly fee is due at the start of the session and overdue after June
+    "yearly": [_period("Annual (Apr-Mar)", ACADEMIC_MONTHS, overdue_after_month=6)],
+}
+
+# Response key holding the period breakdown for each frequency
+PERIOD_LIST_KEYS = {"monthly": "months", "quarterly": "quarters", "half_yearly": "halves"}
+
+
+def elapsed_academic_months(session_start_year: int, current_date: date) -> int:
+    """
+    Number of academic months of the session that have started by current_date (0-12),
+    or 13 once the session has ended so that March balances also count as overdue
+    """
+    if current_date >= date(session_start_year + 1, 4, 1):
+        return len(ACADEMIC_MONTHS) + 1
+
+    elapsed = 0
+    for month in ACADEMIC_MONTHS:
+        year = session_start_year if month >= 4 else session_start_year + 1
+        if date(year, month, 1) <= current_date:
+            elapsed += 1
+    return elapsed
+
+
+def build_month_vectors(
+    monthly_fee: float,
+    total_paid: float,
+    tracked_months: Optional[Dict[int, Dict[str, float]]] = None
+) -> tuple[List[float], List[float]]:
+    """
+    Build (due, paid) vectors of 12 academic months for one student.
+
+    Students with monthly tracking use their tracked amounts (which include sibling
+    waivers). Otherwise the net amount paid is applied to months in order.
+    """
+    if tracked_months:
+        due = [tracked_months.get(month, {}).get("monthly_amount", monthly_fee) for month in ACADEMIC_MONTHS]
+        paid = [tracked_months.get(month, {}).get("paid_amount", 0.0) for month in ACADEMIC_MONTHS]
+        return due, paid
+
+    due = [monthly_fee] * len(ACADEMIC_MONTHS)
+    paid = []
+    remaining = max(total_paid, 0.0)
+    for month_due in due:
+        applied = min(month_due, remaining)
+        paid.append(applied)
+        remaining -= applied
+    return due, paid
+
+
+def calculate_fee_status(
+    frequency: str,
+    due_vector: Sequence[float],
+    paid_vector: Sequence[float],
+    total_paid: float,
+    session_start_year: int,
+    elapsed_months: int
+) -> Dict[str, Any]:
+    """Aggregate month vectors into the period breakdown for the requested frequency"""
+    periods = FREQUENCY_PERIODS.get(frequency, FREQUENCY_PERIODS["yearly"])
+    frequency = frequency if frequency in FREQUENCY_PERIODS else "yearly"
+
+    periods_status = []
+    total_due = 0.0
+    overdue_amount = 0.0
+
+    for period in periods:
+        # Only periods that have started are due
+        if min(period["indexes"]) >= elapsed_months:
+            continue
+
+        period_due = sum(due_vector[i] for i in period["indexes"])
+        period_paid = sum(paid_vector[i] for i in period["indexes"])
+        outstanding = max(period_due - period_paid, 0.0)
+        is_past_due = elapsed_months > period["overdue_after"] + 1
+
+        if outstanding <= 0:
+            status = "paid"
+        elif is_past_due:
+            status = "overdue" if period_paid <= 0 else "partial"
+            overdue_amount += outstanding
+        elif period_paid > 0:
+            status = "partial"
+        else:
+            status = "pending"
+
+        total_due += period_due
+
+        period_status = {
+            "months": period["months"],
+            "due_amount": round(period_due, 2),
+            "paid_amount": round(period_paid, 2),
+            "status": status
+        }
+        if frequency == "monthly":
+            month = period["months"][0]
+            period_status.update({
+                "month": month,
+                "year": session_start_year if month >= 4 else session_start_year + 1,
+                "month_name": period["name"]
+            })
+        elif frequency == "quarterly":
+            period_status["quarter"] = period["name"]
+        elif frequency == "half_yearly":
+            period_status["half"] = period["name"]
+        periods_status.append(period_status)
+
+    fee_status = {
+        "type": frequency,
+        "total_due": round(total_due, 2),
+        "total_paid": round(total_paid, 2),
+        "overdue_amount": round(overdue_amount, 2),
+        "status": "overdue" if overdue_amount > 0 else ("paid" if total_paid >= total_due else "pending")
+    }
+    if frequency in PERIOD_LIST_KEYS:
+        fee_status[PERIOD_LIST_KEYS[frequency]] = periods_status
+    return fee_status
+
+
+class DueFeeEngine:
+    """Computes fee due status for many students with a constant number of queries"""
+
+    async def get_students_fee_status(
+        self,
+        db: AsyncSession,
+        students: Sequence[Student],
+        session_year_id: int,
+        session_start_year: int,
+        frequency: str,
+        current_date: Optional[date] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Build fee status rows for the given students (with class_ref loaded).
+        Students whose class has no fee structure for the session are skipped.
+        """
+        if not students:
+            return []
+
+        current_date = current_date or date.today()
+        student_ids = [student.id for student in students]
+
+        # Three grouped queries regardless of page size
+        structures = await fee_structure_crud.get_by_class_ids_and_session_id(
+            db, class_ids=list({student.class_id for student in students}), session_year_id=session_year_id
+        )
+        tracked_amounts = await monthly_fee_tracking_crud.get_monthly_amounts_by_students(
+            db, student_ids, session_year_id
+        )
+        total_paid_by_student = await fee_payment_crud.get_total_paid_by_students(
+            db, student_ids=student_ids, session_year_id=session_year_id
+        )
+
+        elapsed_months = elapsed_academic_months(session_start_year, current_date)
+
+        rows = []
+        for student in students:
+            fee_structure = structures.get(student.class_id)
+            if not fee_structure:
+                continue
+
+            annual_fee = float(fee_structure.total_annual_fee)
+            monthly_fee = annual_fee / 12
+            total_paid = total_paid_by_student.get(student.id, 0.0)
+
+            due_vector, paid_vector = build_month_vectors(
+                monthly_fee, total_paid, tracked_amounts.get(student.id)
+            )
+            fee_status = calculate_fee_status(
+                frequency, due_vector, paid_vector, total_paid, session_start_year, elapsed_months
+            )
+
+            rows.append({
+                "id": student.id,
+                "admission_number": student.admission_number,
+                "name": f"{student.first_name} {student.last_name}",
+                "class": student.class_ref.name if student.class_ref else "Unknown",
+                "section": student.section,
+                "phone": student.phone,
+                "email": student.email,
+                "monthly_fee": monthly_fee,
+                "annual_fee": annual_fee,
+                "fee_status": fee_status,
+                "total_paid": total_paid,
+                "total_due": fee_status.get("total_due", 0),
+                "overdue_amount": fee_status.get("overdue_amount", 0),
+                "status_summary": fee_status.get("status", "Unknown")
+            })
+
+        return rows
+
+
+# Create singleton instance
+due_fee_engine = DueFeeEngine()
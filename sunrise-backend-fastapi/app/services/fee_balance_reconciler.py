@@ -0,0 +1,91 @@
+"""
+Fee Balance Reconciler - periodic verification of the student_fee_balances rollup
+Balance rows are maintained by the application in the same transaction as every
+payment, reversal and tracking change. This job recomputes all rows from the
+tracking tables to repair drift from writes made outside the application (SQL
+scripts, manual fixes) and to roll the overdue figures forward as months fall due.
+Repairs are idempotent upserts, so running it in several workers is harmless.
+"""
+
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.crud.crud_fee_balance import fee_balance_crud
+
+logger = logging.getLogger(__name__)
+
+
+class FeeBalanceReconciler:
+    """Background loop running ``fee_balance_crud.reconcile`` for all sessions"""
+
+    def __init__(self, session_factory=None, interval_seconds: Optional[float] = None):
+        self.session_factory = session_factory or AsyncSessionLocal
+        self.interval_seconds = (
+            settings.FEE_BALANCE_RECONCILE_INTERVAL_SECONDS if interval_seconds is None else interval_seconds
+        )
+        self._task: Optional[asyncio.Task] = None
+        self.runs = 0
+        self.failures = 0
+        self.last_run_at: Optional[datetime] = None
+        self.last_report: Optional[Dict[str, Any]] = None
+        self.last_error: Optional[str] = None
+
+    async def start(self) -> None:
+        """Start the reconciliation loop (application startup)"""
+        if self._task is not None or self.interval_seconds <= 0:
+            return
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"Fee balance reconciler started (interval={self.interval_seconds}s)")
+
+    async def stop(self) -> None:
+        """Stop the reconciliation loop (application shutdown)"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            logger.info("Fee balance reconciler stopped")
+
+    async def _run(self) -> None:
+        while True:
+            await self.run_once()
+            await asyncio.sleep(self.interval_seconds)
+
+    async def run_once(self, repair: bool = True) -> Optional[Dict[str, Any]]:
+        """Reconcile every session once; errors are logged and kept for /monitoring"""
+        self.last_run_at = datetime.now()
+        try:
+            async with self.session_factory() as db:
+                report = await fee_balance_crud.reconcile(db, repair=repair)
+        except Exception as e:
+            self.failures += 1
+            self.last_error = str(e)
+            logger.error(f"Fee balance reconciliation failed: {e}")
+            return None
+
+        self.runs += 1
+        self.last_report = report
+        self.last_error = None
+        return report
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.interval_seconds > 0,
+            "running": self._task is not None,
+            "interval_seconds": self.interval_seconds,
+            "runs": self.runs,
+            "failures": self.failures,
+            "last_run_at": self.last_run_at.isoformat() if self.last_run_at else None,
+            "last_error": self.last_error,
+            "last_report": self.last_report
+        }
+
+
+# Create singleton instance
+fee_balance_reconciler = FeeBalanceReconciler()
@@ -0,0 +1,519 @@
+"""
+Session Progression Engine - set-based bulk progression in resumable chunks
+
+A bulk progression request is validated once against a class transition map,
+progression actions and the students' current rows (three queries), then staged
+as progression_batch_items under a batch id. Pending items are processed in
+chunks; each chunk is one transaction of a handful of set-based statements:
+
+- UPDATE of items that no longer apply (student progressed since staging) to FAILED
+- INSERT ... SELECT of the session history rows (snapshot built in SQL)
+- UPDATE students ... FROM items for actions that create a new session
+- UPDATE students ... FROM items deactivating the others (GRADUATED, ...)
+- item status and batch counters
+
+so the year-end run does not hold one transaction for the whole school, the
+batch counters report progress to the admin UI, and an interrupted batch
+resumes from its pending items.
+"""
+
+import asyncio
+import logging
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, case, exists, func, insert, literal_column, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+from sqlalchemy.types import JSON
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.crud.crud_session_progression import (
+    ProgressionActionIds, get_class_transition_map, get_progression_actions
+)
+from app.models.metadata import Class, SessionYear
+from app.models.progression_batch import ProgressionBatch, ProgressionBatchItem
+from app.models.progression_action import ProgressionAction
+from app.models.student import Student
+from app.models.student_session_history import StudentSessionHistory
+
+logger = logging.getLogger(__name__)
+
+BATCH_PENDING = "PENDING"
+BATCH_RUNNING = "RUNNING"
+BATCH_COMPLETED = "COMPLETED"
+BATCH_FAILED = "FAILED"
+BATCH_ROLLED_BACK = "ROLLED_BACK"
+
+ITEM_PENDING = "PENDING"
+ITEM_DONE = "DONE"
+ITEM_FAILED = "FAILED"
+
+
+class json_snapshot(FunctionElement):
+    """JSON object from alternating key/value arguments"""
+    type = JSON()
+    name = "json_snapshot"
+    inherit_cache = True
+
+
+@compiles(json_snapshot)
+def _compile_json_snapshot(element, compiler, **kw):
+    return f"jsonb_build_object({compiler.process(element.clauses, **kw)})"
+
+
+@compiles(json_snapshot, "sqlite")
+def _compile_json_snapshot_sqlite(element, compiler, **kw):
+    return f"json_object({compiler.process(element.clauses, **kw)})"
+
+
+def new_batch_id() -> str:
+    return f"PROG-{datetime.now().strftime('%Y%m%d%H%M%S')}-{str(uuid.uuid4())[:8]}"
+
+
+def default_target_class_id(
+    action_id: int, current_class_id: int, transitions: Dict[int, Dict[str, Optional[int]]]
+) -> int:
+    """Next class for PROMOTED, previous for DEMOTED, otherwise the current class"""
+    transition = transitions.get(current_class_id, {})
+    if action_id == ProgressionActionIds.PROMOTED:
+        return transition.get("next") or current_class_id
+    if action_id == ProgressionActionIds.DEMOTED:
+        return transition.get("previous") or current_class_id
+    return current_class_id
+
+
+class ProgressionEngine:
+    """Stages, runs, resumes and reports bulk progression batches"""
+
+    def __init__(self, session_factory=None, chunk_size: Optional[int] = None):
+        self.session_factory = session_factory or AsyncSessionLocal
+        self.chunk_size = chunk_size or settings.SESSION_PROGRESSION_CHUNK_SIZE
+        # Background runs started by this process, by batch id
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    # =====================================================
+    # Staging
+    # =====================================================
+
+    async def stage(
+        self,
+        db: AsyncSession,
+        from_session_year_id: int,
+        to_session_year_id: int,
+        students_data: List[Dict[str, Any]],
+        progressed_by: int,
+        chunk_size: Optional[int] = None
+    ) -> str:
+        """
+        Validate the request and store it as a PENDING batch; returns the batch id.
+        Students that fail validation are stored as FAILED items with the reason.
+        """
+        batch_id = new_batch_id()
+        actions = {action.id: action for action in await get_progression_actions(db, active_only=False)}
+        transitions = await get_class_transition_map(db)
+
+        student_ids = [data["student_id"] for data in students_data]
+        students = {}
+        if student_ids:
+            result = await db.execute(
+                select(Student.id, Student.class_id, Student.session_year_id, Student.is_deleted)
+                .where(Student.id.in_(student_ids))
+            )
+            students = {row.id: row for row in result.all()}
+
+            # One history row per student and session year
+            result = await db.execute(
+                select(StudentSessionHistory.student_id).where(and_(
+                    StudentSessionHistory.student_id.in_(student_ids),
+                    StudentSessionHistory.session_year_id == from_session_year_id
+                ))
+            )
+            already_progressed = set(result.scalars().all())
+        else:
+            already_progressed = set()
+
+        items = []
+        seen = set()
+        for data in students_data:
+            student_id = data["student_id"]
+            action_id = data["progression_action_id"]
+            action = actions.get(action_id)
+            student = students.get(student_id)
+            target_class_id = data.get("target_class_id")
+
+            error = None
+            if student_id in seen:
+                error = "Duplicate student in request"
+            elif student is None or student.is_deleted:
+                error = "Student not found"
+            elif action is None or not action.is_active:
+                error = "Invalid progression action"
+            elif student.session_year_id != from_session_year_id:
+                error = "Student is not in the source session year"
+            elif student_id in already_progressed:
+                error = "Student already progressed from this session year"
+            elif target_class_id is not None and target_class_id not in transitions:
+                error = "Invalid target class"
+            seen.add(student_id)
+
+            if error is None and target_class_id is None:
+                target_class_id = default_target_class_id(action_id, student.class_id, transitions)
+
+            items.append({
+                "batch_id": batch_id,
+                "student_id": student_id,
+                "progression_action_id": action_id if action else None,
+                "creates_new_session": bool(action.creates_new_session) if action else True,
+                "target_class_id": target_class_id if error is None else None,
+                "target_section": data.get("target_section"),
+                "target_roll_number": data.get("target_roll_number"),
+                "remarks": data.get("remarks"),
+                "status": ITEM_PENDING if error is None else ITEM_FAILED,
+                "error_message": error
+            })
+
+        failed = sum(1 for item in items if item["status"] == ITEM_FAILED)
+        db.add(ProgressionBatch(
+            batch_id=batch_id,
+            from_session_year_id=from_session_year_id,
+            to_session_year_id=to_session_year_id,
+            status=BATCH_PENDING,
+            total_students=len(items),
+            processed_count=failed,
+            failed_count=failed,
+            chunk_size=chunk_size or self.chunk_size,
+            created_by=progressed_by
+        ))
+        await db.flush()
+        # Unknown students cannot be stored (FK); get_results reports them from the request
+        stored_items = [item for item in items if item["student_id"] in students]
+        if stored_items:
+            await db.execute(insert(ProgressionBatchItem), stored_items)
+        await db.commit()
+
+        logger.info(
+            f"Progression batch {batch_id} staged: {len(items)} students, {failed} failed validation"
+        )
+        return batch_id
+
+    # =====================================================
+    # Running
+    # =====================================================
+
+    async def run(self, db: AsyncSession, batch_id: str, force: bool = False) -> Dict[str, Any]:
+        """
+        Process the pending items of a batch chunk by chunk and return its status.
+        A batch already RUNNING elsewhere is left alone unless ``force``.
+        """
+        claimable = [BATCH_PENDING, BATCH_FAILED] + ([BATCH_RUNNING] if force else [])
+        claim = await db.execute(
+            update(ProgressionBatch)
+            .where(and_(ProgressionBatch.batch_id == batch_id, ProgressionBatch.status.in_(claimable)))
+            .values(status=BATCH_RUNNING, last_error=None,
+                    started_at=func.coalesce(ProgressionBatch.started_at, func.now()))
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        if claim.rowcount == 0:
+            return await self.get_status(db, batch_id)
+
+        batch = (await db.execute(
+            select(ProgressionBatch).where(ProgressionBatch.batch_id == batch_id)
+        )).scalar_one()
+        batch_values = (batch.to_session_year_id, batch.chunk_size)
+
+        while True:
+            result = await db.execute(
+                select(ProgressionBatchItem.id)
+                .where(and_(
+                    ProgressionBatchItem.batch_id == batch_id,
+                    ProgressionBatchItem.status == ITEM_PENDING
+                ))
+                .order_by(ProgressionBatchItem.id)
+                .limit(batch_values[1])
+            )
+            chunk_ids = list(result.scalars().all())
+            if not chunk_ids:
+                break
+
+            try:
+                await self._apply_chunk(db, batch_id, batch_values[0], chunk_ids)
+                await db.commit()
+            except Exception as e:
+                await db.rollback()
+                logger.error(f"Progression batch {batch_id} chunk failed: {e}")
+                await db.execute(
+                    update(ProgressionBatch)
+                    .where(ProgressionBatch.batch_id == batch_id)
+                    .values(status=BATCH_FAILED, last_error=str(e))
+                    .execution_options(synchronize_session=False)
+                )
+                await db.commit()
+                return await self.get_status(db, batch_id)
+
+        await db.execute(
+            update(ProgressionBatch)
+            .where(ProgressionBatch.batch_id == batch_id)
+            .values(status=BATCH_COMPLETED, completed_at=func.now())
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        status = await self.get_status(db, batch_id)
+        logger.info(
+            f"Progression batch {batch_id} completed: {status['successful_count']} progressed, "
+            f"{status['failed_count']} failed"
+        )
+        return status
+
+    async def _apply_chunk(
+        self, db: AsyncSession, batch_id: str, to_session_year_id: int, chunk_ids: List[int]
+    ) -> None:
+        item = ProgressionBatchItem
+
+        # A student may have been progressed since staging (individually or by another
+        # batch): re-applying would duplicate the session history row and move them
+        # again, and a failing chunk would block its other students on every resume
+        from_session_year_id = (
+            select(ProgressionBatch.from_session_year_id)
+            .where(ProgressionBatch.batch_id == item.batch_id)
+            .scalar_subquery()
+        )
+        left_session = exists().where(and_(
+            Student.id == item.student_id, Student.session_year_id != from_session_year_id
+        ))
+        has_history = exists().where(and_(
+            StudentSessionHistory.student_id == item.student_id,
+            StudentSessionHistory.session_year_id == from_session_year_id
+        ))
+        skipped = await db.execute(
+            update(item)
+            .where(and_(item.id.in_(chunk_ids), or_(left_session, has_history)))
+            .values(
+                status=ITEM_FAILED,
+                error_message=case(
+                    (left_session, "Student is no longer in the source session (progressed after staging)"),
+                    else_="Student already has session history for the source session"
+                )
+            )
+            .returning(item.id)
+            .execution_options(synchronize_session=False)
+        )
+        skipped_ids = set(skipped.scalars().all())
+        apply_ids = [item_id for item_id in chunk_ids if item_id not in skipped_ids]
+        if apply_ids:
+            await self._apply_items(db, to_session_year_id, apply_ids)
+
+        await db.execute(
+            update(ProgressionBatch)
+            .where(ProgressionBatch.batch_id == batch_id)
+            .values(
+                processed_count=ProgressionBatch.processed_count + len(chunk_ids),
+                successful_count=ProgressionBatch.successful_count + len(apply_ids),
+                failed_count=ProgressionBatch.failed_count + len(skipped_ids)
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+    async def _apply_items(self, db: AsyncSession, to_session_year_id: int, item_ids: List[int]) -> None:
+        item = ProgressionBatchItem
+        in_chunk = item.id.in_(item_ids)
+
+        # History: where each student WAS (from session, class, section, roll number)
+        history_source = (
+            select(
+                item.student_id,
+                ProgressionBatch.from_session_year_id,
+                Student.class_id,
+                Student.section,
+                Student.roll_number,
+                item.progression_action_id,
+                ProgressionBatch.from_session_year_id,
+                Student.class_id,
+                item.batch_id,
+                ProgressionBatch.created_by,
+                item.remarks,
+                json_snapshot(
+                    literal_column("'class_id'"), Student.class_id,
+                    literal_column("'class_name'"), Class.description,
+                    literal_column("'section'"), Student.section,
+                    literal_column("'roll_number'"), Student.roll_number,
+                    literal_column("'session_year_id'"), ProgressionBatch.from_session_year_id,
+                    literal_column("'session_year_name'"), SessionYear.description
+                )
+            )
+            .select_from(item)
+            .join(ProgressionBatch, ProgressionBatch.batch_id == item.batch_id)
+            .join(Student, Student.id == item.student_id)
+            .outerjoin(Class, Class.id == Student.class_id)
+            .outerjoin(SessionYear, SessionYear.id == Student.session_year_id)
+            .where(in_chunk)
+        )
+        await db.execute(
+            insert(StudentSessionHistory).from_select(
+                [
+                    "student_id", "session_year_id", "class_id", "section", "roll_number",
+                    "progression_action_id", "from_session_year_id", "from_class_id",
+                    "progression_batch_id", "progressed_by", "remarks", "snapshot_data"
+                ],
+                history_source
+            )
+        )
+
+        # Students moving into the new session (SET expressions see pre-update values)
+        await db.execute(
+            update(Student)
+            .where(and_(Student.id == item.student_id, in_chunk, item.creates_new_session == True))
+            .values(
+                session_year_id=to_session_year_id,
+                class_id=item.target_class_id,
+                section=item.target_section,
+                roll_number=item.target_roll_number,
+                original_session_year_id=func.coalesce(Student.original_session_year_id, Student.session_year_id),
+                original_class_id=func.coalesce(Student.original_class_id, Student.class_id)
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+        # Students leaving (GRADUATED, TRANSFERRED_OUT, WITHDRAWN)
+        await db.execute(
+            update(Student)
+            .where(and_(Student.id == item.student_id, in_chunk, item.creates_new_session == False))
+            .values(is_active=False)
+            .execution_options(synchronize_session=False)
+        )
+
+        await db.execute(
+            update(item).where(in_chunk).values(status=ITEM_DONE)
+            .execution_options(synchronize_session=False)
+        )
+
+    async def progress(
+        self,
+        db: AsyncSession,
+        from_session_year_id: int,
+        to_session_year_id: int,
+        students_data: List[Dict[str, Any]],
+        progressed_by: int
+    ) -> Tuple[str, Dict[str, Any]]:
+        """Stage and run a batch in this request; returns (batch id, status)"""
+        batch_id = await self.stage(db, from_session_year_id, to_session_year_id, students_data, progressed_by)
+        return batch_id, await self.run(db, batch_id)
+
+    def start(self, batch_id: str, force: bool = False) -> bool:
+        """Run a staged batch in the background with its own session; False if already running here"""
+        task = self._tasks.get(batch_id)
+        if task is not None and not task.done():
+            return False
+        self._tasks[batch_id] = asyncio.create_task(self._run_in_background(batch_id, force))
+        return True
+
+    async def _run_in_background(self, batch_id: str, force: bool) -> None:
+        try:
+            async with self.session_factory() as db:
+                await self.run(db, batch_id, force=force)
+        except Exception as e:
+            logger.error(f"Progression batch {batch_id} background run failed: {e}")
+        finally:
+            self._tasks.pop(batch_id, None)
+
+    # =====================================================
+    # Reporting
+    # =====================================================
+
+    async def get_status(self, db: AsyncSession, batch_id: str) -> Optional[Dict[str, Any]]:
+        """Progress counters of a batch, or None if it does not exist"""
+        batch = (await db.execute(
+            select(ProgressionBatch)
+            .where(ProgressionBatch.batch_id == batch_id)
+            .execution_options(populate_existing=True)
+        )).scalar_one_or_none()
+        if batch is None:
+            return None
+
+        total = batch.total_students or 0
+        return {
+            "batch_id": batch.batch_id,
+            "status": batch.status,
+            "from_session_year_id": batch.from_session_year_id,
+            "to_session_year_id": batch.to_session_year_id,
+            "total_students": total,
+            "processed_count": batch.processed_count,
+            "successful_count": batch.successful_count,
+            "failed_count": batch.failed_count,
+            "pending_count": total - batch.processed_count,
+            "progress_percentage": round(batch.processed_count / total * 100, 2) if total else 100.0,
+            "running_in_process": batch_id in self._tasks,
+            "last_error": batch.last_error,
+            "created_at": batch.created_at,
+            "started_at": batch.started_at,
+            "completed_at": batch.completed_at
+        }
+
+    async def get_results(
+        self, db: AsyncSession, batch_id: str, students_data: Optional[List[Dict[str, Any]]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Per-student outcome of a batch in one query. Request entries whose student
+        does not exist (not staged) are reported from ``students_data``.
+        """
+        result = await db.execute(
+            select(
+                ProgressionBatchItem.student_id,
+                ProgressionBatchItem.status,
+                ProgressionBatchItem.error_message,
+                ProgressionBatchItem.progression_action_id,
+                ProgressionBatchItem.target_class_id,
+                ProgressionAction.name.label("action_name"),
+                Student.admission_number,
+                Student.first_name,
+                Student.last_name
+            )
+            .join(Student, Student.id == ProgressionBatchItem.student_id)
+            .outerjoin(ProgressionAction, ProgressionAction.id == ProgressionBatchItem.progression_action_id)
+            .where(ProgressionBatchItem.batch_id == batch_id)
+            .order_by(ProgressionBatchItem.id)
+        )
+        outcomes: Dict[int, List[Dict[str, Any]]] = {}
+        for row in result.all():
+            error = row.error_message
+            if row.status == ITEM_PENDING:
+                error = "Not processed yet; resume the batch"
+            outcomes.setdefault(row.student_id, []).append({
+                "success": row.status == ITEM_DONE,
+                "student_id": row.student_id,
+                "admission_number": row.admission_number,
+                "student_name": f"{row.first_name} {row.last_name}",
+                "progression_action_id": row.progression_action_id,
+                "progression_action_name": row.action_name,
+                "to_class_id": row.target_class_id,
+                "error_message": error
+            })
+
+        if students_data is None:
+            return [outcome for student_outcomes in outcomes.values() for outcome in student_outcomes]
+
+        # Request order; missing students were never staged
+        results = []
+        for data in students_data:
+            student_outcomes = outcomes.get(data["student_id"])
+            if student_outcomes:
+                results.append(student_outcomes.pop(0))
+            else:
+                results.append({
+                    "success": False,
+                    "student_id": data["student_id"],
+                    "admission_number": "",
+                    "student_name": "",
+                    "progression_action_id": data["progression_action_id"],
+                    "progression_action_name": None,
+                    "error_message": "Student not found"
+                })
+        return results
+
+
+# Global progression engine
+progression_engine = ProgressionEngine()
@@ -0,0 +1,360 @@
+"""
+Receipt Batch - bulk receipt rendering for end-of-day and month-end reprints
+
+Renders the stored receipt jobs of many payments at once instead of replaying
+the per-payment path:
+
+- receipts already in the receipt PDF cache are not rendered again
+- the rest are rendered with ReceiptGenerator / TransportReceiptGenerator in a
+  process pool, several receipts per task to keep pickling overhead low
+- the output is either one merged, print-ready PDF (identical objects such as
+  the school logo stored once), spooled to a temporary file once it outgrows
+  RECEIPT_BATCH_SPOOL_MB and streamed from there, or a ZIP of individual
+  receipts streamed as the chunks complete
+
+Each batch reports throughput metrics (receipts/second, cache hits, render time).
+"""
+
+import asyncio
+import hashlib
+import io
+import json
+import logging
+import tempfile
+import time
+import zipfile
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import IO, Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from pypdf import PdfWriter
+from pypdf.generic import ArrayObject, DictionaryObject, IndirectObject, NameObject, StreamObject
+
+from app.core.config import settings
+from app.models.receipt_job import ReceiptJob
+from app.services.receipt_pipeline import render_receipt_pdf
+from app.services.receipt_renderer import ReceiptPDFCache, receipt_cache_key, receipt_pdf_cache
+
+logger = logging.getLogger(__name__)
+
+
+def render_receipt_chunk(items: List[Tuple[str, Dict[str, Any]]]) -> List[bytes]:
+    """
+    Render several receipts in one worker task.
+    Runs in a worker process, so it only takes and returns picklable values.
+    """
+    return [render_receipt_pdf(job_type, payload) for job_type, payload in items]
+
+
+def _stream_content(stream: StreamObject) -> bytes:
+    """
+    The stream's bytes as stored, without decoding: get_data() decodes, which
+    for ReportLab's ASCII85 + Flate images costs more than the whole merge.
+    Falls back to get_data() if pypdf stops keeping them in ``_data``; the
+    object key includes /Filter, so encoded and decoded bytes never collide.
+    """
+    data = getattr(stream, "_data", None)
+    if not isinstance(data, bytes):
+        data = stream.get_data()
+    return data
+
+
+def _object_key(value: Any, keys: Dict[int, str]) -> str:
+    """
+    Content key of a PDF object. References are keyed by what they point to, so
+    two logos whose /SMask point to separate but identical masks match.
+    """
+    if isinstance(value, IndirectObject):
+        if value.idnum not in keys:
+            keys[value.idnum] = repr(value)  # placeholder while resolving (reference cycles)
+            keys[value.idnum] = _object_key(value.get_object(), keys)
+        return keys[value.idnum]
+    if isinstance(value, StreamObject):
+        header = sorted((key, _object_key(item, keys)) for key, item in value.items() if key != "/Length")
+        return f"{hashlib.sha1(_stream_content(value)).hexdigest()}:{header}"
+    if isinstance(value, DictionaryObject):
+        return repr(sorted((key, _object_key(item, keys)) for key, item in value.items()))
+    if isinstance(value, ArrayObject):
+        return repr([_object_key(item, keys) for item in value])
+    return repr(value)
+
+
+def write_merged_receipts(pdfs: List[bytes], output: IO[bytes]) -> None:
+    """
+    Write one print-ready PDF with every receipt in order to ``output``. Every receipt embeds the
+    same school logo, so identical image objects are stored once: page
+    references are pointed at the first copy (a targeted pass;
+    PdfWriter.compress_identical_objects hashes every object and is ~20x slower
+    on a month-end batch), then the pages are copied into the output writer,
+    which only clones the objects they still reference.
+    """
+    merged = PdfWriter()
+    for pdf in pdfs:
+        merged.append(io.BytesIO(pdf))
+
+    keys: Dict[int, str] = {}
+    first_copy: Dict[str, IndirectObject] = {}
+    for page in merged.pages:
+        xobjects = page.get("/Resources", {}).get("/XObject")
+        if not xobjects:
+            continue
+        xobjects = xobjects.get_object()
+        for name in list(xobjects.keys()):
+            reference = xobjects.raw_get(name)
+            if not isinstance(reference, IndirectObject):
+                continue
+            key = _object_key(reference, keys)
+            if key not in first_copy:
+                first_copy[key] = reference
+            elif first_copy[key] != reference:
+                xobjects[NameObject(name)] = first_copy[key]
+
+    writer = PdfWriter()
+    for page in merged.pages:
+        writer.add_page(page)
+    writer.write(output)
+
+
+def merge_receipt_pdfs(pdfs: List[bytes]) -> bytes:
+    """The merged PDF of write_merged_receipts as bytes"""
+    output = io.BytesIO()
+    write_merged_receipts(pdfs, output)
+    return output.getvalue()
+
+
+async def iter_file(file: IO[bytes], chunk_size: int = 64 * 1024) -> AsyncIterator[bytes]:
+    """Stream a (spooled) file in chunks and close it"""
+    try:
+        while True:
+            chunk = await asyncio.to_thread(file.read, chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        file.close()
+
+
+def receipt_payment_id(job: ReceiptJob) -> Optional[int]:
+    return job.transport_payment_id if job.job_type == "TRANSPORT" else job.fee_payment_id
+
+
+class _ZipStream:
+    """Write-only buffer that lets zipfile stream an archive chunk by chunk"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class ReceiptBatchRenderer:
+    """Renders batches of stored receipt jobs across a process pool"""
+
+    def __init__(
+        self,
+        pdf_cache: Optional[ReceiptPDFCache] = None,
+        processes: Optional[int] = None,
+        chunk_size: Optional[int] = None
+    ):
+        self.pdf_cache = pdf_cache or receipt_pdf_cache
+        self.processes = settings.RECEIPT_BATCH_PROCESSES if processes is None else processes
+        self.chunk_size = chunk_size or settings.RECEIPT_BATCH_CHUNK_SIZE
+        self._executor: Optional[Executor] = None
+
+        # Cumulative counters for monitoring
+        self.batches = 0
+        self.receipts = 0
+        self.rendered = 0
+        self.cache_hits = 0
+        self.render_seconds = 0.0
+
+    def _get_executor(self) -> Optional[Executor]:
+        # The pool is started on the first batch and kept for the next ones
+        if self._executor is None and self.processes > 0:
+            self._executor = ProcessPoolExecutor(max_workers=self.processes)
+        return self._executor
+
+    def shutdown(self) -> None:
+        """Stop the worker processes (application shutdown)"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    @staticmethod
+    def new_metrics(jobs: List[ReceiptJob]) -> Dict[str, Any]:
+        return {
+            "receipts": len(jobs),
+            "rendered": 0,
+            "cache_hits": 0,
+            "chunks": 0,
+            "render_seconds": 0.0,
+            "total_seconds": 0.0,
+            "receipts_per_second": 0.0,
+            "output_bytes": 0
+        }
+
+    async def iter_rendered(
+        self, jobs: List[ReceiptJob], metrics: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[Tuple[ReceiptJob, bytes]]:
+        """
+        Yield (job, pdf) in job order. Cached receipts are served directly; the
+        rest are rendered in chunks, with at most two chunks per worker in flight
+        so a large batch does not hold every PDF in memory.
+        """
+        metrics = metrics if metrics is not None else self.new_metrics(jobs)
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+
+        keys = [receipt_cache_key(job.job_type, receipt_payment_id(job), job.payload) for job in jobs]
+        cached = await asyncio.to_thread(lambda: [self.pdf_cache.get(key) for key in keys])
+
+        # Chunks of consecutive cache misses, rendered in order
+        chunks: List[List[int]] = []
+        for index, pdf in enumerate(cached):
+            if pdf is not None:
+                continue
+            if not chunks or len(chunks[-1]) >= self.chunk_size or chunks[-1][-1] != index - 1:
+                chunks.append([])
+            chunks[-1].append(index)
+        metrics["cache_hits"] = len(jobs) - sum(len(chunk) for chunk in chunks)
+        metrics["chunks"] = len(chunks)
+
+        max_in_flight = max(self.processes, 1) * 2
+        pending: Dict[int, asyncio.Future] = {}
+        next_chunk = 0
+
+        def submit_chunks() -> None:
+            nonlocal next_chunk
+            while next_chunk < len(chunks) and len(pending) < max_in_flight:
+                items = [(jobs[index].job_type, jobs[index].payload) for index in chunks[next_chunk]]
+                pending[chunks[next_chunk][0]] = loop.run_in_executor(executor, render_receipt_chunk, items)
+                next_chunk += 1
+
+        render_started = time.perf_counter()
+        submit_chunks()
+        index = 0
+        try:
+            while index < len(jobs):
+                if cached[index] is not None:
+                    yield jobs[index], cached[index]
+                    index += 1
+                    continue
+
+                pdfs = await pending.pop(index)
+                submit_chunks()
+                for pdf in pdfs:
+                    await asyncio.to_thread(self.pdf_cache.put, keys[index], pdf)
+                    metrics["rendered"] += 1
+                    yield jobs[index], pdf
+                    index += 1
+        finally:
+            for future in pending.values():
+                future.cancel()
+
+        metrics["render_seconds"] = round(time.perf_counter() - render_started, 3) if chunks else 0.0
+        metrics["total_seconds"] = round(time.perf_counter() - started, 3)
+        if metrics["total_seconds"]:
+            metrics["receipts_per_second"] = round(len(jobs) / metrics["total_seconds"], 1)
+        self._record(metrics)
+
+    async def render_merged_file(self, jobs: List[ReceiptJob]) -> Tuple[IO[bytes], Dict[str, Any]]:
+        """
+        All receipts of the batch as one print-ready PDF, with the batch metrics.
+        The PDF is written to a spooled temporary file (on disk past
+        RECEIPT_BATCH_SPOOL_MB), positioned at the start; the caller closes it.
+        """
+        metrics = self.new_metrics(jobs)
+        started = time.perf_counter()
+        pdfs = [pdf async for _, pdf in self.iter_rendered(jobs, metrics)]
+
+        merge_started = time.perf_counter()
+        output = tempfile.SpooledTemporaryFile(max_size=settings.RECEIPT_BATCH_SPOOL_MB * 1024 * 1024)
+        try:
+            await asyncio.to_thread(write_merged_receipts, pdfs, output)
+        except BaseException:
+            output.close()
+            raise
+        del pdfs
+        metrics["output_bytes"] = output.tell()
+        output.seek(0)
+        metrics["merge_seconds"] = round(time.perf_counter() - merge_started, 3)
+        metrics["total_seconds"] = round(time.perf_counter() - started, 3)
+        metrics["receipts_per_second"] = round(len(jobs) / metrics["total_seconds"], 1) if metrics["total_seconds"] else 0.0
+        self._log(metrics, "merged PDF")
+        return output, metrics
+
+    async def render_merged(self, jobs: List[ReceiptJob]) -> Tuple[bytes, Dict[str, Any]]:
+        """The merged PDF of render_merged_file as bytes"""
+        output, metrics = await self.render_merged_file(jobs)
+        with output:
+            return output.read(), metrics
+
+    async def stream_zip(
+        self, jobs: List[ReceiptJob], extra_summary: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[bytes]:
+        """
+        ZIP archive of the individual receipts, streamed as they are rendered.
+        summary.json at the end of the archive carries the batch metrics.
+        """
+        metrics = self.new_metrics(jobs)
+        stream = _ZipStream()
+        archive = zipfile.ZipFile(stream, mode="w", compression=zipfile.ZIP_DEFLATED)
+        seen = set()
+
+        async for job, pdf in self.iter_rendered(jobs, metrics):
+            name = f"{job.receipt_number}.pdf"
+            if name in seen:
+                name = f"{job.receipt_number}-{job.id}.pdf"
+            seen.add(name)
+            archive.writestr(name, pdf)
+            data = stream.drain()
+            metrics["output_bytes"] += len(data)
+            yield data
+
+        archive.writestr("summary.json", json.dumps({**metrics, **(extra_summary or {})}, indent=2, default=str))
+        archive.close()
+        data = stream.drain()
+        metrics["output_bytes"] += len(data)
+        self._log(metrics, "ZIP")
+        yield data
+
+    def _record(self, metrics: Dict[str, Any]) -> None:
+        self.batches += 1
+        self.receipts += metrics["receipts"]
+        self.rendered += metrics["rendered"]
+        self.cache_hits += metrics["cache_hits"]
+        self.render_seconds += metrics["render_seconds"]
+
+    @staticmethod
+    def _log(metrics: Dict[str, Any], output: str) -> None:
+        logger.info(
+            f"Receipt batch ({output}): {metrics['receipts']} receipts, {metrics['rendered']} rendered, "
+            f"{metrics['cache_hits']} cached, {metrics['receipts_per_second']} receipts/s, "
+            f"{metrics['output_bytes']} bytes"
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "processes": self.processes,
+            "chunk_size": self.chunk_size,
+            "batches": self.batches,
+            "receipts": self.receipts,
+            "rendered": self.rendered,
+            "cache_hits": self.cache_hits,
+            "render_seconds": round(self.render_seconds, 3),
+            "rendered_per_second": round(self.rendered / self.render_seconds, 1) if self.render_seconds else 0.0
+        }
+
+
+# Global batch renderer
+receipt_batch_renderer = ReceiptBatchRenderer()
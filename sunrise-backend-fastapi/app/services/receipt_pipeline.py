@@ -0,0 +1,466 @@
+"""
+Receipt Pipeline - Post-payment receipt generation and delivery
+Payment endpoints store a ReceiptJob in the same transaction as the payment and
+return immediately. A background worker renders the PDF in a process pool, uploads
+it to Cloudinary and sends the WhatsApp media receipt, retrying failed steps with
+exponential backoff. Each step is persisted, so a retry never re-uploads a receipt
+that was already stored or re-sends a message that was already delivered. Rendered
+PDFs are kept in the content-addressed receipt cache, so retries and reprints of an
+unchanged receipt are not rendered again.
+"""
+
+import asyncio
+import io
+import logging
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.crud.crud_receipt_job import receipt_job_crud
+from app.models.fee import FeePayment
+from app.models.receipt_job import ReceiptJob
+from app.models.student import Student
+from app.models.transport import TransportPayment
+from app.services.cloudinary_receipt_service import CloudinaryReceiptService
+from app.services.cloudinary_transport_receipt_service import CloudinaryTransportReceiptService
+from app.services.receipt_renderer import ReceiptPDFCache, receipt_cache_key, receipt_pdf_cache
+from app.services.whatsapp_service import whatsapp_service
+
+logger = logging.getLogger(__name__)
+
+# WhatsApp outcomes that a retry cannot change. UNCONFIRMED (Twilio timed out after the
+# request was sent) is not retried either: the message may have been delivered.
+TERMINAL_WHATSAPP_STATUSES = {
+    "SENT", "NO_PHONE", "INVALID_PHONE", "SERVICE_UNAVAILABLE", "TEMPLATE_NOT_CONFIGURED", "FAILED",
+    "UNCONFIRMED"
+}
+
+# PROCESSING jobs locked longer than this are assumed abandoned by a crashed worker
+STALE_LOCK_MINUTES = 10
+
+
+def render_receipt_pdf(job_type: str, payload: Dict[str, Any]) -> bytes:
+    """
+    Render a receipt PDF from a job payload.
+    Runs in a worker process, so it only takes and returns picklable values.
+    """
+    if job_type == "TRANSPORT":
+        from app.services.transport_receipt_generator import TransportReceiptGenerator
+        pdf_buffer = TransportReceiptGenerator().generate_receipt(
+            payment_data=payload["payment_data"],
+            student_data=payload["student_data"],
+            transport_data=payload["transport_data"],
+            month_breakdown=payload["month_breakdown"]
+        )
+    else:
+        from app.services.receipt_generator import ReceiptGenerator
+        pdf_buffer = ReceiptGenerator().generate_receipt(
+            payment_data=payload["payment_data"],
+            student_data=payload["student_data"],
+            month_breakdown=payload["month_breakdown"],
+            fee_summary=payload["fee_summary"],
+            transport_data=payload.get("transport_data"),
+            created_by_name=payload.get("created_by_name")
+        )
+    return pdf_buffer.getvalue()
+
+
+def resolve_whatsapp_phone(student: Student) -> Optional[str]:
+    """First valid phone number in priority order: father > mother > guardian > student"""
+    for phone_field in [student.father_phone, student.mother_phone, student.guardian_phone, student.phone]:
+        is_valid, validated_phone = whatsapp_service.validate_phone_number(phone_field)
+        if is_valid and validated_phone:
+            return validated_phone
+    return None
+
+
+class ReceiptPipeline:
+    """
+    Durable receipt queue and its worker
+
+    Usage from a payment endpoint:
+        receipt_pipeline.enqueue(db, job_type="FEE", ...)
+        await db.commit()
+        receipt_pipeline.notify()
+    """
+
+    def __init__(self, session_factory=None, pdf_cache: Optional[ReceiptPDFCache] = None):
+        self.session_factory = session_factory or AsyncSessionLocal
+        self.pdf_cache = pdf_cache or receipt_pdf_cache
+        self._executor: Optional[Executor] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+        self._next_stale_release = 0.0
+
+    # =====================================================
+    # Producer side (request path)
+    # =====================================================
+
+    def enqueue(
+        self,
+        db: AsyncSession,
+        *,
+        job_type: str,
+        receipt_number: str,
+        payload: Dict[str, Any],
+        whatsapp: Dict[str, Any],
+        fee_payment_id: Optional[int] = None,
+        transport_payment_id: Optional[int] = None,
+        created_by: Optional[int] = None
+    ) -> ReceiptJob:
+        """
+        Add a receipt job to the session. The caller commits it together with the
+        receipt number on the payment, then calls notify().
+
+        whatsapp: {"phone", "student_name", "amount"}; phone None skips delivery.
+        """
+        job = ReceiptJob(
+            job_type=job_type,
+            fee_payment_id=fee_payment_id,
+            transport_payment_id=transport_payment_id,
+            receipt_number=receipt_number,
+            payload=jsonable_encoder({**payload, "whatsapp": whatsapp}),
+            status="PENDING",
+            attempts=0,
+            max_attempts=settings.RECEIPT_JOB_MAX_ATTEMPTS,
+            next_attempt_at=datetime.now(),
+            receipt_status="PENDING",
+            whatsapp_status="PENDING" if whatsapp.get("phone") else "NO_PHONE",
+            whatsapp_phone=whatsapp.get("phone"),
+            created_by=created_by
+        )
+        db.add(job)
+        return job
+
+    def queue_whatsapp_resend(
+        self,
+        db: AsyncSession,
+        *,
+        job: Optional[ReceiptJob],
+        fee_payment: FeePayment,
+        phone: str,
+        student_name: str,
+        amount: float,
+        created_by: Optional[int] = None
+    ) -> ReceiptJob:
+        """
+        Re-queue WhatsApp delivery for a fee payment. Reuses the payment's receipt
+        job (retrying the receipt step too if it had failed); payments receipted
+        before the queue existed get a job with only the WhatsApp step pending.
+        """
+        whatsapp = {"phone": phone, "student_name": student_name, "amount": amount}
+
+        if job is None:
+            job = ReceiptJob(
+                job_type="FEE",
+                fee_payment_id=fee_payment.id,
+                receipt_number=fee_payment.receipt_number or f"FEE-{fee_payment.id:06d}",
+                payload={},
+                max_attempts=settings.RECEIPT_JOB_MAX_ATTEMPTS,
+                receipt_status="GENERATED",
+                receipt_url=fee_payment.receipt_cloudinary_url,
+                receipt_public_id=fee_payment.receipt_cloudinary_id,
+                created_by=created_by
+            )
+            db.add(job)
+
+        job.payload = {**(job.payload or {}), "whatsapp": jsonable_encoder(whatsapp)}
+        job.status = "PENDING"
+        job.attempts = 0
+        job.next_attempt_at = datetime.now()
+        job.locked_at = None
+        job.last_error = None
+        job.completed_at = None
+        job.whatsapp_status = "PENDING"
+        job.whatsapp_phone = phone
+        job.whatsapp_message_sid = None
+        return job
+
+    def notify(self) -> None:
+        """Wake the worker so a freshly committed job does not wait for the next poll"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    @staticmethod
+    def describe(job: Optional[ReceiptJob], receipt_url: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Receipt status block for API responses. Payments without a job (receipted
+        before the queue existed) report GENERATED when they have a receipt URL.
+        """
+        if job is None:
+            return {
+                "job_id": None,
+                "status": "GENERATED" if receipt_url else "NOT_GENERATED",
+                "job_status": None,
+                "receipt_url": receipt_url,
+                "whatsapp_status": None,
+                "whatsapp_message_sid": None,
+                "attempts": 0,
+                "last_error": None,
+                "next_attempt_at": None,
+                "completed_at": None
+            }
+
+        return {
+            "job_id": job.id,
+            "status": job.receipt_status,
+            "job_status": job.status,
+            "receipt_url": job.receipt_url or receipt_url,
+            "whatsapp_status": job.whatsapp_status,
+            "whatsapp_message_sid": job.whatsapp_message_sid,
+            "attempts": job.attempts,
+            "last_error": job.last_error,
+            "next_attempt_at": job.next_attempt_at if job.status == "PENDING" else None,
+            "completed_at": job.completed_at
+        }
+
+    # =====================================================
+    # Worker lifecycle
+    # =====================================================
+
+    async def start(self) -> None:
+        """Start the worker loop (application startup)"""
+        if self._task is not None:
+            return
+
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        if settings.RECEIPT_WORKER_PROCESSES > 0:
+            self._executor = ProcessPoolExecutor(max_workers=settings.RECEIPT_WORKER_PROCESSES)
+
+        # The first loop iteration releases jobs abandoned by a previous worker
+        self._next_stale_release = 0.0
+        self._task = asyncio.create_task(self._run())
+        logger.info(
+            f"Receipt worker started (processes={settings.RECEIPT_WORKER_PROCESSES}, "
+            f"poll={settings.RECEIPT_WORKER_POLL_SECONDS}s)"
+        )
+
+    async def stop(self) -> None:
+        """Stop the worker loop (application shutdown)"""
+        self._stopping = True
+        self.notify()
+
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+        logger.info("Receipt worker stopped")
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            if time.monotonic() >= self._next_stale_release:
+                await self.release_stale_jobs()
+
+            try:
+                processed = await self.run_once()
+            except Exception as e:
+                logger.error(f"Receipt worker iteration failed: {e}")
+                processed = 0
+
+            # Keep draining while there is work, otherwise sleep until notified or polled
+            if processed:
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=settings.RECEIPT_WORKER_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def release_stale_jobs(self) -> int:
+        """
+        Re-queue PROCESSING jobs locked for more than STALE_LOCK_MINUTES (crashed
+        worker process or hung send). Runs at startup and every STALE_LOCK_MINUTES.
+        """
+        self._next_stale_release = time.monotonic() + STALE_LOCK_MINUTES * 60
+        try:
+            async with self.session_factory() as db:
+                released = await receipt_job_crud.release_stale_jobs(
+                    db, locked_before=datetime.now() - timedelta(minutes=STALE_LOCK_MINUTES)
+                )
+        except Exception as e:
+            logger.error(f"Could not release stale receipt jobs: {e}")
+            return 0
+
+        if released:
+            logger.warning(f"Re-queued {released} stale receipt job(s)")
+        return released
+
+    async def run_once(self, now: Optional[datetime] = None) -> int:
+        """Claim and process one batch of due jobs. Returns the number of jobs claimed."""
+        async with self.session_factory() as db:
+            jobs = await receipt_job_crud.claim_due_jobs(
+                db, limit=settings.RECEIPT_WORKER_BATCH_SIZE, now=now or datetime.now()
+            )
+            job_ids = [job.id for job in jobs]
+
+        if job_ids:
+            await asyncio.gather(*(self.process_job(job_id) for job_id in job_ids))
+        return len(job_ids)
+
+    # =====================================================
+    # Job processing
+    # =====================================================
+
+    async def process_job(self, job_id: int) -> None:
+        """Run the remaining steps of a claimed job and record the outcome"""
+        async with self.session_factory() as db:
+            job = await receipt_job_crud.get(db, id=job_id)
+            if not job or job.status != "PROCESSING":
+                return
+
+            try:
+                if job.receipt_status != "GENERATED":
+                    await self._generate_receipt(db, job)
+
+                if job.whatsapp_status not in TERMINAL_WHATSAPP_STATUSES:
+                    await self._deliver_whatsapp(job)
+
+                job.status = "COMPLETED"
+                job.completed_at = datetime.now()
+                job.locked_at = None
+                await db.commit()
+                logger.info(
+                    f"Receipt job {job.id} completed: {job.receipt_number} "
+                    f"(whatsapp: {job.whatsapp_status})"
+                )
+            except Exception as e:
+                await self._record_failure(db, job, e)
+
+    async def _record_failure(self, db: AsyncSession, job: ReceiptJob, error: Exception) -> None:
+        """Schedule a retry from the committed job state (the failure may be a failed commit)"""
+        # Keep the WhatsApp outcome so a delivered message is not sent again
+        whatsapp_status, whatsapp_message_sid = job.whatsapp_status, job.whatsapp_message_sid
+        await db.rollback()
+        await db.refresh(job)
+        job.whatsapp_status, job.whatsapp_message_sid = whatsapp_status, whatsapp_message_sid
+
+        self._schedule_retry(job, error)
+        await db.commit()
+
+    async def _generate_receipt(self, db: AsyncSession, job: ReceiptJob) -> None:
+        pdf_bytes = await self.render_pdf(job)
+        receipt_url, public_id = await self._upload_pdf(job, pdf_bytes)
+
+        job.receipt_status = "GENERATED"
+        job.receipt_url = receipt_url
+        job.receipt_public_id = public_id
+        await self._store_on_payment(db, job)
+
+        # Persist before WhatsApp so a delivery retry does not upload again
+        await db.commit()
+        logger.info(f"Receipt {job.receipt_number} generated and uploaded: {receipt_url}")
+
+    async def _deliver_whatsapp(self, job: ReceiptJob) -> None:
+        result = await self._send_whatsapp(job)
+
+        job.whatsapp_status = result.get("status", "UNKNOWN")
+        job.whatsapp_message_sid = result.get("message_sid")
+
+        if job.whatsapp_status not in TERMINAL_WHATSAPP_STATUSES:
+            raise RuntimeError(result.get("error") or f"WhatsApp status {job.whatsapp_status}")
+        job.last_error = result.get("error")
+
+    def _schedule_retry(self, job: ReceiptJob, error: Exception) -> None:
+        job.last_error = str(error)[:1000]
+        job.locked_at = None
+
+        if job.attempts >= job.max_attempts:
+            job.status = "FAILED"
+            if job.receipt_status != "GENERATED":
+                job.receipt_status = "FAILED"
+            if job.whatsapp_status not in TERMINAL_WHATSAPP_STATUSES:
+                job.whatsapp_status = "FAILED"
+            logger.error(f"Receipt job {job.id} failed after {job.attempts} attempt(s): {error}")
+            return
+
+        delay = settings.RECEIPT_JOB_RETRY_BASE_SECONDS * 2 ** (job.attempts - 1)
+        job.status = "PENDING"
+        job.next_attempt_at = datetime.now() + timedelta(seconds=delay)
+        logger.warning(
+            f"Receipt job {job.id} attempt {job.attempts}/{job.max_attempts} failed, "
+            f"retrying in {delay}s: {error}"
+        )
+
+    async def _store_on_payment(self, db: AsyncSession, job: ReceiptJob) -> None:
+        """Copy the uploaded receipt onto the payment row read by history and receipt endpoints"""
+        if job.job_type == "TRANSPORT":
+            await db.execute(
+                update(TransportPayment)
+                .where(TransportPayment.id == job.transport_payment_id)
+                .values(
+                    receipt_number=job.receipt_number,
+                    receipt_url=job.receipt_url,
+                    receipt_cloudinary_public_id=job.receipt_public_id,
+                    receipt_generated_at=datetime.now()
+                )
+            )
+        else:
+            await db.execute(
+                update(FeePayment)
+                .where(FeePayment.id == job.fee_payment_id)
+                .values(
+                    receipt_number=job.receipt_number,
+                    receipt_cloudinary_url=job.receipt_url,
+                    receipt_cloudinary_id=job.receipt_public_id
+                )
+            )
+
+    async def render_pdf(self, job: ReceiptJob) -> bytes:
+        """Receipt PDF of a job from the receipt cache, rendering it on a miss"""
+        payment_id = job.transport_payment_id if job.job_type == "TRANSPORT" else job.fee_payment_id
+        key = receipt_cache_key(job.job_type, payment_id, job.payload)
+
+        pdf_bytes = await asyncio.to_thread(self.pdf_cache.get, key)
+        if pdf_bytes is None:
+            pdf_bytes = await self._render_pdf(job.job_type, job.payload)
+            await asyncio.to_thread(self.pdf_cache.put, key, pdf_bytes)
+        return pdf_bytes
+
+    async def _render_pdf(self, job_type: str, payload: Dict[str, Any]) -> bytes:
+        # ReportLab is CPU bound: render in the process pool (or a thread when disabled)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, render_receipt_pdf, job_type, payload)
+
+    async def _upload_pdf(self, job: ReceiptJob, pdf_bytes: bytes) -> Tuple[str, str]:
+        if job.job_type == "TRANSPORT":
+            cloudinary_service = CloudinaryTransportReceiptService()
+            payment_id = job.transport_payment_id
+        else:
+            cloudinary_service = CloudinaryReceiptService()
+            payment_id = job.fee_payment_id
+        return await cloudinary_service.upload_receipt(
+            pdf_buffer=io.BytesIO(pdf_bytes),
+            payment_id=payment_id,
+            receipt_number=job.receipt_number
+        )
+
+    async def _send_whatsapp(self, job: ReceiptJob) -> Dict[str, Any]:
+        whatsapp = (job.payload or {}).get("whatsapp", {})
+        return await whatsapp_service.send_fee_media_receipt(
+            phone_number=job.whatsapp_phone,
+            student_name=whatsapp.get("student_name", ""),
+            amount=float(whatsapp.get("amount") or 0),
+            receipt_url=job.receipt_url,
+            payment_id=job.fee_payment_id or job.transport_payment_id
+        )
+
+
+# Create singleton instance
+receipt_pipeline = ReceiptPipeline()
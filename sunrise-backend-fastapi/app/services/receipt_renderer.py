@@ -0,0 +1,403 @@
+"""
+Receipt Renderer - process-wide ReportLab resources and PDF cache for receipts
+
+ReceiptGenerator and TransportReceiptGenerator share one renderer per process:
+
+- the paragraph stylesheet is built once
+- the school logo JPEG is read and ASCII85-encoded into a PDF image object once
+  (re-encoding the ~200 KB logo was most of the cost of every receipt)
+- the header flowables (logo, school info, rule) are built once per thread and
+  reused by every receipt rendered on that thread
+
+ReceiptPDFCache keeps rendered PDFs keyed by job type, payment id, template
+version and a hash of the receipt payload, so upload retries, reprints and
+WhatsApp resends of an unchanged receipt never render it again.
+"""
+
+import copy
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle, StyleSheet1
+from reportlab.lib.units import inch
+from reportlab.pdfbase.pdfdoc import PDFImageXObject
+from reportlab.platypus import Flowable, Paragraph, Spacer, Table, TableStyle
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Bump when the receipt layout changes so cached PDFs are not served for the new template
+RECEIPT_TEMPLATE_VERSION = "2025.1"
+
+
+class CachedImage(Flowable):
+    """
+    Draws a PDF image object that was encoded once per process.
+    Mirrors Canvas.drawImage, registering a copy of the image object in each
+    document instead of reading and encoding the image file again.
+    """
+
+    def __init__(self, xobject: PDFImageXObject, width: float, height: float):
+        super().__init__()
+        self.xobject = xobject
+        self.width = width
+        self.height = height
+
+    def wrap(self, availWidth, availHeight):
+        return self.width, self.height
+
+    def draw(self):
+        canv = self.canv
+        doc = canv._doc
+        name = self.xobject.name
+        reg_name = doc.getXObjectName(name)
+        if reg_name not in doc.idToObject:
+            # A PDF object is registered in exactly one document; the encoded stream is shared
+            xobject = copy.copy(self.xobject)
+            canv._setXObjects(xobject)
+            doc.Reference(xobject, reg_name)
+            doc.addForm(name, xobject)
+
+        canv._currentPageHasImages = 1
+        canv.saveState()
+        canv.scale(self.width, self.height)
+        canv._code.append(f"/{reg_name} Do")
+        canv.restoreState()
+        canv._formsinuse.append(name)
+
+
+class ReceiptRenderer:
+    """Shared styles, logo and header for fee and transport receipts"""
+
+    # School Information
+    SCHOOL_NAME = "SUNRISE NATIONAL PUBLIC SCHOOL"
+    SCHOOL_ADDRESS = "Sena road, Farsauliyana, Rath, Hamirpur, UP - 210431"
+    SCHOOL_EMAIL = "sunrise.nps008@gmail.com"
+    SCHOOL_WEBSITE = "https://sunrisenps.com"
+
+    # Logo path (B&W version)
+    LOGO_PATH = os.path.join(os.path.dirname(__file__), '..', 'static', 'images', 'school_logo_bw.jpeg')
+
+    def __init__(self, logo_path: Optional[str] = None):
+        self.logo_path = logo_path or self.LOGO_PATH
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._styles: Optional[StyleSheet1] = None
+        self._logo: Optional[PDFImageXObject] = None
+        self._logo_loaded = False
+
+    @property
+    def styles(self) -> StyleSheet1:
+        """Receipt stylesheet, built on first use (read-only afterwards)"""
+        if self._styles is None:
+            with self._lock:
+                if self._styles is None:
+                    self._styles = self._build_styles()
+        return self._styles
+
+    @property
+    def logo(self) -> Optional[PDFImageXObject]:
+        """The encoded logo image object, or None when the logo is unavailable"""
+        if not self._logo_loaded:
+            with self._lock:
+                if not self._logo_loaded:
+                    self._logo = self._load_logo()
+                    self._logo_loaded = True
+        return self._logo
+
+    def header_flowables(self) -> List:
+        """
+        Header with B&W logo and school info. Flowables keep layout state while a
+        document is built, so each thread gets its own prebuilt copy.
+        """
+        header = getattr(self._local, "header", None)
+        if header is None:
+            header = self._local.header = self._build_header()
+        return header
+
+    def _load_logo(self) -> Optional[PDFImageXObject]:
+        if not os.path.exists(self.logo_path):
+            return None
+        try:
+            with open(self.logo_path, "rb") as logo_file:
+                digest = hashlib.sha1(logo_file.read()).hexdigest()[:16]
+            return PDFImageXObject(f"logo{digest}", self.logo_path)
+        except Exception as e:
+            logger.warning(f"Could not load receipt logo {self.logo_path}: {e}")
+            return None
+
+    def _build_styles(self) -> StyleSheet1:
+        """Paragraph styles for professional B&W receipt"""
+        styles = getSampleStyleSheet()
+
+        # School name style
+        styles.add(ParagraphStyle(
+            name='SchoolName',
+            parent=styles['Normal'],
+            fontSize=16,
+            textColor=colors.black,
+            alignment=TA_CENTER,
+            fontName='Helvetica-Bold',
+            spaceAfter=2
+        ))
+
+        # School address style
+        styles.add(ParagraphStyle(
+            name='SchoolAddress',
+            parent=styles['Normal'],
+            fontSize=9,
+            textColor=colors.black,
+            alignment=TA_CENTER,
+            spaceAfter=2
+        ))
+
+        # Receipt title style
+        styles.add(ParagraphStyle(
+            name='ReceiptTitle',
+            parent=styles['Normal'],
+            fontSize=14,
+            textColor=colors.black,
+            alignment=TA_CENTER,
+            fontName='Helvetica-Bold',
+            spaceBefore=8,
+            spaceAfter=8
+        ))
+
+        # Section header style - CENTER ALIGNED
+        styles.add(ParagraphStyle(
+            name='SectionHeader',
+            parent=styles['Normal'],
+            fontSize=10,
+            textColor=colors.black,
+            fontName='Helvetica-Bold',
+            alignment=TA_CENTER,
+            spaceBefore=6,
+            spaceAfter=4
+        ))
+
+        # Table cell style - left aligned
+        styles.add(ParagraphStyle(
+            name='CellLeft',
+            parent=styles['Normal'],
+            fontSize=9,
+            textColor=colors.black,
+            alignment=TA_LEFT
+        ))
+
+        # Table cell style - right aligned
+        styles.add(ParagraphStyle(
+            name='CellRight',
+            parent=styles['Normal'],
+            fontSize=9,
+            textColor=colors.black,
+            alignment=TA_RIGHT
+        ))
+
+        # Table cell style - center aligned
+        styles.add(ParagraphStyle(
+            name='CellCenter',
+            parent=styles['Normal'],
+            fontSize=9,
+            textColor=colors.black,
+            alignment=TA_CENTER
+        ))
+
+        # Bold cell style
+        styles.add(ParagraphStyle(
+            name='CellBold',
+            parent=styles['Normal'],
+            fontSize=9,
+            textColor=colors.black,
+            fontName='Helvetica-Bold'
+        ))
+
+        # Footer style
+        styles.add(ParagraphStyle(
+            name='Footer',
+            parent=styles['Normal'],
+            fontSize=8,
+            textColor=colors.gray,
+            alignment=TA_CENTER,
+            spaceBefore=12
+        ))
+
+        # Header school info
+        styles.add(ParagraphStyle(
+            'HeaderInfo',
+            parent=styles['Normal'],
+            fontSize=10,
+            alignment=TA_CENTER,
+            leading=16
+        ))
+
+        return styles
+
+    def _build_header(self) -> List:
+        styles = self.styles
+        elements = []
+
+        # School info paragraph - BIGGER school name (18pt)
+        school_info = Paragraph(
+            f"<b><font size=18>{self.SCHOOL_NAME}</font></b><br/>"
+            f"<font size=9>{self.SCHOOL_ADDRESS}</font><br/>"
+            f"<font size=9>Email: {self.SCHOOL_EMAIL} | Web: {self.SCHOOL_WEBSITE}</font>",
+            styles['HeaderInfo']
+        )
+
+        if self.logo is not None:
+            # Create header table with logo - full width
+            header_data = [[CachedImage(self.logo, width=0.9*inch, height=0.9*inch), school_info]]
+            header_table = Table(header_data, colWidths=[1.1*inch, 5.9*inch])
+            header_table.setStyle(TableStyle([
+                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+                ('ALIGN', (0, 0), (0, 0), 'CENTER'),
+                ('ALIGN', (1, 0), (1, 0), 'CENTER'),
+            ]))
+            elements.append(header_table)
+        else:
+            # No logo - just school info
+            elements.append(Paragraph(self.SCHOOL_NAME, styles['SchoolName']))
+            elements.append(Paragraph(self.SCHOOL_ADDRESS, styles['SchoolAddress']))
+            elements.append(Paragraph(
+                f"Email: {self.SCHOOL_EMAIL} | Web: {self.SCHOOL_WEBSITE}",
+                styles['SchoolAddress']
+            ))
+
+        # Horizontal line - full width
+        elements.append(Spacer(1, 0.08*inch))
+        line_table = Table([['']], colWidths=[7*inch])
+        line_table.setStyle(TableStyle([
+            ('LINEBELOW', (0, 0), (-1, 0), 1, colors.black),
+        ]))
+        elements.append(line_table)
+
+        return elements
+
+
+def receipt_cache_key(job_type: str, payment_id: Optional[int], payload: Dict[str, Any]) -> str:
+    """
+    Content address of a receipt PDF: payment, template version and the receipt
+    payload (the WhatsApp delivery block does not affect the PDF)
+    """
+    content = {key: value for key, value in (payload or {}).items() if key != "whatsapp"}
+    digest = hashlib.sha256(
+        json.dumps(content, sort_keys=True, default=str, separators=(",", ":")).encode("utf-8")
+    ).hexdigest()
+    return f"{job_type}-{payment_id}-{RECEIPT_TEMPLATE_VERSION}-{digest[:32]}"
+
+
+class ReceiptPDFCache:
+    """
+    Rendered receipt PDFs by content address: an in-memory LRU bounded by size,
+    optionally backed by a directory shared by all workers on the host
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None, directory: Optional[str] = None):
+        self.max_bytes = settings.RECEIPT_PDF_CACHE_MAX_MB * 1024 * 1024 if max_bytes is None else max_bytes
+        self.directory = settings.RECEIPT_PDF_CACHE_DIR if directory is None else directory
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            pdf = self._entries.get(key)
+            if pdf is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return pdf
+
+        pdf = self._read_file(key)
+        with self._lock:
+            if pdf is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        self._remember(key, pdf)
+        return pdf
+
+    def put(self, key: str, pdf: bytes) -> None:
+        self._remember(key, pdf)
+        self._write_file(key, pdf)
+
+    def get_or_render(self, key: str, render: Callable[[], bytes]) -> bytes:
+        """Cached PDF for key, rendering and storing it on a miss"""
+        pdf = self.get(key)
+        if pdf is None:
+            pdf = render()
+            self.put(key, pdf)
+        return pdf
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "size_bytes": self._size,
+            "max_bytes": self.max_bytes,
+            "directory": self.directory or None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+    def _remember(self, key: str, pdf: bytes) -> None:
+        if len(pdf) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._entries[key] = pdf
+            self._size += len(pdf)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.pdf")
+
+    def _read_file(self, key: str) -> Optional[bytes]:
+        if not self.directory:
+            return None
+        try:
+            with open(self._path(key), "rb") as pdf_file:
+                return pdf_file.read()
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.warning(f"Could not read cached receipt {key}: {e}")
+            return None
+
+    def _write_file(self, key: str, pdf: bytes) -> None:
+        if not self.directory:
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            temp_path = f"{self._path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_path, "wb") as pdf_file:
+                pdf_file.write(pdf)
+            os.replace(temp_path, self._path(key))
+        except OSError as e:
+            logger.warning(f"Could not store cached receipt {key}: {e}")
+
+
+# Global receipt renderer (one per process, including receipt worker processes)
+receipt_renderer = ReceiptRenderer()
+
+# Global receipt PDF cache
+receipt_pdf_cache = ReceiptPDFCache()
@@ -0,0 +1,244 @@
+"""
+Stock Reservation Engine - atomic stock decrement for inventory purchases
+
+A purchase used to check each line's stock, insert the purchase, then read,
+decrement and commit each stock row in turn. Two counters selling the last
+items of a size could both pass the check, and a failure half-way left some
+lines decremented.
+
+``reserve`` decrements every line of a purchase with one conditional statement:
+
+    UPDATE inventory_stock
+       SET current_quantity = current_quantity - CASE <line> THEN <qty> ... END
+     WHERE (<line 1> AND current_quantity >= <qty 1>) OR ...
+    RETURNING id, item, size, current_quantity, minimum_threshold, reorder_quantity
+
+The guard is re-checked by the database on the locked row, so concurrent
+reservations can never take stock below zero. If a line is not returned, its
+stock was missing or too low: the statement's savepoint is rolled back (no line
+is decremented, other pending work of the caller is kept) and
+``InsufficientStockError`` carries a per-line shortage report. On success the
+caller writes the purchase in the same transaction and commits once. The
+returned rows tell which items just crossed their minimum threshold, so
+low-stock alerts need no extra stock query.
+
+Restocks and procurements (``crud_inventory_stock.adjust_stock_quantity``) add
+to the same column with ``current_quantity = current_quantity + change``, so
+they never overwrite a reservation made in between.
+"""
+
+from dataclasses import asdict, dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, case, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.inventory import InventoryItemType, InventorySizeType, InventoryStock
+from app.services.alert_service import alert_service
+
+
+@dataclass(frozen=True)
+class StockLine:
+    """Quantity of one item (and size) to take from stock"""
+    item_type_id: int
+    size_type_id: Optional[int]
+    quantity: int
+
+
+@dataclass
+class ReservedStock:
+    """A stock row after the reservation"""
+    stock_id: int
+    item_type_id: int
+    size_type_id: Optional[int]
+    quantity: int
+    remaining: int
+    minimum_threshold: int
+    reorder_quantity: int
+
+    @property
+    def crossed_threshold(self) -> bool:
+        """This reservation took the item to (or below) its minimum threshold"""
+        return self.remaining <= self.minimum_threshold < self.remaining + self.quantity
+
+
+@dataclass
+class StockShortage:
+    """A line that could not be reserved"""
+    item_type_id: int
+    size_type_id: Optional[int]
+    required: int
+    available: int
+    item_name: str
+    size_name: Optional[str] = None
+
+    def describe(self) -> str:
+        size_info = f" (Size: {self.size_name})" if self.size_name else ""
+        return f"{self.item_name}{size_info}. Available: {self.available}, Required: {self.required}"
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+class InsufficientStockError(Exception):
+    """One or more purchase lines exceed the stock on hand"""
+
+    def __init__(self, shortages: List[StockShortage]):
+        self.shortages = shortages
+        super().__init__("Insufficient stock for " + "; ".join(s.describe() for s in shortages))
+
+
+def merge_lines(lines: Iterable[StockLine]) -> List[StockLine]:
+    """One line per item/size (a purchase may list the same item twice)"""
+    quantities: Dict[Tuple[int, Optional[int]], int] = {}
+    for line in lines:
+        key = (line.item_type_id, line.size_type_id)
+        quantities[key] = quantities.get(key, 0) + line.quantity
+    return [
+        StockLine(item_type_id, size_type_id, quantity)
+        for (item_type_id, size_type_id), quantity in quantities.items()
+    ]
+
+
+def _line_matches(line: StockLine):
+    size_match = (
+        InventoryStock.size_type_id == line.size_type_id if line.size_type_id is not None
+        else InventoryStock.size_type_id.is_(None)
+    )
+    return and_(InventoryStock.inventory_item_type_id == line.item_type_id, size_match)
+
+
+class StockReservationEngine:
+    """All-or-nothing stock decrement for the lines of one purchase"""
+
+    async def reserve(self, db: AsyncSession, lines: Iterable[StockLine]) -> List[ReservedStock]:
+        """
+        Decrement stock for every line in one statement, without committing
+
+        Runs in a savepoint: on a shortage only the decrement is undone and
+        ``InsufficientStockError`` is raised.
+        """
+        merged = merge_lines(lines)
+        if not merged:
+            return []
+
+        decrement = case(*[(_line_matches(line), line.quantity) for line in merged], else_=0)
+        statement = (
+            update(InventoryStock)
+            .where(or_(*[
+                and_(_line_matches(line), InventoryStock.current_quantity >= line.quantity)
+                for line in merged
+            ]))
+            .values(current_quantity=InventoryStock.current_quantity - decrement)
+            .returning(
+                InventoryStock.id,
+                InventoryStock.inventory_item_type_id,
+                InventoryStock.size_type_id,
+                InventoryStock.current_quantity,
+                InventoryStock.minimum_threshold,
+                InventoryStock.reorder_quantity
+            )
+            .execution_options(synchronize_session=False)
+        )
+        async with db.begin_nested():
+            rows = (await db.execute(statement)).all()
+
+            by_key = {(row.inventory_item_type_id, row.size_type_id): row for row in rows}
+            missing = [line for line in merged if (line.item_type_id, line.size_type_id) not in by_key]
+            if missing:
+                # Raising out of the savepoint undoes the lines that were decremented
+                raise InsufficientStockError(await self.shortage_report(db, missing))
+
+        reserved = []
+        for line in merged:
+            row = by_key[(line.item_type_id, line.size_type_id)]
+            reserved.append(ReservedStock(
+                stock_id=row.id,
+                item_type_id=row.inventory_item_type_id,
+                size_type_id=row.size_type_id,
+                quantity=line.quantity,
+                remaining=row.current_quantity,
+                minimum_threshold=row.minimum_threshold,
+                reorder_quantity=row.reorder_quantity
+            ))
+        return reserved
+
+    async def shortage_report(self, db: AsyncSession, lines: List[StockLine]) -> List[StockShortage]:
+        """Stock on hand and display names for lines that could not be reserved"""
+        stock_rows = (await db.execute(
+            select(
+                InventoryStock.inventory_item_type_id,
+                InventoryStock.size_type_id,
+                InventoryStock.current_quantity
+            ).where(or_(*[_line_matches(line) for line in lines]))
+        )).all()
+        available = {(row.inventory_item_type_id, row.size_type_id): row.current_quantity for row in stock_rows}
+        item_names, size_names = await self._names(
+            db, {line.item_type_id for line in lines}, {line.size_type_id for line in lines}
+        )
+
+        return [
+            StockShortage(
+                item_type_id=line.item_type_id,
+                size_type_id=line.size_type_id,
+                required=line.quantity,
+                available=available.get((line.item_type_id, line.size_type_id), 0),
+                item_name=item_names.get(line.item_type_id, f"Item #{line.item_type_id}"),
+                size_name=size_names.get(line.size_type_id)
+            )
+            for line in lines
+        ]
+
+    async def emit_low_stock_alerts(
+        self,
+        db: AsyncSession,
+        reserved: List[ReservedStock],
+        *,
+        actor_user_id: int,
+        actor_name: str,
+        session_year_id: Optional[int] = None
+    ) -> int:
+        """One INVENTORY_LOW_STOCK alert per item this reservation took to its threshold"""
+        crossed = [stock for stock in reserved if stock.crossed_threshold]
+        if not crossed:
+            return 0
+
+        item_names, size_names = await self._names(
+            db, {stock.item_type_id for stock in crossed}, {stock.size_type_id for stock in crossed}
+        )
+        for stock in crossed:
+            await alert_service.create_inventory_low_stock_alert(
+                db,
+                stock_id=stock.stock_id,
+                item_name=item_names.get(stock.item_type_id, f"Item #{stock.item_type_id}"),
+                size_name=size_names.get(stock.size_type_id),
+                remaining_quantity=stock.remaining,
+                minimum_threshold=stock.minimum_threshold,
+                reorder_quantity=stock.reorder_quantity,
+                actor_user_id=actor_user_id,
+                actor_name=actor_name,
+                session_year_id=session_year_id,
+                auto_commit=False
+            )
+        await db.commit()
+        return len(crossed)
+
+    async def _names(
+        self, db: AsyncSession, item_type_ids: set, size_type_ids: set
+    ) -> Tuple[Dict[int, str], Dict[int, str]]:
+        item_rows = (await db.execute(
+            select(InventoryItemType.id, InventoryItemType.description)
+            .where(InventoryItemType.id.in_(item_type_ids))
+        )).all()
+        size_type_ids = {size_id for size_id in size_type_ids if size_id is not None}
+        size_rows = []
+        if size_type_ids:
+            size_rows = (await db.execute(
+                select(InventorySizeType.id, InventorySizeType.name)
+                .where(InventorySizeType.id.in_(size_type_ids))
+            )).all()
+        return {row.id: row.description for row in item_rows}, {row.id: row.name for row in size_rows}
+
+
+# Create singleton instance
+stock_reservation_engine = StockReservationEngine()
@@ -6,90 +6,22 @@ Black & white design for WhatsApp UTILITY template compliance
 """
 
 import io
-import os
 from typing import List, Dict, Any
 
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import letter
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
-from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+
+from app.services.receipt_renderer import receipt_renderer
 
 
 class TransportReceiptGenerator:
     """Service for generating PDF receipts for transport payments (matches ReceiptGenerator format)"""
 
-    # School Information
-    SCHOOL_NAME = "SUNRISE NATIONAL PUBLIC SCHOOL"
-    SCHOOL_ADDRESS = "Sena road, Farsauliyana, Rath, Hamirpur, UP - 210431"
-    SCHOOL_EMAIL = "sunrise.nps008@gmail.com"
-    SCHOOL_WEBSITE = "https://sunrisenps.com"
-
-    # Logo path (B&W version - same as ReceiptGenerator)
-    LOGO_PATH = os.path.join(os.path.dirname(__file__), '..', 'static', 'images', 'school_logo_bw.jpeg')
-
     def __init__(self):
-        """Initialize the transport receipt generator"""
-        self.styles = getSampleStyleSheet()
-        self._setup_custom_styles()
-
-    def _setup_custom_styles(self):
-        """Setup paragraph styles for professional B&W receipt (matches ReceiptGenerator)"""
-        # School name style
-        self.styles.add(ParagraphStyle(
-            name='SchoolName',
-            parent=self.styles['Normal'],
-            fontSize=16,
-            textColor=colors.black,
-            alignment=TA_CENTER,
-            fontName='Helvetica-Bold',
-            spaceAfter=2
-        ))
-
-        # School address style
-        self.styles.add(ParagraphStyle(
-            name='SchoolAddress',
-            parent=self.styles['Normal'],
-            fontSize=9,
-            textColor=colors.black,
-            alignment=TA_CENTER,
-            spaceAfter=2
-        ))
-
-        # Receipt title style
-        self.styles.add(ParagraphStyle(
-            name='ReceiptTitle',
-            parent=self.styles['Normal'],
-            fontSize=14,
-            textColor=colors.black,
-            alignment=TA_CENTER,
-            fontName='Helvetica-Bold',
-            spaceBefore=8,
-            spaceAfter=8
-        ))
-
-        # Section header style - CENTER ALIGNED
-        self.styles.add(ParagraphStyle(
-            name='SectionHeader',
-            parent=self.styles['Normal'],
-            fontSize=10,
-            textColor=colors.black,
-            fontName='Helvetica-Bold',
-            alignment=TA_CENTER,
-            spaceBefore=6,
-            spaceAfter=4
-        ))
-
-        # Footer style
-        self.styles.add(ParagraphStyle(
-            name='Footer',
-            parent=self.styles['Normal'],
-            fontSize=8,
-            textColor=colors.gray,
-            alignment=TA_CENTER,
-            spaceBefore=12
-        ))
+        """Initialize the transport receipt generator with the shared, preloaded stylesheet"""
+        self.styles = receipt_renderer.styles
 
     def generate_receipt(
         self,
@@ -179,59 +111,8 @@ class TransportReceiptGenerator:
         return buffer
 
     def _create_header(self) -> List:
-        """Create header with B&W logo and school info (matches ReceiptGenerator)"""
-        elements = []
-
-        # Try to load the B&W logo
-        logo_element = None
-        if os.path.exists(self.LOGO_PATH):
-            try:
-                logo_element = Image(self.LOGO_PATH, width=0.9*inch, height=0.9*inch)
-            except Exception:
-                logo_element = None
-
-        # School info paragraph - BIGGER school name (18pt)
-        school_info = Paragraph(
-            f"<b><font size=18>{self.SCHOOL_NAME}</font></b><br/>"
-            f"<font size=9>{self.SCHOOL_ADDRESS}</font><br/>"
-            f"<font size=9>Email: {self.SCHOOL_EMAIL} | Web: {self.SCHOOL_WEBSITE}</font>",
-            ParagraphStyle(
-                'HeaderInfo',
-                parent=self.styles['Normal'],
-                fontSize=10,
-                alignment=TA_CENTER,
-                leading=16
-            )
-        )
-
-        if logo_element:
-            # Create header table with logo - full width
-            header_data = [[logo_element, school_info]]
-            header_table = Table(header_data, colWidths=[1.1*inch, 5.9*inch])
-            header_table.setStyle(TableStyle([
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                ('ALIGN', (0, 0), (0, 0), 'CENTER'),
-                ('ALIGN', (1, 0), (1, 0), 'CENTER'),
-            ]))
-            elements.append(header_table)
-        else:
-            # No logo - just school info
-            elements.append(Paragraph(self.SCHOOL_NAME, self.styles['SchoolName']))
-            elements.append(Paragraph(self.SCHOOL_ADDRESS, self.styles['SchoolAddress']))
-            elements.append(Paragraph(
-                f"Email: {self.SCHOOL_EMAIL} | Web: {self.SCHOOL_WEBSITE}",
-                self.styles['SchoolAddress']
-            ))
-
-        # Horizontal line - full width
-        elements.append(Spacer(1, 0.08*inch))
-        line_table = Table([['']], colWidths=[7*inch])
-        line_table.setStyle(TableStyle([
-            ('LINEBELOW', (0, 0), (-1, 0), 1, colors.black),
-        ]))
-        elements.append(line_table)
-
-        return elements
+        """Header with B&W logo and school info (same prebuilt header as ReceiptGenerator)"""
+        return receipt_renderer.header_flowables()
 
     def _create_receipt_info_table(
         self, receipt_number: str, payment_date: str, paid_amount: float
@@ -38,8 +38,15 @@ from typing import Optional, Dict, Any, Tuple
 from datetime import datetime
 from twilio.rest import Client
 from twilio.base.exceptions import TwilioRestException
+from twilio.http.http_client import TwilioHttpClient
 
 from app.core.config import settings
+from app.core.integrations import (
+    CircuitOpenError,
+    IntegrationTimeoutError,
+    IntegrationUnavailableError,
+    twilio_integration
+)
 
 logger = logging.getLogger("sunrise_app")
 
@@ -58,6 +65,20 @@ TWILIO_ERROR_CODES = {
 }
 
 
+def unavailable_status(error: IntegrationUnavailableError) -> str:
+    """
+    Result status for a Twilio call that got no answer.
+    CIRCUIT_OPEN and TIMEOUT (no free slot) mean nothing was sent, so a retry is safe.
+    UNCONFIRMED means the request was dispatched and may still be delivered, so
+    sending it again could message the parent twice.
+    """
+    if isinstance(error, CircuitOpenError):
+        return "CIRCUIT_OPEN"
+    if isinstance(error, IntegrationTimeoutError) and error.dispatched:
+        return "UNCONFIRMED"
+    return "TIMEOUT"
+
+
 class WhatsAppService:
     """
     Service class for sending WhatsApp notifications via Twilio
@@ -68,6 +89,8 @@ class WhatsAppService:
     - Format phone numbers for WhatsApp
     - Handle Twilio API errors gracefully with detailed logging
     - Track message delivery status
+    - Twilio calls run on the Twilio integration pool (app.core.integrations),
+      never on the event loop
     """
 
     def __init__(self):
@@ -92,7 +115,13 @@ class WhatsAppService:
         # Initialize client if credentials are available
         if self.account_sid and self.auth_token and self.from_number:
             try:
-                self.client = Client(self.account_sid, self.auth_token)
+                self.client = Client(
+                    self.account_sid,
+                    self.auth_token,
+                    http_client=TwilioHttpClient(timeout=settings.TWILIO_TIMEOUT_SECONDS)
+                )
+                if settings.TWILIO_API_BASE_URL:
+                    self.client.api.base_url = settings.TWILIO_API_BASE_URL
                 self._initialized = True
                 if self.template_sid:
                     logger.info("✅ WhatsApp Service initialized with template support")
@@ -341,7 +370,8 @@ class WhatsAppService:
         try:
             logger.info("   📤 Sending message via Twilio...")
 
-            message = self.client.messages.create(
+            message = await twilio_integration.call(
+                self.client.messages.create,
                 body=test_message,
                 from_=from_whatsapp,
                 to=formatted_phone
@@ -362,6 +392,12 @@ class WhatsAppService:
             result["error_details"] = error_details
             result["status"] = "TWILIO_ERROR"
 
+        except IntegrationUnavailableError as e:
+            # Twilio slow or failing: not sent, or sent without confirmation
+            result["error"] = str(e)
+            result["status"] = unavailable_status(e)
+            logger.warning(f"   ⚠️ WhatsApp not confirmed ({result['status']}): {e}")
+
         except Exception as e:
             result["error"] = f"Unexpected error: {str(e)}"
             result["status"] = "ERROR"
@@ -502,7 +538,8 @@ class WhatsAppService:
 
         try:
             # Send WhatsApp message using approved template
-            message = self.client.messages.create(
+            message = await twilio_integration.call(
+                self.client.messages.create,
                 from_=from_whatsapp,
                 to=formatted_phone,
                 content_sid=self.template_sid,
@@ -521,6 +558,12 @@ class WhatsAppService:
             result["error_details"] = error_details
             result["status"] = "TWILIO_ERROR"
 
+        except IntegrationUnavailableError as e:
+            # Twilio slow or failing: not sent, or sent without confirmation
+            result["error"] = str(e)
+            result["status"] = unavailable_status(e)
+            logger.warning(f"   ⚠️ WhatsApp not confirmed ({result['status']}): {e}")
+
         except Exception as e:
             result["error"] = f"Unexpected error: {str(e)}"
             result["status"] = "ERROR"
@@ -622,7 +665,8 @@ class WhatsAppService:
 
         try:
             # Send WhatsApp message using approved media template
-            message = self.client.messages.create(
+            message = await twilio_integration.call(
+                self.client.messages.create,
                 from_=from_whatsapp,
                 to=formatted_phone,
                 content_sid=media_receipt_template_sid,
@@ -641,6 +685,12 @@ class WhatsAppService:
             result["error_details"] = error_details
             result["status"] = "TWILIO_ERROR"
 
+        except IntegrationUnavailableError as e:
+            # Twilio slow or failing: not sent, or sent without confirmation
+            result["error"] = str(e)
+            result["status"] = unavailable_status(e)
+            logger.warning(f"   ⚠️ WhatsApp not confirmed ({result['status']}): {e}")
+
         except Exception as e:
             result["error"] = f"Unexpected error: {str(e)}"
             result["status"] = "ERROR"
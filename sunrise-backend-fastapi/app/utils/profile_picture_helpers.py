@@ -5,11 +5,10 @@ Handles profile picture upload, validation, and deletion for students and teache
 
 from typing import Optional, Tuple
 from fastapi import UploadFile, HTTPException, status
-import cloudinary
-import cloudinary.uploader
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.cloudinary_config import configure_cloudinary
+from app.core.integrations import IntegrationUnavailableError, cloudinary_destroy, cloudinary_upload
 
 # Ensure Cloudinary is configured
 configure_cloudinary()
@@ -72,7 +71,7 @@ async def upload_profile_picture_to_cloudinary(
     """
     try:
         # Upload to Cloudinary with transformations
-        cloudinary_response = cloudinary.uploader.upload(
+        cloudinary_response = await cloudinary_upload(
             file.file,
             folder=folder,
             public_id=f"{identifier}_{file.filename}",
@@ -94,6 +93,11 @@ async def upload_profile_picture_to_cloudinary(
         
         return cloudinary_response['secure_url'], cloudinary_response['public_id']
         
+    except IntegrationUnavailableError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Image storage is unavailable, please try again: {str(e)}"
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -115,7 +119,7 @@ async def delete_profile_picture_from_cloudinary(public_id: str) -> bool:
         return False
         
     try:
-        result = cloudinary.uploader.destroy(public_id, resource_type="image")
+        result = await cloudinary_destroy(public_id, resource_type="image")
         return result.get('result') == 'ok'
     except Exception as e:
         # Log error but don't raise exception
@@ -35,10 +35,20 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Query counts and DB time per request (Server-Timing / X-DB-Queries headers)
+if settings.QUERY_INSTRUMENTATION_ENABLED:
+    from app.core.query_instrumentation import QueryInstrumentationMiddleware
+    app.add_middleware(QueryInstrumentationMiddleware)
+
+# Reads after a client's own write go to the primary until the replica has it (app/core/read_replica.py)
+from app.core.database import read_router
+if read_router.enabled:
+    from app.core.read_replica import ReadYourWritesMiddleware
+    app.add_middleware(ReadYourWritesMiddleware)
+
 # Import and include routers
 import sys
 import os
-import asyncpg
 
 # Ensure proper path setup
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -74,6 +84,43 @@ except ImportError as e:
             "error": str(e)
         }
 
+# Background workers
+@app.on_event("startup")
+async def start_background_workers():
+    """
+    Start the receipt worker (post-payment PDF, Cloudinary upload, WhatsApp), the fee
+    balance reconciler and the alert broker behind /alerts/stream
+    """
+    if settings.RECEIPT_WORKER_ENABLED:
+        from app.services.receipt_pipeline import receipt_pipeline
+        await receipt_pipeline.start()
+    if settings.FEE_BALANCE_RECONCILE_INTERVAL_SECONDS > 0:
+        from app.services.fee_balance_reconciler import fee_balance_reconciler
+        await fee_balance_reconciler.start()
+    from app.services.alert_broker import alert_broker
+    try:
+        await alert_broker.start()
+    except Exception as e:
+        # Streams retry on first use; clients keep polling meanwhile
+        print(f"⚠️ Alert broker not started: {e}")
+
+
+@app.on_event("shutdown")
+async def stop_background_workers():
+    if settings.RECEIPT_WORKER_ENABLED:
+        from app.services.receipt_pipeline import receipt_pipeline
+        await receipt_pipeline.stop()
+    if settings.FEE_BALANCE_RECONCILE_INTERVAL_SECONDS > 0:
+        from app.services.fee_balance_reconciler import fee_balance_reconciler
+        await fee_balance_reconciler.stop()
+    from app.services.receipt_batch import receipt_batch_renderer
+    receipt_batch_renderer.shutdown()
+    from app.services.alert_broker import alert_broker
+    await alert_broker.stop()
+    from app.core.integrations import shutdown_integrations
+    shutdown_integrations()
+
+
 # Basic routes
 @app.get("/")
 async def root():
@@ -87,26 +134,22 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    import asyncpg
-    from app.core.config import settings
+    from app.core.database import async_engine, pool_metrics
+    from app.core.db_pool import check_database
 
-    # Test database connectivity
-    db_status = "unknown"
-    try:
-        # Use the original DATABASE_URL for asyncpg connection
-        conn = await asyncpg.connect(settings.DATABASE_URL)
-        schema = await conn.fetchval("SELECT current_schema()")
-        user_count = await conn.fetchval("SELECT COUNT(*) FROM users")
-        await conn.close()
-        db_status = f"connected (schema: {schema}, users: {user_count})"
-    except Exception as e:
-        db_status = f"error: {str(e)}"
+    # Cheap probe over a pooled connection (no new connection per health check)
+    database = await check_database(async_engine)
+    db_status = database["status"]
+    if "latency_ms" in database:
+        db_status = f"{db_status} ({database['latency_ms']} ms)"
+    pool = pool_metrics.get_stats()
 
     return {
         "status": "healthy",
         "service": "Sunrise Backend FastAPI",
         "environment": environment,
         "database": db_status,
+        "db_pool": {key: pool[key] for key in ("checked_out", "capacity", "saturation") if key in pool},
         "cors_origins": cors_origins
     }
 
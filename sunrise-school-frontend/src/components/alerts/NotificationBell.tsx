@@ -31,8 +31,10 @@ import { alertAPI } from '../../services/alertService';
 import { Alert } from '../../types/alert';
 import { formatDistanceToNow } from 'date-fns';
 
-// Polling interval for unread count (30 seconds)
+// Polling interval for unread count when the alert stream is unavailable (30 seconds)
 const POLL_INTERVAL = 30000;
+// Slower backstop poll while the stream is open, for any update the stream missed (5 minutes)
+const STREAM_POLL_INTERVAL = 300000;
 // Number of alerts to show in dropdown
 const DROPDOWN_ALERT_COUNT = 5;
 
@@ -77,11 +79,38 @@ const NotificationBell: React.FC<NotificationBellProps> = ({ color = 'inherit' }
     }
   }, []);
 
-  // Initial fetch and polling
+  // Pushed updates, with fast polling while the stream is unavailable and slow polling while it is open
   useEffect(() => {
-    fetchUnreadCount();
-    const interval = setInterval(fetchUnreadCount, POLL_INTERVAL);
-    return () => clearInterval(interval);
+    let interval: ReturnType<typeof setInterval> | null = null;
+    let intervalMs = 0;
+    const poll = (ms: number) => {
+      if (interval && intervalMs === ms) {
+        return;
+      }
+      stopPolling();
+      fetchUnreadCount();
+      intervalMs = ms;
+      interval = setInterval(fetchUnreadCount, ms);
+    };
+    const stopPolling = () => {
+      if (interval) {
+        clearInterval(interval);
+        interval = null;
+      }
+    };
+
+    const unsubscribe = alertAPI.subscribe({
+      onUnreadCount: setUnreadCount,
+      onAvailable: () => poll(STREAM_POLL_INTERVAL),
+      onUnavailable: () => poll(POLL_INTERVAL),
+    });
+    if (!unsubscribe) {
+      poll(POLL_INTERVAL);
+    }
+    return () => {
+      stopPolling();
+      unsubscribe?.();
+    };
   }, [fetchUnreadCount]);
 
   // Handle bell click
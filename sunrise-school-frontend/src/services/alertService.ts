@@ -4,6 +4,7 @@
  */
 
 import api from './api';
+import { API_BASE_URL } from '../config/apiConfig';
 import {
   Alert,
   AlertListResponse,
@@ -102,6 +103,37 @@ export const alertAPI = {
     const response = await api.delete(`/alerts/${alertId}`);
     return response.data;
   },
+
+  /**
+   * Subscribe to pushed alerts and unread count changes (server-sent events).
+   * Returns a function that closes the stream, or null when streaming is not
+   * available (no EventSource or not logged in) and the caller should poll.
+   * onUnavailable is called when the stream fails; EventSource keeps retrying.
+   */
+  subscribe: (handlers: {
+    onUnreadCount: (count: number) => void;
+    onAlert?: (alert: Partial<Alert>) => void;
+    onAvailable?: () => void;
+    onUnavailable?: () => void;
+  }): (() => void) | null => {
+    const token = localStorage.getItem('authToken');
+    if (typeof EventSource === 'undefined' || !token) {
+      return null;
+    }
+
+    const source = new EventSource(`${API_BASE_URL}/alerts/stream?token=${encodeURIComponent(token)}`);
+    source.onopen = () => handlers.onAvailable?.();
+    source.onerror = () => handlers.onUnavailable?.();
+    source.addEventListener('unread_count', (event) => {
+      handlers.onUnreadCount(JSON.parse((event as MessageEvent).data).unread_count);
+    });
+    source.addEventListener('alert', (event) => {
+      const data = JSON.parse((event as MessageEvent).data);
+      handlers.onUnreadCount(data.unread_count);
+      handlers.onAlert?.(data.alert);
+    });
+    return () => source.close();
+  },
 };
 
 export default alertAPI;
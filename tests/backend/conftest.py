@@ -5,6 +5,8 @@ This module contains pytest fixtures and configuration that are shared
 across all test modules in the test suite.
 """
 import asyncio
+import os
+import sys
 import pytest
 import pytest_asyncio
 from typing import AsyncGenerator, Generator
@@ -13,9 +15,13 @@ from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from fastapi.testclient import TestClient
 
+# Make the backend package importable when tests run from the repository root
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "sunrise-backend-fastapi"))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
 from app.core.config import settings
-from app.core.database import get_db
-from app.models.base import Base
+from app.core.database import Base, get_db
 from main import app
 
 
@@ -0,0 +1,110 @@
+"""
+In-memory SQLite database helpers for tests and benchmarks.
+
+Tests create just the tables they need; PostgreSQL JSONB columns are created
+as SQLite JSON. Unit tests build their databases through the
+``sqlite_session_factory`` fixture in ``unit/conftest.py``. ``QueryCounter``
+records every statement sent to the engine so tests can assert a fixed number
+of round-trips.
+"""
+import importlib
+import os
+import sys
+from contextlib import contextmanager
+from datetime import date
+from typing import Iterable, List
+
+from sqlalchemy import event
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+# Make the backend package importable when tests run from the repository root
+BACKEND_DIR = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "..", "..", "sunrise-backend-fastapi")
+)
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from app.core.database import Base  # noqa: E402
+
+# Register every mapper; Student relationships also need the transport models
+for _models_module in ("app.models", "app.models.transport"):
+    importlib.import_module(_models_module)
+
+from app.models.metadata import Class, Gender, SessionYear  # noqa: E402
+
+TEST_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
+
+
+@compiles(JSONB, "sqlite")
+def _compile_jsonb_for_sqlite(type_, compiler, **kw):
+    return "JSON"
+
+
+def create_test_engine():
+    """Create a single-connection in-memory SQLite engine"""
+    return create_async_engine(
+        TEST_DATABASE_URL,
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+
+
+def create_session_factory(engine):
+    """Create a session factory bound to the given engine"""
+    return sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+
+async def create_tables(engine, models: Iterable) -> None:
+    """Create only the tables backing the given models"""
+    tables = [model.__table__ for model in models]
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all, tables=tables)
+
+
+async def seed_core_metadata(session: AsyncSession) -> None:
+    """Insert the session years, genders and classes most tests depend on"""
+    session.add_all([
+        SessionYear(id=3, name="2024-25", description="2024-25",
+                    start_date=date(2024, 4, 1), end_date=date(2025, 3, 31)),
+        SessionYear(id=4, name="2025-26", description="2025-26",
+                    start_date=date(2025, 4, 1), end_date=date(2026, 3, 31), is_current=True),
+        SessionYear(id=5, name="2026-27", description="2026-27",
+                    start_date=date(2026, 4, 1), end_date=date(2027, 3, 31)),
+        Gender(id=1, name="MALE", description="Male"),
+        Gender(id=2, name="FEMALE", description="Female"),
+    ])
+    session.add_all([
+        Class(id=class_id, name=f"CLASS_{class_id}", description=f"Class {class_id}", sort_order=class_id)
+        for class_id in range(1, 13)
+    ])
+    await session.commit()
+
+
+class QueryCounter:
+    """Collects the SQL statements executed on an engine while active"""
+
+    def __init__(self):
+        self.statements: List[str] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+
+@contextmanager
+def count_queries(engine):
+    """Count statements executed on ``engine`` inside the ``with`` block"""
+    counter = QueryCounter()
+    sync_engine = engine.sync_engine
+    event.listen(sync_engine, "before_cursor_execute", counter._before_cursor_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", counter._before_cursor_execute)
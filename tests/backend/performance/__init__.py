@@ -0,0 +1,6 @@
+"""
+Performance benchmarks.
+
+Benchmarks are marked ``slow`` and print their measurements; run them with
+``python -m pytest ../tests/backend/performance -m slow -s``.
+"""
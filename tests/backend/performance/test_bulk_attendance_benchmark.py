@@ -0,0 +1,144 @@
+"""
+Benchmark for bulk attendance marking.
+
+Compares the batched upsert with the previous pattern (one SELECT per student
+to decide insert vs update) for a 60-student class and for a whole school of
+12 classes, reporting statement count and latency for first marking and for
+re-marking the same day.
+"""
+
+import time
+from datetime import date, datetime
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import and_, delete, select
+
+from fixtures.sqlite_db import create_test_engine, create_session_factory, create_tables, count_queries
+from app.crud.crud_attendance import attendance_record_crud
+from app.models.attendance import AttendanceRecord
+from app.schemas.attendance import BulkAttendanceCreate, BulkAttendanceSchoolCreate
+
+CLASS_SIZE = 60
+CLASS_COUNT = 12
+DAY = date(2025, 7, 14)
+
+
+def class_records(class_id, status_id):
+    first_student = (class_id - 1) * CLASS_SIZE + 1
+    return [
+        {"student_id": student_id, "attendance_status_id": status_id}
+        for student_id in range(first_student, first_student + CLASS_SIZE)
+    ]
+
+
+@pytest_asyncio.fixture
+async def attendance_db():
+    engine = create_test_engine()
+    await create_tables(engine, [AttendanceRecord])
+    yield engine, create_session_factory(engine)
+    await engine.dispose()
+
+
+async def _legacy_bulk(db, bulk_data, marked_by):
+    """Replays the old per-student SELECT then INSERT/UPDATE pattern"""
+    for item in bulk_data.records:
+        existing = (await db.execute(
+            select(AttendanceRecord).where(
+                and_(
+                    AttendanceRecord.student_id == item.student_id,
+                    AttendanceRecord.attendance_date == bulk_data.attendance_date,
+                    AttendanceRecord.attendance_period_id == bulk_data.attendance_period_id
+                )
+            )
+        )).scalar_one_or_none()
+        if existing:
+            existing.attendance_status_id = item.attendance_status_id
+            existing.marked_by = marked_by
+            existing.updated_at = datetime.utcnow()
+        else:
+            db.add(AttendanceRecord(
+                student_id=item.student_id, class_id=bulk_data.class_id,
+                session_year_id=bulk_data.session_year_id, attendance_date=bulk_data.attendance_date,
+                attendance_status_id=item.attendance_status_id,
+                attendance_period_id=bulk_data.attendance_period_id, marked_by=marked_by
+            ))
+    await db.commit()
+
+
+async def _measure(engine, session_factory, work):
+    async with session_factory() as db:
+        start = time.perf_counter()
+        with count_queries(engine) as counter:
+            await work(db)
+        return counter.count, (time.perf_counter() - start) * 1000
+
+
+async def _reset(session_factory):
+    async with session_factory() as db:
+        await db.execute(delete(AttendanceRecord))
+        await db.commit()
+
+
+@pytest.mark.slow
+@pytest.mark.asyncio
+async def test_bulk_attendance_upsert_vs_row_by_row(attendance_db):
+    engine, session_factory = attendance_db
+    results = []
+
+    def one_class(status_id):
+        return BulkAttendanceCreate(
+            class_id=1, session_year_id=4, attendance_date=DAY, records=class_records(1, status_id)
+        )
+
+    def whole_school(status_id):
+        return BulkAttendanceSchoolCreate(
+            session_year_id=4, attendance_date=DAY,
+            classes=[
+                {"class_id": class_id, "records": class_records(class_id, status_id)}
+                for class_id in range(1, CLASS_COUNT + 1)
+            ]
+        )
+
+    for scenario, status_id in [("first mark", 1), ("re-mark", 2)]:
+        if scenario == "first mark":
+            await _reset(session_factory)
+        legacy = await _measure(engine, session_factory, lambda db: _legacy_bulk(db, one_class(status_id), 7))
+        if scenario == "first mark":
+            await _reset(session_factory)
+        batched = await _measure(
+            engine, session_factory,
+            lambda db: attendance_record_crud.create_bulk(db, bulk_data=one_class(status_id), marked_by=7)
+        )
+        results.append((f"class, {scenario}", legacy, batched))
+
+    for scenario, status_id in [("first mark", 1), ("re-mark", 2)]:
+        if scenario == "first mark":
+            await _reset(session_factory)
+
+        async def legacy_school(db, status_id=status_id):
+            for class_id in range(1, CLASS_COUNT + 1):
+                await _legacy_bulk(db, BulkAttendanceCreate(
+                    class_id=class_id, session_year_id=4, attendance_date=DAY,
+                    records=class_records(class_id, status_id)
+                ), 7)
+
+        legacy = await _measure(engine, session_factory, legacy_school)
+        if scenario == "first mark":
+            await _reset(session_factory)
+        batched = await _measure(
+            engine, session_factory,
+            lambda db: attendance_record_crud.create_bulk_school(db, bulk_data=whole_school(status_id), marked_by=7)
+        )
+        results.append((f"school, {scenario}", legacy, batched))
+
+    print(f"\nbulk attendance benchmark ({CLASS_SIZE} students per class, {CLASS_COUNT} classes)")
+    print(f"{'scenario':>20} {'legacy q':>9} {'legacy ms':>10} {'upsert q':>9} {'upsert ms':>10}")
+    for scenario, (legacy_q, legacy_ms), (batched_q, batched_ms) in results:
+        print(f"{scenario:>20} {legacy_q:>9} {legacy_ms:>10.1f} {batched_q:>9} {batched_ms:>10.1f}")
+
+    for _, (legacy_q, _), (batched_q, _) in results:
+        assert batched_q < legacy_q
+    async with session_factory() as db:
+        rows = (await db.execute(select(AttendanceRecord.attendance_status_id))).scalars().all()
+    assert len(rows) == CLASS_SIZE * CLASS_COUNT and set(rows) == {2}
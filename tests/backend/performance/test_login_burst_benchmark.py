@@ -0,0 +1,82 @@
+"""
+Benchmark: latency of unrelated requests during a login burst.
+
+Simulates a morning burst of teacher logins (concurrent bcrypt verifications)
+while a probe repeatedly calls a cheap endpoint, and reports the probe's
+p50/p99 latency with bcrypt on the event loop versus in the password hash pool.
+"""
+
+import asyncio
+import statistics
+import time
+
+import pytest
+
+from app.api.v1.endpoints.auth import logout
+from app.core.security import PasswordHashPool, pwd_context, verify_password
+
+LOGINS = 24
+PROBE_INTERVAL_S = 0.005
+PASSWORD = "Teacher@2025"
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run_burst(login):
+    """Run LOGINS concurrent logins and probe the loop until they finish"""
+    latencies = []
+    done = asyncio.Event()
+
+    async def probe():
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(PROBE_INTERVAL_S)
+            await logout()
+            latencies.append((time.perf_counter() - start - PROBE_INTERVAL_S) * 1000)
+
+    probe_task = asyncio.create_task(probe())
+    start = time.perf_counter()
+    results = await asyncio.gather(*(login() for _ in range(LOGINS)))
+    burst_ms = (time.perf_counter() - start) * 1000
+    done.set()
+    await probe_task
+
+    assert all(results)
+    return burst_ms, latencies
+
+
+@pytest.mark.slow
+@pytest.mark.asyncio
+async def test_probe_latency_during_login_burst():
+    stored_hash = pwd_context.hash(PASSWORD)
+
+    async def blocking_login():
+        # Previous behaviour: bcrypt called directly inside the async handler
+        await asyncio.sleep(0)
+        return verify_password(PASSWORD, stored_hash)
+
+    pool = PasswordHashPool(max_concurrency=4)
+
+    async def pooled_login():
+        return await pool.run(pwd_context.verify, PASSWORD, stored_hash)
+
+    blocking_ms, blocking_latencies = await run_burst(blocking_login)
+    pooled_ms, pooled_latencies = await run_burst(pooled_login)
+
+    print(f"\nlogin burst benchmark ({LOGINS} concurrent logins)")
+    print(f"{'mode':>9} {'burst ms':>9} {'probes':>7} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for mode, burst_ms, latencies in [
+        ("blocking", blocking_ms, blocking_latencies),
+        ("pooled", pooled_ms, pooled_latencies),
+    ]:
+        print(
+            f"{mode:>9} {burst_ms:>9.0f} {len(latencies):>7} "
+            f"{statistics.median(latencies):>8.1f} {percentile(latencies, 99):>8.1f} {max(latencies):>8.1f}"
+        )
+    print(f"pool stats: {pool.get_stats()}")
+
+    assert percentile(pooled_latencies, 99) < percentile(blocking_latencies, 99)
@@ -0,0 +1,79 @@
+"""
+Micro-benchmark for batch receipt reprints.
+
+Renders a month-end sized batch of fee receipts and reports receipts/second:
+
+- sequential: one receipt after another on the event loop thread, which is
+  what replaying the per-payment path costs
+- batch: the batch renderer's process pool, merged into one print-ready PDF
+- cached: the same batch again, served from the receipt PDF cache
+"""
+
+import asyncio
+import os
+import time
+
+import pytest
+from fastapi.encoders import jsonable_encoder
+
+from app.models.receipt_job import ReceiptJob
+from app.services.receipt_batch import ReceiptBatchRenderer, merge_receipt_pdfs
+from app.services.receipt_pipeline import render_receipt_pdf
+from app.services.receipt_renderer import ReceiptPDFCache
+
+RECEIPTS = 120
+PROCESSES = max(min(os.cpu_count() or 1, 4), 2)
+
+
+def make_jobs():
+    jobs = []
+    for payment_id in range(1, RECEIPTS + 1):
+        payload = jsonable_encoder({
+            "payment_data": {"id": payment_id, "amount": 3000.0, "payment_date_str": "31-Mar-2026",
+                             "receipt_number": f"FEE-{payment_id:06d}"},
+            "student_data": {"name": f"Student {payment_id}", "admission_number": f"ADM{payment_id:04d}",
+                             "class_name": "Class 5 - A", "roll_number": str(payment_id)},
+            "month_breakdown": [
+                {"month_name": month, "monthly_fee": 1000.0, "previous_paid": 0.0, "allocated_amount": 1000.0,
+                 "remaining_balance": 0.0}
+                for month in ("January", "February", "March")
+            ],
+            "fee_summary": {"total_annual_fee": 12000.0, "total_paid": 12000.0, "balance_remaining": 0.0},
+            "transport_data": None
+        })
+        jobs.append(ReceiptJob(id=payment_id, job_type="FEE", fee_payment_id=payment_id,
+                               receipt_number=f"FEE-{payment_id:06d}", payload=payload))
+    return jobs
+
+
+@pytest.mark.slow
+def test_batch_receipt_throughput():
+    jobs = make_jobs()
+    render_receipt_pdf("FEE", jobs[0].payload)  # warm the shared renderer
+
+    start = time.perf_counter()
+    merge_receipt_pdfs([render_receipt_pdf(job.job_type, job.payload) for job in jobs])
+    sequential_rate = RECEIPTS / (time.perf_counter() - start)
+
+    renderer = ReceiptBatchRenderer(
+        pdf_cache=ReceiptPDFCache(max_bytes=256 * 1024 * 1024, directory=""), processes=PROCESSES
+    )
+    try:
+        asyncio.run(renderer.render_merged(jobs[:PROCESSES]))  # start the worker processes
+        renderer.pdf_cache.clear()
+
+        _, batch = asyncio.run(renderer.render_merged(jobs))
+        merged, cached = asyncio.run(renderer.render_merged(jobs))
+    finally:
+        renderer.shutdown()
+
+    print(f"\nBatch receipt benchmark ({RECEIPTS} fee receipts, {PROCESSES} processes, receipts/second)")
+    print(f"{'sequential':>12} {sequential_rate:>10.1f}")
+    print(f"{'batch':>12} {batch['receipts_per_second']:>10.1f}")
+    print(f"{'cached':>12} {cached['receipts_per_second']:>10.1f}")
+    print(f"merged PDF: {len(merged) // 1024} KB")
+
+    assert batch["rendered"] == RECEIPTS and cached["cache_hits"] == RECEIPTS
+    if (os.cpu_count() or 1) >= 2:
+        assert batch["receipts_per_second"] > sequential_rate
+    assert cached["receipts_per_second"] > batch["receipts_per_second"] * 2
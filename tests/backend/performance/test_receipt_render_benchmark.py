@@ -0,0 +1,67 @@
+"""
+Micro-benchmark for receipt rendering.
+
+Renders the same fee receipt through three paths and reports receipts/second:
+
+- cold: a new renderer per receipt (stylesheet rebuilt, logo read and encoded
+  again), which is what every receipt used to cost
+- shared: the process-wide renderer with preloaded styles, encoded logo and
+  prebuilt header
+- cached: a reprint served from the receipt PDF cache
+"""
+
+import time
+
+import pytest
+from fastapi.encoders import jsonable_encoder
+
+from app.services import receipt_generator
+from app.services.receipt_pipeline import render_receipt_pdf
+from app.services.receipt_renderer import ReceiptPDFCache, ReceiptRenderer, receipt_cache_key
+
+RECEIPTS = 40
+
+PAYLOAD = jsonable_encoder({
+    "payment_data": {"id": 1, "amount": 3000.0, "payment_date_str": "05-Jun-2025", "receipt_number": "FEE-000001"},
+    "student_data": {"name": "Asha Verma", "admission_number": "ADM001", "class_name": "Class 5 - A",
+                     "roll_number": "12", "father_name": "Ravi Verma", "mobile": "9876543210"},
+    "month_breakdown": [
+        {"month_name": month, "monthly_fee": 1000.0, "previous_paid": 0.0, "allocated_amount": 1000.0,
+         "remaining_balance": 0.0}
+        for month in ("April", "May", "June")
+    ],
+    "fee_summary": {"total_annual_fee": 12000.0, "total_paid": 3000.0, "balance_remaining": 9000.0},
+    "transport_data": None
+})
+
+
+def _receipts_per_second(render) -> float:
+    start = time.perf_counter()
+    for _ in range(RECEIPTS):
+        render()
+    return RECEIPTS / (time.perf_counter() - start)
+
+
+@pytest.mark.slow
+def test_receipt_rendering_throughput(monkeypatch):
+    def cold():
+        monkeypatch.setattr(receipt_generator, "receipt_renderer", ReceiptRenderer())
+        return render_receipt_pdf("FEE", PAYLOAD)
+
+    cold_rate = _receipts_per_second(cold)
+    monkeypatch.undo()
+
+    render_receipt_pdf("FEE", PAYLOAD)  # warm the shared renderer
+    shared_rate = _receipts_per_second(lambda: render_receipt_pdf("FEE", PAYLOAD))
+
+    cache = ReceiptPDFCache(max_bytes=16 * 1024 * 1024, directory="")
+    key = receipt_cache_key("FEE", 1, PAYLOAD)
+    cached_rate = _receipts_per_second(lambda: cache.get_or_render(key, lambda: render_receipt_pdf("FEE", PAYLOAD)))
+
+    print("\nReceipt rendering benchmark (fee receipt, receipts/second)")
+    print(f"{'cold renderer':>16} {cold_rate:>10.1f}")
+    print(f"{'shared renderer':>16} {shared_rate:>10.1f}")
+    print(f"{'cached reprint':>16} {cached_rate:>10.1f}")
+
+    assert shared_rate > cold_rate * 2
+    assert cached_rate > shared_rate * 10
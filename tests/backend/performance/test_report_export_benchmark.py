@@ -0,0 +1,108 @@
+"""
+Benchmark for the streamed UDISE report export.
+
+Exports a synthetic school of 10k and 50k students as CSV through the streaming
+path (batched database cursor into the CSV writer) and through the previous
+pattern (load every row, then build the file), reporting latency, output size
+and peak Python memory. Streaming memory should stay flat as the school grows.
+"""
+
+import csv
+import io
+import time
+import tracemalloc
+from datetime import date
+
+import pytest
+from sqlalchemy import insert
+
+from fixtures.sqlite_db import create_test_engine, create_session_factory, create_tables, seed_core_metadata
+from app.api.v1.endpoints.reports import UDISE_EXPORT_COLUMNS
+from app.crud.crud_report import report_crud
+from app.models.metadata import Class, Gender, SessionYear
+from app.models.student import Student
+from app.utils.report_export import stream_csv
+
+STUDENT_COUNTS = [10_000, 50_000]
+
+
+async def _build_school(student_count: int):
+    engine = create_test_engine()
+    await create_tables(engine, [SessionYear, Gender, Class, Student])
+    session_factory = create_session_factory(engine)
+    async with session_factory() as session:
+        await seed_core_metadata(session)
+        await session.execute(insert(Student), [
+            {
+                "admission_number": f"BENCH{index:06d}", "first_name": "Student", "last_name": str(index),
+                "date_of_birth": date(2012 + index % 6, 1 + index % 12, 1 + index % 28),
+                "gender_id": 1 + index % 2, "class_id": 1 + index % 12, "section": "ABCD"[index % 4],
+                "session_year_id": 4, "admission_date": date(2025, 4, 1),
+                "father_name": f"Father {index}", "father_phone": f"98{index:08d}",
+                "mother_name": f"Mother {index}", "address": f"{index} Main Road", "city": "Lucknow",
+                "state": "Uttar Pradesh", "postal_code": "226001", "is_active": True,
+            }
+            for index in range(student_count)
+        ])
+        await session.commit()
+    return engine, session_factory
+
+
+async def _streamed_export(session_factory) -> int:
+    size = 0
+    async with session_factory() as db:
+        batches = report_crud.stream_udise_records(db, session_year_id=4)
+        async for chunk in stream_csv(UDISE_EXPORT_COLUMNS, batches):
+            size += len(chunk)
+    return size
+
+
+async def _buffered_export(session_factory, student_count: int) -> int:
+    """Replays the load-everything pattern for comparison"""
+    async with session_factory() as db:
+        records, _ = await report_crud.get_udise_report_data(db, session_year_id=4, per_page=student_count)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([header for _, header in UDISE_EXPORT_COLUMNS])
+    for record in records:
+        writer.writerow([record.get(key) for key, _ in UDISE_EXPORT_COLUMNS])
+    return len(buffer.getvalue().encode("utf-8"))
+
+
+async def _measure(export):
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        size = await export
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return elapsed_ms, size, peak / (1024 * 1024)
+
+
+@pytest.mark.slow
+@pytest.mark.asyncio
+async def test_udise_export_memory_is_bounded():
+    print("\nUDISE export benchmark (CSV)")
+    print(f"{'students':>8} {'stream ms':>10} {'stream MB':>10} {'buffer ms':>10} {'buffer MB':>10} {'file MB':>8}")
+
+    streamed_peaks = {}
+    buffered_peaks = {}
+    for student_count in STUDENT_COUNTS:
+        engine, session_factory = await _build_school(student_count)
+        try:
+            stream_ms, size, streamed_peaks[student_count] = await _measure(_streamed_export(session_factory))
+            buffer_ms, _, buffered_peaks[student_count] = await _measure(
+                _buffered_export(session_factory, student_count)
+            )
+        finally:
+            await engine.dispose()
+
+        print(f"{student_count:>8} {stream_ms:>10.1f} {streamed_peaks[student_count]:>10.1f} "
+              f"{buffer_ms:>10.1f} {buffered_peaks[student_count]:>10.1f} {size / (1024 * 1024):>8.1f}")
+
+    small, large = STUDENT_COUNTS
+    # Five times the students, roughly the same working set
+    assert streamed_peaks[large] < streamed_peaks[small] * 2
+    assert streamed_peaks[large] < buffered_peaks[large] / 5
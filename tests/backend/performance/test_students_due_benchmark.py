@@ -0,0 +1,131 @@
+"""
+Benchmark for /fees/students-due.
+
+Compares the batched due fee engine with the previous per-student pattern
+(one fee structure query and one payments query per student) on a synthetic
+school, reporting query count and latency per page size.
+"""
+
+import time
+from datetime import date
+from decimal import Decimal
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import and_, select
+from sqlalchemy.orm import joinedload
+
+from fixtures.sqlite_db import (
+    create_test_engine, create_session_factory, create_tables,
+    seed_core_metadata, count_queries
+)
+from app.api.v1.endpoints.fees import get_students_with_due_fees
+from app.crud import fee_structure_crud
+from app.models.fee import FeeStructure, FeeRecord, FeePayment, MonthlyFeeTracking, StudentFeeBalance
+from app.models.metadata import Class, Gender, SessionYear
+from app.models.student import Student
+from app.models.transport import TransportMonthlyTracking
+from app.schemas.fee import SessionYearEnum
+
+STUDENT_COUNT = 1500
+PAGE_SIZES = [25, 50, 100]
+
+
+@pytest_asyncio.fixture
+async def school_db():
+    engine = create_test_engine()
+    await create_tables(engine, [
+        SessionYear, Gender, Class, Student, FeeStructure, FeeRecord, FeePayment, MonthlyFeeTracking,
+        TransportMonthlyTracking, StudentFeeBalance
+    ])
+    session_factory = create_session_factory(engine)
+    async with session_factory() as session:
+        await seed_core_metadata(session)
+        for class_id in range(1, 13):
+            session.add(FeeStructure(
+                class_id=class_id, session_year_id=4,
+                total_annual_fee=Decimal(12000 + class_id * 600)
+            ))
+        students = [
+            Student(
+                admission_number=f"BENCH{index:05d}", first_name="Student", last_name=str(index),
+                date_of_birth=date(2015, 1, 1), gender_id=1 + index % 2, class_id=(index % 12) + 1,
+                session_year_id=4, father_name="Father", mother_name="Mother",
+                admission_date=date(2025, 4, 1), is_active=True
+            )
+            for index in range(STUDENT_COUNT)
+        ]
+        session.add_all(students)
+        await session.flush()
+        fee_records = [
+            FeeRecord(
+                student_id=student.id, session_year_id=4, class_id=student.class_id,
+                payment_type_id=1, total_amount=Decimal("12000.00"),
+                balance_amount=Decimal("12000.00"), due_date=date(2025, 4, 10)
+            )
+            for student in students
+        ]
+        session.add_all(fee_records)
+        await session.flush()
+        session.add_all([
+            FeePayment(
+                fee_record_id=fee_record.id, amount=Decimal(1000 * (1 + index % 6)),
+                payment_method_id=1, payment_date=date(2025, 4, 5)
+            )
+            for index, fee_record in enumerate(fee_records)
+        ])
+        await session.commit()
+
+    yield engine, session_factory
+    await engine.dispose()
+
+
+async def _legacy_page(db, students):
+    """Replays the old per-student query pattern for comparison"""
+    for student in students:
+        await fee_structure_crud.get_by_class_and_session(
+            db, class_name=student.class_ref.name, session_year="2025-26"
+        )
+        await db.execute(
+            select(FeePayment).join(FeeRecord).where(
+                and_(FeeRecord.student_id == student.id, FeeRecord.session_year_id == 4)
+            )
+        )
+
+
+@pytest.mark.slow
+@pytest.mark.asyncio
+async def test_students_due_query_count_is_constant(school_db):
+    engine, session_factory = school_db
+
+    print(f"\nstudents-due benchmark ({STUDENT_COUNT} students)")
+    print(f"{'per_page':>8} {'batched q':>10} {'batched ms':>11} {'legacy q':>9} {'legacy ms':>10}")
+
+    batched_counts = set()
+    for per_page in PAGE_SIZES:
+        async with session_factory() as db:
+            start = time.perf_counter()
+            with count_queries(engine) as batched:
+                response = await get_students_with_due_fees(
+                    session_year=SessionYearEnum.YEAR_2025_26, frequency="quarterly",
+                    class_id=None, search=None, page=2, per_page=per_page,
+                    db=db, current_user=None
+                )
+            batched_ms = (time.perf_counter() - start) * 1000
+            assert len(response["students"]) == per_page
+
+        async with session_factory() as db:
+            page_students = (await db.execute(
+                select(Student).options(joinedload(Student.class_ref))
+                .order_by(Student.id).offset(per_page).limit(per_page)
+            )).scalars().all()
+            start = time.perf_counter()
+            with count_queries(engine) as legacy:
+                await _legacy_page(db, page_students)
+            legacy_ms = (time.perf_counter() - start) * 1000
+
+        batched_counts.add(batched.count)
+        # Legacy query count includes the same count and page queries as the batched path
+        print(f"{per_page:>8} {batched.count:>10} {batched_ms:>11.1f} {legacy.count + 2:>9} {legacy_ms:>10.1f}")
+
+    assert batched_counts == {5}
@@ -1,6 +1,4 @@
 import asyncio
-import os
-import sys
 import pytest
 import pytest_asyncio
 from httpx import AsyncClient
@@ -8,21 +6,16 @@ from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
-# Add the parent directory (sunrise-backend-fastapi) to the path so we can import from app
-current_dir = os.path.dirname(os.path.abspath(__file__))
-parent_dir = os.path.dirname(current_dir)  # api-tests
-grandparent_dir = os.path.dirname(parent_dir)  # sunrise-backend-fastapi
-sys.path.insert(0, grandparent_dir)
-
 from app.core.database import Base, get_db
 from app.core.config import settings
-from app.main import app
+from main import app
 from app.models.user import User
 from app.models.student import Student
 from app.models.fee import FeeRecord, FeeStructure
 from app.core.security import get_password_hash
 from decimal import Decimal
 from datetime import date
+from fixtures.sqlite_db import create_session_factory, create_tables, create_test_engine
 
 # Test database URL (use in-memory SQLite for testing)
 TEST_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
@@ -42,6 +35,33 @@ TestSessionLocal = sessionmaker(
 )
 
 
+@pytest_asyncio.fixture
+async def sqlite_session_factory():
+    """
+    Build isolated in-memory SQLite databases.
+
+    Call it with the models whose tables the test needs and an optional
+    ``seed(session)`` coroutine; the seed is committed and
+    ``(session_factory, engine)`` is returned. Engines are disposed on teardown.
+    """
+    engines = []
+
+    async def build(tables, seed=None):
+        engine = create_test_engine()
+        engines.append(engine)
+        await create_tables(engine, tables)
+        session_factory = create_session_factory(engine)
+        if seed is not None:
+            async with session_factory() as session:
+                await seed(session)
+                await session.commit()
+        return session_factory, engine
+
+    yield build
+    for engine in engines:
+        await engine.dispose()
+
+
 @pytest_asyncio.fixture
 async def db_session():
     """Create a test database session"""
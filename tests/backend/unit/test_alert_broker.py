@@ -0,0 +1,198 @@
+"""
+Test cases for the alert push channel: audience fan-out, publication on commit,
+and the server-sent event stream
+"""
+
+import asyncio
+import json
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import update
+
+from app.crud.crud_alert import alert_crud
+from app.models.alert import Alert, AlertUnreadCounter
+from app.services import alert_broker as broker_module
+from app.services.alert_broker import (
+    ALERT_CREATED, COUNT_CHANGED, AlertBroker, AlertEvent, InProcessAlertBackend, stream_alert_events
+)
+
+
+async def drain(subscription):
+    await asyncio.sleep(0)
+    events = []
+    while not subscription.queue.empty():
+        events.append(subscription.queue.get_nowait())
+    return events
+
+
+def parse_sse(message: str):
+    if message.startswith(":"):
+        return "comment", None
+    lines = dict(line.split(": ", 1) for line in message.strip().split("\n"))
+    return lines["event"], json.loads(lines["data"])
+
+
+@pytest_asyncio.fixture
+async def broker(monkeypatch):
+    broker = AlertBroker(InProcessAlertBackend())
+    await broker.start()
+    monkeypatch.setattr(broker_module, "alert_broker", broker)
+    yield broker
+    await broker.stop()
+
+
+@pytest_asyncio.fixture
+async def db_factory(sqlite_session_factory):
+    session_factory, _ = await sqlite_session_factory([Alert, AlertUnreadCounter])
+    return session_factory
+
+
+async def create_alert(db, **target):
+    return await alert_crud.create_alert(
+        db, alert_type_id=1, title="Leave request", message="Pending approval",
+        entity_type="LEAVE_REQUEST", entity_id=7, **target
+    )
+
+
+class TestFanOut:
+    @pytest.mark.asyncio
+    async def test_events_reach_targeted_user_role_or_everyone(self, broker):
+        admin = broker.subscribe(1, "ADMIN")
+        teacher = broker.subscribe(2, "TEACHER")
+        other_teacher = broker.subscribe(3, "TEACHER")
+
+        await broker.publish([
+            AlertEvent(event=ALERT_CREATED, user_ids=frozenset({2})),
+            AlertEvent(event=ALERT_CREATED, roles=frozenset({"TEACHER"})),
+            AlertEvent(event=COUNT_CHANGED, everyone=True),
+        ])
+
+        assert len(await drain(admin)) == 1
+        assert len(await drain(teacher)) == 3
+        assert len(await drain(other_teacher)) == 2
+        assert broker.get_stats()["delivered"] == 6
+
+    @pytest.mark.asyncio
+    async def test_unsubscribed_stream_receives_nothing(self, broker):
+        subscription = broker.subscribe(1, "ADMIN")
+        broker.unsubscribe(subscription)
+
+        await broker.publish([AlertEvent(event=COUNT_CHANGED, everyone=True)])
+
+        assert await drain(subscription) == []
+        assert broker.get_stats()["subscribers"] == 0
+
+    @pytest.mark.asyncio
+    async def test_full_queue_drops_events_and_flags_resync(self, broker, monkeypatch):
+        monkeypatch.setattr(broker_module.settings, "ALERT_STREAM_QUEUE_SIZE", 2)
+        subscription = broker.subscribe(1, "ADMIN")
+
+        await broker.publish([AlertEvent(event=ALERT_CREATED, everyone=True)] * 3)
+
+        assert subscription.overflowed is True
+        assert broker.get_stats()["dropped"] == 1
+
+
+class TestPublishOnCommit:
+    @pytest.mark.asyncio
+    async def test_created_alert_is_published_after_commit(self, broker, db_factory):
+        subscription = broker.subscribe(5, "TEACHER")
+        async with db_factory() as db:
+            alert = await create_alert(db, target_user_id=5)
+
+        [created] = await drain(subscription)
+        assert created.event == ALERT_CREATED
+        assert created.alert["id"] == alert.id and created.alert["title"] == "Leave request"
+
+    @pytest.mark.asyncio
+    async def test_rolled_back_alert_is_not_published(self, broker, db_factory):
+        subscription = broker.subscribe(5, "TEACHER")
+        async with db_factory() as db:
+            await create_alert(db, target_role="TEACHER", auto_commit=False)
+            await db.rollback()
+
+        assert await drain(subscription) == []
+        assert broker.get_stats()["published"] == 0
+
+    @pytest.mark.asyncio
+    async def test_status_changes_publish_count_changed(self, broker, db_factory):
+        async with db_factory() as db:
+            alert = await create_alert(db, target_role="TEACHER")
+            subscription = broker.subscribe(5, "TEACHER")
+
+            await alert_crud.mark_as_read(db, alert_id=alert.id, user_id=5)
+            [read] = await drain(subscription)
+
+        assert read.event == COUNT_CHANGED and read.roles == {"TEACHER"}
+
+    @pytest.mark.asyncio
+    async def test_mark_all_read_reaches_only_the_affected_buckets(self, broker, db_factory):
+        async with db_factory() as db:
+            await create_alert(db, target_user_id=5)
+            await create_alert(db, target_role="TEACHER")
+            await create_alert(db, target_role="ADMIN")
+            reader = broker.subscribe(5, "TEACHER")
+            colleague = broker.subscribe(6, "TEACHER")
+            admin = broker.subscribe(1, "ADMIN")
+
+            assert await alert_crud.mark_all_as_read(db, user_id=5, user_role="TEACHER") == 2
+            [changed] = await drain(reader)
+
+        assert changed.event == COUNT_CHANGED and not changed.everyone
+        assert (changed.user_ids, changed.roles) == ({5}, {"TEACHER"})
+        assert len(await drain(colleague)) == 1
+        assert await drain(admin) == []
+
+        async with db_factory() as db:
+            await db.execute(update(Alert).values(alert_status_id=1))
+            await db.commit()
+        # Other bulk updates no longer make every stream recount
+        assert await drain(admin) == []
+
+
+class TestStream:
+    @pytest.mark.asyncio
+    async def test_stream_pushes_alerts_and_coalesces_recounts(self, broker):
+        subscription = broker.subscribe(1, "ADMIN")
+        counts = iter([4, 2])
+        recounts = []
+
+        async def count_unread():
+            recounts.append(1)
+            return next(counts)
+
+        async def connected():
+            return False
+
+        stream = stream_alert_events(subscription, count_unread, connected, heartbeat_seconds=0.05, max_seconds=5)
+        assert parse_sse(await stream.__anext__()) == ("unread_count", {"unread_count": 4})
+
+        await broker.publish([AlertEvent(event=ALERT_CREATED, everyone=True, alert={"id": 9, "alert_status_id": 1})])
+        event_name, data = parse_sse(await stream.__anext__())
+        assert event_name == "alert" and data == {"alert": {"id": 9, "alert_status_id": 1}, "unread_count": 5}
+
+        await broker.publish([AlertEvent(event=COUNT_CHANGED, everyone=True)] * 3)
+        assert parse_sse(await stream.__anext__()) == ("unread_count", {"unread_count": 2})
+        assert len(recounts) == 2
+
+        assert parse_sse(await stream.__anext__()) == ("comment", None)
+        await stream.aclose()
+
+    @pytest.mark.asyncio
+    async def test_stream_ends_on_disconnect(self, broker):
+        subscription = broker.subscribe(1, "ADMIN")
+        disconnected = False
+
+        async def count_unread():
+            return 0
+
+        async def is_disconnected():
+            return disconnected
+
+        stream = stream_alert_events(subscription, count_unread, is_disconnected, heartbeat_seconds=0.01)
+        await stream.__anext__()
+        disconnected = True
+
+        with pytest.raises(StopAsyncIteration):
+            await stream.__anext__()
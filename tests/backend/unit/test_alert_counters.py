@@ -0,0 +1,144 @@
+"""
+Test cases for the maintained unread alert counters and the single-scan alert list
+"""
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select, update
+
+from fixtures.sqlite_db import count_queries
+from app.crud.crud_alert import alert_crud
+from app.models.alert import Alert, AlertStatus, AlertType, AlertUnreadCounter
+
+TEACHER = {"user_id": 5, "user_role": "TEACHER"}
+OTHER_TEACHER = {"user_id": 6, "user_role": "TEACHER"}
+ADMIN = {"user_id": 1, "user_role": "ADMIN"}
+
+
+async def seed_alert_metadata(db):
+    db.add(AlertType(id=1, name="LEAVE_REQUEST_CREATED", category="LEAVE_MANAGEMENT"))
+    db.add_all([AlertStatus(id=status_id, name=name) for status_id, name in
+                enumerate(["UNREAD", "READ", "ACKNOWLEDGED", "DISMISSED", "EXPIRED"], start=1)])
+
+
+@pytest_asyncio.fixture
+async def alert_db(sqlite_session_factory):
+    return await sqlite_session_factory([AlertType, AlertStatus, Alert, AlertUnreadCounter], seed_alert_metadata)
+
+
+async def create_alert(db, **target):
+    return await alert_crud.create_alert(
+        db, alert_type_id=1, title="Leave request", message="Pending approval",
+        entity_type="LEAVE_REQUEST", entity_id=7, **target
+    )
+
+
+async def seed_alerts(db):
+    """One alert for user 5, two for the TEACHER role, one for ADMIN, one broadcast"""
+    return [
+        await create_alert(db, target_user_id=5, target_role="TEACHER"),
+        await create_alert(db, target_role="TEACHER"),
+        await create_alert(db, target_role="TEACHER"),
+        await create_alert(db, target_role="ADMIN"),
+        await create_alert(db),
+    ]
+
+
+async def counted_unread(db, user_id, user_role):
+    """Unread count by scanning alerts (the pre-counter query)"""
+    alerts, _ = await alert_crud.get_alerts_for_user(db, user_id=user_id, user_role=user_role, limit=100)
+    return sum(1 for alert in alerts if alert.alert_status_id == 1)
+
+
+class TestUnreadCounters:
+    @pytest.mark.asyncio
+    async def test_counts_follow_visibility(self, alert_db):
+        session_factory, _ = alert_db
+        async with session_factory() as db:
+            await seed_alerts(db)
+
+            assert await alert_crud.get_unread_count(db, **TEACHER) == 4
+            assert await alert_crud.get_unread_count(db, **OTHER_TEACHER) == 3
+            assert await alert_crud.get_unread_count(db, **ADMIN) == 2
+
+    @pytest.mark.asyncio
+    async def test_status_changes_move_counters(self, alert_db):
+        session_factory, _ = alert_db
+        async with session_factory() as db:
+            own, role_alert, other_role_alert, admin_alert, broadcast = await seed_alerts(db)
+
+            await alert_crud.mark_as_read(db, alert_id=own.id, user_id=5)
+            await alert_crud.mark_as_read(db, alert_id=own.id, user_id=5)  # already read
+            await alert_crud.acknowledge_alert(db, alert_id=role_alert.id, user_id=6)
+            await alert_crud.dismiss_alert(db, alert_id=broadcast.id, user_id=1)
+            await alert_crud.dismiss_alert(db, alert_id=role_alert.id, user_id=6)  # acknowledged already
+
+            for user in (TEACHER, OTHER_TEACHER, ADMIN):
+                assert await alert_crud.get_unread_count(db, **user) == await counted_unread(db, **user)
+            assert await alert_crud.get_unread_count(db, **TEACHER) == 1
+
+    @pytest.mark.asyncio
+    async def test_mark_all_as_read_clears_visible_buckets_only(self, alert_db):
+        session_factory, _ = alert_db
+        async with session_factory() as db:
+            await seed_alerts(db)
+
+            marked = await alert_crud.mark_all_as_read(db, **OTHER_TEACHER)
+
+            assert marked == 3
+            assert await alert_crud.get_unread_count(db, **OTHER_TEACHER) == 0
+            assert await alert_crud.get_unread_count(db, **TEACHER) == 1
+            assert await alert_crud.get_unread_count(db, **ADMIN) == 1
+
+    @pytest.mark.asyncio
+    async def test_rolled_back_alert_is_not_counted(self, alert_db):
+        session_factory, _ = alert_db
+        async with session_factory() as db:
+            await create_alert(db, target_role="TEACHER", auto_commit=False)
+            await db.rollback()
+
+            assert await alert_crud.get_unread_count(db, **TEACHER) == 0
+
+    @pytest.mark.asyncio
+    async def test_rebuild_repairs_writes_outside_the_application(self, alert_db):
+        session_factory, _ = alert_db
+        async with session_factory() as db:
+            await seed_alerts(db)
+            await db.execute(
+                update(Alert).where(Alert.target_role == "TEACHER").values(alert_status_id=2)
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+            assert await alert_crud.get_unread_count(db, **TEACHER) == 4
+
+            report = await alert_crud.rebuild_unread_counters(db)
+
+            assert report["repaired"] == 2
+            assert await alert_crud.get_unread_count(db, **TEACHER) == 1
+            rows = (await db.execute(select(AlertUnreadCounter.recipient_key))).scalars().all()
+            assert "TEACHER" not in rows and "5" not in rows
+
+
+class TestAlertList:
+    @pytest.mark.asyncio
+    async def test_page_and_total_in_one_query(self, alert_db):
+        session_factory, engine = alert_db
+        async with session_factory() as db:
+            await seed_alerts(db)
+
+            with count_queries(engine) as counter:
+                alerts, total = await alert_crud.get_alerts_for_user(db, **TEACHER, skip=0, limit=2)
+
+        assert counter.count == 1
+        assert total == 4 and len(alerts) == 2
+        assert alerts[0].id > alerts[1].id
+
+    @pytest.mark.asyncio
+    async def test_page_past_the_end_still_reports_total(self, alert_db):
+        session_factory, _ = alert_db
+        async with session_factory() as db:
+            await seed_alerts(db)
+
+            alerts, total = await alert_crud.get_alerts_for_user(db, **ADMIN, skip=10, limit=5)
+
+        assert alerts == [] and total == 2
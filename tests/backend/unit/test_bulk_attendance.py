@@ -0,0 +1,144 @@
+"""
+Test cases for the batched attendance upsert (single class and whole school)
+"""
+
+import pytest
+import pytest_asyncio
+from datetime import date, time
+
+from sqlalchemy import func, select
+
+from fixtures.sqlite_db import count_queries
+from app.crud import crud_attendance
+from app.crud.crud_attendance import attendance_record_crud
+from app.models.attendance import AttendanceRecord
+from app.schemas.attendance import BulkAttendanceCreate, BulkAttendanceSchoolCreate
+
+PRESENT, ABSENT = 1, 2
+DAY = date(2025, 7, 14)
+
+
+def class_payload(class_id, student_ids, status_id=PRESENT, **extra):
+    return BulkAttendanceCreate(
+        class_id=class_id, session_year_id=4, attendance_date=DAY, attendance_period_id=1,
+        records=[{"student_id": student_id, "attendance_status_id": status_id} for student_id in student_ids],
+        **extra
+    )
+
+
+@pytest_asyncio.fixture
+async def attendance_db(sqlite_session_factory):
+    session_factory, engine = await sqlite_session_factory([AttendanceRecord])
+    return engine, session_factory
+
+
+async def load_records(session_factory):
+    async with session_factory() as db:
+        result = await db.execute(select(AttendanceRecord).order_by(AttendanceRecord.student_id))
+        return result.scalars().all()
+
+
+class TestBulkAttendanceUpsert:
+    """One upsert statement per chunk instead of a SELECT per student"""
+
+    @pytest.mark.asyncio
+    async def test_new_class_is_inserted_with_constant_queries(self, attendance_db):
+        engine, session_factory = attendance_db
+
+        async with session_factory() as db:
+            with count_queries(engine) as counter:
+                result = await attendance_record_crud.create_bulk(
+                    db, bulk_data=class_payload(5, range(1, 61)), marked_by=7
+                )
+
+        assert result == {"created": 60, "updated": 0, "errors": [], "total_processed": 60}
+        # existing-key lookup + upsert (SQLite path)
+        assert counter.count == 2
+        records = await load_records(session_factory)
+        assert len(records) == 60
+        assert {record.class_id for record in records} == {5}
+        assert records[0].marked_by == 7
+
+    @pytest.mark.asyncio
+    async def test_remarking_updates_existing_records(self, attendance_db):
+        _, session_factory = attendance_db
+
+        async with session_factory() as db:
+            await attendance_record_crud.create_bulk(db, bulk_data=class_payload(5, range(1, 11)), marked_by=7)
+
+        payload = class_payload(5, range(6, 16), status_id=ABSENT)
+        payload.records[0].check_in_time = time(9, 15)
+        payload.records[0].remarks = "Late bus"
+        async with session_factory() as db:
+            result = await attendance_record_crud.create_bulk(db, bulk_data=payload, marked_by=8)
+
+        assert (result["created"], result["updated"]) == (5, 5)
+        records = {record.student_id: record for record in await load_records(session_factory)}
+        assert len(records) == 15
+        assert records[1].attendance_status_id == PRESENT and records[1].marked_by == 7
+        assert records[6].attendance_status_id == ABSENT and records[6].marked_by == 8
+        assert records[6].check_in_time == time(9, 15) and records[6].remarks == "Late bus"
+        assert records[6].updated_at is not None
+
+    @pytest.mark.asyncio
+    async def test_duplicate_student_keeps_last_entry(self, attendance_db):
+        _, session_factory = attendance_db
+        payload = class_payload(5, [1, 2])
+        payload.records.append(payload.records[0].model_copy(update={"attendance_status_id": ABSENT}))
+
+        async with session_factory() as db:
+            result = await attendance_record_crud.create_bulk(db, bulk_data=payload, marked_by=7)
+
+        assert result["created"] == 2
+        records = await load_records(session_factory)
+        assert [record.attendance_status_id for record in records] == [ABSENT, PRESENT]
+
+    @pytest.mark.asyncio
+    async def test_large_requests_are_chunked(self, attendance_db, monkeypatch):
+        engine, session_factory = attendance_db
+        monkeypatch.setattr(crud_attendance, "UPSERT_BATCH_SIZE", 25)
+
+        async with session_factory() as db:
+            with count_queries(engine) as counter:
+                result = await attendance_record_crud.create_bulk(
+                    db, bulk_data=class_payload(5, range(1, 61)), marked_by=7
+                )
+
+        assert result["created"] == 60
+        assert counter.count == 6
+
+    @pytest.mark.asyncio
+    async def test_whole_school_mode_reports_per_class_counts(self, attendance_db):
+        engine, session_factory = attendance_db
+        async with session_factory() as db:
+            await attendance_record_crud.create_bulk(db, bulk_data=class_payload(1, range(1, 4)), marked_by=7)
+
+        payload = BulkAttendanceSchoolCreate(
+            session_year_id=4, attendance_date=DAY, attendance_period_id=1,
+            classes=[
+                {"class_id": 1, "records": [{"student_id": sid, "attendance_status_id": ABSENT} for sid in range(1, 6)]},
+                {"class_id": 2, "records": [{"student_id": sid, "attendance_status_id": PRESENT} for sid in range(6, 10)]},
+            ]
+        )
+        async with session_factory() as db:
+            with count_queries(engine) as counter:
+                result = await attendance_record_crud.create_bulk_school(db, bulk_data=payload, marked_by=7)
+
+        assert counter.count == 2
+        assert (result["created"], result["updated"], result["total_processed"]) == (6, 3, 9)
+        assert result["classes"] == [
+            {"class_id": 1, "created": 2, "updated": 3},
+            {"class_id": 2, "created": 4, "updated": 0},
+        ]
+        async with session_factory() as db:
+            assert (await db.execute(select(func.count()).select_from(AttendanceRecord))).scalar() == 9
+
+    def test_whole_school_payload_rejects_repeated_classes(self):
+        with pytest.raises(ValueError):
+            BulkAttendanceSchoolCreate(
+                session_year_id=4, attendance_date=DAY,
+                classes=[
+                    {"class_id": 1, "records": [{"student_id": 1, "attendance_status_id": PRESENT}]},
+                    {"class_id": 1, "records": [{"student_id": 2, "attendance_status_id": PRESENT}]},
+                ]
+            )
@@ -0,0 +1,243 @@
+"""
+Test cases for the database-side daily collection report and its streaming export
+"""
+
+import csv
+import io
+import zipfile
+import pytest
+import pytest_asyncio
+from datetime import date, datetime
+from decimal import Decimal
+
+from sqlalchemy import text
+
+from fixtures.sqlite_db import create_tables, seed_core_metadata, count_queries
+from app.crud import crud_report as crud_report_module
+from app.crud.crud_report import CRUDReport, report_crud
+from app.models.fee import FeeRecord, FeePayment, MonthlyFeeTracking, StudentFeeBalance
+from app.models.metadata import Class, Gender, SessionYear, PaymentMethod
+from app.models.student import Student
+from app.models.transport import StudentTransportEnrollment, TransportMonthlyTracking, TransportPayment
+from app.models.user import User
+from app.utils.report_export import stream_csv, stream_xlsx
+
+
+JUNE = {"from_date": date(2025, 6, 1), "to_date": date(2025, 6, 30)}
+
+
+async def seed_collections(session):
+    await seed_core_metadata(session)
+    session.add_all([
+        PaymentMethod(id=1, name="CASH", description="Cash"),
+        PaymentMethod(id=2, name="UPI", description="UPI"),
+        User(id=1, email="admin@sunrise.com", password="hash", first_name="Admin",
+             last_name="User", user_type_id=1),
+    ])
+    students = [
+        Student(id=1, admission_number="ADM001", first_name="Asha", last_name="Verma", class_id=5,
+                section="A", date_of_birth=date(2015, 1, 1), gender_id=2, session_year_id=4,
+                father_name="Ravi", mother_name="Sita", admission_date=date(2025, 4, 1)),
+        Student(id=2, admission_number="ADM002", first_name="Rohan", last_name="Das", class_id=6,
+                section="B", date_of_birth=date(2014, 1, 1), gender_id=1, session_year_id=4,
+                father_name="Amit", mother_name="Rina", admission_date=date(2025, 4, 1)),
+    ]
+    session.add_all(students)
+    session.add_all([
+        FeeRecord(id=student.id, student_id=student.id, session_year_id=4, class_id=student.class_id,
+                  payment_type_id=1, total_amount=Decimal("12000.00"),
+                  balance_amount=Decimal("12000.00"), due_date=date(2025, 4, 10))
+        for student in students
+    ])
+    session.add(StudentTransportEnrollment(
+        id=1, student_id=2, session_year_id=4, transport_type_id=1,
+        enrollment_date=date(2025, 4, 1), monthly_fee=Decimal("800.00")
+    ))
+
+    def fee(payment_id, record_id, amount, day, method=1, **extra):
+        return FeePayment(
+            id=payment_id, fee_record_id=record_id, amount=Decimal(amount), payment_method_id=method,
+            payment_date=date(2025, 6, day), receipt_number=f"FEE-{payment_id:03d}", created_by=1,
+            created_at=datetime(2025, 6, day, 10, payment_id), **extra
+        )
+
+    session.add_all([
+        fee(1, 1, "1000.00", 2),
+        fee(2, 1, "1500.00", 10, method=2),
+        fee(3, 2, "2000.00", 15),
+        # Reversed original and its reversal record are excluded
+        fee(4, 2, "700.00", 16, reversed_by_payment_id=5),
+        fee(5, 2, "-700.00", 16, is_reversal=True, reverses_payment_id=4),
+        # Outside the range
+        FeePayment(id=6, fee_record_id=1, amount=Decimal("900.00"), payment_method_id=1,
+                   payment_date=date(2025, 5, 31), created_at=datetime(2025, 5, 31, 10)),
+        TransportPayment(
+            id=1, enrollment_id=1, student_id=2, amount=Decimal("800.00"), payment_method_id=2,
+            payment_date=date(2025, 6, 10), receipt_number="TRN-001",
+            created_at=datetime(2025, 6, 10, 12)
+        ),
+    ])
+
+
+@pytest_asyncio.fixture
+async def collection_db(sqlite_session_factory):
+    session_factory, engine = await sqlite_session_factory([
+        SessionYear, Gender, Class, PaymentMethod, User, Student,
+        FeeRecord, FeePayment, StudentTransportEnrollment, TransportPayment,
+        MonthlyFeeTracking, TransportMonthlyTracking, StudentFeeBalance
+    ], seed_collections)
+    return engine, session_factory
+
+
+class TestDailyCollectionReport:
+    """Filtering, ordering, pagination and totals run in the database"""
+
+    @pytest.mark.asyncio
+    async def test_page_and_summary_in_two_queries(self, collection_db):
+        engine, session_factory = collection_db
+
+        async with session_factory() as db:
+            assert await report_crud._has_transport_tables(db)  # checked once per process
+            with count_queries(engine) as counter:
+                records, total, summary = await report_crud.get_daily_collection_report_data(
+                    db, **JUNE, page=1, per_page=25
+                )
+
+        assert counter.count == 2
+        assert total == 4
+        assert [(r["payment_type"], r["payment_id"]) for r in records] == [
+            ("Fee", 3), ("Transport", 1), ("Fee", 2), ("Fee", 1)
+        ]
+        transport = records[1]
+        assert transport["student_name"] == "Rohan Das"
+        assert transport["fee_record_id"] == 1
+        assert transport["session_year_name"] == "2025-26"
+        assert transport["created_by_name"] is None
+        assert records[0]["created_by_name"] == "Admin User"
+        assert records[0]["class_name"] == "Class 6"
+        assert summary == {
+            "total_collections": 4,
+            "total_amount": 5300.0,
+            "cash_amount": 3000.0,
+            "online_amount": 0.0,
+            "upi_amount": 2300.0,
+            "cheque_amount": 0.0,
+            "card_amount": 0.0,
+            "fee_collections": 4500.0,
+            "transport_collections": 800.0,
+        }
+
+    @pytest.mark.asyncio
+    async def test_pagination_keeps_totals_for_whole_range(self, collection_db):
+        _, session_factory = collection_db
+
+        async with session_factory() as db:
+            records, total, summary = await report_crud.get_daily_collection_report_data(
+                db, **JUNE, page=2, per_page=3
+            )
+
+        assert [r["payment_id"] for r in records] == [1]
+        assert total == 4
+        assert summary["total_amount"] == 5300.0
+
+    @pytest.mark.asyncio
+    async def test_filters(self, collection_db):
+        _, session_factory = collection_db
+
+        async with session_factory() as db:
+            by_class, total, _ = await report_crud.get_daily_collection_report_data(db, **JUNE, class_id=6)
+            assert total == 2 and {r["student_id"] for r in by_class} == {2}
+
+            _, total, summary = await report_crud.get_daily_collection_report_data(db, **JUNE, payment_method_id=2)
+            assert total == 2 and summary["upi_amount"] == 2300.0
+
+            by_search, total, _ = await report_crud.get_daily_collection_report_data(db, **JUNE, search="asha")
+            assert total == 2 and {r["admission_number"] for r in by_search} == {"ADM001"}
+
+            _, total, _ = await report_crud.get_daily_collection_report_data(db, **JUNE, search="adm%")
+            assert total == 0
+
+            records, total, summary = await report_crud.get_daily_collection_report_data(
+                db, from_date=date(2025, 7, 1), to_date=date(2025, 7, 31)
+            )
+            assert (records, total, summary["total_amount"]) == ([], 0, 0.0)
+
+    @pytest.mark.asyncio
+    async def test_fee_only_when_transport_tables_are_missing(self, collection_db):
+        engine, session_factory = collection_db
+        async with engine.begin() as connection:
+            await connection.execute(text("DROP TABLE transport_payments"))
+            await connection.execute(text("DROP TABLE student_transport_enrollment"))
+
+        crud = CRUDReport()
+        async with session_factory() as db:
+            records, total, summary = await crud.get_daily_collection_report_data(db, **JUNE)
+            exported = [record async for batch in crud.stream_daily_collection_records(db, **JUNE)
+                        for record in batch]
+            # A missing result is cached for the recheck interval
+            with count_queries(engine) as counter:
+                assert await crud._has_transport_tables(db) is False
+            assert counter.count == 0
+
+        assert total == 3
+        assert {record["payment_type"] for record in records} == {"Fee"}
+        assert summary["total_amount"] == 4500.0 and summary["transport_collections"] == 0.0
+        assert [record["payment_id"] for record in exported] == [1, 2, 3]
+
+    @pytest.mark.asyncio
+    async def test_transport_tables_deployed_later_are_picked_up(self, collection_db, monkeypatch):
+        engine, session_factory = collection_db
+        async with engine.begin() as connection:
+            await connection.execute(text("DROP TABLE transport_payments"))
+        clock = [1000.0]
+        monkeypatch.setattr(crud_report_module.time, "monotonic", lambda: clock[0])
+
+        crud = CRUDReport()
+        async with session_factory() as db:
+            assert await crud._has_transport_tables(db) is False
+        await create_tables(engine, [TransportPayment])
+
+        async with session_factory() as db:
+            assert await crud._has_transport_tables(db) is False
+            clock[0] += crud.TRANSPORT_TABLES_RECHECK_SECONDS
+            assert await crud._has_transport_tables(db) is True
+            _, total, _ = await crud.get_daily_collection_report_data(db, **JUNE)
+        assert total == 3
+
+
+class TestDailyCollectionExport:
+    """Exports stream batches from the database"""
+
+    COLUMNS = [("payment_date", "Payment Date"), ("student_name", "Student Name"), ("amount", "Amount")]
+
+    @pytest.mark.asyncio
+    async def test_csv_export_streams_in_batches(self, collection_db):
+        _, session_factory = collection_db
+
+        async with session_factory() as db:
+            batches = report_crud.stream_daily_collection_records(db, **JUNE, batch_size=2)
+            chunks = [chunk async for chunk in stream_csv(self.COLUMNS, batches)]
+
+        # header + two batches of two rows
+        assert len(chunks) == 3
+        rows = list(csv.reader(io.StringIO(b"".join(chunks).decode("utf-8-sig"))))
+        assert rows[0] == ["Payment Date", "Student Name", "Amount"]
+        assert rows[1] == ["2025-06-02", "Asha Verma", "1000.0"]
+        assert len(rows) == 5
+
+    @pytest.mark.asyncio
+    async def test_xlsx_export_is_a_valid_workbook(self, collection_db):
+        _, session_factory = collection_db
+
+        async with session_factory() as db:
+            batches = report_crud.stream_daily_collection_records(db, **JUNE, batch_size=3)
+            content = b"".join([chunk async for chunk in stream_xlsx(self.COLUMNS, batches)])
+
+        with zipfile.ZipFile(io.BytesIO(content)) as workbook:
+            assert workbook.testzip() is None
+            assert "xl/workbook.xml" in workbook.namelist()
+            sheet = workbook.read("xl/worksheets/sheet1.xml").decode("utf-8")
+
+        assert sheet.count("<row ") == 5
+        assert '<c r="C2"><v>1000.0</v></c>' in sheet
+        assert "Rohan Das" in sheet
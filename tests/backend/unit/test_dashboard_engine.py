@@ -0,0 +1,228 @@
+"""
+Test cases for the concurrent, cached admin dashboard sections
+"""
+
+import asyncio
+from datetime import date
+from decimal import Decimal
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import text, update
+
+from fixtures.sqlite_db import seed_core_metadata
+from app.services import dashboard_engine as dashboard_engine_module
+from app.services.dashboard_engine import (
+    DashboardContext, DashboardEngine, DashboardSection, dashboard_engine, mark_dashboard_topic
+)
+from app.models.fee import FeeRecord, FeePayment, MonthlyFeeTracking, StudentFeeBalance
+from app.models.metadata import Class, Gender, SessionYear
+from app.models.student import Student
+from app.models.transport import StudentTransportEnrollment, TransportMonthlyTracking, TransportPayment
+
+CONTEXT = DashboardContext(session_year_id=4, session_year_name="2025-26", is_current=True, today=date(2025, 9, 15))
+
+
+class FakeSession:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+
+class SlowSection:
+    """Section builder that sleeps and records how many builds overlap"""
+
+    def __init__(self, tracker, delay: float = 0.05, fail: bool = False):
+        self.tracker = tracker
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+
+    async def __call__(self, db, ctx):
+        self.calls += 1
+        self.tracker["running"] += 1
+        self.tracker["peak"] = max(self.tracker["peak"], self.tracker["running"])
+        try:
+            await asyncio.sleep(self.delay)
+            if self.fail:
+                raise RuntimeError("relation does not exist")
+            return {"total": self.calls, "session": ctx.session_year_id}
+        finally:
+            self.tracker["running"] -= 1
+
+
+def make_sections(tracker, count: int = 4, **kwargs):
+    return [
+        DashboardSection(f"card_{index}", SlowSection(tracker, **kwargs), ("fees",), {"total": 0})
+        for index in range(count)
+    ]
+
+
+class TestConcurrentSections:
+    @pytest.mark.asyncio
+    async def test_sections_run_concurrently_within_limit(self):
+        tracker = {"running": 0, "peak": 0}
+        engine = DashboardEngine(FakeSession, ttl_seconds=0, max_concurrency=3)
+
+        payloads, timings = await engine.run(make_sections(tracker, count=6), CONTEXT)
+
+        assert tracker["peak"] == 3
+        assert list(payloads) == [f"card_{index}" for index in range(6)]
+        assert all(timing["cached"] is False and timing["ms"] > 0 for timing in timings.values())
+
+    @pytest.mark.asyncio
+    async def test_failing_section_is_isolated_and_not_cached(self):
+        tracker = {"running": 0, "peak": 0}
+        engine = DashboardEngine(FakeSession, ttl_seconds=60, max_concurrency=4)
+        broken = DashboardSection("broken", SlowSection(tracker, fail=True), ("fees",), {"total": 0})
+        sections = [broken] + make_sections(tracker, count=2)
+
+        payloads, timings = await engine.run(sections, CONTEXT)
+        await engine.run(sections, CONTEXT)
+
+        assert payloads["broken"] == {"total": 0, "error": "relation does not exist"}
+        assert timings["broken"]["error"] is True
+        assert payloads["card_0"]["total"] == 1
+        assert broken.build.calls == 2
+        assert engine.get_stats()["errors"] == 2
+
+
+class TestSectionCache:
+    @pytest.mark.asyncio
+    async def test_hits_ttl_and_refresh(self, monkeypatch):
+        clock = [1000.0]
+        monkeypatch.setattr(dashboard_engine_module.time, "time", lambda: clock[0])
+        tracker = {"running": 0, "peak": 0}
+        engine = DashboardEngine(FakeSession, ttl_seconds=30)
+        sections = make_sections(tracker, count=1)
+
+        await engine.run(sections, CONTEXT)
+        payloads, timings = await engine.run(sections, CONTEXT)
+        assert timings["card_0"] == {"ms": 0.0, "cached": True}
+        assert payloads["card_0"]["total"] == 1
+
+        payloads, _ = await engine.run(sections, CONTEXT, refresh=True)
+        assert payloads["card_0"]["total"] == 2
+
+        clock[0] += 31
+        payloads, timings = await engine.run(sections, CONTEXT)
+        assert payloads["card_0"]["total"] == 3
+        assert timings["card_0"]["cached"] is False
+
+        # Another session year is a separate entry
+        other = DashboardContext(session_year_id=3, session_year_name="2024-25", today=CONTEXT.today)
+        payloads, _ = await engine.run(sections, other)
+        assert payloads["card_0"] == {"total": 4, "session": 3}
+
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_share_one_build(self):
+        tracker = {"running": 0, "peak": 0}
+        engine = DashboardEngine(FakeSession, ttl_seconds=60)
+        sections = make_sections(tracker, count=1)
+
+        await asyncio.gather(*(engine.run(sections, CONTEXT) for _ in range(5)))
+
+        assert sections[0].build.calls == 1
+        assert (engine.hits, engine.misses) == (4, 1)
+
+    @pytest.mark.asyncio
+    async def test_invalidation_during_build_is_not_cached(self):
+        engine = DashboardEngine(FakeSession, ttl_seconds=60)
+        calls = []
+
+        async def build(db, ctx):
+            calls.append(1)
+            # A payment commits while the section is still reading
+            engine.invalidate({"fees"})
+            return {"total": len(calls)}
+
+        section = DashboardSection("fees", build, ("fees",), {"total": 0})
+        await engine.run([section], CONTEXT)
+        payloads, timings = await engine.run([section], CONTEXT)
+
+        assert timings["fees"]["cached"] is False
+        assert payloads["fees"]["total"] == 2
+
+    @pytest.mark.asyncio
+    async def test_invalidation_is_per_topic(self):
+        tracker = {"running": 0, "peak": 0}
+        engine = DashboardEngine(FakeSession, ttl_seconds=60)
+        fees = DashboardSection("fees", SlowSection(tracker), ("fees",), {})
+        staff = DashboardSection("staff", SlowSection(tracker), ("teachers",), {}, session_scoped=False)
+        await engine.run([fees, staff], CONTEXT)
+
+        engine.invalidate({"fees"})
+        _, timings = await engine.run([fees, staff], CONTEXT)
+
+        assert (timings["fees"]["cached"], timings["staff"]["cached"]) == (False, True)
+
+
+async def seed_fee_record(session):
+    await seed_core_metadata(session)
+    session.add(FeeRecord(id=1, student_id=1, session_year_id=4, class_id=5, payment_type_id=1,
+                          total_amount=Decimal("4000.00"), balance_amount=Decimal("4000.00"),
+                          due_date=date(2025, 4, 10)))
+
+
+@pytest_asyncio.fixture
+async def fee_db(sqlite_session_factory):
+    session_factory, _ = await sqlite_session_factory([
+        SessionYear, Gender, Class, Student, FeeRecord, FeePayment, MonthlyFeeTracking,
+        StudentTransportEnrollment, TransportMonthlyTracking, TransportPayment, StudentFeeBalance
+    ], seed_fee_record)
+    return session_factory
+
+
+class TestCommitInvalidation:
+    """Committed ORM writes invalidate the sections reading that table"""
+
+    @staticmethod
+    def fees_version():
+        return dashboard_engine._topic_versions["fees"]
+
+    @pytest.mark.asyncio
+    async def test_committed_payment_invalidates_fee_sections(self, fee_db):
+        before = self.fees_version()
+
+        async with fee_db() as db:
+            db.add(FeePayment(fee_record_id=1, amount=Decimal("500.00"), payment_method_id=1,
+                              payment_date=date(2025, 5, 2)))
+            await db.commit()
+
+        assert self.fees_version() == before + 1
+
+    @pytest.mark.asyncio
+    async def test_rolled_back_payment_keeps_cache(self, fee_db):
+        before = self.fees_version()
+
+        async with fee_db() as db:
+            db.add(FeePayment(fee_record_id=1, amount=Decimal("500.00"), payment_method_id=1,
+                              payment_date=date(2025, 5, 2)))
+            await db.flush()
+            await db.rollback()
+            await db.commit()
+
+        assert self.fees_version() == before
+
+    @pytest.mark.asyncio
+    async def test_committed_update_statement_invalidates_fee_sections(self, fee_db):
+        before = self.fees_version()
+
+        async with fee_db() as db:
+            await db.execute(update(FeeRecord).where(FeeRecord.id == 1).values(balance_amount=Decimal("3500.00")))
+            await db.commit()
+
+        assert self.fees_version() == before + 1
+
+    @pytest.mark.asyncio
+    async def test_marked_raw_sql_write_invalidates_fee_sections(self, fee_db):
+        before = self.fees_version()
+
+        async with fee_db() as db:
+            await db.execute(text("UPDATE fee_records SET balance_amount = 3500 WHERE id = 1"))
+            mark_dashboard_topic(db, "fees")
+            await db.commit()
+
+        assert self.fees_version() == before + 1
@@ -0,0 +1,145 @@
+"""
+Test cases for connection pool configuration, checkout metrics and the health probe
+"""
+
+import asyncio
+import pytest
+from sqlalchemy import exc, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.db_pool import (
+    InstrumentedAsyncQueuePool, PoolMetrics, check_database, install_pool_metrics, pool_options
+)
+
+
+def make_engine(metrics: PoolMetrics, pool_size=1, max_overflow=0, pool_timeout=0.2):
+    engine = create_async_engine(
+        "sqlite+aiosqlite:///:memory:",
+        poolclass=InstrumentedAsyncQueuePool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=pool_timeout,
+        pool_pre_ping=True
+    )
+    install_pool_metrics(engine.sync_engine, metrics)
+    return engine
+
+
+class TestPoolOptions:
+    def test_postgres_gets_sized_instrumented_pool(self):
+        options = pool_options("postgresql://user:secret@db/sunrise")
+
+        assert options["poolclass"] is InstrumentedAsyncQueuePool
+        assert options["pool_pre_ping"] is True
+        assert {"pool_size", "max_overflow", "pool_timeout", "pool_recycle"} <= set(options)
+
+    def test_sqlite_keeps_driver_default(self):
+        assert pool_options("sqlite:///./sunrise_school.db") == {}
+
+
+class TestPoolMetrics:
+    @pytest.mark.asyncio
+    async def test_checkouts_connects_and_saturation(self):
+        metrics = PoolMetrics("test", slow_checkout_ms=10_000)
+        engine = make_engine(metrics, pool_size=2)
+        try:
+            for _ in range(3):
+                async with engine.connect() as conn:
+                    await conn.execute(text("SELECT 1"))
+            async with engine.connect() as first, engine.connect() as second:
+                await first.execute(text("SELECT 1"))
+                await second.execute(text("SELECT 1"))
+                during = metrics.get_stats()
+        finally:
+            await engine.dispose()
+
+        stats = metrics.get_stats()
+        assert stats["checkouts"] == 5 and stats["timeouts"] == 0
+        assert stats["connects"] == 2
+        assert during["checked_out"] == 2 and during["saturation"] == 1.0
+        assert stats["peak_saturation"] == 1.0
+        assert stats["p95_wait_ms"] <= stats["max_wait_ms"]
+
+    @pytest.mark.asyncio
+    async def test_exhausted_pool_records_saturated_checkout_and_timeout(self):
+        metrics = PoolMetrics("test", slow_checkout_ms=10_000)
+        engine = make_engine(metrics, pool_size=1, pool_timeout=0.1)
+        try:
+            async with engine.connect() as held:
+                await held.execute(text("SELECT 1"))
+                with pytest.raises(exc.TimeoutError):
+                    async with engine.connect():
+                        pass
+        finally:
+            await engine.dispose()
+
+        stats = metrics.get_stats()
+        assert stats["timeouts"] == 1
+        assert stats["checkouts"] == 1
+
+    @pytest.mark.asyncio
+    async def test_waiting_checkout_is_timed_and_counted_slow(self):
+        metrics = PoolMetrics("test", slow_checkout_ms=50)
+        engine = make_engine(metrics, pool_size=1, pool_timeout=5)
+        try:
+            holding = asyncio.Event()
+
+            async def hold():
+                async with engine.connect() as conn:
+                    await conn.execute(text("SELECT 1"))
+                    holding.set()
+                    await asyncio.sleep(0.15)
+
+            holder = asyncio.create_task(hold())
+            await holding.wait()
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+            await holder
+        finally:
+            await engine.dispose()
+
+        stats = metrics.get_stats()
+        assert stats["saturated_checkouts"] == 1 and stats["slow_checkouts"] == 1
+        assert stats["max_wait_ms"] >= 50
+
+    @pytest.mark.asyncio
+    async def test_metrics_follow_pool_across_dispose(self):
+        metrics = PoolMetrics("test")
+        engine = make_engine(metrics)
+        await engine.dispose()
+        try:
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+        finally:
+            await engine.dispose()
+
+        assert metrics.pool is engine.sync_engine.pool
+        assert metrics.get_stats()["checkouts"] == 1
+
+
+class TestHealthProbe:
+    @pytest.mark.asyncio
+    async def test_probe_reuses_pooled_connection(self):
+        metrics = PoolMetrics("test")
+        engine = make_engine(metrics)
+        try:
+            first = await check_database(engine)
+            second = await check_database(engine)
+        finally:
+            await engine.dispose()
+
+        assert first["status"] == second["status"] == "connected"
+        assert metrics.get_stats()["connects"] == 1
+
+    @pytest.mark.asyncio
+    async def test_probe_reports_timeout(self):
+        metrics = PoolMetrics("test", slow_checkout_ms=10_000)
+        engine = make_engine(metrics, pool_size=1, pool_timeout=5)
+        try:
+            async with engine.connect() as held:
+                await held.execute(text("SELECT 1"))
+                result = await check_database(engine, timeout=0.1)
+        finally:
+            await engine.dispose()
+
+        assert result["status"].startswith("error: no response")
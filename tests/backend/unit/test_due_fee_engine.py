@@ -0,0 +1,127 @@
+"""
+Test cases for the set-based due fee engine behind /fees/students-due
+"""
+
+import pytest
+import pytest_asyncio
+from datetime import date
+from decimal import Decimal
+
+from fixtures.sqlite_db import seed_core_metadata, count_queries
+from app.api.v1.endpoints.fees import get_students_with_due_fees
+from app.models.fee import FeeStructure, FeeRecord, FeePayment, MonthlyFeeTracking, StudentFeeBalance
+from app.models.metadata import Class, Gender, SessionYear
+from app.models.student import Student
+from app.models.transport import TransportMonthlyTracking
+from app.schemas.fee import SessionYearEnum
+from app.services.due_fee_engine import (
+    build_month_vectors, calculate_fee_status, elapsed_academic_months
+)
+
+
+class TestDueFeeCalculation:
+    """Test the pure period aggregation"""
+
+    def test_elapsed_academic_months(self):
+        assert elapsed_academic_months(2025, date(2025, 3, 31)) == 0
+        assert elapsed_academic_months(2025, date(2025, 4, 1)) == 1
+        assert elapsed_academic_months(2025, date(2025, 12, 15)) == 9
+        assert elapsed_academic_months(2025, date(2026, 3, 1)) == 12
+        assert elapsed_academic_months(2024, date(2025, 10, 1)) == 13
+
+    def test_lump_payment_applied_to_months_in_order(self):
+        due, paid = build_month_vectors(1000.0, 2500.0)
+        assert paid[:4] == [1000.0, 1000.0, 500.0, 0.0]
+        assert sum(due) == 12000.0
+
+    def test_tracked_months_take_precedence(self):
+        tracked = {4: {"monthly_amount": 900.0, "paid_amount": 900.0}}
+        due, paid = build_month_vectors(1000.0, 0.0, tracked)
+        assert due[0] == 900.0 and paid[0] == 900.0
+        assert due[1] == 1000.0 and paid[1] == 0.0
+
+    def test_monthly_status_marks_past_unpaid_months_overdue(self):
+        due, paid = build_month_vectors(1000.0, 1500.0)
+        status = calculate_fee_status("monthly", due, paid, 1500.0, 2025, elapsed_months=3)
+
+        assert [m["status"] for m in status["months"]] == ["paid", "partial", "pending"]
+        assert status["months"][0]["month_name"] == "April"
+        assert status["total_due"] == 3000.0
+        assert status["overdue_amount"] == 500.0
+        assert status["status"] == "overdue"
+
+    def test_quarterly_and_half_yearly_breakdown(self):
+        due, paid = build_month_vectors(1000.0, 3000.0)
+        quarterly = calculate_fee_status("quarterly", due, paid, 3000.0, 2025, elapsed_months=4)
+        assert [q["status"] for q in quarterly["quarters"]] == ["paid", "pending"]
+
+        half_yearly = calculate_fee_status("half_yearly", due, paid, 3000.0, 2025, elapsed_months=12)
+        assert [h["status"] for h in half_yearly["halves"]] == ["partial", "pending"]
+
+        half_yearly = calculate_fee_status("half_yearly", due, paid, 3000.0, 2025, elapsed_months=13)
+        assert [h["status"] for h in half_yearly["halves"]] == ["partial", "overdue"]
+        assert half_yearly["overdue_amount"] == 9000.0
+
+    def test_yearly_overdue_after_june(self):
+        due, paid = build_month_vectors(1000.0, 0.0)
+        assert calculate_fee_status("yearly", due, paid, 0.0, 2025, elapsed_months=3)["status"] == "pending"
+        assert calculate_fee_status("yearly", due, paid, 0.0, 2025, elapsed_months=4)["status"] == "overdue"
+
+
+async def seed_fee_records(session):
+    await seed_core_metadata(session)
+    for class_id in range(1, 13):
+        session.add(FeeStructure(
+            class_id=class_id, session_year_id=4, total_annual_fee=Decimal("12000.00")
+        ))
+    for index in range(120):
+        student = Student(
+            admission_number=f"ADM{index:04d}", first_name="Student", last_name=str(index),
+            date_of_birth=date(2015, 1, 1), gender_id=1, class_id=(index % 12) + 1,
+            session_year_id=4, father_name="Father", mother_name="Mother",
+            admission_date=date(2025, 4, 1), is_active=True
+        )
+        session.add(student)
+        await session.flush()
+        fee_record = FeeRecord(
+            student_id=student.id, session_year_id=4, class_id=student.class_id,
+            payment_type_id=1, total_amount=Decimal("12000.00"),
+            balance_amount=Decimal("12000.00"), due_date=date(2025, 4, 10)
+        )
+        session.add(fee_record)
+        await session.flush()
+        session.add(FeePayment(
+            fee_record_id=fee_record.id, amount=Decimal("2000.00"),
+            payment_method_id=1, payment_date=date(2025, 4, 5)
+        ))
+
+
+@pytest_asyncio.fixture
+async def seeded_db(sqlite_session_factory):
+    session_factory, engine = await sqlite_session_factory([
+        SessionYear, Gender, Class, Student, FeeStructure, FeeRecord, FeePayment, MonthlyFeeTracking,
+        TransportMonthlyTracking, StudentFeeBalance
+    ], seed_fee_records)
+    async with session_factory() as session:
+        yield engine, session
+
+
+class TestStudentsDueQueryCount:
+    """The students-due page must not issue queries per student"""
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("per_page", [10, 50, 100])
+    async def test_constant_query_count(self, seeded_db, per_page):
+        engine, session = seeded_db
+
+        with count_queries(engine) as counter:
+            response = await get_students_with_due_fees(
+                session_year=SessionYearEnum.YEAR_2025_26, frequency="monthly",
+                class_id=None, search=None, page=1, per_page=per_page,
+                db=session, current_user=None
+            )
+
+        assert len(response["students"]) == per_page
+        # count + page + fee structures + monthly tracking + payments
+        assert counter.count == 5
+        assert response["students"][0]["total_paid"] == 2000.0
@@ -0,0 +1,115 @@
+"""
+Test cases for exact totals and keyset pagination of the enhanced students summary
+
+The summary SQL is PostgreSQL-specific (DISTINCT ON, LATERAL), so these tests
+check the paging logic against recorded statements and canned rows.
+"""
+
+import pytest
+from types import SimpleNamespace
+
+from app.crud.crud_monthly_fee import (
+    monthly_fee_tracking_crud, encode_summary_cursor, decode_summary_cursor,
+    SUMMARY_ORDER_CLASS_ROLL
+)
+
+
+def summary_row(student_id: int, class_id: int, roll: str, total_count: int):
+    return SimpleNamespace(
+        student_id=student_id, admission_number=f"ADM{student_id:03d}", student_name=f"Student {student_id}",
+        roll_number=roll, father_name="Father", mobile_number=None, class_name=f"Class {class_id}",
+        session_year="2025-26", fee_record_id=None, annual_fee=None, total_paid=None, total_balance=None,
+        total_months_tracked=0, paid_months=0, pending_months=0, overdue_months=0,
+        monthly_total=None, monthly_paid=None, monthly_balance=None, collection_percentage=0,
+        has_monthly_tracking=False, has_transport_enrollment=False, transport_enrollment_id=None,
+        session_class_id=class_id, roll_sort_key=roll.zfill(20), total_count=total_count
+    )
+
+
+class RecordingSession:
+    """Returns queued results and records each statement with its parameters"""
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.statements = []
+
+    async def execute(self, statement, params=None):
+        self.statements.append((str(statement), dict(params or {})))
+        result = self.results.pop(0)
+        return SimpleNamespace(fetchall=lambda: result, scalar=lambda: result)
+
+
+class TestSummaryCursor:
+    def test_round_trip(self):
+        key = (7, "00000000000000000012", 431)
+        cursor = encode_summary_cursor(key)
+        assert "=" not in cursor
+        assert decode_summary_cursor(cursor) == key
+
+    @pytest.mark.parametrize("cursor", ["", "not-a-cursor", encode_summary_cursor((1, "2", 3))[:-2], "WzEsMl0"])
+    def test_rejects_foreign_cursors(self, cursor):
+        with pytest.raises(ValueError):
+            decode_summary_cursor(cursor)
+
+
+class TestSummaryPage:
+    @pytest.mark.asyncio
+    async def test_total_comes_from_window_count(self):
+        db = RecordingSession([summary_row(1, 5, "1", 1500), summary_row(2, 5, "2", 1500)])
+
+        page = await monthly_fee_tracking_crud.get_enhanced_student_summary_page(
+            db, session_year_id=4, limit=25, offset=50
+        )
+
+        assert page["total"] == 1500
+        assert page["next_key"] is None
+        assert len(page["students"]) == 2
+        assert len(db.statements) == 1
+        statement, params = db.statements[0]
+        assert "COUNT(*) OVER ()" in statement
+        assert "ORDER BY page.student_name, page.student_id" in statement
+        assert (params["limit"], params["offset"]) == (26, 50)
+
+    @pytest.mark.asyncio
+    async def test_keyset_page_seeks_past_cursor(self):
+        rows = [summary_row(student_id, 6, str(student_id), 40) for student_id in range(11, 14)]
+        db = RecordingSession(rows)
+
+        page = await monthly_fee_tracking_crud.get_enhanced_student_summary_page(
+            db, session_year_id=4, class_id=6, limit=2,
+            order=SUMMARY_ORDER_CLASS_ROLL, after=(6, "10".zfill(20), 10)
+        )
+
+        statement, params = db.statements[0]
+        assert "(page.session_class_id, page.roll_sort_key, page.student_id) > " in statement
+        assert "ORDER BY page.session_class_id, page.roll_sort_key, page.student_id" in statement
+        assert (params["after_class_id"], params["after_student_id"], params["offset"]) == (6, 10, 0)
+        assert [summary.student_id for summary in page["students"]] == [11, 12]
+        assert page["next_key"] == (6, "12".zfill(20), 12)
+        assert page["total"] == 40
+
+    @pytest.mark.asyncio
+    async def test_last_keyset_page_has_no_next_key(self):
+        db = RecordingSession([summary_row(40, 12, "5", 40)])
+
+        page = await monthly_fee_tracking_crud.get_enhanced_student_summary_page(
+            db, session_year_id=4, limit=25, order=SUMMARY_ORDER_CLASS_ROLL, after=(12, "4".zfill(20), 39)
+        )
+
+        assert page["next_key"] is None
+        assert len(db.statements) == 1
+
+    @pytest.mark.asyncio
+    async def test_page_past_the_end_still_reports_total(self):
+        db = RecordingSession([], 1500)
+
+        page = await monthly_fee_tracking_crud.get_enhanced_student_summary_page(
+            db, session_year_id=4, search="ram", limit=25, offset=5000
+        )
+
+        assert page["students"] == []
+        assert page["total"] == 1500
+        count_statement, count_params = db.statements[1]
+        assert count_statement.startswith("SELECT COUNT(*) FROM (")
+        assert "limit" not in count_params
+        assert count_params["search"] == "%ram%"
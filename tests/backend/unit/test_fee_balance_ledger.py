@@ -0,0 +1,263 @@
+"""
+Test cases for the maintained student_fee_balances rollup and its reconciliation
+"""
+
+import pytest
+import pytest_asyncio
+from datetime import date
+from decimal import Decimal
+from sqlalchemy import select, update
+
+from fixtures.sqlite_db import seed_core_metadata
+from app.crud.crud_fee_balance import fee_balance_crud, mark_fee_balances_stale
+from app.models.fee import FeeRecord, FeePayment, MonthlyFeeTracking, StudentFeeBalance
+from app.models.metadata import Class, Gender, SessionYear
+from app.models.student import Student
+from app.models.transport import StudentTransportEnrollment, TransportMonthlyTracking, TransportPayment
+
+MONTHS = [(4, 2025, "April"), (5, 2025, "May"), (6, 2025, "June"), (7, 2025, "July")]
+
+
+def tuition_months(student_id: int, fee_record_id: int):
+    return [
+        MonthlyFeeTracking(
+            fee_record_id=fee_record_id, student_id=student_id, session_year_id=4,
+            academic_month=month, academic_year=year, month_name=name,
+            monthly_amount=Decimal("1000.00"), paid_amount=Decimal("0.00"),
+            due_date=date(year, month, 10), payment_status_id=1
+        )
+        for month, year, name in MONTHS
+    ]
+
+
+async def balance_of(session_factory, student_id: int) -> StudentFeeBalance:
+    async with session_factory() as db:
+        return await fee_balance_crud.get(db, student_id=student_id, session_year_id=4)
+
+
+async def seed_students(session):
+    await seed_core_metadata(session)
+    session.add_all([
+        Student(id=student_id, admission_number=f"ADM00{student_id}", first_name=first_name,
+                last_name="Verma", class_id=5, section="A", date_of_birth=date(2015, 1, 1), gender_id=2,
+                session_year_id=4, father_name="Ravi", mother_name="Sita", admission_date=date(2025, 4, 1))
+        for student_id, first_name in ((1, "Asha"), (2, "Rohan"))
+    ])
+    session.add_all([
+        FeeRecord(id=student_id, student_id=student_id, session_year_id=4, class_id=5, payment_type_id=1,
+                  total_amount=Decimal("4000.00"), balance_amount=Decimal("4000.00"),
+                  due_date=date(2025, 4, 10))
+        for student_id in (1, 2)
+    ])
+
+
+@pytest_asyncio.fixture
+async def ledger_db(sqlite_session_factory):
+    session_factory, engine = await sqlite_session_factory([
+        SessionYear, Gender, Class, Student, FeeRecord, FeePayment, MonthlyFeeTracking,
+        StudentTransportEnrollment, TransportMonthlyTracking, TransportPayment, StudentFeeBalance
+    ], seed_students)
+    return engine, session_factory
+
+
+class TestBalanceMaintenance:
+    """Rows are recomputed in the transaction that writes tracking rows"""
+
+    @pytest.mark.asyncio
+    async def test_tracking_and_payment_writes_update_balance_on_commit(self, ledger_db):
+        engine, session_factory = ledger_db
+
+        async with session_factory() as db:
+            db.add_all(tuition_months(1, 1))
+            await db.commit()
+
+        balance = await balance_of(session_factory, 1)
+        assert (balance.months_tracked, balance.pending_months) == (4, 4)
+        assert balance.tuition_expected == Decimal("4000.00")
+        assert balance.balance_amount == Decimal("4000.00")
+        assert balance.oldest_unpaid_due_date == date(2025, 4, 10)
+        assert balance.last_payment_date is None
+
+        # Payment: 1500 allocated to April (full) and May (partial)
+        async with session_factory() as db:
+            months = (await db.execute(
+                select(MonthlyFeeTracking).where(MonthlyFeeTracking.student_id == 1)
+                .order_by(MonthlyFeeTracking.academic_month)
+            )).scalars().all()
+            months[0].paid_amount = Decimal("1000.00")
+            months[1].paid_amount = Decimal("500.00")
+            db.add(FeePayment(fee_record_id=1, amount=Decimal("1500.00"), payment_method_id=1,
+                              payment_date=date(2025, 5, 2)))
+            fee_record = await db.get(FeeRecord, 1)
+            fee_record.paid_amount = Decimal("1500.00")
+            await db.commit()
+
+        balance = await balance_of(session_factory, 1)
+        assert (balance.paid_months, balance.partial_months, balance.pending_months) == (1, 1, 2)
+        assert balance.tuition_paid == Decimal("1500.00")
+        assert balance.tuition_balance == Decimal("2500.00")
+        assert balance.oldest_unpaid_due_date == date(2025, 5, 10)
+        assert balance.last_payment_date == date(2025, 5, 2)
+        assert balance.as_of_date == date.today()
+        # All months of 2025 are already due
+        assert (balance.tuition_overdue_months, balance.tuition_overdue_amount) == (3, Decimal("2500.00"))
+        assert balance.collection_percentage == 37.5
+
+        # Other students are untouched
+        assert await balance_of(session_factory, 2) is None
+
+    @pytest.mark.asyncio
+    async def test_rolled_back_writes_leave_balance_unchanged(self, ledger_db):
+        engine, session_factory = ledger_db
+
+        async with session_factory() as db:
+            db.add_all(tuition_months(1, 1))
+            await db.flush()
+            await db.rollback()
+
+        async with session_factory() as db:
+            await db.commit()
+            assert (await db.execute(select(StudentFeeBalance))).scalars().all() == []
+
+    @pytest.mark.asyncio
+    async def test_transport_counts_only_enabled_months(self, ledger_db):
+        engine, session_factory = ledger_db
+
+        async with session_factory() as db:
+            db.add(StudentTransportEnrollment(
+                id=1, student_id=2, session_year_id=4, transport_type_id=1,
+                enrollment_date=date(2025, 4, 1), monthly_fee=Decimal("800.00")
+            ))
+            db.add_all([
+                TransportMonthlyTracking(
+                    enrollment_id=1, student_id=2, session_year_id=4, academic_month=month,
+                    academic_year=year, month_name=name, is_service_enabled=month != 7,
+                    monthly_amount=Decimal("800.00"), paid_amount=Decimal("800.00") if month == 4 else 0,
+                    due_date=date(year, month, 10)
+                )
+                for month, year, name in MONTHS
+            ])
+            db.add(TransportPayment(enrollment_id=1, student_id=2, amount=Decimal("800.00"),
+                                    payment_method_id=1, payment_date=date(2025, 4, 5)))
+            await db.commit()
+
+        balance = await balance_of(session_factory, 2)
+        assert balance.months_tracked == 0
+        assert balance.transport_months == 3
+        assert (balance.transport_expected, balance.transport_paid) == (Decimal("2400.00"), Decimal("800.00"))
+        assert balance.expected_amount == Decimal("2400.00")
+        assert balance.overdue_months == 2
+        assert balance.last_payment_date == date(2025, 4, 5)
+
+    @pytest.mark.asyncio
+    async def test_deleting_all_tracking_rows_removes_balance(self, ledger_db):
+        engine, session_factory = ledger_db
+
+        async with session_factory() as db:
+            db.add_all(tuition_months(1, 1))
+            await db.commit()
+
+        async with session_factory() as db:
+            for month in (await db.execute(select(MonthlyFeeTracking))).scalars().all():
+                await db.delete(month)
+            await db.commit()
+
+        assert await balance_of(session_factory, 1) is None
+
+    @pytest.mark.asyncio
+    async def test_raw_sql_writers_mark_keys_explicitly(self, ledger_db):
+        engine, session_factory = ledger_db
+
+        async with session_factory() as db:
+            db.add_all(tuition_months(1, 1))
+            await db.commit()
+
+        async with session_factory() as db:
+            # Core UPDATE (like the allocation SQL) is invisible to mapper events
+            await db.execute(update(MonthlyFeeTracking).values(paid_amount=Decimal("1000.00")))
+            mark_fee_balances_stale(db, [(1, 4)])
+            await db.commit()
+
+        balance = await balance_of(session_factory, 1)
+        assert balance.paid_months == 4
+        assert balance.balance_amount == Decimal("0.00")
+        assert balance.overdue_months == 0
+        assert balance.oldest_unpaid_due_date is None
+
+
+class TestReconciliation:
+    """The reconciliation job finds and repairs drift"""
+
+    @pytest.mark.asyncio
+    async def test_detects_and_repairs_drift(self, ledger_db):
+        engine, session_factory = ledger_db
+
+        async with session_factory() as db:
+            db.add_all(tuition_months(1, 1) + tuition_months(2, 2))
+            await db.commit()
+
+        async with session_factory() as db:
+            # Writes outside the application: an unmarked payment and a lost balance row
+            await db.execute(
+                update(MonthlyFeeTracking).where(MonthlyFeeTracking.student_id == 1)
+                .values(paid_amount=Decimal("1000.00"))
+            )
+            await db.execute(StudentFeeBalance.__table__.delete().where(StudentFeeBalance.student_id == 2))
+            await db.commit()
+
+        async with session_factory() as db:
+            report = await fee_balance_crud.reconcile(db, session_year_id=4, repair=False)
+        assert (report["checked"], report["drifted"], report["missing"], report["repaired"]) == (2, 1, 1, 0)
+        assert report["drift_samples"][0]["fields"]["tuition_paid"] == {"stored": "0.00", "expected": "4000.00"}
+
+        async with session_factory() as db:
+            report = await fee_balance_crud.reconcile(db, session_year_id=4)
+        assert report["repaired"] == 2
+        assert (await balance_of(session_factory, 1)).tuition_balance == Decimal("0.00")
+        assert (await balance_of(session_factory, 2)).tuition_balance == Decimal("4000.00")
+
+        async with session_factory() as db:
+            report = await fee_balance_crud.reconcile(db, session_year_id=4)
+        assert (report["drifted"], report["missing"], report["orphaned"], report["repaired"]) == (0, 0, 0, 0)
+
+    @pytest.mark.asyncio
+    async def test_overdue_figures_roll_forward_with_the_date(self, ledger_db):
+        engine, session_factory = ledger_db
+
+        async with session_factory() as db:
+            db.add_all(tuition_months(1, 1))
+            await db.commit()
+
+        async with session_factory() as db:
+            report = await fee_balance_crud.reconcile(db, as_of=date(2025, 5, 15))
+        assert (report["drifted"], report["overdue_refreshed"], report["repaired"]) == (0, 1, 1)
+
+        balance = await balance_of(session_factory, 1)
+        assert balance.as_of_date == date(2025, 5, 15)
+        assert (balance.overdue_months, balance.overdue_amount) == (2, Decimal("2000.00"))
+
+    @pytest.mark.asyncio
+    async def test_list_and_totals(self, ledger_db):
+        engine, session_factory = ledger_db
+
+        async with session_factory() as db:
+            db.add_all(tuition_months(1, 1) + tuition_months(2, 2))
+            await db.commit()
+            await db.execute(
+                update(MonthlyFeeTracking).where(MonthlyFeeTracking.student_id == 2)
+                .values(paid_amount=Decimal("1000.00"))
+            )
+            mark_fee_balances_stale(db, [(2, 4)])
+            await db.commit()
+
+        async with session_factory() as db:
+            balances, total = await fee_balance_crud.get_multi(db, session_year_id=4, outstanding_only=True)
+            totals = await fee_balance_crud.get_session_totals(db, session_year_id=4)
+
+        assert total == 1
+        assert balances[0]["student_name"] == "Asha Verma"
+        assert balances[0]["class_name"] == "Class 5"
+        assert totals["students"] == 2
+        assert totals["students_cleared"] == 1
+        assert (totals["expected_amount"], totals["paid_amount"]) == (8000.0, 4000.0)
+        assert totals["collection_percentage"] == 50.0
@@ -0,0 +1,254 @@
+"""
+Test cases for the outbound integration clients (timeouts, concurrency limits,
+circuit breaker), driving the real Twilio and Cloudinary SDKs against a local
+fake HTTP server
+"""
+
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cloudinary.uploader
+import pytest
+from twilio.base.exceptions import TwilioRestException
+from twilio.http.http_client import TwilioHttpClient
+from twilio.rest import Client
+
+from app.core.integrations import (
+    CircuitOpenError, IntegrationClient, IntegrationTimeoutError,
+    cloudinary_failure, cloudinary_upload, cloudinary_integration, twilio_failure
+)
+
+ACCOUNT_SID = "AC" + "0" * 32
+
+
+class FakeProvider:
+    """Answers every request with the configured status/body after an optional delay"""
+
+    def __init__(self):
+        self.status = 200
+        self.body = {}
+        self.delay = 0.0
+        self.requests = 0
+        self.active = 0
+        self.peak_active = 0
+        self._lock = threading.Lock()
+
+        provider = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                with provider._lock:
+                    provider.requests += 1
+                    provider.active += 1
+                    provider.peak_active = max(provider.peak_active, provider.active)
+                try:
+                    time.sleep(provider.delay)
+                    payload = json.dumps(provider.body).encode()
+                    self.send_response(provider.status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                finally:
+                    with provider._lock:
+                        provider.active -= 1
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def respond(self, status, body, delay=0.0):
+        self.status, self.body, self.delay = status, body, delay
+
+
+@pytest.fixture
+def provider():
+    fake = FakeProvider()
+    fake._thread.start()
+    yield fake
+    fake.server.shutdown()
+    fake.server.server_close()
+
+
+@pytest.fixture
+def twilio_client(provider):
+    client = Client(ACCOUNT_SID, "token", http_client=TwilioHttpClient(timeout=5))
+    client.api.base_url = provider.url
+    return client
+
+
+def send_message(twilio_client):
+    return twilio_client.messages.create(from_="whatsapp:+14155238886", to="whatsapp:+919876543210", body="Paid")
+
+
+def integration(**overrides):
+    options = {"timeout_seconds": 5, "max_concurrency": 4, "failure_threshold": 3, "reset_seconds": 60,
+               "is_failure": twilio_failure}
+    options.update(overrides)
+    return IntegrationClient("twilio", **options)
+
+
+class TestTwilioCalls:
+    @pytest.mark.asyncio
+    async def test_message_is_sent_through_the_pool(self, provider, twilio_client):
+        provider.respond(201, {"sid": "SM123", "status": "queued"})
+        client = integration()
+
+        message = await client.call(send_message, twilio_client)
+
+        assert message.sid == "SM123"
+        stats = client.get_stats()
+        assert stats["successes"] == 1 and stats["state"] == "closed"
+        client.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_slow_provider_times_out_without_blocking_the_loop(self, provider, twilio_client):
+        provider.respond(201, {"sid": "SM123"}, delay=1.0)
+        client = integration(timeout_seconds=0.2)
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticking = asyncio.create_task(ticker())
+        started = time.perf_counter()
+        with pytest.raises(IntegrationTimeoutError) as timed_out:
+            await client.call(send_message, twilio_client)
+        elapsed = time.perf_counter() - started
+        ticking.cancel()
+
+        assert timed_out.value.dispatched
+        assert elapsed < 0.5
+        assert ticks >= 10
+        assert client.get_stats()["timeouts"] == 1
+        client.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_timeout_waiting_for_a_slot_is_not_dispatched(self, provider, twilio_client):
+        provider.respond(201, {"sid": "SM123"}, delay=0.5)
+        client = integration(timeout_seconds=0.2, max_concurrency=1)
+
+        results = await asyncio.gather(
+            *(client.call(send_message, twilio_client) for _ in range(2)), return_exceptions=True
+        )
+
+        assert sorted(error.dispatched for error in results) == [False, True]
+        await asyncio.sleep(0.4)
+        assert provider.requests == 1
+        client.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_are_capped(self, provider, twilio_client):
+        provider.respond(201, {"sid": "SM123"}, delay=0.1)
+        client = integration(max_concurrency=2)
+
+        await asyncio.gather(*(client.call(send_message, twilio_client) for _ in range(6)))
+
+        assert provider.requests == 6
+        assert provider.peak_active <= 2
+        assert client.get_stats()["peak_in_flight"] == 2
+        client.shutdown()
+
+
+class TestCircuitBreaker:
+    @pytest.mark.asyncio
+    async def test_server_errors_open_the_circuit_then_a_trial_closes_it(self, provider, twilio_client):
+        provider.respond(500, {"code": 20500, "message": "Internal Server Error"})
+        client = integration(failure_threshold=2, reset_seconds=0.2)
+
+        for _ in range(2):
+            with pytest.raises(TwilioRestException):
+                await client.call(send_message, twilio_client)
+        with pytest.raises(CircuitOpenError):
+            await client.call(send_message, twilio_client)
+        assert provider.requests == 2
+
+        provider.respond(201, {"sid": "SM123"})
+        await asyncio.sleep(0.25)
+        message = await client.call(send_message, twilio_client)
+
+        assert message.sid == "SM123"
+        stats = client.get_stats()
+        assert stats["state"] == "closed"
+        assert stats["circuit_opens"] == 1 and stats["rejected"] == 1
+        client.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_cancelled_trial_does_not_keep_the_circuit_half_open(self, provider, twilio_client):
+        provider.respond(500, {"code": 20500, "message": "Internal Server Error"})
+        client = integration(failure_threshold=1, reset_seconds=0.1)
+        with pytest.raises(TwilioRestException):
+            await client.call(send_message, twilio_client)
+        await asyncio.sleep(0.15)
+
+        provider.respond(201, {"sid": "SM1"}, delay=0.3)
+        trial = asyncio.create_task(client.call(send_message, twilio_client))
+        await asyncio.sleep(0.05)
+        trial.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await trial
+
+        provider.respond(201, {"sid": "SM2"})
+        message = await client.call(send_message, twilio_client)
+
+        assert message.sid == "SM2"
+        assert client.get_stats()["state"] == "closed"
+        client.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_client_errors_do_not_open_the_circuit(self, provider, twilio_client):
+        provider.respond(400, {"code": 21211, "message": "Invalid 'To' Phone Number"})
+        client = integration(failure_threshold=2)
+
+        for _ in range(4):
+            with pytest.raises(TwilioRestException):
+                await client.call(send_message, twilio_client)
+
+        stats = client.get_stats()
+        assert stats["state"] == "closed"
+        assert stats["errors"] == 4 and stats["failures"] == 0
+        client.shutdown()
+
+
+class TestCloudinary:
+    @pytest.mark.asyncio
+    async def test_upload_goes_to_the_configured_host(self, provider):
+        provider.respond(200, {"public_id": "receipts/R-1", "secure_url": "https://example.test/R-1.pdf"})
+
+        result = await cloudinary_upload(
+            b"%PDF-1.4", upload_prefix=provider.url, cloud_name="demo", api_key="key", api_secret="secret"
+        )
+
+        assert result["public_id"] == "receipts/R-1"
+        assert provider.requests == 1
+        assert cloudinary_integration.get_stats()["successes"] >= 1
+
+    @pytest.mark.asyncio
+    async def test_only_transport_errors_count_as_failures(self, provider):
+        provider.respond(400, {"error": {"message": "Invalid image file"}})
+        client = IntegrationClient("cloudinary", timeout_seconds=5, max_concurrency=1, is_failure=cloudinary_failure)
+        options = {"upload_prefix": provider.url, "cloud_name": "demo", "api_key": "key", "api_secret": "secret"}
+
+        with pytest.raises(Exception, match="Invalid image file"):
+            await client.call(cloudinary.uploader.upload, b"not an image", **options)
+        provider.server.shutdown()
+        provider.server.server_close()
+        with pytest.raises(Exception):
+            await client.call(cloudinary.uploader.upload, b"not an image", **options)
+
+        stats = client.get_stats()
+        assert stats["errors"] == 2 and stats["failures"] == 1
+        client.shutdown()
@@ -0,0 +1,177 @@
+"""
+Test cases for the versioned metadata cache behind the configuration endpoints
+"""
+
+import gzip
+import json
+
+import pytest
+import pytest_asyncio
+from starlette.requests import Request
+
+from fixtures.sqlite_db import seed_core_metadata
+from app.api.v1.endpoints import configuration
+from app.core import metadata_cache as metadata_cache_module
+from app.core.metadata_cache import (
+    InProcessMetadataCacheBackend, LocalFileMetadataCacheBackend, MetadataCache, metadata_cache
+)
+from app.models.metadata import Class, Gender, SessionYear
+
+
+def make_request(**headers) -> Request:
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": "/api/v1/configuration/common/",
+        "headers": [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()],
+    })
+
+
+class PayloadBuilder:
+    """Counts database loads"""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        return {"classes": [{"id": 1, "name": "CLASS_1"}], "metadata": {"service": "common"}}
+
+
+class TestMetadataCache:
+    """Version stamp, TTL and pre-encoded bodies"""
+
+    @pytest.mark.asyncio
+    async def test_entry_is_pre_encoded_and_reused(self):
+        cache = MetadataCache(InProcessMetadataCacheBackend(), ttl_seconds=60)
+        builder = PayloadBuilder()
+
+        entry, hit = await cache.get_or_build("common", builder)
+        again, hit_again = await cache.get_or_build("common", builder)
+
+        assert (hit, hit_again) == (False, True)
+        assert again is entry
+        assert builder.calls == 1
+        assert json.loads(entry.json_bytes)["classes"][0]["name"] == "CLASS_1"
+        assert gzip.decompress(entry.gzip_bytes) == entry.json_bytes
+        assert entry.etag.startswith('W/"')
+        assert entry.record_count == 1
+
+    @pytest.mark.asyncio
+    async def test_version_bump_invalidates_all_entries(self):
+        cache = MetadataCache(InProcessMetadataCacheBackend(), ttl_seconds=60)
+        builder = PayloadBuilder()
+        first, _ = await cache.get_or_build("common", builder)
+        await cache.get_or_build("fee-management", builder)
+
+        cache.invalidate()
+        second, hit = await cache.get_or_build("common", builder)
+        _, fee_hit = await cache.get_or_build("fee-management", builder)
+
+        assert not hit and not fee_hit
+        assert builder.calls == 4
+        assert second.version != first.version
+
+    @pytest.mark.asyncio
+    async def test_ttl_is_a_backstop(self, monkeypatch):
+        clock = [1000.0]
+        monkeypatch.setattr(metadata_cache_module.time, "time", lambda: clock[0])
+        cache = MetadataCache(InProcessMetadataCacheBackend(), ttl_seconds=30)
+        builder = PayloadBuilder()
+
+        await cache.get_or_build("common", builder)
+        clock[0] += 31
+        _, hit = await cache.get_or_build("common", builder)
+        assert not hit and builder.calls == 2
+
+    @pytest.mark.asyncio
+    async def test_file_backend_is_shared_between_workers(self, tmp_path):
+        worker_a = MetadataCache(LocalFileMetadataCacheBackend(str(tmp_path)), ttl_seconds=60)
+        worker_b = MetadataCache(LocalFileMetadataCacheBackend(str(tmp_path)), ttl_seconds=60)
+        builder = PayloadBuilder()
+
+        built, _ = await worker_a.get_or_build("common", builder)
+        shared, hit = await worker_b.get_or_build("common", builder)
+        assert hit and builder.calls == 1
+        assert shared.etag == built.etag and shared.gzip_bytes == built.gzip_bytes
+
+        worker_b.invalidate()
+        _, hit = await worker_a.get_or_build("common", builder)
+        assert not hit and builder.calls == 2
+
+
+@pytest_asyncio.fixture
+async def metadata_db(sqlite_session_factory):
+    session_factory, _ = await sqlite_session_factory([SessionYear, Gender, Class], seed_core_metadata)
+    metadata_cache.clear()
+    yield session_factory
+    metadata_cache.clear()
+
+
+class TestInvalidationOnWrites:
+    """Committed metadata writes bump the version, rollbacks do not"""
+
+    @pytest.mark.asyncio
+    async def test_committed_write_bumps_version(self, metadata_db):
+        version = metadata_cache.current_version()
+        async with metadata_db() as db:
+            db_class = await db.get(Class, 1)
+            db_class.description = "Class One"
+            await db.commit()
+        assert metadata_cache.current_version() != version
+
+    @pytest.mark.asyncio
+    async def test_rolled_back_write_keeps_version(self, metadata_db):
+        version = metadata_cache.current_version()
+        async with metadata_db() as db:
+            db.add(Class(id=99, name="CLASS_99", description="Temp", sort_order=99))
+            await db.flush()
+            await db.rollback()
+        assert metadata_cache.current_version() == version
+
+
+class TestConfigurationResponses:
+    """ETag / 304 and gzip handling in the configuration endpoint helper"""
+
+    @pytest.fixture(autouse=True)
+    def fake_loader(self, monkeypatch):
+        async def fake_configuration(db, service_name):
+            return {"session_years": [{"id": 4, "name": "2025-26"}], "metadata": {"service": service_name}}
+
+        monkeypatch.setattr(configuration, "get_service_metadata_configuration", fake_configuration)
+        metadata_cache.clear()
+        yield
+        metadata_cache.clear()
+
+    @pytest.mark.asyncio
+    async def test_gzip_and_plain_bodies(self):
+        zipped = await configuration._get_service_configuration_with_cache(
+            None, "common", make_request(accept_encoding="gzip, deflate")
+        )
+        plain = await configuration._get_service_configuration_with_cache(None, "common", make_request())
+
+        assert zipped.headers["content-encoding"] == "gzip"
+        assert zipped.headers["x-cache-status"] == "MISS"
+        assert plain.headers["x-cache-status"] == "HIT"
+        assert gzip.decompress(zipped.body) == plain.body
+        assert json.loads(plain.body)["session_years"][0]["name"] == "2025-26"
+        assert plain.headers["x-cache-version"] == metadata_cache.current_version()
+
+    @pytest.mark.asyncio
+    async def test_matching_etag_returns_304_until_invalidated(self):
+        first = await configuration._get_service_configuration_with_cache(None, "common", make_request())
+        etag = first.headers["etag"]
+
+        revalidated = await configuration._get_service_configuration_with_cache(
+            None, "common", make_request(if_none_match=f'"other", {etag}')
+        )
+        assert revalidated.status_code == 304
+        assert revalidated.body == b""
+
+        metadata_cache.invalidate()
+        rebuilt = await configuration._get_service_configuration_with_cache(
+            None, "common", make_request(if_none_match=etag)
+        )
+        # Same content after rebuild keeps the same ETag, so clients still get 304
+        assert rebuilt.status_code == 304
+        assert rebuilt.headers["x-cache-status"] == "MISS"
@@ -0,0 +1,207 @@
+"""
+Test cases for the two-query monthly fee history (single student and class batch)
+"""
+
+import calendar
+import pytest
+import pytest_asyncio
+from datetime import date, datetime
+from decimal import Decimal
+
+from fastapi import HTTPException
+
+from fixtures.sqlite_db import seed_core_metadata, count_queries
+from app.api.v1.endpoints.fees import get_class_monthly_history
+from app.core.metadata_cache import metadata_cache
+from app.crud.crud_monthly_fee import monthly_fee_tracking_crud
+from app.models.fee import FeeStructure, FeeRecord, FeePayment, MonthlyFeeTracking, StudentFeeBalance
+from app.models.metadata import Class, Gender, PaymentStatus, SessionYear
+from app.models.student import Student
+from app.models.student_session_history import StudentSessionHistory
+from app.models.user import User
+from app.models.transport import StudentTransportEnrollment, TransportMonthlyTracking, TransportPayment
+
+
+def month_rows(fee_record_id: int, student_id: int, paid_months: int = 0):
+    rows = []
+    for index, month in enumerate([4, 5, 6, 7, 8, 9, 10, 11, 12, 1, 2, 3]):
+        year = 2025 if month >= 4 else 2026
+        paid = index < paid_months
+        rows.append(MonthlyFeeTracking(
+            fee_record_id=fee_record_id, student_id=student_id, session_year_id=4,
+            academic_month=month, academic_year=year, month_name=calendar.month_name[month],
+            monthly_amount=Decimal("1000.00"), paid_amount=Decimal("1000.00") if paid else Decimal("0"),
+            due_date=date(year, month, 10), payment_status_id=3 if paid else 1
+        ))
+    return rows
+
+
+def fee_record(record_id: int, student_id: int, created: datetime, tracked: bool = True) -> FeeRecord:
+    return FeeRecord(
+        id=record_id, student_id=student_id, session_year_id=4, class_id=5, payment_type_id=1,
+        is_monthly_tracked=tracked, total_amount=Decimal("12000.00"), balance_amount=Decimal("12000.00"),
+        due_date=date(2025, 4, 10), created_at=created
+    )
+
+
+async def seed_fee_history(session):
+    await seed_core_metadata(session)
+    session.add_all([
+        PaymentStatus(id=1, name="PENDING"),
+        PaymentStatus(id=2, name="PARTIAL"),
+        PaymentStatus(id=3, name="PAID"),
+        PaymentStatus(id=4, name="OVERDUE"),
+        FeeStructure(class_id=5, session_year_id=4, total_annual_fee=Decimal("18000.00")),
+    ])
+    session.add_all([
+        Student(
+            id=student_id, admission_number=f"ADM{student_id:03d}", first_name=f"Child{student_id}",
+            last_name="Iyer", date_of_birth=date(2015, 1, 1), gender_id=1, class_id=5, section="A",
+            roll_number=str(student_id), session_year_id=4, father_name="Father", mother_name="Mother",
+            admission_date=date(2025, 4, 1)
+        )
+        for student_id in (1, 2, 3, 4)
+    ])
+    session.add_all([
+        # Student 1: a newer duplicate record without tracking rows must not win
+        fee_record(10, 1, datetime(2025, 4, 1)),
+        fee_record(11, 1, datetime(2025, 5, 1)),
+        fee_record(20, 2, datetime(2025, 4, 1)),
+        # Student 3: not monthly tracked
+        fee_record(30, 3, datetime(2025, 4, 1), tracked=False),
+        # Student 4: tracked, but the month rows were never created
+        fee_record(40, 4, datetime(2025, 4, 1)),
+    ])
+    session.add_all(month_rows(10, 1, paid_months=3) + month_rows(20, 2))
+    session.add_all([
+        FeePayment(fee_record_id=10, amount=Decimal("2000.00"), payment_method_id=1, payment_date=date(2025, 5, 2)),
+        FeePayment(fee_record_id=10, amount=Decimal("1000.00"), payment_method_id=1, payment_date=date(2025, 6, 2)),
+    ])
+
+
+@pytest_asyncio.fixture
+async def history_db(sqlite_session_factory):
+    session_factory, engine = await sqlite_session_factory([
+        SessionYear, Gender, Class, PaymentStatus, Student, FeeStructure, FeeRecord, FeePayment,
+        MonthlyFeeTracking, StudentTransportEnrollment, TransportMonthlyTracking, TransportPayment, StudentFeeBalance,
+        StudentSessionHistory
+    ], seed_fee_history)
+    metadata_cache.clear()
+    yield engine, session_factory
+    metadata_cache.clear()
+
+
+class TestMonthlyHistory:
+    @pytest.mark.asyncio
+    async def test_single_student_in_two_queries(self, history_db):
+        engine, session_factory = history_db
+
+        async with session_factory() as db:
+            await monthly_fee_tracking_crud.get_student_monthly_history(db, student_id=2, session_year_id=4)
+            with count_queries(engine) as counter:
+                history = await monthly_fee_tracking_crud.get_student_monthly_history(
+                    db, student_id=1, session_year_id=4
+                )
+
+        # Status names come from the cached map after the first call
+        assert counter.count == 2
+        assert (history.student_name, history.class_name, history.session_year) == ("Child1 Iyer", "Class 5", "2025-26")
+        assert history.total_months == 12
+        assert [month.status for month in history.monthly_history[:4]] == ["PAID", "PAID", "PAID", "PENDING"]
+        assert history.total_paid == 3000.0
+        assert history.total_balance == 9000.0
+        assert history.collection_percentage == 25.0
+
+    @pytest.mark.asyncio
+    async def test_missing_student_or_tracking_returns_none(self, history_db):
+        _, session_factory = history_db
+
+        async with session_factory() as db:
+            assert await monthly_fee_tracking_crud.get_student_monthly_history(db, student_id=99, session_year_id=4) is None
+            assert await monthly_fee_tracking_crud.get_student_monthly_history(db, student_id=3, session_year_id=4) is None
+            assert await monthly_fee_tracking_crud.get_student_monthly_history(db, student_id=1, session_year_id=3) is None
+
+    @pytest.mark.asyncio
+    async def test_class_batch_uses_the_same_query_count(self, history_db):
+        engine, session_factory = history_db
+
+        async with session_factory() as db:
+            await monthly_fee_tracking_crud.get_students_monthly_history(db, [4], session_year_id=4)
+            with count_queries(engine) as counter:
+                histories = await monthly_fee_tracking_crud.get_students_monthly_history(
+                    db, [1, 2, 3, 4], session_year_id=4
+                )
+
+        assert counter.count == 2
+        assert sorted(histories) == [1, 2, 4]
+        assert histories[2].overdue_months + histories[2].pending_months == 12
+        assert histories[2].total_paid == 0.0
+
+    @pytest.mark.asyncio
+    async def test_missing_month_rows_are_created_once(self, history_db):
+        _, session_factory = history_db
+
+        async with session_factory() as db:
+            history = await monthly_fee_tracking_crud.get_student_monthly_history(db, student_id=4, session_year_id=4)
+            again = await monthly_fee_tracking_crud.get_student_monthly_history(db, student_id=4, session_year_id=4)
+
+        assert history.total_months == again.total_months == 12
+        assert history.monthly_fee_amount == 1500.0
+        assert history.monthly_history[0].status == "PENDING"
+
+    @pytest.mark.asyncio
+    async def test_status_rename_refreshes_the_name_map(self, history_db):
+        _, session_factory = history_db
+
+        async with session_factory() as db:
+            before = await monthly_fee_tracking_crud.get_student_monthly_history(db, student_id=1, session_year_id=4)
+            status = await db.get(PaymentStatus, 3)
+            status.name = "FULLY_PAID"
+            await db.commit()
+            after = await monthly_fee_tracking_crud.get_student_monthly_history(db, student_id=1, session_year_id=4)
+
+        assert before.monthly_history[0].status == "PAID"
+        assert after.monthly_history[0].status == "FULLY_PAID"
+
+
+class TestClassHistoryEndpoint:
+    @pytest.mark.asyncio
+    async def test_staff_only(self, history_db):
+        _, session_factory = history_db
+
+        async with session_factory() as db:
+            with pytest.raises(HTTPException) as denied:
+                await get_class_monthly_history(
+                    class_id=5, session_year_id=4, section=None, db=db, current_user=User(id=9, user_type_id=3)
+                )
+            response = await get_class_monthly_history(
+                class_id=5, session_year_id=4, section=None, db=db, current_user=User(id=2, user_type_id=2)
+            )
+
+        assert denied.value.status_code == 403
+        assert [history.student_id for history in response["histories"]] == [1, 2, 4]
+        assert response["students_without_tracking"] == [3]
+
+    @pytest.mark.asyncio
+    async def test_past_session_uses_the_class_of_that_session(self, history_db):
+        _, session_factory = history_db
+        staff = User(id=2, user_type_id=2)
+
+        async with session_factory() as db:
+            # In 2024-25 student 1 was in class 4 and student 2 in class 5 (both in class 5 now)
+            db.add_all([
+                StudentSessionHistory(student_id=student_id, session_year_id=3, class_id=class_id, section="A",
+                                      roll_number=str(student_id), progression_action_id=1, progressed_by=1)
+                for student_id, class_id in ((1, 4), (2, 5))
+            ])
+            await db.commit()
+
+            class_five = await get_class_monthly_history(
+                class_id=5, session_year_id=3, section=None, db=db, current_user=staff
+            )
+            class_four = await get_class_monthly_history(
+                class_id=4, session_year_id=3, section="A", db=db, current_user=staff
+            )
+
+        assert class_five["total_students"] == 1 and class_five["students_without_tracking"] == [2]
+        assert class_four["students_without_tracking"] == [1]
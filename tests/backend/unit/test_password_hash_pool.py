@@ -0,0 +1,89 @@
+"""
+Test cases for the bounded bcrypt pool used by login and password endpoints
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.core.security import (
+    PasswordHashPool, get_password_hash_async, pwd_context, verify_password_async
+)
+
+
+class TestPasswordHashAsync:
+    """Async wrappers must behave like the sync functions"""
+
+    @pytest.mark.asyncio
+    async def test_hash_and_verify_round_trip(self):
+        hashed = await get_password_hash_async("Sunrise@001")
+
+        assert pwd_context.verify("Sunrise@001", hashed)
+        assert await verify_password_async("Sunrise@001", hashed) is True
+        assert await verify_password_async("wrong-password", hashed) is False
+
+    @pytest.mark.asyncio
+    async def test_password_longer_than_72_bytes_is_rejected(self):
+        with pytest.raises(ValueError):
+            await get_password_hash_async("x" * 73)
+
+
+class TestPasswordHashPool:
+    """Concurrency cap and queue metrics"""
+
+    @pytest.mark.asyncio
+    async def test_concurrency_is_capped_and_queue_is_measured(self):
+        pool = PasswordHashPool(max_concurrency=2)
+        lock = threading.Lock()
+        active = {"now": 0, "max": 0}
+
+        def slow_hash(value):
+            with lock:
+                active["now"] += 1
+                active["max"] = max(active["max"], active["now"])
+            time.sleep(0.05)
+            with lock:
+                active["now"] -= 1
+            return value
+
+        results = await asyncio.gather(*(pool.run(slow_hash, index) for index in range(6)))
+
+        assert results == list(range(6))
+        assert active["max"] == 2
+        stats = pool.get_stats()
+        assert stats["completed"] == 6
+        assert stats["max_queued"] >= 4
+        assert stats["queued"] == 0 and stats["running"] == 0
+        assert stats["max_wait_ms"] >= 50
+
+    @pytest.mark.asyncio
+    async def test_failures_are_counted_and_release_the_slot(self):
+        pool = PasswordHashPool(max_concurrency=1)
+
+        def broken(_):
+            raise RuntimeError("bcrypt backend error")
+
+        with pytest.raises(RuntimeError):
+            await pool.run(broken, None)
+        assert await pool.run(str.upper, "ok") == "OK"
+        assert pool.get_stats()["failed"] == 1
+
+    @pytest.mark.asyncio
+    async def test_event_loop_keeps_running_during_hashing(self):
+        pool = PasswordHashPool(max_concurrency=2)
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticker_task = asyncio.create_task(ticker())
+        await asyncio.gather(*(pool.run(time.sleep, 0.1) for _ in range(4)))
+        ticker_task.cancel()
+
+        # ~200ms of pool work: the loop must have ticked throughout
+        assert ticks >= 10
@@ -0,0 +1,149 @@
+"""
+Test cases for the principal cache used by get_current_user
+"""
+
+import pytest
+import pytest_asyncio
+from fastapi.security import HTTPAuthorizationCredentials
+
+from fixtures.sqlite_db import count_queries
+from app.api.deps import get_current_user
+from app.core import principal_cache as principal_cache_module
+from app.core.principal_cache import PrincipalCache, principal_cache
+from app.core.security import create_access_token
+from app.crud.crud_user import CRUDUser
+from app.models.metadata import UserType
+from app.models.user import User
+
+
+def bearer(user_id: int) -> HTTPAuthorizationCredentials:
+    return HTTPAuthorizationCredentials(scheme="Bearer", credentials=create_access_token(user_id))
+
+
+async def seed_users(session):
+    session.add_all([
+        UserType(id=1, name="ADMIN", description="Administrator"),
+        UserType(id=3, name="STUDENT", description="Student"),
+    ])
+    session.add_all([
+        User(id=1, email="admin@sunrise.com", password="hash", first_name="Admin",
+             last_name="User", user_type_id=1, is_active=True),
+        User(id=2, email="student@sunrise.com", password="hash", first_name="Asha",
+             last_name="Verma", user_type_id=3, is_active=True),
+    ])
+
+
+@pytest_asyncio.fixture
+async def user_db(sqlite_session_factory):
+    session_factory, engine = await sqlite_session_factory([UserType, User], seed_users)
+    principal_cache.clear()
+    principal_cache.reset_stats()
+    yield engine, session_factory
+    principal_cache.clear()
+
+
+class TestPrincipalCache:
+    """Test TTL, LRU and counters"""
+
+    def _user(self, user_id: int) -> User:
+        user = User(id=user_id, email=f"u{user_id}@sunrise.com", first_name="U", last_name=str(user_id),
+                    user_type_id=1, is_active=True)
+        user.user_type = UserType(id=1, name="ADMIN")
+        return user
+
+    def test_hit_returns_detached_principal_without_password(self):
+        cache = PrincipalCache(ttl_seconds=60, max_entries=10)
+        cache.set(self._user(1))
+
+        principal = cache.get(1)
+        assert principal.email == "u1@sunrise.com"
+        assert principal.user_type.name == "ADMIN"
+        assert principal.password is None
+        assert cache.get_stats()["hits"] == 1
+
+    def test_entries_expire_after_ttl(self, monkeypatch):
+        clock = [1000.0]
+        monkeypatch.setattr(principal_cache_module.time, "monotonic", lambda: clock[0])
+        cache = PrincipalCache(ttl_seconds=30, max_entries=10)
+        cache.set(self._user(1))
+
+        clock[0] += 29
+        assert cache.get(1) is not None
+        clock[0] += 2
+        assert cache.get(1) is None
+        assert cache.get_stats()["expirations"] == 1
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = PrincipalCache(ttl_seconds=60, max_entries=2)
+        cache.set(self._user(1))
+        cache.set(self._user(2))
+        cache.get(1)
+        cache.set(self._user(3))
+
+        assert cache.get(2) is None
+        assert cache.get(1) is not None
+        assert cache.get(3) is not None
+        stats = cache.get_stats()
+        assert stats["evictions"] == 1
+        assert stats["size"] == 2
+        assert stats["hit_rate"] == 0.75
+
+    def test_disabled_cache_passes_users_through(self):
+        cache = PrincipalCache(ttl_seconds=60, max_entries=0)
+        user = self._user(1)
+        assert cache.set(user) is user
+        assert cache.get(1) is None
+
+
+class TestGetCurrentUser:
+    """get_current_user must only hit the database on a cache miss"""
+
+    @pytest.mark.asyncio
+    async def test_second_request_is_served_from_cache(self, user_db):
+        engine, session_factory = user_db
+
+        async with session_factory() as db:
+            with count_queries(engine) as first:
+                user = await get_current_user(db=db, credentials=bearer(1))
+            with count_queries(engine) as second:
+                cached = await get_current_user(db=db, credentials=bearer(1))
+
+        assert first.count >= 1
+        assert second.count == 0
+        assert user.user_type.name == "ADMIN"
+        assert cached.id == 1 and cached.user_type_id == 1 and cached.is_active
+        stats = principal_cache.get_stats()
+        assert (stats["hits"], stats["misses"]) == (1, 1)
+
+    @pytest.mark.asyncio
+    async def test_committed_user_update_invalidates_entry(self, user_db):
+        engine, session_factory = user_db
+
+        async with session_factory() as db:
+            await get_current_user(db=db, credentials=bearer(2))
+
+        async with session_factory() as db:
+            user_crud = CRUDUser()
+            db_user = await user_crud.get(db, id=2)
+            await user_crud.update(db, db_obj=db_user, obj_in={"is_active": False})
+
+        assert principal_cache.get_stats()["invalidations"] == 1
+        async with session_factory() as db:
+            principal = await get_current_user(db=db, credentials=bearer(2))
+        assert principal.is_active is False
+
+    @pytest.mark.asyncio
+    async def test_rolled_back_update_keeps_entry(self, user_db):
+        engine, session_factory = user_db
+
+        async with session_factory() as db:
+            await get_current_user(db=db, credentials=bearer(1))
+
+        async with session_factory() as db:
+            db_user = await db.get(User, 1)
+            db_user.first_name = "Changed"
+            await db.flush()
+            await db.rollback()
+
+        assert principal_cache.get_stats()["invalidations"] == 0
+        assert principal_cache.get(1).first_name == "Admin"
@@ -0,0 +1,218 @@
+"""
+Test cases for the public site content cache (faculty, gallery, home page):
+grouped gallery query, ETag / 304 handling, invalidation on committed writes
+(across workers), and stale-while-revalidate rebuilds
+"""
+
+import asyncio
+import gzip
+import json
+from datetime import datetime
+
+import pytest
+import pytest_asyncio
+from starlette.requests import Request
+
+from fixtures.sqlite_db import count_queries
+from app.api.v1.endpoints import public
+from app.core import public_cache as public_cache_module
+from app.core.metadata_cache import InProcessMetadataCacheBackend, LocalFileMetadataCacheBackend
+from app.core.public_cache import FACULTY, GALLERY, HOME_PAGE, PublicContentCache, public_cache
+from app.models.gallery import GalleryCategory, GalleryImage
+
+
+def make_request(**headers) -> Request:
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": "/api/v1/public/gallery",
+        "headers": [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()],
+    })
+
+
+def image(image_id, category_id, display_order=0, home_order=None, **fields):
+    return GalleryImage(
+        id=image_id, category_id=category_id, title=f"Image {image_id}",
+        cloudinary_public_id=f"gallery/{image_id}", cloudinary_url=f"https://cdn.test/{image_id}.jpg",
+        display_order=display_order, upload_date=datetime(2025, 1, image_id),
+        is_visible_on_home_page=home_order is not None, home_page_display_order=home_order, **fields
+    )
+
+
+async def seed_gallery(db):
+    db.add_all([
+        GalleryCategory(id=1, name="Sports Day", display_order=2),
+        GalleryCategory(id=2, name="Annual Function", display_order=1),
+        GalleryCategory(id=3, name="Old Campus", display_order=0, is_active=False),
+        GalleryCategory(id=4, name="Science Fair", display_order=3),
+    ])
+    db.add_all([
+        image(1, 1, display_order=1, home_order=2),
+        image(2, 1, display_order=0),
+        image(3, 2, home_order=1),
+        image(4, 2, is_active=False),
+        image(5, 3, home_order=0),
+    ])
+
+
+@pytest_asyncio.fixture
+async def gallery_db(monkeypatch, sqlite_session_factory):
+    session_factory, engine = await sqlite_session_factory([GalleryCategory, GalleryImage], seed_gallery)
+    monkeypatch.setattr(public, "AsyncSessionLocal", session_factory)
+    public_cache.clear()
+    yield session_factory, engine
+    public_cache.clear()
+
+
+async def finish_refreshes():
+    await asyncio.gather(*list(public_cache._refreshing.values()))
+
+
+class TestGalleryQueries:
+    @pytest.mark.asyncio
+    async def test_gallery_is_grouped_in_one_query(self, gallery_db):
+        session_factory, engine = gallery_db
+        async with session_factory() as db:
+            with count_queries(engine) as counter:
+                categories = await public.load_public_gallery(db)
+            first_only = await public.load_public_gallery(db, limit_categories=1)
+
+        assert counter.count == 1
+        assert [c["name"] for c in categories] == ["Annual Function", "Sports Day", "Science Fair"]
+        assert [img["id"] for img in categories[1]["images"]] == [2, 1]
+        assert [img["id"] for img in categories[0]["images"]] == [3]
+        assert categories[2]["images"] == []
+        assert categories[1]["images"][0]["home_page_display_order"] is None
+        assert [c["id"] for c in first_only] == [2]
+
+    @pytest.mark.asyncio
+    async def test_home_page_skips_inactive_categories(self, gallery_db):
+        session_factory, _ = gallery_db
+        async with session_factory() as db:
+            images = await public.load_home_page_images(db, 10)
+
+        assert [img["id"] for img in images] == [3, 1]
+
+
+class TestResponses:
+    @pytest.mark.asyncio
+    async def test_hit_after_miss_with_cache_headers(self, gallery_db):
+        first = await public.get_public_gallery(make_request(), limit_categories=None)
+        second = await public.get_public_gallery(make_request(), limit_categories=None)
+
+        assert first.headers["x-cache-status"] == "MISS"
+        assert second.headers["x-cache-status"] == "HIT"
+        assert second.body == first.body
+        assert json.loads(first.body)[0]["images"][0]["upload_date"] == "2025-01-03T00:00:00"
+        assert first.headers["cache-control"].startswith("public, max-age=")
+        assert "stale-while-revalidate=" in first.headers["cache-control"]
+        assert not first.headers["etag"].startswith("W/")
+
+    @pytest.mark.asyncio
+    async def test_gzip_representation_has_its_own_strong_etag(self, gallery_db):
+        plain = await public.get_public_gallery(make_request(), limit_categories=None)
+        zipped = await public.get_public_gallery(make_request(accept_encoding="gzip"), limit_categories=None)
+
+        assert zipped.headers["content-encoding"] == "gzip"
+        assert gzip.decompress(zipped.body) == plain.body
+        assert zipped.headers["etag"] != plain.headers["etag"]
+
+        revalidated = await public.get_public_gallery(
+            make_request(accept_encoding="gzip", if_none_match=zipped.headers["etag"]), limit_categories=None
+        )
+        assert revalidated.status_code == 304 and revalidated.body == b""
+
+
+class TestInvalidation:
+    @pytest.mark.asyncio
+    async def test_committed_write_serves_stale_then_rebuilt_content(self, gallery_db):
+        session_factory, _ = gallery_db
+        await public.get_public_gallery(make_request(), limit_categories=None)
+        faculty_version = public_cache.backends[FACULTY].get_version()
+
+        async with session_factory() as db:
+            category = await db.get(GalleryCategory, 4)
+            category.name = "Science Exhibition"
+            await db.commit()
+
+        stale = await public.get_public_gallery(make_request(), limit_categories=None)
+        await finish_refreshes()
+        fresh = await public.get_public_gallery(make_request(), limit_categories=None)
+
+        assert stale.headers["x-cache-status"] == "STALE"
+        assert "Science Fair" in stale.body.decode()
+        assert fresh.headers["x-cache-status"] == "HIT"
+        assert "Science Exhibition" in fresh.body.decode()
+        assert fresh.headers["etag"] != stale.headers["etag"]
+        assert public_cache.backends[FACULTY].get_version() == faculty_version
+
+    @pytest.mark.asyncio
+    async def test_rolled_back_write_keeps_versions(self, gallery_db):
+        session_factory, _ = gallery_db
+        versions = {section: public_cache.backends[section].get_version() for section in (GALLERY, HOME_PAGE)}
+
+        async with session_factory() as db:
+            db.add(image(6, 1, home_order=0))
+            await db.flush()
+            await db.rollback()
+
+        assert {section: public_cache.backends[section].get_version() for section in versions} == versions
+
+
+class TestStaleWhileRevalidate:
+    @pytest.mark.asyncio
+    async def test_failed_refresh_keeps_serving_stale_until_the_stale_window_ends(self, monkeypatch):
+        clock = [1000.0]
+        monkeypatch.setattr(public_cache_module.time, "time", lambda: clock[0])
+        cache = PublicContentCache(lambda section: InProcessMetadataCacheBackend(), ttl_seconds=60, stale_seconds=30)
+        payloads = [[{"id": 1}], RuntimeError("database down"), [{"id": 2}]]
+
+        async def builder():
+            payload = payloads.pop(0)
+            if isinstance(payload, Exception):
+                raise payload
+            return payload
+
+        first, _ = await cache.get_or_build(GALLERY, "all", builder)
+        clock[0] += 70
+        stale, status = await cache.get_or_build(GALLERY, "all", builder)
+        await asyncio.gather(*list(cache._refreshing.values()))
+
+        assert status == "STALE" and stale is first
+        assert cache.refresh_errors == 1
+
+        clock[0] += 30
+        rebuilt, status = await cache.get_or_build(GALLERY, "all", builder)
+        assert status == "MISS"
+        assert json.loads(rebuilt.json_bytes) == [{"id": 2}]
+
+
+class TestWorkers:
+    @pytest.mark.asyncio
+    async def test_invalidation_on_one_worker_reaches_the_other(self, tmp_path):
+        def workers_cache():
+            return PublicContentCache(
+                lambda section: LocalFileMetadataCacheBackend(str(tmp_path / section)),
+                ttl_seconds=900, stale_seconds=600, memory_ttl_seconds=60
+            )
+        serving, writing = workers_cache(), workers_cache()
+        payloads = [[{"id": 1}], [{"id": 2}]]
+
+        async def builder():
+            return payloads.pop(0)
+
+        first, _ = await serving.get_or_build(GALLERY, "all", builder)
+        writing.invalidate(GALLERY)
+        stale, status = await serving.get_or_build(GALLERY, "all", builder)
+        await asyncio.gather(*list(serving._refreshing.values()))
+        rebuilt, _ = await writing.get_or_build(GALLERY, "all", builder)
+
+        assert serving.ttl_seconds == 900
+        assert status == "STALE" and stale.etag == first.etag
+        assert json.loads(rebuilt.json_bytes) == [{"id": 2}]
+
+    def test_per_process_backend_caps_the_ttl(self):
+        cache = PublicContentCache(
+            lambda section: InProcessMetadataCacheBackend(), ttl_seconds=900, stale_seconds=600, memory_ttl_seconds=60
+        )
+        assert cache.ttl_seconds == 60
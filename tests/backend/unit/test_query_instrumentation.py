@@ -0,0 +1,158 @@
+"""
+Test cases for per-request query instrumentation and N+1 detection
+"""
+
+import pytest
+import pytest_asyncio
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from httpx import AsyncClient
+from sqlalchemy import select, text
+from sqlalchemy.dialects import postgresql
+
+from fixtures.sqlite_db import seed_core_metadata
+from app.core.query_instrumentation import (
+    QueryInstrumentationMiddleware, RequestQueryStats, install_query_instrumentation,
+    route_metrics, statement_shape
+)
+from app.models.metadata import Class, Gender, SessionYear
+from app.utils.performance_monitor import db_perf_tracker
+
+
+class TestStatementShape:
+    """Executions differing only in parameters share a shape"""
+
+    def test_parameters_and_literals_are_normalized(self):
+        assert statement_shape("SELECT * FROM students WHERE id = $1") == \
+            statement_shape("SELECT *\n  FROM students WHERE id = $7")
+        assert statement_shape("SELECT * FROM classes WHERE name = 'CLASS_1' LIMIT 10") == \
+            "SELECT * FROM classes WHERE name = ? LIMIT ?"
+
+    def test_expanded_in_lists_collapse(self):
+        assert statement_shape("SELECT id FROM students WHERE id IN (?, ?, ?)") == \
+            statement_shape("SELECT id FROM students WHERE id IN (?, ?)")
+
+    def test_asyncpg_bind_casts_are_stripped(self):
+        def compiled(class_ids):
+            statement = select(Class.name).where(Class.id.in_(class_ids), Class.name != "CLASS_1")
+            return str(statement.compile(
+                dialect=postgresql.asyncpg.dialect(), compile_kwargs={"render_postcompile": True}
+            ))
+
+        assert "::INTEGER" in compiled([1, 2])
+        shape = statement_shape(compiled([1, 2]))
+        assert shape == statement_shape(compiled([1, 2, 3]))
+        assert "::" not in shape and "IN (?)" in shape
+        assert statement_shape("SELECT $1::TIMESTAMP WITHOUT TIME ZONE AND $2::NUMERIC(10, 2)") == \
+            "SELECT ? AND ?"
+
+    def test_identifiers_with_digits_are_kept(self):
+        assert "users_1" in statement_shape("SELECT users_1.id FROM users AS users_1")
+
+    def test_repeated_shapes(self):
+        stats = RequestQueryStats()
+        for _ in range(12):
+            stats.record("SELECT a", 1.0, 1)
+        stats.record("SELECT b", 1.0, 5)
+        assert stats.repeated_shapes(10) == [("SELECT a", 12)]
+        assert (stats.query_count, stats.rows) == (13, 17)
+
+
+@pytest_asyncio.fixture
+async def instrumented_app(sqlite_session_factory):
+    session_factory, engine = await sqlite_session_factory([SessionYear, Gender, Class], seed_core_metadata)
+    install_query_instrumentation(engine.sync_engine)
+
+    app = FastAPI()
+    app.state.session_factory = session_factory
+
+    @app.get("/classes")
+    async def list_classes():
+        async with session_factory() as db:
+            classes = (await db.execute(select(Class).order_by(Class.id))).scalars().all()
+        return {"count": len(classes)}
+
+    @app.get("/classes/one-by-one")
+    async def list_classes_one_by_one():
+        async with session_factory() as db:
+            names = []
+            for class_id in range(1, 13):
+                names.append((await db.execute(select(Class.name).where(Class.id == class_id))).scalar())
+        return {"count": len(names)}
+
+    @app.get("/classes/{class_id}/export")
+    async def export_class(class_id: int):
+        async def rows():
+            async with session_factory() as db:
+                yield (await db.execute(select(Class.name).where(Class.id == class_id))).scalar()
+        return StreamingResponse(rows(), media_type="text/plain")
+
+    app.add_middleware(QueryInstrumentationMiddleware, n_plus_one_threshold=10, timing_headers=True)
+    route_metrics.reset()
+    db_perf_tracker.reset_stats()
+    yield app
+    route_metrics.reset()
+    db_perf_tracker.reset_stats()
+
+
+class TestQueryInstrumentationMiddleware:
+    """Headers and per-route metrics"""
+
+    @pytest.mark.asyncio
+    async def test_headers_report_queries_and_db_time(self, instrumented_app):
+        async with AsyncClient(app=instrumented_app, base_url="http://test") as client:
+            response = await client.get("/classes")
+
+        assert response.json() == {"count": 12}
+        assert response.headers["x-db-queries"] == "1"
+        assert response.headers["server-timing"].startswith("db;dur=")
+        assert 'desc="1 queries"' in response.headers["server-timing"]
+        assert "x-db-n-plus-one" not in response.headers
+
+    @pytest.mark.asyncio
+    async def test_repeated_statement_is_flagged(self, instrumented_app, caplog):
+        async with AsyncClient(app=instrumented_app, base_url="http://test") as client:
+            response = await client.get("/classes/one-by-one")
+
+        assert response.headers["x-db-queries"] == "12"
+        assert response.headers["x-db-n-plus-one"] == "12"
+        assert "Possible N+1 on GET /classes/one-by-one" in caplog.text
+
+        stats = route_metrics.get_stats()["GET /classes/one-by-one"]
+        assert stats["requests"] == 1
+        assert stats["n_plus_one_requests"] == 1
+        assert stats["last_n_plus_one"]["executions"] == 12
+        assert stats["queries"]["max"] == 12
+        assert stats["rows"]["max"] == 0  # SQLite reports no rowcount for SELECT
+
+        shapes = db_perf_tracker.get_stats()
+        assert any(values["count"] == 12 for values in shapes.values())
+
+    @pytest.mark.asyncio
+    async def test_long_shapes_sharing_a_prefix_are_kept_apart(self, instrumented_app):
+        padding = ", ".join(f"classes.name AS name_{index}" for index in range(20))
+        async with instrumented_app.state.session_factory() as db:
+            await db.execute(text(f"SELECT {padding} FROM classes WHERE classes.id = 1"))
+            await db.execute(text(f"SELECT {padding} FROM classes WHERE classes.name = 'CLASS_1'"))
+
+        shapes = [shape for shape in db_perf_tracker.get_stats() if shape.startswith(f"SELECT {padding}")]
+        assert len(shapes) == 2
+        assert all(len(shape) > 200 for shape in shapes)
+
+    @pytest.mark.asyncio
+    async def test_routes_use_path_templates_and_percentiles(self, instrumented_app):
+        async with AsyncClient(app=instrumented_app, base_url="http://test") as client:
+            for class_id in (1, 2, 3):
+                response = await client.get(f"/classes/{class_id}/export")
+                assert response.text == f"CLASS_{class_id}"
+            await client.get("/classes")
+            await client.get("/missing")
+
+        stats = route_metrics.get_stats()
+        export = stats["GET /classes/{class_id}/export"]
+        assert export["requests"] == 3
+        # Queries issued while streaming are counted for the route
+        assert export["queries"]["p50"] == 1
+        assert sum(export["latency_histogram"].values()) == 3
+        assert set(export["latency_ms"]) == {"p50", "p95", "p99"}
+        assert "GET unmatched" in stats
@@ -0,0 +1,207 @@
+"""
+Test cases for read replica routing (two in-memory SQLite databases stand in
+for the primary and the replica)
+"""
+
+from contextlib import contextmanager
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import event, select, text
+
+from app.core import database, read_replica
+from app.core.read_replica import (
+    ReadReplicaRouter, ReadYourWritesMiddleware, reset_current_writer, set_current_writer, writer_key
+)
+from app.models.metadata import SessionYear
+
+
+class LagProbe:
+    """Replica lag in seconds, or an exception when the replica is down"""
+
+    def __init__(self, lag=0.0):
+        self.lag = lag
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        if isinstance(self.lag, Exception):
+            raise self.lag
+        return self.lag
+
+
+@pytest_asyncio.fixture
+async def databases(sqlite_session_factory):
+    factories = {}
+    engines = []
+    for name in ("primary", "replica"):
+        async def seed(session, name=name):
+            session.add(SessionYear(id=1, name=name, description=name))
+
+        factories[name], engine = await sqlite_session_factory([SessionYear], seed)
+        engines.append(engine)
+
+    return factories, engines[0]
+
+
+def make_router(factories, probe, **kwargs):
+    options = {"max_lag_seconds": 10, "check_interval_seconds": 60, **kwargs}
+    return ReadReplicaRouter(factories["primary"], factories["replica"], lag_probe=probe, **options)
+
+
+async def read_source(router) -> str:
+    async with router() as db:
+        return (await db.execute(select(SessionYear.name).where(SessionYear.id == 1))).scalar_one()
+
+
+class TestReadRouting:
+    @pytest.mark.asyncio
+    async def test_without_replica_reads_primary(self, databases):
+        factories, _ = databases
+        router = ReadReplicaRouter(factories["primary"])
+
+        assert await read_source(router) == "primary"
+        assert router.get_stats()["enabled"] is False
+
+    @pytest.mark.asyncio
+    async def test_fresh_replica_serves_reads_and_probe_is_cached(self, databases):
+        factories, _ = databases
+        probe = LagProbe(0.5)
+        router = make_router(factories, probe)
+
+        assert [await read_source(router) for _ in range(3)] == ["replica"] * 3
+        assert probe.calls == 1
+        assert router.get_stats()["replica_share"] == 1.0
+
+    @pytest.mark.asyncio
+    async def test_lagging_replica_falls_back_to_primary(self, databases):
+        factories, _ = databases
+        router = make_router(factories, LagProbe(45.0))
+
+        assert await read_source(router) == "primary"
+        assert router.get_stats()["fallbacks"]["lag"] == 1
+
+    @pytest.mark.asyncio
+    async def test_unreachable_replica_falls_back_until_next_probe(self, databases):
+        factories, _ = databases
+        probe = LagProbe(ConnectionRefusedError("replica down"))
+        router = make_router(factories, probe, check_interval_seconds=0)
+
+        assert await read_source(router) == "primary"
+        assert router.get_stats()["last_error"] == "replica down"
+
+        probe.lag = 0.0
+        assert await read_source(router) == "replica"
+        assert router.get_stats()["fallbacks"]["unavailable"] == 1
+
+
+@contextmanager
+def as_client(key):
+    token = set_current_writer(key)
+    try:
+        yield
+    finally:
+        reset_current_writer(token)
+
+
+class TestReadYourWrites:
+    @pytest_asyncio.fixture
+    async def tracked(self, databases, monkeypatch):
+        factories, primary_engine = databases
+        monkeypatch.setattr("app.core.read_replica.RECHECK_AFTER_WRITE_SECONDS", 0)
+        probe = LagProbe(0.0)
+        router = make_router(factories, probe)
+        router.track_primary_writes(primary_engine.sync_engine)
+        yield factories, probe, router
+        event.remove(primary_engine.sync_engine, "after_cursor_execute", read_replica._flag_write)
+        event.remove(primary_engine.sync_engine, "commit", router._on_commit)
+        event.remove(primary_engine.sync_engine, "rollback", read_replica._clear_write)
+
+    @pytest.mark.asyncio
+    async def test_commit_on_primary_routes_reads_to_primary_until_replica_catches_up(self, tracked):
+        factories, probe, router = tracked
+        with as_client("cashier"):
+            assert await read_source(router) == "replica"
+
+            async with factories["primary"]() as db:
+                db.add(SessionYear(id=2, name="2026-27", description="2026-27"))
+                await db.commit()
+
+            # The replica is 5 seconds behind: the new session year is not there yet
+            probe.lag = 5.0
+            assert await read_source(router) == "primary"
+            assert router.get_stats()["fallbacks"]["recent_write"] == 1
+
+            # Caught up: the re-probe after the write shows no lag
+            probe.lag = 0.0
+            assert await read_source(router) == "replica"
+            assert probe.calls == 3
+
+    @pytest.mark.asyncio
+    async def test_only_the_writing_client_reads_from_primary(self, tracked):
+        factories, probe, router = tracked
+        assert await read_source(router) == "replica"
+        probe.lag = 5.0
+
+        with as_client("cashier"):
+            async with factories["primary"]() as db:
+                await db.execute(text("UPDATE session_years SET description = 'renamed' WHERE id = 1"))
+                await db.commit()
+            assert await read_source(router) == "primary"
+
+        with as_client("principal"):
+            assert await read_source(router) == "replica"
+        assert await read_source(router) == "replica"
+        assert router.get_stats()["tracked_writers"] == 1
+
+    @pytest.mark.asyncio
+    async def test_read_only_and_anonymous_commits_are_not_writes(self, tracked):
+        factories, probe, router = tracked
+        assert await read_source(router) == "replica"
+        probe.lag = 5.0
+
+        with as_client("cashier"):
+            async with factories["primary"]() as db:
+                await db.execute(select(SessionYear.name))
+                await db.commit()
+            assert await read_source(router) == "replica"
+
+        # Background work (no client) does not send anyone to the primary
+        async with factories["primary"]() as db:
+            db.add(SessionYear(id=2, name="2026-27", description="2026-27"))
+            await db.commit()
+        with as_client("cashier"):
+            assert await read_source(router) == "replica"
+        assert router.get_stats()["fallbacks"]["recent_write"] == 0
+
+
+class TestReadYourWritesMiddleware:
+    @pytest.mark.asyncio
+    async def test_scopes_writes_to_the_bearer_token(self):
+        seen = []
+
+        async def app(scope, receive, send):
+            seen.append(read_replica._current_writer.get())
+
+        middleware = ReadYourWritesMiddleware(app)
+        for headers in ([(b"authorization", b"Bearer token-a")], [(b"authorization", b"Bearer token-b")], []):
+            await middleware({"type": "http", "headers": headers}, None, None)
+
+        assert seen == [writer_key("Bearer token-a"), writer_key("Bearer token-b"), None]
+        assert seen[0] != seen[1]
+        assert read_replica._current_writer.get() is None
+
+
+class TestReadDependency:
+    @pytest.mark.asyncio
+    async def test_get_read_db_uses_router(self, databases, monkeypatch):
+        factories, _ = databases
+        monkeypatch.setattr(database, "read_router", make_router(factories, LagProbe(0.0)))
+
+        sessions = database.get_read_db()
+        db = await sessions.__anext__()
+        name = (await db.execute(select(SessionYear.name))).scalar_one()
+        await sessions.aclose()
+
+        assert name == "replica"
+        assert db.info["read_target"] == "replica"
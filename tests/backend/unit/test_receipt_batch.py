@@ -0,0 +1,206 @@
+"""
+Test cases for batch receipt reprints (selection, rendering, merged PDF and ZIP output)
+"""
+
+import io
+import json
+import zipfile
+import pytest
+import pytest_asyncio
+from datetime import date
+from decimal import Decimal
+
+from fastapi.encoders import jsonable_encoder
+from PIL import Image
+from pypdf import PdfReader
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen import canvas
+
+from app.crud.crud_receipt_job import receipt_job_crud
+from app.models.fee import FeePayment
+from app.models.receipt_job import ReceiptJob
+from app.models.transport import TransportPayment
+from app.services.receipt_batch import ReceiptBatchRenderer, iter_file, merge_receipt_pdfs
+from app.services.receipt_renderer import ReceiptPDFCache
+
+
+def fee_payload(payment_id: int) -> dict:
+    return jsonable_encoder({
+        "payment_data": {"id": payment_id, "amount": 1000.0, "payment_date_str": "05-Jun-2025",
+                         "receipt_number": f"FEE-{payment_id:06d}"},
+        "student_data": {"name": f"Student {payment_id}", "admission_number": f"ADM{payment_id:03d}",
+                         "class_name": "Class 5 - A"},
+        "month_breakdown": [{"month_name": "April", "monthly_fee": 1000.0, "previous_paid": 0.0,
+                             "allocated_amount": 1000.0, "remaining_balance": 0.0}],
+        "fee_summary": {"total_annual_fee": 12000.0, "total_paid": 1000.0, "balance_remaining": 11000.0},
+        "transport_data": None
+    })
+
+
+TRANSPORT_PAYLOAD = {
+    "payment_data": {"id": 1, "amount": 800.0, "payment_date": "05-Jun-2025", "receipt_number": "TRANSPORT-000001"},
+    "student_data": {"name": "Student 1", "admission_number": "ADM001", "class_name": "Class 5 - A"},
+    "transport_data": {"transport_type": "Van", "monthly_fee": 800.0, "total_fee": 8000.0,
+                       "total_paid": 800.0, "balance": 7200.0},
+    "month_breakdown": [{"month_name": "April", "monthly_amount": 800.0, "allocated_amount": 800.0,
+                         "balance_amount": 0.0}]
+}
+
+
+async def seed_receipted_payments(session):
+    for payment_id, day in [(1, 5), (2, 3), (3, 20)]:
+        session.add(FeePayment(
+            id=payment_id, fee_record_id=1, amount=Decimal("1000.00"), payment_method_id=1,
+            payment_date=date(2025, 6, day)
+        ))
+    session.add(FeePayment(
+        id=4, fee_record_id=1, amount=Decimal("-1000.00"), payment_method_id=1,
+        payment_date=date(2025, 6, 6), is_reversal=True, reverses_payment_id=1
+    ))
+    session.add(TransportPayment(
+        id=1, enrollment_id=1, student_id=1, amount=Decimal("800.00"), payment_method_id=1,
+        payment_date=date(2025, 6, 5)
+    ))
+    await session.flush()
+
+    # Payment 1 was receipted twice (resend); the latest job wins
+    session.add(ReceiptJob(job_type="FEE", fee_payment_id=1, receipt_number="FEE-000001", payload={}))
+    for payment_id in (1, 2, 3, 4):
+        session.add(ReceiptJob(job_type="FEE", fee_payment_id=payment_id,
+                               receipt_number=f"FEE-{payment_id:06d}", payload=fee_payload(payment_id)))
+    session.add(ReceiptJob(job_type="TRANSPORT", transport_payment_id=1,
+                           receipt_number="TRANSPORT-000001", payload=TRANSPORT_PAYLOAD))
+
+
+@pytest_asyncio.fixture
+async def batch_db(sqlite_session_factory):
+    session_factory, _ = await sqlite_session_factory([FeePayment, TransportPayment, ReceiptJob], seed_receipted_payments)
+    return session_factory
+
+
+def make_renderer(**kwargs) -> ReceiptBatchRenderer:
+    return ReceiptBatchRenderer(
+        pdf_cache=ReceiptPDFCache(max_bytes=16 * 1024 * 1024, directory=""), processes=0, **kwargs
+    )
+
+
+class TestBatchSelection:
+    @pytest.mark.asyncio
+    async def test_date_range_selects_latest_job_per_payment_in_date_order(self, batch_db):
+        async with batch_db() as db:
+            jobs = await receipt_job_crud.get_latest_for_payments(
+                db, from_date=date(2025, 6, 1), to_date=date(2025, 6, 10)
+            )
+
+        assert [job.receipt_number for job in jobs] == ["FEE-000002", "FEE-000001", "TRANSPORT-000001"]
+        assert jobs[1].payload["payment_data"]["id"] == 1
+
+    @pytest.mark.asyncio
+    async def test_ids_limit_to_requested_payment_types(self, batch_db):
+        async with batch_db() as db:
+            jobs = await receipt_job_crud.get_latest_for_payments(
+                db, fee_payment_ids=[3, 1], transport_payment_ids=[], job_types=["FEE", "TRANSPORT"]
+            )
+            transport_only = await receipt_job_crud.get_latest_for_payments(
+                db, from_date=date(2025, 6, 1), job_types=["TRANSPORT"]
+            )
+
+        assert [job.fee_payment_id for job in jobs] == [1, 3]
+        assert [job.receipt_number for job in transport_only] == ["TRANSPORT-000001"]
+
+
+class TestBatchRendering:
+    @pytest.mark.asyncio
+    async def test_merged_pdf_keeps_order_and_stores_logo_once(self, batch_db):
+        async with batch_db() as db:
+            jobs = await receipt_job_crud.get_latest_for_payments(db, from_date=date(2025, 6, 1))
+        renderer = make_renderer(chunk_size=2)
+
+        merged, metrics = await renderer.render_merged(jobs)
+
+        reader = PdfReader(io.BytesIO(merged))
+        texts = [page.extract_text() for page in reader.pages]
+        assert len(reader.pages) == 4
+        # Fee receipts, then transport receipts, each in payment date order
+        for text, receipt_number in zip(texts, ["FEE-000002", "FEE-000001", "FEE-000003", "TRANSPORT-000001"]):
+            assert receipt_number in text
+        assert merged.count(b"/Subtype /Image") == 1
+        assert metrics["receipts"] == metrics["rendered"] == 4
+        assert metrics["cache_hits"] == 0 and metrics["chunks"] == 2
+
+    @pytest.mark.asyncio
+    async def test_merged_file_is_streamed_in_chunks(self, batch_db):
+        async with batch_db() as db:
+            jobs = await receipt_job_crud.get_latest_for_payments(db, fee_payment_ids=[1, 2])
+        renderer = make_renderer()
+
+        output, metrics = await renderer.render_merged_file(jobs)
+        chunks = [chunk async for chunk in iter_file(output, chunk_size=1024)]
+
+        assert len(chunks) > 1 and output.closed
+        merged = b"".join(chunks)
+        assert len(merged) == metrics["output_bytes"]
+        assert len(PdfReader(io.BytesIO(merged)).pages) == 2
+
+    @pytest.mark.asyncio
+    async def test_second_batch_is_served_from_cache(self, batch_db):
+        async with batch_db() as db:
+            jobs = await receipt_job_crud.get_latest_for_payments(db, fee_payment_ids=[1, 2, 3])
+        renderer = make_renderer()
+
+        await renderer.render_merged(jobs[:2])
+        _, metrics = await renderer.render_merged(jobs)
+
+        assert metrics["cache_hits"] == 2 and metrics["rendered"] == 1
+        assert renderer.get_stats()["rendered"] == 3
+
+    @pytest.mark.asyncio
+    async def test_zip_streams_each_receipt_and_summary(self, batch_db):
+        async with batch_db() as db:
+            jobs = await receipt_job_crud.get_latest_for_payments(db, fee_payment_ids=[1, 2])
+        renderer = make_renderer(chunk_size=1)
+
+        chunks = [chunk async for chunk in renderer.stream_zip(jobs, extra_summary={"missing": 1})]
+
+        assert len(chunks) == 3
+        archive = zipfile.ZipFile(io.BytesIO(b"".join(chunks)))
+        assert archive.namelist() == ["FEE-000002.pdf", "FEE-000001.pdf", "summary.json"]
+        assert archive.read("FEE-000001.pdf").startswith(b"%PDF")
+        summary = json.loads(archive.read("summary.json"))
+        assert summary["receipts"] == 2 and summary["missing"] == 1
+
+
+def masked_logo_pdf(text: str, color=(200, 0, 0, 128)) -> bytes:
+    """One-page PDF with a semi-transparent logo (image + /SMask) and some text"""
+    logo = io.BytesIO()
+    Image.new("RGBA", (40, 40), color).save(logo, "PNG")
+    output = io.BytesIO()
+    pdf = canvas.Canvas(output)
+    pdf.drawImage(ImageReader(io.BytesIO(logo.getvalue())), 10, 10, mask="auto")
+    pdf.drawString(100, 100, text)
+    pdf.showPage()
+    pdf.save()
+    return output.getvalue()
+
+
+class TestMergeReceiptPdfs:
+    def test_logos_with_transparency_masks_are_stored_once(self):
+        merged = merge_receipt_pdfs([masked_logo_pdf(f"R-{i}") for i in range(3)])
+
+        reader = PdfReader(io.BytesIO(merged))
+        assert [page.extract_text().strip() for page in reader.pages] == ["R-0", "R-1", "R-2"]
+        # One logo and its mask
+        assert merged.count(b"/Subtype /Image") == 2
+        logos = {page["/Resources"]["/XObject"].raw_get(name).idnum
+                 for page in reader.pages for name in page["/Resources"]["/XObject"]}
+        assert len(logos) == 1
+
+    def test_different_logos_are_all_kept(self):
+        merged = merge_receipt_pdfs([
+            masked_logo_pdf("R-0"), masked_logo_pdf("R-1", color=(0, 0, 200, 64)), masked_logo_pdf("R-2")
+        ])
+
+        reader = PdfReader(io.BytesIO(merged))
+        logos = [page["/Resources"]["/XObject"].raw_get(name).idnum
+                 for page in reader.pages for name in page["/Resources"]["/XObject"]]
+        assert logos[0] == logos[2] != logos[1]
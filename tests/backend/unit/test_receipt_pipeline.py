@@ -0,0 +1,407 @@
+"""
+Test cases for the post-payment receipt queue and worker
+"""
+
+import asyncio
+import pytest
+import pytest_asyncio
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from fastapi import HTTPException
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from fixtures.sqlite_db import seed_core_metadata
+from app.api.v1.endpoints import transport as transport_endpoints
+from app.crud.crud_receipt_job import receipt_job_crud
+from app.models.fee import FeePayment, FeeRecord, MonthlyFeeTracking, StudentFeeBalance
+from app.models.metadata import Class, Gender, PaymentMethod, SessionYear
+from app.models.receipt_job import ReceiptJob
+from app.models.student import Student
+from app.models.transport import (
+    StudentTransportEnrollment, TransportMonthlyTracking, TransportPayment, TransportPaymentAllocation,
+    TransportType
+)
+from app.models.user import User
+from app.schemas.transport import TransportPaymentRequest
+from app.services import receipt_pipeline as receipt_pipeline_module
+from app.services.receipt_pipeline import ReceiptPipeline, render_receipt_pdf
+
+
+FEE_PAYLOAD = {
+    "payment_data": {
+        "id": 1, "amount": 2000.0, "payment_method": "Cash", "payment_date": date(2025, 6, 5),
+        "payment_date_str": "05-Jun-2025", "transaction_id": "N/A", "receipt_number": "FEE-000001"
+    },
+    "student_data": {
+        "name": "Asha Verma", "admission_number": "ADM001", "class_name": "Class 5 - A",
+        "roll_number": "12", "father_name": "Ravi Verma", "mobile": "9876543210",
+        "father_phone": "9876543210", "address": ""
+    },
+    "month_breakdown": [
+        {"month_name": "April", "monthly_fee": Decimal("1000.00"), "previous_paid": 0.0,
+         "allocated_amount": 1000.0, "remaining_balance": 0.0, "status": "Paid"},
+        {"month_name": "May", "monthly_fee": Decimal("1000.00"), "previous_paid": 0.0,
+         "allocated_amount": 1000.0, "remaining_balance": 0.0, "status": "Paid"},
+    ],
+    "fee_summary": {"total_annual_fee": 12000.0, "total_paid": 2000.0, "balance_remaining": 10000.0},
+    "transport_data": None,
+    "created_by_name": "Admin User"
+}
+
+
+class FakeDelivery:
+    """Stands in for Cloudinary and Twilio, failing the first N calls of each step"""
+
+    def __init__(self, upload_failures=0, whatsapp_results=None):
+        self.upload_failures = upload_failures
+        self.whatsapp_results = list(whatsapp_results or [])
+        self.uploads = []
+        self.messages = []
+
+    async def upload(self, job, pdf_bytes):
+        self.uploads.append((job.receipt_number, pdf_bytes))
+        if self.upload_failures:
+            self.upload_failures -= 1
+            raise ConnectionError("Cloudinary timeout")
+        return f"https://cdn.example.com/{job.receipt_number}.pdf", f"receipts/{job.receipt_number}"
+
+    async def send(self, job):
+        self.messages.append((job.whatsapp_phone, job.receipt_url))
+        if self.whatsapp_results:
+            return self.whatsapp_results.pop(0)
+        return {"success": True, "status": "SENT", "message_sid": "SM123", "error": None}
+
+
+async def seed_payment(session):
+    session.add(FeePayment(
+        id=1, fee_record_id=1, amount=Decimal("2000.00"), payment_method_id=1,
+        payment_date=date(2025, 6, 5)
+    ))
+
+
+@pytest_asyncio.fixture
+async def pipeline_db(sqlite_session_factory):
+    session_factory, _ = await sqlite_session_factory([FeePayment, TransportPayment, ReceiptJob], seed_payment)
+    return session_factory
+
+
+def make_pipeline(session_factory, delivery, monkeypatch):
+    pipeline = ReceiptPipeline(session_factory=session_factory)
+    monkeypatch.setattr(pipeline, "_upload_pdf", delivery.upload)
+    monkeypatch.setattr(pipeline, "_send_whatsapp", delivery.send)
+    return pipeline
+
+
+async def enqueue_fee_job(session_factory, pipeline, phone="9876543210"):
+    async with session_factory() as db:
+        job = pipeline.enqueue(
+            db, job_type="FEE", receipt_number="FEE-000001", payload=FEE_PAYLOAD,
+            whatsapp={"phone": phone, "student_name": "Asha Verma", "amount": 2000.0},
+            fee_payment_id=1
+        )
+        await db.commit()
+        return job.id
+
+
+async def load_job(session_factory, job_id):
+    async with session_factory() as db:
+        return await receipt_job_crud.get(db, id=job_id)
+
+
+class TestReceiptRendering:
+    """Receipt jobs carry everything the generator needs as JSON"""
+
+    def test_render_fee_receipt_from_json_payload(self):
+        from fastapi.encoders import jsonable_encoder
+
+        pdf_bytes = render_receipt_pdf("FEE", jsonable_encoder(FEE_PAYLOAD))
+        assert pdf_bytes.startswith(b"%PDF")
+
+
+class TestReceiptPipeline:
+    """Test queue processing, retries and resend"""
+
+    @pytest.mark.asyncio
+    async def test_job_renders_uploads_and_sends(self, pipeline_db, monkeypatch):
+        delivery = FakeDelivery()
+        pipeline = make_pipeline(pipeline_db, delivery, monkeypatch)
+        job_id = await enqueue_fee_job(pipeline_db, pipeline)
+
+        assert await pipeline.run_once() == 1
+
+        job = await load_job(pipeline_db, job_id)
+        assert job.status == "COMPLETED"
+        assert job.receipt_status == "GENERATED"
+        assert job.whatsapp_status == "SENT"
+        assert job.whatsapp_message_sid == "SM123"
+        assert delivery.uploads[0][1].startswith(b"%PDF")
+        assert delivery.messages == [("9876543210", "https://cdn.example.com/FEE-000001.pdf")]
+
+        async with pipeline_db() as db:
+            payment = await db.get(FeePayment, 1)
+            assert payment.receipt_number == "FEE-000001"
+            assert payment.receipt_cloudinary_url == "https://cdn.example.com/FEE-000001.pdf"
+
+    @pytest.mark.asyncio
+    async def test_failed_upload_is_retried_with_backoff(self, pipeline_db, monkeypatch):
+        delivery = FakeDelivery(upload_failures=1)
+        pipeline = make_pipeline(pipeline_db, delivery, monkeypatch)
+        job_id = await enqueue_fee_job(pipeline_db, pipeline)
+
+        await pipeline.run_once()
+        job = await load_job(pipeline_db, job_id)
+        assert job.status == "PENDING"
+        assert job.attempts == 1
+        assert "Cloudinary timeout" in job.last_error
+        assert job.next_attempt_at > datetime.now()
+
+        # Not due yet
+        assert await pipeline.run_once() == 0
+
+        await pipeline.run_once(now=job.next_attempt_at + timedelta(seconds=1))
+        job = await load_job(pipeline_db, job_id)
+        assert job.status == "COMPLETED"
+        assert job.attempts == 2
+        assert len(delivery.messages) == 1
+
+    @pytest.mark.asyncio
+    async def test_whatsapp_retry_does_not_upload_again(self, pipeline_db, monkeypatch):
+        delivery = FakeDelivery(whatsapp_results=[
+            {"success": False, "status": "TWILIO_ERROR", "error": "Twilio error (20429): Too Many Requests"}
+        ])
+        pipeline = make_pipeline(pipeline_db, delivery, monkeypatch)
+        job_id = await enqueue_fee_job(pipeline_db, pipeline)
+
+        await pipeline.run_once()
+        job = await load_job(pipeline_db, job_id)
+        assert job.status == "PENDING"
+        assert job.receipt_status == "GENERATED"
+
+        await pipeline.run_once(now=job.next_attempt_at + timedelta(seconds=1))
+        job = await load_job(pipeline_db, job_id)
+        assert job.status == "COMPLETED"
+        assert job.whatsapp_status == "SENT"
+        assert len(delivery.uploads) == 1
+        assert len(delivery.messages) == 2
+
+    @pytest.mark.asyncio
+    async def test_job_fails_after_max_attempts(self, pipeline_db, monkeypatch):
+        delivery = FakeDelivery(upload_failures=10)
+        pipeline = make_pipeline(pipeline_db, delivery, monkeypatch)
+        job_id = await enqueue_fee_job(pipeline_db, pipeline)
+
+        now = datetime.now()
+        for _ in range(5):
+            await pipeline.run_once(now=now)
+            now += timedelta(days=1)
+
+        job = await load_job(pipeline_db, job_id)
+        assert job.status == "FAILED"
+        assert job.attempts == 5
+        assert job.receipt_status == "FAILED"
+        assert job.whatsapp_status == "FAILED"
+        assert pipeline.describe(job)["status"] == "FAILED"
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("status,error", [
+        ("INVALID_PHONE", "Invalid phone number: 123"),
+        # Twilio timed out after the request was sent: a retry could deliver it twice
+        ("UNCONFIRMED", "twilio: no response within 15.0s (the call may still complete)"),
+    ])
+    async def test_terminal_whatsapp_outcomes_are_not_retried(self, pipeline_db, monkeypatch, status, error):
+        delivery = FakeDelivery(whatsapp_results=[{"success": False, "status": status, "error": error}])
+        pipeline = make_pipeline(pipeline_db, delivery, monkeypatch)
+        job_id = await enqueue_fee_job(pipeline_db, pipeline)
+
+        await pipeline.run_once()
+        job = await load_job(pipeline_db, job_id)
+        assert job.status == "COMPLETED"
+        assert job.whatsapp_status == status
+        assert job.last_error == error
+
+    @pytest.mark.asyncio
+    async def test_no_phone_skips_whatsapp(self, pipeline_db, monkeypatch):
+        delivery = FakeDelivery()
+        pipeline = make_pipeline(pipeline_db, delivery, monkeypatch)
+        job_id = await enqueue_fee_job(pipeline_db, pipeline, phone=None)
+
+        await pipeline.run_once()
+        job = await load_job(pipeline_db, job_id)
+        assert job.status == "COMPLETED"
+        assert job.whatsapp_status == "NO_PHONE"
+        assert delivery.messages == []
+
+    @pytest.mark.asyncio
+    async def test_resend_only_repeats_whatsapp(self, pipeline_db, monkeypatch):
+        delivery = FakeDelivery()
+        pipeline = make_pipeline(pipeline_db, delivery, monkeypatch)
+        job_id = await enqueue_fee_job(pipeline_db, pipeline)
+        await pipeline.run_once()
+
+        async with pipeline_db() as db:
+            payment = await db.get(FeePayment, 1)
+            job = await receipt_job_crud.get_latest_for_fee_payment(db, fee_payment_id=1)
+            pipeline.queue_whatsapp_resend(
+                db, job=job, fee_payment=payment, phone="9123456780",
+                student_name="Asha Verma", amount=2000.0
+            )
+            await db.commit()
+
+        await pipeline.run_once()
+        job = await load_job(pipeline_db, job_id)
+        assert job.status == "COMPLETED"
+        assert len(delivery.uploads) == 1
+        assert delivery.messages[-1] == ("9123456780", "https://cdn.example.com/FEE-000001.pdf")
+
+    @pytest.mark.asyncio
+    async def test_resend_for_payment_receipted_before_queue(self, pipeline_db, monkeypatch):
+        delivery = FakeDelivery()
+        pipeline = make_pipeline(pipeline_db, delivery, monkeypatch)
+
+        async with pipeline_db() as db:
+            payment = await db.get(FeePayment, 1)
+            payment.receipt_cloudinary_url = "https://cdn.example.com/legacy.pdf"
+            assert pipeline.describe(None, receipt_url=payment.receipt_cloudinary_url)["status"] == "GENERATED"
+
+            pipeline.queue_whatsapp_resend(
+                db, job=None, fee_payment=payment, phone="9123456780",
+                student_name="Asha Verma", amount=2000.0
+            )
+            await db.commit()
+
+        await pipeline.run_once()
+        assert delivery.uploads == []
+        assert delivery.messages == [("9123456780", "https://cdn.example.com/legacy.pdf")]
+
+    @pytest.mark.asyncio
+    async def test_stale_processing_jobs_are_released(self, pipeline_db, monkeypatch):
+        pipeline = make_pipeline(pipeline_db, FakeDelivery(), monkeypatch)
+        job_id = await enqueue_fee_job(pipeline_db, pipeline)
+
+        async with pipeline_db() as db:
+            claimed = await receipt_job_crud.claim_due_jobs(db, limit=5, now=datetime.now())
+            assert [job.id for job in claimed] == [job_id]
+
+        async with pipeline_db() as db:
+            released = await receipt_job_crud.release_stale_jobs(
+                db, locked_before=datetime.now() + timedelta(minutes=1)
+            )
+        assert released == 1
+        assert (await load_job(pipeline_db, job_id)).status == "PENDING"
+
+    @pytest.mark.asyncio
+    async def test_worker_loop_releases_stale_jobs_periodically(self, pipeline_db, monkeypatch):
+        monkeypatch.setattr(receipt_pipeline_module.settings, "RECEIPT_WORKER_PROCESSES", 0)
+        pipeline = make_pipeline(pipeline_db, FakeDelivery(), monkeypatch)
+        job_id = await enqueue_fee_job(pipeline_db, pipeline)
+
+        # Claimed by a worker that hung 20 minutes ago
+        async with pipeline_db() as db:
+            [job] = await receipt_job_crud.claim_due_jobs(db, limit=5, now=datetime.now())
+            job.locked_at = datetime.now() - timedelta(minutes=20)
+            await db.commit()
+
+        await pipeline.start()
+        await asyncio.sleep(0.5)
+        await pipeline.stop()
+
+        job = await load_job(pipeline_db, job_id)
+        assert job.status == "COMPLETED"
+        assert job.attempts == 2
+
+
+class TestFailedCommit:
+    @pytest.mark.asyncio
+    async def test_failed_completion_commit_schedules_a_retry(self, pipeline_db, monkeypatch):
+        delivery = FakeDelivery()
+        pipeline = make_pipeline(pipeline_db, delivery, monkeypatch)
+        job_id = await enqueue_fee_job(pipeline_db, pipeline)
+        failures = [ConnectionError("connection lost during commit")]
+
+        def fail_completion_once(session, flush_context, instances):
+            completed = any(isinstance(obj, ReceiptJob) and obj.status == "COMPLETED" for obj in session.dirty)
+            if completed and failures:
+                raise failures.pop()
+
+        event.listen(Session, "before_flush", fail_completion_once)
+        try:
+            await pipeline.run_once()
+        finally:
+            event.remove(Session, "before_flush", fail_completion_once)
+
+        job = await load_job(pipeline_db, job_id)
+        assert job.status == "PENDING" and job.locked_at is None
+        assert "connection lost during commit" in job.last_error
+        # Delivered before the failed commit: the retry must not send it again
+        assert job.whatsapp_status == "SENT"
+
+        await pipeline.run_once(now=job.next_attempt_at + timedelta(seconds=1))
+        assert (await load_job(pipeline_db, job_id)).status == "COMPLETED"
+        assert len(delivery.messages) == 1
+
+
+async def seed_transport_student(session):
+    session.add_all([
+        PaymentMethod(id=1, name="CASH", description="Cash"),
+        User(id=1, email="admin@sunrise.com", password="hash", first_name="Admin",
+             last_name="User", user_type_id=1),
+        Student(id=1, admission_number="ADM001", first_name="Asha", last_name="Verma", class_id=5,
+                section="A", date_of_birth=date(2015, 1, 1), gender_id=2, session_year_id=4,
+                father_name="Ravi", mother_name="Sita", father_phone="9876543210",
+                admission_date=date(2025, 4, 1)),
+        TransportType(id=1, name="VAN", description="Van", base_monthly_fee=Decimal("800.00")),
+        StudentTransportEnrollment(
+            id=1, student_id=1, session_year_id=4, transport_type_id=1,
+            enrollment_date=date(2025, 4, 1), monthly_fee=Decimal("800.00")
+        ),
+    ])
+    session.add_all([
+        TransportMonthlyTracking(
+            enrollment_id=1, student_id=1, session_year_id=4, academic_month=month, academic_year=2025,
+            month_name=name, monthly_amount=Decimal("800.00"), paid_amount=Decimal("0.00"),
+            due_date=date(2025, month, 10)
+        )
+        for month, name in ((4, "April"), (5, "May"))
+    ])
+
+
+class TestPaymentCommitsWithJob:
+    """The receipt job is committed in the payment's transaction"""
+
+    @pytest.mark.asyncio
+    async def test_failure_after_payment_commit_keeps_the_job(self, sqlite_session_factory, monkeypatch):
+        async def seed(session):
+            await seed_core_metadata(session)
+            await seed_transport_student(session)
+
+        session_factory, _ = await sqlite_session_factory([
+            SessionYear, Gender, Class, PaymentMethod, User, Student, TransportType,
+            StudentTransportEnrollment, TransportMonthlyTracking, TransportPayment,
+            TransportPaymentAllocation, FeeRecord, FeePayment, MonthlyFeeTracking, StudentFeeBalance, ReceiptJob
+        ], seed)
+
+        def crash_after_commit():
+            raise RuntimeError("worker crashed after the payment commit")
+
+        monkeypatch.setattr(transport_endpoints.receipt_pipeline, "notify", crash_after_commit)
+
+        async with session_factory() as db:
+            admin = await db.get(User, 1)
+            with pytest.raises(HTTPException) as error:
+                await transport_endpoints.pay_monthly_transport(
+                    student_id=1,
+                    payment_data=TransportPaymentRequest(
+                        amount=Decimal("1600.00"), payment_method_id=1, selected_months=[4, 5]
+                    ),
+                    session_year_id=4, db=db, current_user=admin
+                )
+        assert "worker crashed" in error.value.detail
+
+        async with session_factory() as db:
+            payment = (await db.execute(select(TransportPayment))).scalar_one()
+            job = (await db.execute(select(ReceiptJob))).scalar_one()
+        assert job.transport_payment_id == payment.id
+        assert job.status == "PENDING" and job.whatsapp_phone == "9876543210"
+        assert payment.receipt_number == job.receipt_number == f"TRANSPORT-{payment.id:06d}"
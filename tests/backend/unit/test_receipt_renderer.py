@@ -0,0 +1,164 @@
+"""
+Test cases for the shared receipt renderer and the content-addressed receipt PDF cache
+"""
+
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+from fastapi.encoders import jsonable_encoder
+from reportlab import rl_config
+
+from app.models.receipt_job import ReceiptJob
+from app.services import receipt_renderer as renderer_module
+from app.services.receipt_generator import ReceiptGenerator
+from app.services.receipt_pipeline import ReceiptPipeline, render_receipt_pdf
+from app.services.receipt_renderer import (
+    ReceiptPDFCache, ReceiptRenderer, receipt_cache_key, receipt_renderer
+)
+from app.services.transport_receipt_generator import TransportReceiptGenerator
+
+FEE_PAYLOAD = {
+    "payment_data": {"id": 1, "amount": 2000.0, "payment_date": date(2025, 6, 5),
+                     "payment_date_str": "05-Jun-2025", "receipt_number": "FEE-000001"},
+    "student_data": {"name": "Asha Verma", "admission_number": "ADM001", "class_name": "Class 5 - A",
+                     "roll_number": "12", "father_name": "Ravi Verma", "mobile": "9876543210"},
+    "month_breakdown": [
+        {"month_name": "April", "monthly_fee": 1000.0, "previous_paid": 0.0, "allocated_amount": 1000.0,
+         "remaining_balance": 0.0},
+        {"month_name": "May", "monthly_fee": 1000.0, "previous_paid": 0.0, "allocated_amount": 1000.0,
+         "remaining_balance": 0.0},
+    ],
+    "fee_summary": {"total_annual_fee": 12000.0, "total_paid": 2000.0, "balance_remaining": 10000.0},
+    "transport_data": None
+}
+
+TRANSPORT_PAYLOAD = {
+    "payment_data": {"id": 3, "amount": 800.0, "payment_date": "05-Jun-2025", "receipt_number": "TRANSPORT-000003"},
+    "student_data": {"name": "Asha Verma", "admission_number": "ADM001", "class_name": "Class 5 - A"},
+    "transport_data": {"transport_type": "Van", "monthly_fee": 800.0, "total_fee": 8000.0,
+                       "total_paid": 800.0, "balance": 7200.0},
+    "month_breakdown": [{"month_name": "April", "monthly_amount": 800.0, "allocated_amount": 800.0,
+                         "balance_amount": 0.0}]
+}
+
+
+@pytest.fixture
+def invariant_pdfs(monkeypatch):
+    """Reproducible PDFs (no timestamps or random document ids)"""
+    monkeypatch.setattr(rl_config, "invariant", 1)
+
+
+def render_fee(payload=FEE_PAYLOAD) -> bytes:
+    return render_receipt_pdf("FEE", jsonable_encoder(payload))
+
+
+class TestSharedRenderer:
+    def test_generators_share_styles_logo_and_header(self):
+        assert ReceiptGenerator().styles is TransportReceiptGenerator().styles is receipt_renderer.styles
+        assert receipt_renderer.logo is not None
+        assert ReceiptGenerator()._create_header() is TransportReceiptGenerator()._create_header()
+
+    def test_reused_header_renders_identical_receipts(self, invariant_pdfs):
+        first = render_fee()
+        second = render_fee()
+
+        assert first == second
+        # The logo is embedded once per document, as an ASCII85 JPEG
+        assert first.count(b"/Subtype /Image") == 1
+        assert b"/ASCII85Decode /DCTDecode" in first
+
+    def test_transport_receipt_uses_the_same_logo(self, invariant_pdfs):
+        pdf = render_receipt_pdf("TRANSPORT", jsonable_encoder(TRANSPORT_PAYLOAD))
+
+        assert pdf.startswith(b"%PDF")
+        assert f"FormXob.{receipt_renderer.logo.name}".encode() in pdf
+
+    def test_concurrent_threads_render_the_same_pdf(self, invariant_pdfs):
+        expected = render_fee()
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            results = list(pool.map(lambda _: render_fee(), range(8)))
+
+        assert all(result == expected for result in results)
+
+    def test_missing_logo_falls_back_to_text_header(self, invariant_pdfs, monkeypatch, tmp_path):
+        renderer = ReceiptRenderer(logo_path=str(tmp_path / "missing.jpeg"))
+        monkeypatch.setattr("app.services.receipt_generator.receipt_renderer", renderer)
+
+        pdf = render_fee()
+
+        assert renderer.logo is None
+        assert b"/Subtype /Image" not in pdf
+
+
+class TestReceiptCacheKey:
+    def test_key_ignores_whatsapp_block_but_not_receipt_content(self):
+        key = receipt_cache_key("FEE", 1, FEE_PAYLOAD)
+
+        assert receipt_cache_key("FEE", 1, {**FEE_PAYLOAD, "whatsapp": {"phone": "9000000000"}}) == key
+        assert receipt_cache_key("FEE", 2, FEE_PAYLOAD) != key
+        changed = {**FEE_PAYLOAD, "fee_summary": {**FEE_PAYLOAD["fee_summary"], "total_paid": 3000.0}}
+        assert receipt_cache_key("FEE", 1, changed) != key
+
+    def test_key_includes_template_version(self, monkeypatch):
+        key = receipt_cache_key("FEE", 1, FEE_PAYLOAD)
+        monkeypatch.setattr(renderer_module, "RECEIPT_TEMPLATE_VERSION", "next")
+
+        assert receipt_cache_key("FEE", 1, FEE_PAYLOAD) != key
+
+
+class TestReceiptPDFCache:
+    def test_lru_is_bounded_by_size(self):
+        cache = ReceiptPDFCache(max_bytes=10, directory="")
+        cache.put("a", b"aaaa")
+        cache.put("b", b"bbbb")
+        assert cache.get("a") == b"aaaa"
+        cache.put("c", b"cccc")
+
+        assert cache.get("b") is None
+        assert cache.get("a") == b"aaaa" and cache.get("c") == b"cccc"
+        assert cache.get_stats()["size_bytes"] == 8
+
+    def test_directory_is_shared_between_instances(self, tmp_path):
+        ReceiptPDFCache(max_bytes=1024, directory=str(tmp_path)).put("FEE-1-v-abc", b"%PDF-1.4")
+        other_worker = ReceiptPDFCache(max_bytes=1024, directory=str(tmp_path))
+
+        assert other_worker.get("FEE-1-v-abc") == b"%PDF-1.4"
+        assert other_worker.get_stats()["hits"] == 1
+        assert list(tmp_path.iterdir()) == [tmp_path / "FEE-1-v-abc.pdf"]
+
+    def test_get_or_render_renders_once(self):
+        cache = ReceiptPDFCache(max_bytes=1024, directory="")
+        renders = []
+
+        def render():
+            renders.append(1)
+            return b"%PDF"
+
+        assert cache.get_or_render("k", render) == cache.get_or_render("k", render) == b"%PDF"
+        assert len(renders) == 1
+
+
+class TestPipelineRendersOnce:
+    @pytest.mark.asyncio
+    async def test_reprint_and_retry_reuse_the_cached_pdf(self, monkeypatch):
+        pipeline = ReceiptPipeline(
+            session_factory=object(), pdf_cache=ReceiptPDFCache(max_bytes=10 * 1024 * 1024, directory="")
+        )
+        renders = []
+        render_pdf = pipeline._render_pdf
+
+        async def counting_render(job_type, payload):
+            renders.append(job_type)
+            return await render_pdf(job_type, payload)
+
+        monkeypatch.setattr(pipeline, "_render_pdf", counting_render)
+        job = ReceiptJob(job_type="FEE", fee_payment_id=1, receipt_number="FEE-000001",
+                         payload=jsonable_encoder({**FEE_PAYLOAD, "whatsapp": {"phone": "9876543210"}}))
+
+        first = await pipeline.render_pdf(job)
+        job.payload = {**job.payload, "whatsapp": {"phone": "9123456789"}}
+        again = await pipeline.render_pdf(job)
+
+        assert first == again and first.startswith(b"%PDF")
+        assert renders == ["FEE"]
@@ -0,0 +1,187 @@
+"""
+Test cases for the streamed UDISE and fee tracking report exports and the NDJSON writer
+"""
+
+import json
+import pytest
+import pytest_asyncio
+from datetime import date
+from decimal import Decimal
+
+from fixtures.sqlite_db import seed_core_metadata
+from app.api.v1.endpoints import reports
+from app.crud.crud_report import report_crud
+from app.models.fee import StudentFeeBalance
+from app.models.metadata import Class, Gender, SessionYear
+from app.models.student import Student
+from app.models.transport import StudentTransportEnrollment, TransportType
+from app.utils.report_export import EXPORT_MEDIA_TYPES, stream_export, stream_ndjson
+
+
+async def as_batches(*batches):
+    for batch in batches:
+        yield batch
+
+
+async def seed_students(session):
+    await seed_core_metadata(session)
+    session.add(TransportType(id=1, name="VAN", description="Van"))
+    session.add_all([
+        Student(
+            id=index, admission_number=f"ADM{index:03d}", first_name=f"Student{index}", last_name="Rao",
+            date_of_birth=date(2014, 6, index), gender_id=1 + index % 2, class_id=1 + index % 3,
+            section="A", session_year_id=4, father_name="Father", mother_name="Mother",
+            admission_date=date(2025, 4, 1), is_deleted=(index == 7)
+        )
+        # Inserted out of admission order
+        for index in (5, 3, 9, 1, 7, 2, 8, 4, 6)
+    ])
+    session.add(StudentTransportEnrollment(
+        id=1, student_id=2, session_year_id=4, transport_type_id=1,
+        enrollment_date=date(2025, 4, 1), monthly_fee=Decimal("800.00")
+    ))
+    session.add_all([
+        StudentFeeBalance(
+            student_id=index, session_year_id=4, as_of_date=date(2025, 9, 1),
+            tuition_expected=Decimal("12000.00"), tuition_paid=Decimal(paid),
+            tuition_balance=Decimal("12000.00") - Decimal(paid),
+            transport_expected=Decimal("8000.00") if index == 2 else 0,
+            transport_paid=Decimal("8000.00") if index == 2 else 0,
+        )
+        for index, paid in ((1, "12000.00"), (2, "12000.00"), (3, "4000.00"), (4, "0"), (5, "12000.00"))
+    ])
+
+
+@pytest_asyncio.fixture
+async def report_db(sqlite_session_factory):
+    session_factory, _ = await sqlite_session_factory([
+        SessionYear, Gender, Class, Student, StudentFeeBalance, TransportType, StudentTransportEnrollment
+    ], seed_students)
+    return session_factory
+
+
+class TestNDJSONWriter:
+    @pytest.mark.asyncio
+    async def test_one_object_per_line_per_batch(self):
+        columns = [("name", "Name"), ("amount", "Amount"), ("paid_on", "Paid On")]
+        batches = as_batches(
+            [{"name": "Asha", "amount": Decimal("1000.50"), "paid_on": date(2025, 6, 2), "extra": 1}],
+            [],
+            [{"name": "Rohan", "amount": None, "paid_on": None}],
+        )
+
+        chunks = [chunk async for chunk in stream_ndjson(columns, batches)]
+
+        assert len(chunks) == 2
+        lines = b"".join(chunks).decode("utf-8").splitlines()
+        assert [json.loads(line) for line in lines] == [
+            {"name": "Asha", "amount": 1000.5, "paid_on": "2025-06-02"},
+            {"name": "Rohan", "amount": None, "paid_on": None},
+        ]
+
+    @pytest.mark.asyncio
+    async def test_stream_export_dispatches_by_format(self):
+        columns = [("name", "Name")]
+        rows = [{"name": "Asha"}]
+
+        csv_content = b"".join([chunk async for chunk in stream_export("csv", columns, as_batches(rows))])
+        ndjson_content = b"".join([chunk async for chunk in stream_export("ndjson", columns, as_batches(rows))])
+        xlsx_content = b"".join([chunk async for chunk in stream_export("xlsx", columns, as_batches(rows))])
+
+        assert csv_content.decode("utf-8-sig").splitlines() == ["Name", "Asha"]
+        assert ndjson_content == b'{"name": "Asha"}\n'
+        assert xlsx_content[:2] == b"PK"
+        assert set(EXPORT_MEDIA_TYPES) == {"csv", "xlsx", "ndjson"}
+
+
+class TestUDISEExport:
+    @pytest.mark.asyncio
+    async def test_streams_every_student_in_admission_order(self, report_db):
+        async with report_db() as db:
+            batches = [batch async for batch in report_crud.stream_udise_records(db, batch_size=3)]
+            paged, total = await report_crud.get_udise_report_data(db, per_page=100)
+
+        assert [len(batch) for batch in batches] == [3, 3, 2]
+        records = [record for batch in batches for record in batch]
+        # Soft deleted student 7 is excluded
+        assert [record["admission_number"] for record in records] == [
+            f"ADM{index:03d}" for index in (1, 2, 3, 4, 5, 6, 8, 9)
+        ]
+        assert records == paged and total == 8
+        assert records[0]["full_name"] == "Student1 Rao"
+        assert records[0]["class_name"] == "Class 2"
+        assert records[0]["gender_name"] == "Female"
+        assert records[0]["session_year_name"] == "2025-26"
+
+    @pytest.mark.asyncio
+    async def test_filters_match_the_paged_report(self, report_db):
+        async with report_db() as db:
+            records = [
+                record async for batch in report_crud.stream_udise_records(db, class_id=1, gender_id=2)
+                for record in batch
+            ]
+
+        assert [record["id"] for record in records] == [3, 9]
+
+    @pytest.mark.asyncio
+    async def test_endpoint_streams_from_its_own_session(self, report_db, monkeypatch):
+        opened = []
+
+        def session_factory():
+            opened.append(True)
+            return report_db()
+
+        monkeypatch.setattr(reports, "read_router", session_factory)
+        response = await reports.export_student_udise_report(
+            format="ndjson", session_year_id=None, class_id=None, section=None, gender_id=None,
+            is_active=None, search=None, current_user=None
+        )
+
+        # The session is opened when the body is streamed, not by the endpoint
+        assert opened == []
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        assert opened == [True]
+        assert len(body.decode("utf-8").splitlines()) == 8
+
+
+class TestFeeTrackingExport:
+    @pytest.mark.asyncio
+    async def test_streams_the_same_rows_as_the_paged_report(self, report_db):
+        async with report_db() as db:
+            batches = [
+                batch async for batch in report_crud.stream_fee_tracking_records(db, session_year_id=4, batch_size=4)
+            ]
+            first, total, _ = await report_crud.get_fee_tracking_report_data(db, session_year_id=4, per_page=5)
+            second, _, _ = await report_crud.get_fee_tracking_report_data(db, session_year_id=4, page=2, per_page=5)
+
+        assert [len(batch) for batch in batches] == [4, 4]
+        records = [record for batch in batches for record in batch]
+        assert records == first + second and total == 8
+
+        by_student = {record["student_id"]: record for record in records}
+        assert by_student[2]["transport_opted"] and by_student[2]["transport_payment_status"] == "Paid"
+        assert by_student[2]["total_amount"] == Decimal("20000.00")
+        assert by_student[3]["fee_payment_status"] == "Partial"
+        # No balance row yet
+        assert by_student[6]["total_fee_amount"] == Decimal("0")
+
+    @pytest.mark.asyncio
+    async def test_post_query_filters_apply_per_batch(self, report_db):
+        async with report_db() as db:
+            records = [
+                record
+                async for batch in report_crud.stream_fee_tracking_records(
+                    db, session_year_id=4, pending_only=True, batch_size=2
+                )
+                for record in batch
+            ]
+            paid = [
+                record
+                async for batch in report_crud.stream_fee_tracking_records(
+                    db, session_year_id=4, payment_status="paid", batch_size=2
+                )
+                for record in batch
+            ]
+
+        assert sorted(record["student_id"] for record in records) == [3, 4]
+        assert sorted(record["student_id"] for record in paid) == [1, 2, 5]
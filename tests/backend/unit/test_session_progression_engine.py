@@ -0,0 +1,262 @@
+"""
+Test cases for set-based, chunked and resumable bulk session progression
+"""
+
+import pytest
+import pytest_asyncio
+from datetime import date
+from sqlalchemy import select, update
+
+from fixtures.sqlite_db import seed_core_metadata, count_queries
+from app.crud.crud_session_progression import (
+    bulk_progress_students, get_class_transition_map, rollback_progression_batch
+)
+from app.models.metadata import Class, Gender, SessionYear
+from app.models.progression_action import ProgressionAction
+from app.models.progression_batch import ProgressionBatch, ProgressionBatchItem
+from app.models.student import Student
+from app.models.student_session_history import StudentSessionHistory
+from app.services import progression_engine as engine_module
+from app.services.progression_engine import ProgressionEngine
+
+
+def promote(student_id: int, **extra):
+    return {"student_id": student_id, "progression_action_id": 1, "target_section": "A", **extra}
+
+
+async def seed_school(session):
+    await seed_core_metadata(session)
+    session.add_all([
+        ProgressionAction(id=1, name="PROMOTED", display_order=1, creates_new_session=True),
+        ProgressionAction(id=2, name="RETAINED", display_order=2, creates_new_session=True),
+        ProgressionAction(id=3, name="DEMOTED", display_order=3, creates_new_session=True),
+        ProgressionAction(id=4, name="GRADUATED", display_order=4, creates_new_session=False),
+        ProgressionAction(id=5, name="RETIRED_ACTION", display_order=5, is_active=False),
+    ])
+    session.add_all([
+        Student(
+            id=student_id, admission_number=f"ADM{student_id:03d}", first_name=f"Child{student_id}",
+            last_name="Nair", date_of_birth=date(2015, 1, 1), gender_id=1,
+            class_id=5 if student_id < 20 else 12, section="B", roll_number=str(student_id),
+            session_year_id=4, father_name="Father", mother_name="Mother", admission_date=date(2025, 4, 1)
+        )
+        for student_id in list(range(1, 11)) + [20]
+    ])
+
+
+@pytest_asyncio.fixture
+async def progression_db(sqlite_session_factory):
+    session_factory, engine = await sqlite_session_factory([
+        SessionYear, Gender, Class, ProgressionAction, Student, StudentSessionHistory,
+        ProgressionBatch, ProgressionBatchItem
+    ], seed_school)
+    return engine, session_factory
+
+
+class TestClassTransitions:
+    @pytest.mark.asyncio
+    async def test_skips_inactive_classes(self, progression_db):
+        _, session_factory = progression_db
+
+        async with session_factory() as db:
+            await db.execute(update(Class).where(Class.id == 6).values(is_active=False))
+            await db.commit()
+            transitions = await get_class_transition_map(db)
+
+        assert transitions[5]["next"] == 7
+        assert transitions[7]["previous"] == 5
+        assert transitions[1]["previous"] is None and transitions[12]["next"] is None
+        assert transitions[6]["next"] == 7
+
+
+class TestBulkProgression:
+    @pytest.mark.asyncio
+    async def test_progresses_students_and_records_history(self, progression_db):
+        _, session_factory = progression_db
+
+        async with session_factory() as db:
+            result = await bulk_progress_students(
+                db, 4, 5,
+                [
+                    promote(1, target_roll_number="7"),
+                    {"student_id": 2, "progression_action_id": 2},
+                    {"student_id": 3, "progression_action_id": 3, "target_section": "C"},
+                    {"student_id": 20, "progression_action_id": 4},
+                    promote(4, target_class_id=9),
+                ],
+                progressed_by=1
+            )
+            students = {s.id: s for s in (await db.execute(select(Student))).scalars().all()}
+            history = {h.student_id: h for h in (await db.execute(select(StudentSessionHistory))).scalars().all()}
+
+        assert (result["successful_count"], result["failed_count"], result["status"]) == (5, 0, "COMPLETED")
+        assert (students[1].session_year_id, students[1].class_id, students[1].section, students[1].roll_number) == (5, 6, "A", "7")
+        assert (students[1].original_session_year_id, students[1].original_class_id) == (4, 5)
+        assert (students[2].class_id, students[3].class_id, students[4].class_id) == (5, 4, 9)
+        # Graduation deactivates without moving the student
+        assert (students[20].session_year_id, students[20].is_active) == (4, False)
+
+        assert (history[1].session_year_id, history[1].class_id, history[1].section, history[1].roll_number) == (4, 5, "B", "1")
+        assert history[1].progression_batch_id == result["batch_id"]
+        assert history[1].snapshot_data == {
+            "class_id": 5, "class_name": "Class 5", "section": "B", "roll_number": "1",
+            "session_year_id": 4, "session_year_name": "2025-26"
+        }
+        assert [r["student_name"] for r in result["results"]][:2] == ["Child1 Nair", "Child2 Nair"]
+
+    @pytest.mark.asyncio
+    async def test_invalid_entries_fail_without_stopping_the_batch(self, progression_db):
+        _, session_factory = progression_db
+
+        async with session_factory() as db:
+            first = await bulk_progress_students(db, 4, 5, [promote(5)], progressed_by=1)
+            result = await bulk_progress_students(
+                db, 4, 5,
+                [promote(99), promote(6), promote(6), {"student_id": 7, "progression_action_id": 5},
+                 promote(5), promote(8, target_class_id=42)],
+                progressed_by=1
+            )
+
+        assert first["successful_count"] == 1
+        assert (result["successful_count"], result["failed_count"]) == (1, 5)
+        assert [r["error_message"] for r in result["results"]] == [
+            "Student not found",
+            None,
+            "Duplicate student in request",
+            "Invalid progression action",
+            "Student is not in the source session year",
+            "Invalid target class",
+        ]
+
+
+class TestChunkedRun:
+    @pytest.mark.asyncio
+    async def test_statements_per_chunk_do_not_grow_with_students(self, progression_db):
+        engine, session_factory = progression_db
+        progression = ProgressionEngine(session_factory=session_factory, chunk_size=4)
+
+        async with session_factory() as db:
+            batch_id = await progression.stage(db, 4, 5, [promote(i) for i in range(1, 11)], progressed_by=1)
+            with count_queries(engine) as counter:
+                status = await progression.run(db, batch_id)
+
+        # claim + batch load, per chunk (3): select ids + 6 statements, final select, complete, status
+        assert counter.count == 2 + 3 * 7 + 1 + 2
+        assert (status["status"], status["processed_count"], status["progress_percentage"]) == ("COMPLETED", 10, 100.0)
+
+    @pytest.mark.asyncio
+    async def test_failed_chunk_is_resumable(self, progression_db, monkeypatch):
+        _, session_factory = progression_db
+        progression = ProgressionEngine(session_factory=session_factory, chunk_size=4)
+        apply_chunk = ProgressionEngine._apply_chunk
+        calls = []
+
+        async def failing_second_chunk(self, db, batch_id, to_session_year_id, chunk_ids):
+            calls.append(chunk_ids)
+            if len(calls) == 2:
+                raise RuntimeError("connection lost")
+            await apply_chunk(self, db, batch_id, to_session_year_id, chunk_ids)
+
+        monkeypatch.setattr(ProgressionEngine, "_apply_chunk", failing_second_chunk)
+        async with session_factory() as db:
+            batch_id = await progression.stage(db, 4, 5, [promote(i) for i in range(1, 11)], progressed_by=1)
+            failed = await progression.run(db, batch_id)
+            resumed = await progression.run(db, batch_id)
+            moved = (await db.execute(select(Student.id).where(Student.session_year_id == 5))).scalars().all()
+            history_count = len((await db.execute(select(StudentSessionHistory.id))).all())
+
+        assert (failed["status"], failed["processed_count"], failed["last_error"]) == ("FAILED", 4, "connection lost")
+        assert failed["progress_percentage"] == 40.0
+        assert (resumed["status"], resumed["successful_count"]) == ("COMPLETED", 10)
+        assert sorted(moved) == list(range(1, 11)) and history_count == 10
+        # The failed chunk is retried, completed chunks are not
+        assert calls[1] == calls[2]
+
+    @pytest.mark.asyncio
+    async def test_student_progressed_after_staging_is_skipped(self, progression_db):
+        _, session_factory = progression_db
+        progression = ProgressionEngine(session_factory=session_factory, chunk_size=4)
+
+        async with session_factory() as db:
+            batch_id = await progression.stage(db, 4, 5, [promote(i) for i in range(1, 11)], progressed_by=1)
+            # Student 3 is progressed by another batch before this one runs
+            other_id, other = await progression.progress(db, 4, 5, [promote(3, remarks="early")], progressed_by=1)
+            status = await progression.run(db, batch_id)
+
+            skipped = (await db.execute(
+                select(ProgressionBatchItem.status, ProgressionBatchItem.error_message)
+                .where(ProgressionBatchItem.batch_id == batch_id, ProgressionBatchItem.student_id == 3)
+            )).one()
+            histories = (await db.execute(
+                select(StudentSessionHistory.student_id, StudentSessionHistory.progression_batch_id)
+            )).all()
+
+        assert other["status"] == "COMPLETED"
+        assert (status["status"], status["successful_count"], status["failed_count"]) == ("COMPLETED", 9, 1)
+        assert skipped.status == "FAILED" and "progressed after staging" in skipped.error_message
+        assert sorted(student_id for student_id, _ in histories) == list(range(1, 11))
+        assert (3, other_id) in histories
+
+    @pytest.mark.asyncio
+    async def test_running_batch_is_not_claimed_twice(self, progression_db):
+        _, session_factory = progression_db
+        progression = ProgressionEngine(session_factory=session_factory)
+
+        async with session_factory() as db:
+            batch_id = await progression.stage(db, 4, 5, [promote(1)], progressed_by=1)
+            await db.execute(update(ProgressionBatch).values(status="RUNNING"))
+            await db.commit()
+            skipped = await progression.run(db, batch_id)
+            forced = await progression.run(db, batch_id, force=True)
+
+        assert (skipped["status"], skipped["processed_count"]) == ("RUNNING", 0)
+        assert (forced["status"], forced["processed_count"]) == ("COMPLETED", 1)
+
+    @pytest.mark.asyncio
+    async def test_background_start_uses_its_own_session(self, progression_db):
+        _, session_factory = progression_db
+        progression = ProgressionEngine(session_factory=session_factory)
+
+        async with session_factory() as db:
+            batch_id = await progression.stage(db, 4, 5, [promote(1), promote(2)], progressed_by=1)
+        assert progression.start(batch_id)
+        await progression._tasks[batch_id]
+
+        async with session_factory() as db:
+            status = await progression.get_status(db, batch_id)
+        assert status["status"] == "COMPLETED" and not status["running_in_process"]
+
+
+class TestRollback:
+    @pytest.mark.asyncio
+    async def test_restores_students_in_one_update(self, progression_db, monkeypatch):
+        engine, session_factory = progression_db
+        monkeypatch.setattr(engine_module, "progression_engine", ProgressionEngine(session_factory=session_factory))
+
+        async with session_factory() as db:
+            result = await bulk_progress_students(
+                db, 4, 5, [promote(1), promote(2), {"student_id": 20, "progression_action_id": 4}], progressed_by=1
+            )
+            with count_queries(engine) as counter:
+                rollback = await rollback_progression_batch(db, result["batch_id"], rolled_back_by=1)
+            students = (await db.execute(
+                select(Student).where(Student.id.in_([1, 2, 20])).execution_options(populate_existing=True)
+            )).scalars().all()
+            batch = await engine_module.progression_engine.get_status(db, result["batch_id"])
+            history = (await db.execute(select(StudentSessionHistory.id))).all()
+
+        assert rollback["success"] and rollback["students_affected"] == 3
+        # batch status, history count, restore, delete, batch update, commit
+        assert counter.count <= 6
+        assert all((s.session_year_id, s.class_id, s.section, s.is_active) == (4, s.class_id, "B", True) for s in students)
+        assert {s.id: s.class_id for s in students} == {1: 5, 2: 5, 20: 12}
+        assert batch["status"] == "ROLLED_BACK" and history == []
+
+    @pytest.mark.asyncio
+    async def test_unknown_batch(self, progression_db):
+        _, session_factory = progression_db
+
+        async with session_factory() as db:
+            rollback = await rollback_progression_batch(db, "PROG-missing", rolled_back_by=1)
+
+        assert not rollback["success"] and rollback["students_affected"] == 0
@@ -0,0 +1,239 @@
+"""
+Test cases for family-key sibling detection, whole-school clustering and the
+cached waiver rule table
+"""
+
+import pytest
+import pytest_asyncio
+from datetime import date
+from decimal import Decimal
+from types import SimpleNamespace
+from sqlalchemy import select, update
+
+from fixtures.sqlite_db import seed_core_metadata, count_queries
+from app.crud.crud_student_sibling import SiblingWaiverRules, sibling_waiver_rules, student_sibling_crud
+from app.models.metadata import Class, Gender, SessionYear
+from app.models.student import Student, family_key_for
+from app.models.student_sibling import StudentSibling
+
+
+def slab_waiver(total: int, birth_order: int) -> Decimal:
+    """Same rules as the calculate_sibling_fee_waiver SQL function"""
+    if total == 3 and birth_order == 3:
+        return Decimal("100.00")
+    if total == 4 and birth_order in (3, 4):
+        return Decimal("50.00") if birth_order == 3 else Decimal("100.00")
+    if total >= 5 and birth_order >= total - 1:
+        return Decimal("100.00")
+    return Decimal("0.00")
+
+
+def slab_rows(max_total: int):
+    return [
+        SimpleNamespace(total=total, birth_order=order, waiver=slab_waiver(total, order),
+                        reason=f"waiver {total}/{order}")
+        for total in range(1, max_total + 1) for order in range(1, total + 1)
+    ]
+
+
+class SlabSession:
+    """Answers the rule-table query like PostgreSQL would"""
+
+    def __init__(self):
+        self.queries = 0
+
+    async def execute(self, statement, params=None):
+        self.queries += 1
+        rows = slab_rows(params["max_total"])
+        return SimpleNamespace(fetchall=lambda: rows)
+
+
+@pytest.fixture
+def python_slabs(monkeypatch):
+    """Serve the global rule table without the PostgreSQL functions"""
+    loads = []
+
+    async def load(db, max_total):
+        loads.append(max_total)
+        sibling_waiver_rules._rules = {
+            (row.total, row.birth_order): (row.waiver, row.reason if row.waiver else None)
+            for row in slab_rows(max_total)
+        }
+        sibling_waiver_rules._loaded_total = max_total
+
+    sibling_waiver_rules.clear()
+    monkeypatch.setattr(sibling_waiver_rules, "_load", load)
+    yield loads
+    sibling_waiver_rules.clear()
+
+
+def make_student(student_id: int, father_name: str, father_phone: str, born: date, **extra) -> Student:
+    return Student(
+        id=student_id, admission_number=f"ADM{student_id:04d}", first_name=f"Child{student_id}",
+        last_name="Sharma", date_of_birth=born, gender_id=1, class_id=5, section="A",
+        session_year_id=4, father_name=father_name, father_phone=father_phone,
+        mother_name="Mother", admission_date=date(2025, 4, 1), **extra
+    )
+
+
+async def seed_families(session):
+    await seed_core_metadata(session)
+    session.add_all([
+        # Family A: four children, spelled three ways
+        make_student(1, "Ram Kumar", "9876500001", date(2012, 1, 1)),
+        make_student(2, "ram  kumar ", "9876500001", date(2014, 1, 1)),
+        make_student(3, " RAM KUMAR", " 9876500001", date(2016, 1, 1)),
+        make_student(4, "Ram Kumar", "9876500001", date(2018, 1, 1)),
+        # Family B: two children, one of them has left
+        make_student(5, "Mohan Lal", "9876500002", date(2013, 5, 5)),
+        make_student(6, "Mohan Lal", "9876500002", date(2015, 5, 5)),
+        make_student(7, "Mohan Lal", "9876500002", date(2017, 5, 5), is_active=False),
+        # Same name, different phone: not a sibling
+        make_student(8, "Ram Kumar", "9000000000", date(2013, 3, 3)),
+        # No phone: no family key
+        make_student(9, "Suresh", "", date(2013, 3, 3)),
+    ])
+
+
+@pytest_asyncio.fixture
+async def school_db(sqlite_session_factory):
+    session_factory, engine = await sqlite_session_factory([SessionYear, Gender, Class, Student, StudentSibling], seed_families)
+    return engine, session_factory
+
+
+class TestFamilyKey:
+    def test_normalization(self):
+        assert family_key_for("  Ram   Kumar ", " 98765 ") == "ram kumar|98765"
+        assert family_key_for("Ram\tKumar", "98765") == "ram kumar|98765"
+        assert family_key_for("Ram Kumar", None) is None
+        assert family_key_for("   ", "98765") is None
+
+    @pytest.mark.asyncio
+    async def test_key_is_maintained_on_insert_and_update(self, school_db):
+        engine, session_factory = school_db
+
+        async with session_factory() as db:
+            student = await db.get(Student, 2)
+            assert student.family_key == "ram kumar|9876500001"
+            assert (await db.get(Student, 9)).family_key is None
+
+            student.father_phone = "9876500002"
+            student.father_name = "MOHAN   LAL"
+            await db.commit()
+            await db.refresh(student)
+            assert student.family_key == "mohan lal|9876500002"
+
+    @pytest.mark.asyncio
+    async def test_detection_is_one_indexed_lookup(self, school_db):
+        engine, session_factory = school_db
+
+        async with session_factory() as db:
+            with count_queries(engine) as counter:
+                siblings = await student_sibling_crud.detect_siblings_by_father_and_phone(
+                    db, father_name="RAM  kumar", father_phone="9876500001 ", exclude_student_id=4
+                )
+            assert [student.id for student in siblings] == [1, 2, 3]
+            assert counter.count == 1
+
+            # Inactive students are not detected
+            siblings = await student_sibling_crud.detect_siblings_by_father_and_phone(
+                db, father_name="Mohan Lal", father_phone="9876500002"
+            )
+            assert [student.id for student in siblings] == [5, 6]
+
+
+class TestWaiverRules:
+    @pytest.mark.asyncio
+    async def test_rules_are_loaded_once(self):
+        rules = SiblingWaiverRules(max_total=6)
+        db = SlabSession()
+
+        results = [await rules.get(db, 4, order) for order in range(1, 5)]
+        results += [await rules.get(db, 5, order) for order in range(1, 6)]
+
+        assert db.queries == 1
+        assert [percentage for percentage, _ in results[:4]] == [0, 0, Decimal("50.00"), Decimal("100.00")]
+        assert results[0][1] is None
+        assert results[3][1] == "waiver 4/4"
+        assert await rules.get(db, 3, 4) == (Decimal("0.00"), None)
+
+        # A bigger family than the table covers reloads it once
+        assert (await rules.get(db, 9, 9))[0] == Decimal("100.00")
+        assert (await rules.get(db, 8, 7))[0] == Decimal("100.00")
+        assert db.queries == 2
+
+
+class TestFamilyClustering:
+    @staticmethod
+    async def relationships(session_factory):
+        async with session_factory() as db:
+            result = await db.execute(select(StudentSibling).order_by(StudentSibling.student_id))
+            return {(row.student_id, row.sibling_student_id): row for row in result.scalars().all()}
+
+    @pytest.mark.asyncio
+    async def test_clusters_whole_school_in_one_pass(self, school_db, python_slabs):
+        engine, session_factory = school_db
+
+        async with session_factory() as db:
+            with count_queries(engine) as counter:
+                report = await student_sibling_crud.cluster_all_families(db)
+
+        assert (report["families"], report["students_in_families"]) == (2, 6)
+        assert report["relationships_inserted"] == 4 * 3 + 2 * 1
+        assert report["family_keys_refreshed"] == 0
+        # students, relationships, bulk insert (+ commit bookkeeping)
+        assert counter.count <= 4
+        assert python_slabs == [12]
+
+        rows = await self.relationships(session_factory)
+        assert {(pair, row.birth_order) for pair, row in rows.items() if pair[0] in (1, 3, 4) and pair[1] == 2} == {
+            ((1, 2), 1), ((3, 2), 3), ((4, 2), 4)
+        }
+        assert rows[(3, 1)].fee_waiver_percentage == Decimal("50.00")
+        assert rows[(4, 1)].fee_waiver_percentage == Decimal("100.00")
+        assert rows[(6, 5)].fee_waiver_percentage == Decimal("0.00")
+        changed = {change["student_id"]: change["new_waiver_percentage"] for change in report["waiver_changes"]}
+        assert changed == {3: Decimal("50.00"), 4: Decimal("100.00")}
+
+        # Second run is a no-op
+        async with session_factory() as db:
+            report = await student_sibling_crud.cluster_all_families(db)
+        assert (report["relationships_inserted"], report["relationships_updated"], report["waiver_changes"]) == (0, 0, [])
+
+    @pytest.mark.asyncio
+    async def test_manual_links_and_stale_keys(self, school_db, python_slabs):
+        engine, session_factory = school_db
+
+        async with session_factory() as db:
+            # Manual link of a cousin with a different key, and a raw SQL edit of father details
+            db.add_all([
+                StudentSibling(student_id=8, sibling_student_id=1, birth_order=1, fee_waiver_percentage=0),
+                StudentSibling(student_id=1, sibling_student_id=8, birth_order=1, fee_waiver_percentage=0),
+            ])
+            await db.execute(
+                update(Student).where(Student.id == 6).values(father_phone="9111111111")
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+
+        async with session_factory() as db:
+            report = await student_sibling_crud.cluster_all_families(db, dry_run=True)
+        assert report["dry_run"] is True
+        assert report["family_keys_refreshed"] == 1
+        assert (await self.relationships(session_factory)).keys() == {(8, 1), (1, 8)}
+
+        async with session_factory() as db:
+            report = await student_sibling_crud.cluster_all_families(db)
+        # Family A plus the linked cousin (born 2013, so 2nd of 5); family B is split
+        assert (report["families"], report["students_in_families"]) == (1, 5)
+        # (1, 8) is already right: eldest, no waiver
+        assert report["relationships_updated"] == 1
+
+        rows = await self.relationships(session_factory)
+        assert rows[(8, 1)].birth_order == 2
+        assert rows[(1, 8)].birth_order == 1
+        assert rows[(4, 8)].fee_waiver_percentage == Decimal("100.00")
+        assert rows[(3, 8)].fee_waiver_percentage == Decimal("100.00")
+
+        async with session_factory() as db:
+            assert (await db.get(Student, 6)).family_key == "mohan lal|9111111111"
@@ -0,0 +1,207 @@
+"""
+Test cases for the stock reservation engine: single-statement decrement,
+all-or-nothing failure with a shortage report, low-stock alerts from the
+returned rows, atomic restock adjustments, and a concurrent-counter harness
+on a shared database file
+"""
+
+import asyncio
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from fixtures.sqlite_db import create_session_factory, create_tables, count_queries
+from app.crud.crud_inventory_stock import crud_inventory_stock
+from app.models.alert import Alert, AlertUnreadCounter
+from app.models.inventory import InventoryItemCategory, InventoryItemType, InventorySizeType, InventoryStock
+from app.services.stock_reservation_engine import (
+    InsufficientStockError, StockLine, stock_reservation_engine
+)
+
+SHIRT, TROUSER, TIE = 1, 2, 3
+SIZE_32, SIZE_34 = 1, 2
+
+TABLES = [InventoryItemCategory, InventoryItemType, InventorySizeType, InventoryStock, Alert, AlertUnreadCounter]
+
+
+def seed_inventory(stock):
+    async def seed(db):
+        db.add(InventoryItemCategory(id=1, name="UNIFORM"))
+        db.add_all([
+            InventoryItemType(id=SHIRT, name="SHIRT", description="School Shirt", inventory_item_category_id=1),
+            InventoryItemType(id=TROUSER, name="TROUSER", description="School Trouser", inventory_item_category_id=1),
+            InventoryItemType(id=TIE, name="TIE", description="School Tie", inventory_item_category_id=1),
+            InventorySizeType(id=SIZE_32, name="32"),
+            InventorySizeType(id=SIZE_34, name="34"),
+        ])
+        db.add_all([
+            InventoryStock(inventory_item_type_id=item_id, size_type_id=size_id,
+                           current_quantity=quantity, minimum_threshold=10, reorder_quantity=50)
+            for (item_id, size_id), quantity in stock.items()
+        ])
+    return seed
+
+
+async def quantities(db):
+    rows = (await db.execute(select(
+        InventoryStock.inventory_item_type_id, InventoryStock.size_type_id, InventoryStock.current_quantity
+    ))).all()
+    return {(row[0], row[1]): row[2] for row in rows}
+
+
+@pytest_asyncio.fixture
+async def stock_db(sqlite_session_factory):
+    return await sqlite_session_factory(
+        TABLES, seed_inventory({(SHIRT, SIZE_32): 20, (TROUSER, SIZE_34): 2, (TIE, None): 12})
+    )
+
+
+class TestReserve:
+    @pytest.mark.asyncio
+    async def test_all_lines_decremented_in_one_statement(self, stock_db):
+        session_factory, engine = stock_db
+        async with session_factory() as db:
+            with count_queries(engine) as counter:
+                reserved = await stock_reservation_engine.reserve(db, [
+                    StockLine(SHIRT, SIZE_32, 3),
+                    StockLine(TIE, None, 1),
+                    StockLine(SHIRT, SIZE_32, 2),  # same item listed twice
+                ])
+            await db.commit()
+
+            # One UPDATE, wrapped in a savepoint
+            assert [statement.split()[0] for statement in counter.statements] == ["SAVEPOINT", "UPDATE", "RELEASE"]
+            assert [(r.item_type_id, r.quantity, r.remaining) for r in reserved] == [(SHIRT, 5, 15), (TIE, 1, 11)]
+            assert await quantities(db) == {(SHIRT, SIZE_32): 15, (TROUSER, SIZE_34): 2, (TIE, None): 11}
+
+    @pytest.mark.asyncio
+    async def test_shortage_rolls_back_every_line_and_reports_each_item(self, stock_db):
+        session_factory, _ = stock_db
+        async with session_factory() as db:
+            db.add(InventorySizeType(id=3, name="36"))  # caller's pending work
+            with pytest.raises(InsufficientStockError) as error:
+                await stock_reservation_engine.reserve(db, [
+                    StockLine(SHIRT, SIZE_32, 3),
+                    StockLine(TROUSER, SIZE_34, 5),
+                    StockLine(TROUSER, SIZE_32, 1),  # no stock row at all
+                ])
+
+            assert [(s.item_name, s.size_name, s.available, s.required) for s in error.value.shortages] == [
+                ("School Trouser", "34", 2, 5),
+                ("School Trouser", "32", 0, 1),
+            ]
+            assert "School Trouser (Size: 34). Available: 2, Required: 5" in str(error.value)
+            assert (await quantities(db))[(SHIRT, SIZE_32)] == 20
+            await db.commit()
+            assert (await db.get(InventorySizeType, 3)).name == "36"
+
+    @pytest.mark.asyncio
+    async def test_low_stock_alert_only_when_threshold_is_crossed(self, stock_db):
+        session_factory, _ = stock_db
+        async with session_factory() as db:
+            first = await stock_reservation_engine.reserve(db, [StockLine(TIE, None, 2), StockLine(SHIRT, SIZE_32, 1)])
+            await db.commit()
+            emitted = await stock_reservation_engine.emit_low_stock_alerts(
+                db, first, actor_user_id=1, actor_name="Admin User"
+            )
+
+            second = await stock_reservation_engine.reserve(db, [StockLine(TIE, None, 1)])
+            await db.commit()
+            emitted_again = await stock_reservation_engine.emit_low_stock_alerts(
+                db, second, actor_user_id=1, actor_name="Admin User"
+            )
+
+            alerts = (await db.execute(select(Alert))).scalars().all()
+
+        assert (emitted, emitted_again) == (1, 0)
+        assert [alert.title for alert in alerts] == ["Low Stock: School Tie"]
+        assert alerts[0].alert_type_id == 50 and alerts[0].target_role == "ADMIN"
+        assert alerts[0].alert_metadata["remaining_quantity"] == 10
+
+
+class TestAdjustStockQuantity:
+    @pytest.mark.asyncio
+    async def test_adjusts_existing_rows_and_creates_missing_ones(self, stock_db):
+        session_factory, _ = stock_db
+        async with session_factory() as db:
+            restocked = await crud_inventory_stock.adjust_stock_quantity(db, SHIRT, SIZE_32, 15)
+            created = await crud_inventory_stock.adjust_stock_quantity(db, SHIRT, SIZE_34, 5)
+            floored = await crud_inventory_stock.adjust_stock_quantity(db, TROUSER, SIZE_34, -5)
+
+            assert (restocked.current_quantity, created.current_quantity, floored.current_quantity) == (35, 5, 0)
+            assert await quantities(db) == {
+                (SHIRT, SIZE_32): 35, (SHIRT, SIZE_34): 5, (TROUSER, SIZE_34): 0, (TIE, None): 12
+            }
+
+
+class TestConcurrentCounters:
+    """Many counters selling the same item at once never oversell it"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_reservations_never_take_stock_below_zero(self, tmp_path):
+        engine = create_async_engine(
+            f"sqlite+aiosqlite:///{tmp_path / 'stock.db'}", connect_args={"timeout": 30}
+        )
+        await create_tables(engine, TABLES)
+        session_factory = create_session_factory(engine)
+        async with session_factory() as db:
+            await seed_inventory({(SHIRT, SIZE_32): 40, (TIE, None): 100})(db)
+            await db.commit()
+
+        async def counter_sale():
+            async with session_factory() as db:
+                try:
+                    await stock_reservation_engine.reserve(db, [StockLine(SHIRT, SIZE_32, 3), StockLine(TIE, None, 1)])
+                except InsufficientStockError as e:
+                    return e
+                await asyncio.sleep(0.001)  # purchase rows written in the same transaction
+                await db.commit()
+                return None
+
+        results = await asyncio.gather(*(counter_sale() for _ in range(20)))
+
+        sold = sum(1 for result in results if result is None)
+        async with session_factory() as db:
+            final = await quantities(db)
+            negative = (await db.execute(
+                select(func.count()).select_from(InventoryStock).where(InventoryStock.current_quantity < 0)
+            )).scalar()
+        await engine.dispose()
+
+        assert sold == 13
+        assert final == {(SHIRT, SIZE_32): 40 - 3 * sold, (TIE, None): 100 - sold}
+        assert negative == 0
+        for failure in (result for result in results if result is not None):
+            assert [s.item_name for s in failure.shortages] == ["School Shirt"]
+            assert failure.shortages[0].available < 3
+
+    @pytest.mark.asyncio
+    async def test_restocks_during_sales_keep_every_change(self, tmp_path):
+        engine = create_async_engine(
+            f"sqlite+aiosqlite:///{tmp_path / 'stock.db'}", connect_args={"timeout": 30}
+        )
+        await create_tables(engine, TABLES)
+        session_factory = create_session_factory(engine)
+        async with session_factory() as db:
+            await seed_inventory({(TIE, None): 100})(db)
+            await db.commit()
+
+        async def counter_sale():
+            async with session_factory() as db:
+                await stock_reservation_engine.reserve(db, [StockLine(TIE, None, 2)])
+                await asyncio.sleep(0.001)
+                await db.commit()
+
+        async def restock():
+            async with session_factory() as db:
+                await crud_inventory_stock.adjust_stock_quantity(db, TIE, None, 5)
+
+        await asyncio.gather(*(counter_sale() if i % 2 else restock() for i in range(20)))
+
+        async with session_factory() as db:
+            final = await quantities(db)
+        await engine.dispose()
+
+        assert final == {(TIE, None): 100 - 2 * 10 + 5 * 10}
@@ -0,0 +1,131 @@
+"""
+Test cases for the student list: metadata and the past-session history overlay
+come from the list query, so the query count does not grow with the page size
+"""
+
+import pytest
+import pytest_asyncio
+from datetime import date
+
+from fixtures.sqlite_db import seed_core_metadata, count_queries
+from app.api.v1.endpoints.students import get_students
+from app.models.metadata import Class, Gender, SessionYear
+from app.models.student import Student
+from app.models.student_session_history import StudentSessionHistory
+
+STUDENTS = 120
+
+
+async def seed_students(session):
+    await seed_core_metadata(session)
+    session.add_all([
+        Student(
+            id=index, admission_number=f"ADM{index:04d}", first_name="Student", last_name=f"{index:04d}",
+            date_of_birth=date(2015, 1, 1), gender_id=1 + index % 2, class_id=(index % 11) + 2,
+            section="A", roll_number=str(index), session_year_id=4, father_name="Father",
+            mother_name="Mother", admission_date=date(2024, 4, 1)
+        )
+        for index in range(1, STUDENTS + 1)
+    ])
+    # Every student was in the class below (section B) in 2024-25
+    session.add_all([
+        StudentSessionHistory(
+            student_id=index, session_year_id=3, class_id=(index % 11) + 1, section="B",
+            roll_number=f"H{index}", progression_action_id=1, progressed_by=1
+        )
+        for index in range(1, STUDENTS + 1)
+    ])
+    # A student who stayed in 2024-25 without a history row
+    session.add(Student(
+        id=STUDENTS + 1, admission_number="ADM9999", first_name="Alumni", last_name="Student",
+        date_of_birth=date(2014, 1, 1), gender_id=2, class_id=12, section="C", roll_number="1",
+        session_year_id=3, father_name="Father", mother_name="Mother", admission_date=date(2020, 4, 1),
+        is_active=False
+    ))
+
+
+@pytest_asyncio.fixture
+async def school_db(sqlite_session_factory):
+    session_factory, engine = await sqlite_session_factory(
+        [SessionYear, Gender, Class, Student, StudentSessionHistory], seed_students
+    )
+    async with session_factory() as session:
+        yield engine, session
+
+
+async def list_students(session, **filters):
+    params = dict(
+        class_filter=None, section_filter=None, gender_filter=None, search=None,
+        is_active=None, session_year_id=None, page=1, per_page=25
+    )
+    params.update(filters)
+    return await get_students(db=session, current_user=None, **params)
+
+
+class TestStudentListQueryCount:
+    """The list must not re-fetch each student or its history row"""
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("per_page", [25, 100])
+    async def test_current_session(self, school_db, per_page):
+        engine, session = school_db
+
+        with count_queries(engine) as counter:
+            response = await list_students(session, session_year_id=4, per_page=per_page)
+
+        assert len(response.students) == per_page
+        assert response.total == STUDENTS
+        # current-session check + count + page with joined metadata
+        assert counter.count == 3
+        first = response.students[0]
+        assert (first.class_name, first.gender_name, first.session_year_name) == ("Class 3", "FEMALE", "2025-26")
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("per_page", [25, 100])
+    async def test_past_session_uses_history_overlay(self, school_db, per_page):
+        engine, session = school_db
+
+        with count_queries(engine) as counter:
+            response = await list_students(session, session_year_id=3, per_page=per_page)
+
+        assert counter.count == 3
+        assert response.total == STUDENTS + 1
+        by_id = {student.id: student for student in response.students}
+        first = by_id[1]
+        assert (first.class_id, first.class_name, first.section, first.roll_number) == (2, "Class 2", "B", "H1")
+        assert first.session_year_name == "2024-25"
+
+        # The persistent students keep their current values
+        current = await session.get(Student, 1)
+        assert (current.class_id, current.section, current.session_year_id) == (3, "A", 4)
+
+
+class TestStudentListFilters:
+    @pytest.mark.asyncio
+    async def test_past_session_filters_on_historical_class_and_section(self, school_db):
+        engine, session = school_db
+
+        response = await list_students(session, session_year_id=3, class_filter=11, per_page=100)
+
+        ids = sorted(student.id for student in response.students)
+        # Historical class 11, although their current class is 12
+        assert ids == list(range(10, STUDENTS + 1, 11))
+        assert response.total == len(ids)
+
+        # Only the student who stayed in class 12 without a history row
+        response = await list_students(session, session_year_id=3, class_filter=12, per_page=100)
+        assert [student.id for student in response.students] == [STUDENTS + 1]
+
+        response = await list_students(session, session_year_id=3, section_filter="C", per_page=100)
+        assert [student.first_name for student in response.students] == ["Alumni"]
+
+    @pytest.mark.asyncio
+    async def test_current_session_pagination_is_stable(self, school_db):
+        engine, session = school_db
+
+        first = await list_students(session, session_year_id=4, page=1, per_page=50)
+        second = await list_students(session, session_year_id=4, page=2, per_page=50)
+
+        ids = [student.id for student in first.students + second.students]
+        assert len(set(ids)) == 100
+        assert first.total_pages == 3